@@ -4,6 +4,7 @@ and state handlers (engine)
 """
 
 import argparse
+import functools
 import os
 import sys
 import logging
@@ -11,6 +12,7 @@ from logging import handlers
 
 from enginecore.state.redis_state_listener import StateListener
 from enginecore.state.engine.engine import Engine
+from enginecore.tools.clock import CLOCK, ClockMode
 import enginecore
 
 FORMAT = "[%(threadName)s, %(asctime)s, %(module)s:%(lineno)s] %(message)s"
@@ -74,15 +76,78 @@ def run_app():
     argparser.add_argument(
         "-d", "--develop", help="Run in a development mode", action="store_true"
     )
+    argparser.add_argument(
+        "--vectorized-power",
+        help="Resolve wallpower voltage changes with vectorized power flow solver",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--write-behind",
+        help="Buffer asset state updates till engine iterations complete \
+            (instead of writing them to redis right away)",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--state-cache",
+        help="Cache asset state in-process \
+            (invalidated with redis keyspace notifications)",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--shared-sensors",
+        help="Keep BMC sensor values in a memory-mapped table shared with ipmi_sim \
+            (instead of a file per sensor)",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--vectorized-thermal",
+        help="Update thermal relationships of a server with vectorized thermal solver \
+            (instead of updating every relationship separately)",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--redis-streams",
+        help="Read engine input events from redis streams \
+            (instead of pub/sub channels)",
+        action="store_true",
+    )
+
+    argparser.add_argument(
+        "--clock",
+        help="Simulation clock mode: real-time, scaled (see --clock-speed) \
+            or discrete-event (as fast as possible)",
+        choices=[m.name for m in ClockMode],
+        default=ClockMode.real.name,
+    )
+    argparser.add_argument(
+        "--clock-speed",
+        help="Speed factor of the scaled clock (e.g. 10, 100)",
+        type=float,
+        default=10,
+    )
 
     args = vars(argparser.parse_args())
 
     # logging config
     configure_logger(develop=args["develop"], debug=args["verbose"])
 
+    CLOCK.configure(ClockMode[args["clock"]], speed=args["clock_speed"])
+
     # run daemon
+    engine_cls = functools.partial(
+        Engine,
+        vectorized_power=args["vectorized_power"],
+        write_behind=args["write_behind"],
+        state_cache=args["state_cache"],
+        shared_sensors=args["shared_sensors"],
+        vectorized_thermal=args["vectorized_thermal"],
+    )
+
     StateListener(
-        engine_cls=Engine, debug=args["verbose"], force_snmp_init=args["reload_data"]
+        engine_cls=engine_cls,
+        debug=args["verbose"],
+        force_snmp_init=args["reload_data"],
+        streams=args["redis_streams"],
     ).run()
 
 
@@ -0,0 +1,113 @@
+"""Engine benchmark entry point
+
+Example:
+    python -m enginecore.benchmark --ups 4 --pdus 2 --outlets 24 --servers 20 \
+        -o bench.json
+    python -m enginecore.benchmark -o new.json --compare bench.json
+"""
+import argparse
+import json
+import sys
+
+from enginecore.benchmark.report import compare_reports, format_comparison, make_report
+from enginecore.benchmark.runner import BenchmarkEnvironment
+from enginecore.benchmark.scenarios import SCENARIOS
+from enginecore.benchmark.topology import SyntheticTopology
+
+
+def run_benchmark():
+    """Run benchmark scenarios & save/compare the report"""
+
+    argparser = argparse.ArgumentParser(
+        description="Benchmark engine throughput against a synthetic topology \
+            (Redis & Neo4j are replaced with in-process stand-ins)"
+    )
+
+    argparser.add_argument("--ups", help="Number of UPSes (racks)", type=int, default=2)
+    argparser.add_argument("--pdus", help="PDUs per UPS", type=int, default=2)
+    argparser.add_argument("--outlets", help="Outlets per PDU", type=int, default=8)
+    argparser.add_argument("--servers", help="Servers per rack", type=int, default=8)
+    argparser.add_argument(
+        "-s",
+        "--scenario",
+        help="Scenario to be run (all scenarios are run by default)",
+        choices=SCENARIOS.keys(),
+        action="append",
+    )
+    argparser.add_argument(
+        "-r",
+        "--rounds",
+        help="Number of times scenario is repeated",
+        type=int,
+        default=5,
+    )
+    argparser.add_argument(
+        "--vectorized-power",
+        help="Resolve wallpower voltage changes with vectorized power flow solver",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--write-behind",
+        help="Buffer asset state updates till iterations complete \
+            (instead of writing them straight to the store)",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--state-cache",
+        help="Serve asset state reads from in-process cache",
+        action="store_true",
+    )
+    argparser.add_argument(
+        "--trace-malloc",
+        help="Measure peak memory allocated by python (slows down the engine)",
+        action="store_true",
+    )
+    argparser.add_argument("-o", "--output", help="Save JSON report to a file")
+    argparser.add_argument(
+        "--compare", help="Compare results against a report saved earlier"
+    )
+
+    args = vars(argparser.parse_args())
+
+    topology = SyntheticTopology(
+        num_ups=args["ups"],
+        num_pdus=args["pdus"],
+        num_outlets=args["outlets"],
+        num_servers=args["servers"],
+    )
+
+    results = {}
+    with BenchmarkEnvironment(
+        topology,
+        args["vectorized_power"],
+        args["write_behind"],
+        state_cache=args["state_cache"],
+    ) as bench:
+        for name in args["scenario"] or SCENARIOS:
+            results[name] = bench.run(
+                SCENARIOS[name], args["rounds"], trace_malloc=args["trace_malloc"]
+            )
+
+    report = make_report(
+        topology,
+        results,
+        args["vectorized_power"],
+        args["write_behind"],
+        state_cache=args["state_cache"],
+    )
+
+    if args["output"]:
+        with open(args["output"], "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args["compare"]:
+        with open(args["compare"]) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(format_comparison(compare_reports(baseline, report), baseline, report))
+
+
+if __name__ == "__main__":
+    run_benchmark()
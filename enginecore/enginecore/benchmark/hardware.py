@@ -0,0 +1,91 @@
+"""Agent-free hardware assets standing in for UPS, PDU & server types
+during benchmarks (snmpsimd, IPMI & libvirt VMs cannot run in-process);
+Stand-ins keep power logic of the assets they replace but drop
+SNMP/BMC interfaces, UPS battery is not simulated.
+"""
+from enginecore.state.api.state import IStateManager
+import enginecore.state.hardware.internal_state as in_state
+from enginecore.state.hardware.asset_definition import SUPPORTED_ASSETS
+from enginecore.state.hardware.server_asset import Server
+from enginecore.state.hardware.static_asset import StaticAsset
+
+
+class InMemoryVM:
+    """Stand-in for a libvirt domain managed by a server"""
+
+    def __init__(self):
+        self._active = False
+
+    def isActive(self):  # pylint: disable=invalid-name
+        """Check if vm is running"""
+        return self._active
+
+    def create(self):
+        """Start the vm"""
+        self._active = True
+
+    def destroy(self):
+        """Power off the vm"""
+        self._active = False
+
+
+class BenchUPSStateManager(in_state.StaticDeviceStateManager):
+    """UPS that never transfers to battery"""
+
+    @property
+    def on_battery(self):
+        """UPS always runs on input power"""
+        return False
+
+
+class BenchServerStateManager(in_state.ServerStateManager):
+    """Server managing an in-memory vm"""
+
+    def __init__(self, asset_info):
+        # pylint: disable=non-parent-init-called,super-init-not-called
+        IStateManager.__init__(self, asset_info)
+        self._vm = InMemoryVM()
+
+
+class BenchUPS(StaticAsset):
+    """UPS passing input power through to its outlets"""
+
+    channel = "engine-bench-ups"
+    StateManagerCls = BenchUPSStateManager
+
+
+class BenchPDU(StaticAsset):
+    """PDU without SNMP interface"""
+
+    channel = "engine-bench-pdu"
+
+
+class BenchServer(Server):
+    """Dual-PSU server reacting to ambient changes (without BMC sensors)"""
+
+    channel = "engine-bench-server"
+    StateManagerCls = BenchServerStateManager
+    thermal_subscriber = True
+
+
+# asset types replaced with the stand-ins (see install)
+BENCH_ASSETS = {"ups": BenchUPS, "pdu": BenchPDU, "server": BenchServer}
+
+
+def install():
+    """Let the engine instantiate stand-ins in place of the real hardware types
+    Returns:
+        dict: replaced asset types (see uninstall)
+    """
+    replaced = {t: SUPPORTED_ASSETS.get(t) for t in BENCH_ASSETS}
+    SUPPORTED_ASSETS.update(BENCH_ASSETS)
+    return replaced
+
+
+def uninstall(replaced):
+    """Restore asset types replaced by install"""
+    for asset_type, asset_cls in replaced.items():
+        if asset_cls:
+            SUPPORTED_ASSETS[asset_type] = asset_cls
+        else:
+            del SUPPORTED_ASSETS[asset_type]
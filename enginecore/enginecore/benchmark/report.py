@@ -0,0 +1,140 @@
+"""Benchmark reports (JSON) & comparison of reports produced by different
+commits"""
+import datetime
+import platform
+import subprocess
+
+# metrics compared between reports & whether higher value is better
+COMPARED_METRICS = {
+    "elapsed": False,
+    "iterations_per_sec": True,
+    "events_per_sec": True,
+    "redis_calls": False,
+    "neo4j_calls": False,
+    "max_rss_kb": False,
+    "malloc_peak_kb": False,
+}
+
+# iteration latency percentiles compared between reports
+COMPARED_LATENCIES = ("p50", "p95", "p99")
+
+
+def get_commit():
+    """Get current git commit (None if not in a git repository)"""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_report(
+    topology, results, vectorized_power=False, write_behind=False, state_cache=False
+):
+    """Combine scenario results into a report
+    Args:
+        topology(SyntheticTopology): topology scenarios were run against
+        results(dict): scenario names mapped to BenchmarkEnvironment.run results
+        vectorized_power(bool): indicates if power flow solver was used
+        write_behind(bool): indicates if state updates were buffered
+        state_cache(bool): indicates if state reads were cached
+    Returns:
+        dict: JSON-serializable report
+    """
+    index = topology.to_index()
+    return {
+        "commit": get_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "vectorized_power": vectorized_power,
+        "write_behind": write_behind,
+        "state_cache": state_cache,
+        "topology": {
+            **topology.params,
+            "num_assets": len(index.assets),
+            "num_domains": index.num_domains,
+        },
+        "scenarios": results,
+    }
+
+
+def _flatten_metrics(scenario_results):
+    """Scenario metrics (including iteration latencies) as name/value pairs"""
+    metrics = {
+        (name, higher_better): scenario_results.get(name)
+        for name, higher_better in COMPARED_METRICS.items()
+    }
+
+    for iteration, latencies in sorted(scenario_results["iterations"].items()):
+        for pct in COMPARED_LATENCIES:
+            metrics[("{}:{}".format(iteration, pct), False)] = latencies[pct]
+
+    return metrics
+
+
+def compare_reports(baseline, report):
+    """Compare metrics of the scenarios present in both reports
+    Args:
+        baseline(dict): report used as a reference
+        report(dict): new report
+    Returns:
+        list: rows as (scenario, metric, baseline value, new value,
+              change in %, True if change is an improvement)
+    """
+    rows = []
+
+    for scenario, results in report["scenarios"].items():
+        if scenario not in baseline["scenarios"]:
+            continue
+
+        old_metrics = _flatten_metrics(baseline["scenarios"][scenario])
+        for (metric, higher_better), new in _flatten_metrics(results).items():
+            old = old_metrics.get((metric, higher_better))
+            if old is None or new is None:
+                continue
+
+            change = (new - old) * 100 / old if old else 0.0
+            improved = change > 0 if higher_better else change < 0
+            rows.append((scenario, metric, old, new, change, improved))
+
+    return rows
+
+
+def format_comparison(rows, baseline, report):
+    """Format compared metrics as a table"""
+
+    lines = [
+        "Baseline: {} ({}), current: {} ({})".format(
+            baseline.get("commit"),
+            baseline.get("created"),
+            report.get("commit"),
+            report.get("created"),
+        )
+    ]
+
+    if baseline["topology"] != report["topology"]:
+        lines.append("Warning: reports were produced for different topologies!")
+
+    row_format = "{:<20} {:<36} {:>12} {:>12} {:>9}"
+    lines.append(
+        row_format.format("Scenario", "Metric", "Baseline", "Current", "Change")
+    )
+
+    for scenario, metric, old, new, change, improved in rows:
+        lines.append(
+            row_format.format(
+                scenario,
+                metric,
+                "{:.2f}".format(old),
+                "{:.2f}".format(new),
+                "{:+.1f}%{}".format(change, "" if improved or not change else " !"),
+            )
+        )
+
+    lines.append("(latency in ms, '!' marks regressions)")
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+"""Runs engine against in-process stand-ins & measures scenario performance"""
+import gc
+import resource
+import time
+import tracemalloc
+
+import enginecore.state.engine.engine as engine_module
+from enginecore.state.engine.engine import Engine
+from enginecore.state.api import ISystemEnvironment, IStateManager
+from enginecore.tools.tracer import TRACER
+from enginecore.tools.write_buffer import BufferedStore
+
+from enginecore.benchmark import hardware
+from enginecore.benchmark.standins import InMemoryGraph, InMemoryRedis
+from enginecore.benchmark.topology import SyntheticDataSource
+
+
+class BenchmarkEnvironment:
+    """Engine managing a synthetic topology with Redis & Neo4j replaced by
+    in-process stand-ins (external services are not needed)
+
+    Example:
+        with BenchmarkEnvironment(SyntheticTopology(num_ups=4)) as bench:
+            bench.set_voltage(0)
+            bench.wait_iterations()
+    """
+
+    def __init__(
+        self,
+        topology,
+        vectorized_power=False,
+        write_behind=False,
+        timeout=120,
+        state_cache=False,
+    ):
+        """
+        Args:
+            topology(SyntheticTopology): system topology
+            vectorized_power(bool): use vectorized power flow solver
+            write_behind(bool): buffer state updates till iterations complete
+            timeout(float): max seconds to wait for iterations to complete
+            state_cache(bool): serve asset state reads from in-process cache
+        """
+        self._topology = topology
+        self._vectorized_power = vectorized_power
+        self._write_behind = write_behind
+        self._timeout = timeout
+        self._state_cache = state_cache
+
+        self._store = InMemoryRedis()
+        self._graph = InMemoryGraph(topology)
+        self._saved = None
+        self.engine = None
+
+    def __enter__(self):
+        self._install()
+        try:
+            self.engine = Engine(
+                data_source=SyntheticDataSource,
+                vectorized_power=self._vectorized_power,
+                write_behind=self._write_behind,
+                state_cache=self._state_cache,
+            )
+            self.engine.start()
+
+            # wallpower is restored by the server room on start
+            self.engine.handle_voltage_update(0.0, ISystemEnvironment.get_voltage())
+            self.wait_iterations()
+        except Exception:
+            self.__exit__()
+            raise
+
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+        self._uninstall()
+
+    def _seed_state(self):
+        """Stand-in for state initializer (all assets are online)"""
+        for asset in self._topology.assets:
+            self._store.set("{key}-{type}:state".format(**asset), 1)
+
+    def _install(self):
+        """Replace external services & hardware agents with stand-ins"""
+        self._saved = {
+            "redis_stores": (IStateManager.redis_store, ISystemEnvironment.redis_store),
+            "state_init": (engine_module.initialize, engine_module.clear_temp),
+            "assets": hardware.install(),
+        }
+
+        self._graph.install()
+        IStateManager.redis_store = ISystemEnvironment.redis_store = BufferedStore(
+            self._store
+        )
+        engine_module.initialize = lambda force_snmp_init=False: self._seed_state()
+        engine_module.clear_temp = lambda: None
+
+        IStateManager.clear_state_managers()
+        SyntheticDataSource.synthetic_topology = self._topology
+        SyntheticDataSource.topology = None
+
+    def _uninstall(self):
+        """Restore patched services"""
+        if not self._saved:
+            return
+
+        self._graph.uninstall()
+        IStateManager.redis_store, ISystemEnvironment.redis_store = self._saved[
+            "redis_stores"
+        ]
+        engine_module.initialize, engine_module.clear_temp = self._saved["state_init"]
+        hardware.uninstall(self._saved["assets"])
+
+        IStateManager.clear_state_managers()
+        self._saved = None
+
+    @property
+    def topology(self):
+        """Synthetic topology managed by the engine"""
+        return self._topology
+
+    @property
+    def store(self):
+        """In-memory Redis stand-in"""
+        return self._store
+
+    def set_voltage(self, value):
+        """Update wallpower voltage (as done by the state listener)
+        Returns:
+            PowerIteration: queued iteration
+        """
+        old_voltage = ISystemEnvironment.get_voltage()
+        self._store.set("voltage", str(float(value)))
+        return self.engine.handle_voltage_update(old_voltage, float(value))
+
+    def set_ambient(self, value):
+        """Update room temperature (as done by the state listener)
+        Returns:
+            ThermalIteration: queued iteration
+        """
+        old_temp = ISystemEnvironment.get_ambient()
+        self._store.set("ambient", str(int(value)))
+        return self.engine.handle_ambient_update(old_temp, value)
+
+    def set_state(self, asset_key, new_state):
+        """Press asset power button
+        Returns:
+            PowerIteration: queued iteration
+        """
+        old_state = self.engine.assets[asset_key].state.status
+        return self.engine.handle_state_update(asset_key, old_state, new_state)
+
+    def iterations_done(self):
+        """True if all of the queued power & thermal iterations are completed"""
+        stats = self.engine.iteration_stats
+        return all(
+            s["queued"] == s["completed"] + s["merged"]
+            for s in (stats["power"], stats["thermal"])
+        )
+
+    def wait_iterations(self):
+        """Block till queued iterations are completed
+        Raises:
+            TimeoutError: when iterations are not done within the timeout
+        """
+        deadline = time.monotonic() + self._timeout
+        while not self.iterations_done():
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    "Iterations are not completed: {}".format(
+                        self.engine.iteration_stats
+                    )
+                )
+            time.sleep(0.001)
+
+    def run(self, scenario, rounds=1, trace_malloc=False):
+        """Run scenario & collect its performance stats
+        Args:
+            scenario(callable): scenario function (see scenarios.SCENARIOS)
+            rounds(int): number of times scenario is repeated
+            trace_malloc(bool): measure peak memory allocated by python
+                                (slows down the engine)
+        Returns:
+            dict: iteration latencies (ms), throughput & memory stats
+        """
+        gc.collect()
+        TRACER.reset()
+        calls_before = TRACER.calls
+        stats_before = self.engine.iteration_stats
+
+        if trace_malloc:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        scenario(self, rounds)
+        self.wait_iterations()
+        elapsed = time.perf_counter() - start
+
+        malloc_peak = None
+        if trace_malloc:
+            malloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        histograms = TRACER.stats(num_traces=0)["histograms"]
+        stats = self.engine.iteration_stats
+        num_iterations = sum(
+            stats[q]["completed"] - stats_before[q]["completed"]
+            for q in ("power", "thermal")
+        )
+
+        iterations, num_events = {}, 0
+        for name, hist in histograms.items():
+            if name.startswith("iteration:"):
+                iterations[name.split(":", 1)[1]] = {
+                    k: hist[k] for k in ("count", "mean", "p50", "p95", "p99", "max")
+                }
+            else:
+                num_events += hist["count"]
+
+        return {
+            "rounds": rounds,
+            "elapsed": elapsed,
+            "iterations": iterations,
+            "num_iterations": num_iterations,
+            "num_events": num_events,
+            "iterations_per_sec": num_iterations / elapsed,
+            "events_per_sec": num_events / elapsed,
+            "redis_calls": TRACER.calls[0] - calls_before[0],
+            "neo4j_calls": TRACER.calls[1] - calls_before[1],
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "malloc_peak_kb": malloc_peak // 1024 if trace_malloc else None,
+        }
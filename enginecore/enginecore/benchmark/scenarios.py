@@ -0,0 +1,60 @@
+"""Standard benchmark scenarios; every scenario is a function driving
+benchmark environment (see BenchmarkEnvironment) for a number of rounds
+"""
+import random
+
+from enginecore.state.api import ISystemEnvironment
+
+
+def mains_loss_restore(bench, rounds):
+    """Wallpower goes down & gets restored (every asset is affected)"""
+    voltage = ISystemEnvironment.wallpower_volt_standard()
+
+    for _ in range(rounds):
+        bench.set_voltage(0)
+        bench.wait_iterations()
+        bench.set_voltage(voltage)
+        bench.wait_iterations()
+
+
+def voltage_storm(bench, rounds, updates_per_round=20):
+    """Wallpower voltage fluctuates rapidly
+    (voltage updates are issued without waiting for iterations to complete)"""
+    rand = random.Random(rounds)
+
+    for _ in range(rounds * updates_per_round):
+        bench.set_voltage(rand.uniform(100, 130))
+
+    bench.set_voltage(ISystemEnvironment.wallpower_volt_standard())
+
+
+def rack_power_cycle(bench, rounds):
+    """PDUs of every rack are switched off & back on"""
+    for _ in range(rounds):
+        for rack in bench.topology.racks:
+            for pdu_key in rack["pdus"]:
+                bench.set_state(pdu_key, 0)
+            bench.wait_iterations()
+
+            for pdu_key in rack["pdus"]:
+                bench.set_state(pdu_key, 1)
+            bench.wait_iterations()
+
+
+def ambient_ramp(bench, rounds, num_steps=10):
+    """Room temperature rises degree by degree & cools back down"""
+    start = ISystemEnvironment.get_ambient()
+    steps = list(range(1, num_steps + 1))
+
+    for _ in range(rounds):
+        for step in steps + steps[-2::-1] + [0]:
+            bench.set_ambient(start + step)
+            bench.wait_iterations()
+
+
+SCENARIOS = {
+    "mains_loss_restore": mains_loss_restore,
+    "voltage_storm": voltage_storm,
+    "rack_power_cycle": rack_power_cycle,
+    "ambient_ramp": ambient_ramp,
+}
@@ -0,0 +1,387 @@
+"""In-process stand-ins for the Redis store & the graph database
+so that engine can be benchmarked without any external services;
+Stand-ins count calls the same way traced clients do (see Tracer.calls)
+"""
+import collections
+import fnmatch
+import queue
+import threading
+
+from enginecore.model.graph_reference import GraphReference
+from enginecore.tools.query_helpers import to_camelcase
+from enginecore.tools.tracer import TRACER
+
+
+class InMemoryRedis:
+    """Thread-safe replacement for the subset of redis client API
+    used by the engine (values are stored as bytes just like in redis)
+
+    Example:
+        store = InMemoryRedis()
+        store.set("1-outlet:state", 1)
+        store.get("1-outlet:state") # -> b"1"
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        # number of messages published per channel
+        self.published = collections.Counter()
+        # keyspace notifications are sent to all the subscribers (see pubsub)
+        self._config = {}
+        self._subscribers = []
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, float):
+            return repr(value).encode()
+        return str(value).encode()
+
+    def execute_command(self, command, *args):
+        """Run command in a single round trip (see TracedRedis)"""
+        TRACER.redis_call()
+        with self._lock:
+            return getattr(self, "_" + command)(*args)
+
+    def get(self, name):
+        """Get value stored under the key (None if it does not exist)"""
+        return self.execute_command("get", name)
+
+    def set(self, name, value):
+        """Store value under the key"""
+        return self.execute_command("set", name, value)
+
+    def mget(self, keys, *args):
+        """Get values of multiple keys"""
+        return self.execute_command("mget", list(keys) + list(args))
+
+    def mset(self, mapping):
+        """Store multiple key/value pairs"""
+        return self.execute_command("mset", mapping)
+
+    def exists(self, *names):
+        """Number of existing keys"""
+        return self.execute_command("exists", *names)
+
+    def delete(self, *names):
+        """Remove keys, returns number of removed keys"""
+        return self.execute_command("delete", *names)
+
+    def keys(self, pattern="*"):
+        """Keys matching glob-style pattern"""
+        return self.execute_command("keys", pattern)
+
+    def publish(self, channel, message):
+        """Messages are counted & dropped (nobody is subscribed)"""
+        return self.execute_command("publish", channel, message)
+
+    def flushall(self):
+        """Remove all the keys"""
+        return self.execute_command("flushall")
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """Commands are buffered & sent in one go (see InMemoryPipeline)"""
+        return InMemoryPipeline(self)
+
+    def config_get(self, pattern="*"):
+        """Get configuration parameter (e.g. notify-keyspace-events)"""
+        with self._lock:
+            return {pattern: self._config.get(pattern, "")}
+
+    def config_set(self, name, value):
+        """Set configuration parameter"""
+        with self._lock:
+            self._config[name] = value
+        return True
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        """Subscription to keyspace notifications (see InMemoryPubSub)"""
+        return InMemoryPubSub(self)
+
+    def subscribe(self, pubsub):
+        """Send keyspace notifications to the subscriber"""
+        with self._lock:
+            self._subscribers.append(pubsub)
+
+    def unsubscribe(self, pubsub):
+        """Stop sending keyspace notifications to the subscriber"""
+        with self._lock:
+            if pubsub in self._subscribers:
+                self._subscribers.remove(pubsub)
+
+    def _notify(self, command, names):
+        """Notify subscribers of the updated keys"""
+        for pubsub in self._subscribers:
+            for name in names:
+                pubsub.notify(command, name)
+
+    def _get(self, name):
+        return self._data.get(name)
+
+    def _set(self, name, value):
+        self._data[name] = self._encode(value)
+        self._notify("set", [name])
+        return True
+
+    def _mget(self, keys):
+        return [self._data.get(k) for k in keys]
+
+    def _mset(self, mapping):
+        for key, value in mapping.items():
+            self._data[key] = self._encode(value)
+        self._notify("set", list(mapping))
+        return True
+
+    def _exists(self, *names):
+        return sum(n in self._data for n in names)
+
+    def _delete(self, *names):
+        deleted = [n for n in names if self._data.pop(n, None) is not None]
+        self._notify("del", deleted)
+        return len(deleted)
+
+    def _keys(self, pattern):
+        return [k.encode() for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+
+    def _publish(self, channel, message):
+        self.published[channel] += 1
+        return 0
+
+    def _flushall(self):
+        self._data.clear()
+        self.published.clear()
+        return True
+
+    def _pipeline(self, commands):
+        return [getattr(self, c)(*args) for c, args in commands]
+
+
+class InMemoryPubSub:
+    """Keyspace notifications of the in-memory store
+    (subset of redis pubsub API used by StateCache)
+
+    Example:
+        pubsub = store.pubsub()
+        pubsub.psubscribe("__keyspace@*__:*")
+        store.set("1-outlet:state", 1)
+        pubsub.get_message(timeout=1.0) # -> {"type": "pmessage", ...}
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._messages = queue.Queue()
+
+    def psubscribe(self, *patterns):
+        """Subscribe to notifications of all the keys"""
+        self._store.subscribe(self)
+
+    def notify(self, command, name):
+        """Queue keyspace notification of the updated key"""
+        if isinstance(name, bytes):
+            name = name.decode()
+
+        self._messages.put(
+            {
+                "type": "pmessage",
+                "pattern": b"__keyspace@*__:*",
+                "channel": "__keyspace@0__:{}".format(name).encode(),
+                "data": command.encode(),
+            }
+        )
+
+    def get_message(self, timeout=0.0):
+        """Next notification (None if there's none within the timeout)"""
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Unsubscribe from notifications"""
+        self._store.unsubscribe(self)
+
+
+class InMemoryPipeline:
+    """Buffers commands till execute is called
+
+    Example:
+        with store.pipeline() as pipe:
+            pipe.set("a", 1).set("b", 2)
+            pipe.execute() # -> [True, True]
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
+
+    def __getattr__(self, command):
+        if not hasattr(self._store, "_" + command):
+            raise AttributeError(command)
+
+        def buffer_command(*args):
+            if command == "mget":
+                args = (list(args[0]) + list(args[1:]),)
+            self._commands.append(("_" + command, args))
+            return self
+
+        return buffer_command
+
+    def execute(self):
+        """Run buffered commands in a single round trip"""
+        commands, self._commands = self._commands, []
+        return self._store.execute_command("pipeline", commands)
+
+
+class NullSession:
+    """Graph db session that is never used to run queries
+    (queries are answered by InMemoryGraph)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        """Nothing to close"""
+
+
+class InMemoryGraph:
+    """Answers graph db queries issued by the engine & hardware assets
+    based on a synthetic topology (see SyntheticTopology);
+    Methods have the same signatures as GraphReference queries & replace them
+    when installed (see install)
+    """
+
+    # GraphReference queries replaced by the stand-in
+    queries = (
+        "get_parent_keys",
+        "get_asset_and_components",
+        "get_assets_and_components",
+        "get_assets_and_children",
+        "get_mains_powered_outlets",
+        "get_oid_catalog",
+        "get_ambient_props",
+        "set_ambient_props",
+        "get_voltage_props",
+        "set_voltage_props",
+    )
+
+    def __init__(self, topology):
+        self._topology = topology
+        self._sys_env_props = {}
+        self._saved = None
+
+    def get_parent_keys(self, session, asset_key):
+        """Synthetic topology does not include power OIDs"""
+        TRACER.neo4j_call()
+        return self._topology.get_parents(int(asset_key)), {}
+
+    def get_asset_and_components(self, session, asset_key):
+        """Asset details, labels & component keys"""
+        TRACER.neo4j_call()
+        node = self._topology.get_node(int(asset_key))
+        if node is None:
+            return None
+
+        return {
+            **node,
+            "labels": sorted(node.labels),
+            "children": self._topology.get_components(node["key"]),
+        }
+
+    def get_assets_and_components(self, session):
+        """Details, labels & component keys of all the assets"""
+        TRACER.neo4j_call()
+        return {
+            a["key"]: {
+                **a,
+                "labels": sorted(self._topology.get_node(a["key"]).labels),
+                "children": self._topology.get_components(a["key"]),
+            }
+            for a in self._topology.assets
+        }
+
+    def get_assets_and_children(self, session):
+        """Assets ordered by key & child assets powered by them"""
+        TRACER.neo4j_call()
+        return self._topology.assets
+
+    def get_mains_powered_outlets(self, session):
+        """Keys of wall-powered outlets"""
+        TRACER.neo4j_call()
+        return self._topology.mains_outlets
+
+    def get_oid_catalog(self, session, asset_key=None):
+        """Synthetic topology does not include SNMP assets"""
+        TRACER.neo4j_call()
+        return {}
+
+    def _get_sys_env_props(self, env_prop_type):
+        TRACER.neo4j_call()
+        props = self._sys_env_props.get(env_prop_type)
+        return None if props is None else dict(props)
+
+    def _set_sys_env_props(self, env_prop_type, properties):
+        """Shared properties & properties of the event ("up"/"down")
+        are stored separately (property names are camel-cased)"""
+        TRACER.neo4j_call()
+        props = self._sys_env_props.setdefault(env_prop_type, {})
+        event = properties.get("event")
+        shared = ("start", "end") if event else properties.keys()
+
+        for name, value in properties.items():
+            if value is None:
+                continue
+            if name in shared:
+                props[to_camelcase(name)] = value
+            else:
+                props.setdefault(event, {})[to_camelcase(name)] = value
+
+    def get_ambient_props(self, session):
+        """Ambient properties of system environment"""
+        return self._get_sys_env_props("ambient")
+
+    def set_ambient_props(self, session, properties):
+        """Save ambient properties"""
+        self._set_sys_env_props("ambient", properties)
+
+    def get_voltage_props(self, session):
+        """Voltage properties of system environment"""
+        return self._get_sys_env_props("voltage")
+
+    def set_voltage_props(self, session, properties):
+        """Save voltage properties"""
+        self._set_sys_env_props("voltage", properties)
+
+    def install(self):
+        """Let GraphReference use the stand-in in place of the db"""
+        if self._saved is not None:
+            return
+
+        replaced = ("__init__", "close", "get_session") + self.queries
+        self._saved = {name: GraphReference.__dict__[name] for name in replaced}
+
+        GraphReference.__init__ = lambda graph_ref: None
+        GraphReference.close = lambda graph_ref: None
+        GraphReference.get_session = lambda graph_ref: NullSession()
+
+        for query in self.queries:
+            setattr(GraphReference, query, staticmethod(getattr(self, query)))
+
+    def uninstall(self):
+        """Restore GraphReference queries"""
+        if self._saved is None:
+            return
+
+        for name, attr in self._saved.items():
+            setattr(GraphReference, name, attr)
+        self._saved = None
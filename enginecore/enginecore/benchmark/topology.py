@@ -0,0 +1,263 @@
+"""Synthetic hardware topologies used by the engine benchmarks;
+Assets are laid out the same way system modeler creates them in the graph db
+(UPS/PDU outlets & server PSUs are components of their parent asset)
+"""
+import itertools
+
+from enginecore.state.engine.data_source import HardwareGraphDataSource
+from enginecore.state.engine.topology import TopologyIndex
+
+
+class SyntheticNode(dict):
+    """Asset properties & node labels (mimics graph db node)"""
+
+    def __init__(self, labels, **props):
+        super().__init__(**props)
+        self.labels = set(labels)
+
+
+class SyntheticTopology:
+    """Parameterized system topology: every UPS is powered by its own mains
+    outlet & powers a rack of PDUs, servers of the rack are dual-PSU machines
+    plugged into 2 different PDUs (if there is more than one PDU per rack)
+
+    Example:
+        topology = SyntheticTopology(num_ups=2, num_pdus=2, num_outlets=8)
+        len(topology.assets) # -> 68
+        topology.racks[0]["pdus"] # -> [102, 103]
+    """
+
+    def __init__(self, num_ups=1, num_pdus=2, num_outlets=8, num_servers=4, psu_num=2):
+        """
+        Args:
+            num_ups(int): number of UPSes (racks)
+            num_pdus(int): number of PDUs powered by every UPS
+            num_outlets(int): number of outlets per PDU
+            num_servers(int): number of servers in every rack
+            psu_num(int): number of PSUs per server
+        Raises:
+            ValueError: when rack PDUs don't have enough outlets to power
+                        all the server PSUs
+        """
+
+        if min(num_ups, num_pdus, num_outlets) < 1 or num_servers < 0:
+            raise ValueError("Topology parameters must be positive!")
+
+        if num_servers * psu_num > num_pdus * num_outlets:
+            raise ValueError(
+                "Not enough PDU outlets ({}) to power {} PSUs!".format(
+                    num_pdus * num_outlets, num_servers * psu_num
+                )
+            )
+
+        self._params = {
+            "num_ups": num_ups,
+            "num_pdus": num_pdus,
+            "num_outlets": num_outlets,
+            "num_servers": num_servers,
+            "psu_num": psu_num,
+        }
+
+        self._nodes = {}
+        self._power_links = []
+        self._component_links = []
+        self._mains_outlets = []
+        self._racks = []
+        # parent keys of every asset (see get_parents)
+        self._parents = None
+
+        # all the top-level assets have keys of the same length so that
+        # component keys (parent key followed by the component number)
+        # never collide with other keys
+        num_top_level = num_ups * (2 + num_pdus + num_servers)
+        keys = itertools.count(10 ** len(str(num_top_level)))
+
+        for _ in range(num_ups):
+            self._add_rack(keys)
+
+    def _add_node(self, labels, **props):
+        self._nodes[props["key"]] = SyntheticNode(labels, **props)
+        return props["key"]
+
+    def _add_components(self, parent_key, num_components, labels, **props):
+        """Add components (powered by parent or powering it for PSUs)"""
+        prefix = props.pop("prefix", "out")
+        component_keys = []
+        for i in range(1, num_components + 1):
+            key = self._add_node(
+                labels,
+                key=int("{}{}".format(parent_key, i)),
+                name="{}{}".format(prefix, i),
+                **props
+            )
+            self._component_links.append((parent_key, key))
+            component_keys.append(key)
+
+        return component_keys
+
+    def _add_rack(self, keys):
+        """Add mains outlet, UPS, PDUs & servers of a single rack"""
+        params = self._params
+
+        mains_key = self._add_node(
+            ["Asset", "Outlet"], key=next(keys), name="mains", type="outlet"
+        )
+        self._mains_outlets.append(mains_key)
+
+        ups_key = self._add_node(
+            ["Asset", "UPS"], key=next(keys), name="ups", type="ups"
+        )
+        self._power_links.append((ups_key, mains_key))
+
+        ups_outlets = self._add_components(
+            ups_key, params["num_pdus"], ["Asset", "Outlet", "Component"], type="outlet"
+        )
+        self._power_links.extend((out_key, ups_key) for out_key in ups_outlets)
+
+        pdu_outlets = []
+        rack = {"ups": ups_key, "pdus": [], "servers": []}
+
+        for ups_out_key in ups_outlets:
+            pdu_key = self._add_node(
+                ["Asset", "PDU"], key=next(keys), name="pdu", type="pdu"
+            )
+            self._power_links.append((pdu_key, ups_out_key))
+            rack["pdus"].append(pdu_key)
+
+            outlets = self._add_components(
+                pdu_key,
+                params["num_outlets"],
+                ["Asset", "Outlet", "Component"],
+                type="outlet",
+            )
+            self._power_links.extend((out_key, pdu_key) for out_key in outlets)
+            pdu_outlets.append(iter(outlets))
+
+        for server_num in range(params["num_servers"]):
+            server_key = self._add_node(
+                ["Asset", "Server"],
+                key=next(keys),
+                name="server",
+                type="server",
+                domainName="bench-vm-{}".format(server_num),
+                powerConsumption=480,
+            )
+            rack["servers"].append(server_key)
+
+            psus = self._add_components(
+                server_key,
+                params["psu_num"],
+                ["Asset", "PSU", "Component"],
+                prefix="psu",
+                type="psu",
+                powerConsumption=6,
+                draw=1 / params["psu_num"],
+            )
+
+            for psu_num, psu_key in enumerate(psus):
+                # spread PSUs of a server across PDUs
+                pdu_num = (server_num + psu_num) % params["num_pdus"]
+                out_key = next(pdu_outlets[pdu_num], None)
+
+                # some of the PDUs can run out of outlets
+                while out_key is None:
+                    pdu_num = (pdu_num + 1) % params["num_pdus"]
+                    out_key = next(pdu_outlets[pdu_num], None)
+
+                self._power_links.append((psu_key, out_key))
+                self._power_links.append((server_key, psu_key))
+
+        self._racks.append(rack)
+
+    @property
+    def params(self):
+        """Parameters topology was generated with"""
+        return dict(self._params)
+
+    @property
+    def racks(self):
+        """UPS, PDU & server keys of every rack"""
+        return self._racks
+
+    @property
+    def mains_outlets(self):
+        """Keys of wall-powered outlets"""
+        return list(self._mains_outlets)
+
+    @property
+    def power_links(self):
+        """(child key, parent key) pairs of POWERED_BY links"""
+        return list(self._power_links)
+
+    @property
+    def component_links(self):
+        """(asset key, component key) pairs"""
+        return list(self._component_links)
+
+    @property
+    def assets(self):
+        """Asset details as returned by GraphReference.get_assets_and_children"""
+        children = {}
+        for child_key, parent_key in self._power_links:
+            children.setdefault(parent_key, []).append(self._nodes[child_key])
+
+        num_components = {}
+        for asset_key, _ in self._component_links:
+            num_components[asset_key] = num_components.get(asset_key, 0) + 1
+
+        return [
+            {
+                **node,
+                "children": children.get(key, []),
+                "num_components": num_components.get(key, 0),
+            }
+            for key, node in sorted(self._nodes.items())
+        ]
+
+    def get_node(self, key):
+        """Get properties & labels of the asset (None if it does not exist)"""
+        return self._nodes.get(key)
+
+    def get_components(self, key):
+        """Get keys of asset components"""
+        return sorted(c for a, c in self._component_links if a == key)
+
+    def get_parents(self, key):
+        """Get keys of assets powering the asset"""
+        if self._parents is None:
+            self._parents = {}
+            for child_key, parent_key in self._power_links:
+                self._parents.setdefault(child_key, []).append(parent_key)
+
+        return sorted(self._parents.get(key, []))
+
+    def to_index(self, version=1):
+        """Compile topology index the engine works with"""
+        return TopologyIndex(
+            self.assets,
+            self._power_links,
+            self._mains_outlets,
+            component_links=self._component_links,
+            version=version,
+        )
+
+
+class SyntheticDataSource(HardwareGraphDataSource):
+    """Hardware data source serving synthetic topology (no db is involved)"""
+
+    synthetic_topology = None
+
+    @classmethod
+    def init_connection(cls):
+        pass
+
+    @classmethod
+    def reload(cls):
+        """Re-compile topology index from the synthetic topology"""
+        version = cls.topology.version + 1 if cls.topology else 1
+        cls.topology = cls.synthetic_topology.to_index(version=version)
+        return cls.topology
+
+    @classmethod
+    def close(cls):
+        pass
@@ -6,3 +6,4 @@ from enginecore.cli.model import model_command
 from enginecore.cli.storage import storage_command
 from enginecore.cli.play import play_command
 from enginecore.cli.actions import actions_command
+from enginecore.cli.engine import engine_command
@@ -0,0 +1,124 @@
+"""CLI endpoints for engine diagnostics (iteration traces & latency stats)"""
+import json
+from enginecore.state.net.state_client import StateClient
+
+
+def format_latency(value):
+    """Format latency (ms) for display"""
+    return "-" if value is None else "{:.2f}".format(value)
+
+
+def print_histograms(histograms):
+    """Display latency summary per asset type & handler"""
+
+    if not histograms:
+        print("No iterations were traced yet!")
+        return
+
+    row_format = "{:<40} {:>8} {:>10} {:>10} {:>10} {:>10}"
+    print(row_format.format("Asset Type:Handler", "Count", "Mean", "P50", "P95", "Max"))
+
+    for name, hist in histograms.items():
+        print(
+            row_format.format(
+                name,
+                hist["count"],
+                *map(format_latency, [hist[k] for k in ("mean", "p50", "p95", "max")])
+            )
+        )
+
+    print("(latency in ms)")
+
+
+def print_queues(queues):
+    """Display power (per domain) & thermal iteration queue stats"""
+
+    row_format = "{:<20} {:>12} {:>10} {:>10} {:>10}"
+    print(row_format.format("Queue", "Depth", "Queued", "Merged", "Completed"))
+
+    queue_rows = [
+        ("power:" + name, stats) for name, stats in queues["power"]["domains"].items()
+    ]
+    queue_rows.append(("thermal", queues["thermal"]))
+
+    for name, stats in queue_rows:
+        print(
+            row_format.format(
+                name,
+                *[stats[k] for k in ("queue_depth", "queued", "merged", "completed")]
+            )
+        )
+
+    print(
+        "(power domains: {num_domains}, power workers: {num_workers})\n".format(
+            **queues["power"]
+        )
+    )
+
+
+def print_traces(traces):
+    """Display recent iteration traces"""
+
+    for trace in traces:
+        print(
+            "\n[{iteration}] completed in {completed} ms "
+            "(redis calls: {redis_calls}, neo4j calls: {neo4j_calls})".format(
+                **{**trace, "completed": format_latency(trace["completed"])}
+            )
+        )
+        print(" | Source: {}".format(trace["source"].strip().replace("\n", " ")))
+        print(
+            " | Hops: {}, Branch points: {}".format(
+                len(trace["hops"]), len(trace["branches"])
+            )
+        )
+
+        for hop in trace["hops"]:
+            print(
+                " |  - [{type}][{key}] {handler}: {start} -> {end} ms "
+                "(redis calls: {redis_calls}, neo4j calls: {neo4j_calls})".format(
+                    **{
+                        **hop,
+                        "start": format_latency(hop["start"]),
+                        "end": format_latency(hop["end"]),
+                    }
+                )
+            )
+
+
+def print_engine_stats(**kwargs):
+    """Query engine stats & display them"""
+
+    stats = StateClient.get_engine_stats(num_traces=kwargs["traces"])
+
+    if kwargs["json"]:
+        print(json.dumps(stats, indent=4))
+        return
+
+    if "queues" in stats:
+        print_queues(stats["queues"])
+
+    print_histograms(stats["histograms"])
+    print_traces(stats["traces"])
+
+
+def engine_command(engine_group):
+    """Engine diagnostics commands"""
+
+    engine_subp = engine_group.add_subparsers()
+
+    stats_action = engine_subp.add_parser(
+        "stats",
+        help="Show iteration queue stats, latency histograms per asset type \
+            & handler and traces of the most recent engine iterations",
+    )
+    stats_action.add_argument(
+        "-t",
+        "--traces",
+        type=int,
+        default=0,
+        help="Number of the most recent iteration traces to be displayed",
+    )
+    stats_action.add_argument("--json", help="Format as .json", action="store_true")
+
+    stats_action.set_defaults(func=lambda args: print_engine_stats(**args))
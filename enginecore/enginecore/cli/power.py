@@ -1,5 +1,7 @@
 """Power management commands for assets and the system in general"""
 
+import argparse
+
 from enginecore.state.net.state_client import StateClient
 from enginecore.state.api import ISystemEnvironment
 
@@ -12,12 +14,12 @@ def power_command(power_group):
     power_up_action = power_subp.add_parser(
         "up", help="Power up a particular component/asset"
     )
-    power_up_action.add_argument("-k", "--asset-key", type=int, required=True)
+    add_asset_keys_args(power_up_action)
 
     power_down_action = power_subp.add_parser(
         "down", help="Power down a particular component/asset"
     )
-    power_down_action.add_argument("-k", "--asset-key", type=int, required=True)
+    add_asset_keys_args(power_down_action)
     power_down_action.add_argument(
         "--hard",
         help="Enable abrupt poweroff instead of shutdown",
@@ -99,20 +101,62 @@ def power_command(power_group):
     power_outage_action.set_defaults(func=lambda _: StateClient.power_outage())
     power_restore_action.set_defaults(func=lambda _: StateClient.power_restore())
     power_up_action.set_defaults(
-        func=lambda args: manage_state(args["asset_key"], lambda a: a.power_up())
+        func=lambda args: handle_power_set(args, power_up=True)
     )
     power_down_action.set_defaults(
         hard=False,  # abrupt shutdown if False by default
-        func=lambda args: manage_state(
-            args["asset_key"],
-            lambda a: a.power_off() if args["hard"] else a.shut_down(),
-        ),
+        func=lambda args: handle_power_set(args, power_up=False),
     )
 
     set_voltage_action.set_defaults(func=handle_voltage_set)
     get_voltage_action.set_defaults(func=handle_voltage_get)
 
 
+def parse_asset_keys(keys_str):
+    """Parse comma-separated asset keys & key ranges (e.g. "1-40,45")
+    Returns:
+        list: asset keys
+    """
+    asset_keys = []
+
+    try:
+        for key_range in keys_str.split(","):
+            start, _, end = key_range.partition("-")
+            asset_keys.extend(range(int(start), int(end or start) + 1))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            "Invalid asset keys '{}', expected format: 1-40,45".format(keys_str)
+        ) from error
+
+    return asset_keys
+
+
+def add_asset_keys_args(power_action):
+    """Add options for selecting either one asset or a group of assets"""
+    key_group = power_action.add_mutually_exclusive_group(required=True)
+    key_group.add_argument("-k", "--asset-key", type=int)
+    key_group.add_argument(
+        "--keys",
+        type=parse_asset_keys,
+        help="Update a group of assets at once (e.g. 1-40,45)",
+    )
+
+
+def handle_power_set(args, power_up):
+    """Action callback for powering asset(s) up or down"""
+    if args["keys"]:
+        StateClient.set_power_batch(
+            args["keys"], power_up, hard=args.get("hard", False)
+        )
+    elif power_up:
+        manage_state(args["asset_key"], lambda a: a.power_up())
+    else:
+        manage_state(
+            args["asset_key"],
+            lambda a: a.power_off() if args["hard"] else a.shut_down(),
+        )
+
+
 def handle_voltage_set(args):
     """Action callback for handling voltage set command"""
     if args["value"] is not None:
@@ -4,7 +4,6 @@
 """
 
 import argparse
-import enginecore.model.system_modeler as sys_modeler
 from enginecore.state.api import ISystemEnvironment, IBMCServerStateManager
 from enginecore.state.sensor.repository import SensorRepository
 from enginecore.state.net.state_client import StateClient
@@ -172,7 +171,9 @@ def cpu_usage_command(th_cpu_usg_group):
         func=IBMCServerStateManager.update_thermal_cpu_target
     )
 
-    th_delete_cpu_usg_action.set_defaults(func=sys_modeler.delete_thermal_cpu_target)
+    th_delete_cpu_usg_action.set_defaults(
+        func=IBMCServerStateManager.delete_thermal_cpu_target
+    )
 
 
 def get_thermal_add_args():
@@ -408,7 +409,7 @@ def sensor_command(th_sensor_group):
     th_get_sensor_action.set_defaults(func=handle_get_thermal_sensor)
     th_set_sensor_action.set_defaults(func=handle_set_thermal_sensor)
     th_delete_sensor_action.set_defaults(
-        func=sys_modeler.delete_thermal_sensor_target  # TODO: change sys_modeler to IBMCServerStateManager
+        func=IBMCServerStateManager.delete_thermal_sensor_target
     )
 
 
@@ -8,32 +8,128 @@ to db sessions and contains commonly used queries """
 import os
 import json
 import time
+import threading
+from contextlib import contextmanager
 from enum import Enum
 
 from neo4j.v1 import GraphDatabase, basic_auth
 from enginecore.tools.utils import format_as_redis_key
+from enginecore.tools.tracer import TracedSession
 import enginecore.tools.query_helpers as qh
 
 
 class GraphReference:
-    """Graph DB wrapper """
+    """Graph DB wrapper;
+    All the graph references share one process-wide driver (connection pool)
+    configured with NEO4J_URI, NEO4J_USR, NEO4J_PSW & NEO4J_POOL_SIZE
+    environment variables (see configure)
+    """
+
+    # driver shared by all the instances (created on the first use)
+    _shared_driver = None
+    _driver_lock = threading.Lock()
+    _driver_config = {
+        "uri": os.environ.get("NEO4J_URI", "bolt://localhost"),
+        "user": os.environ.get("NEO4J_USR", "simengine"),
+        "password": os.environ.get("NEO4J_PSW", "simengine"),
+        "pool_size": int(os.environ.get("NEO4J_POOL_SIZE", 50)),
+    }
+    # sessions opened by session_scope per thread
+    _thread_session = threading.local()
 
     def __init__(self):
-        self._driver = GraphDatabase.driver(
-            "bolt://localhost",
-            auth=basic_auth(
-                os.environ.get("NEO4J_USR", "simengine"),
-                os.environ.get("NEO4J_PSW", "simengine"),
-            ),
-        )
+        # fail early if db is not reachable
+        GraphReference.get_driver()
+
+    @classmethod
+    def configure(cls, uri=None, user=None, password=None, pool_size=None):
+        """Update db connection settings
+        (shared driver is re-created with the new settings on the next use)
+        Args:
+            uri(str): bolt uri of the db server
+            user(str): db username
+            password(str): db password
+            pool_size(int): max number of connections in the pool
+        """
+        settings = {
+            "uri": uri,
+            "user": user,
+            "password": password,
+            "pool_size": pool_size,
+        }
+        cls._driver_config.update({k: v for k, v in settings.items() if v is not None})
+        cls.close_driver()
+
+    @classmethod
+    def get_driver(cls):
+        """Get process-wide db driver"""
+        with cls._driver_lock:
+            if cls._shared_driver is None:
+                config = cls._driver_config
+                cls._shared_driver = GraphDatabase.driver(
+                    config["uri"],
+                    auth=basic_auth(config["user"], config["password"]),
+                    max_connection_pool_size=config["pool_size"],
+                )
+            return cls._shared_driver
+
+    @classmethod
+    def close_driver(cls):
+        """Close the shared driver & all of its connections"""
+        with cls._driver_lock:
+            driver, cls._shared_driver = cls._shared_driver, None
+
+        if driver is not None:
+            driver.close()
+
+    @classmethod
+    def pool_stats(cls):
+        """Connection pool metrics of the shared driver
+        Returns:
+            dict: number of active (in use) & idle connections, max pool size
+        """
+        stats = {"active": 0, "idle": 0, "max_size": cls._driver_config["pool_size"]}
+        pool = getattr(cls._shared_driver, "_pool", None)
+        if pool is None:
+            return stats
+
+        with pool.lock:
+            for address, connections in pool.connections.items():
+                active = pool.in_use_connection_count(address)
+                stats["active"] += active
+                stats["idle"] += len(connections) - active
+
+        return stats
 
     def close(self):
-        """ Close as db """
-        self._driver.close()
+        """Release db reference
+        (connections of the shared driver stay open, see close_driver)"""
 
     def get_session(self):
         """ Get a database session """
-        return self._driver.session()
+        return TracedSession(GraphReference.get_driver().session())
+
+    @classmethod
+    @contextmanager
+    def session_scope(cls):
+        """Database session reused by the nested scopes of the current thread
+
+        Example:
+            with GraphReference.session_scope() as session:
+                # the same session is used by the callee
+                IStateManager.get_state_manager_by_key(key)
+        """
+        session = getattr(cls._thread_session, "session", None)
+        if session is not None:
+            yield session
+            return
+
+        with cls().get_session() as session:
+            cls._thread_session.session = session
+            try:
+                yield session
+            finally:
+                cls._thread_session.session = None
 
     @classmethod
     def get_parent_assets(cls, session, asset_key):
@@ -160,6 +256,48 @@ class GraphReference:
 
         return oid_info, v_specs
 
+    @classmethod
+    def get_oid_catalog(cls, session, asset_key=None):
+        """Get OIDs of the assets by human-readable name
+        Args:
+            session: database session
+            asset_key(int): key of the asset (all the assets are queried if None)
+        Returns:
+            dict: OID details (OID, data type & optional state details
+                  in the same format as get_asset_oid_by_name specs)
+                  by OID name keyed by asset key
+        """
+
+        results = session.run(
+            """
+            MATCH (asset:Asset)-[:HAS_OID]->(oid)
+            WHERE $key IS NULL OR asset.key = $key
+            OPTIONAL MATCH (oid)-[:HAS_STATE_DETAILS]->(oid_details)
+            RETURN asset.key as key, oid, oid_details
+            """,
+            key=asset_key,
+        )
+
+        catalog = {}
+        for record in results:
+            oid_info = record.get("oid")
+            v_specs = (
+                {v: k for k, v in dict(record["oid_details"]).items()}
+                if record["oid_details"]
+                else None
+            )
+
+            catalog.setdefault(record.get("key"), {}).setdefault(
+                oid_info["OIDName"],
+                {
+                    "oid": oid_info["OID"],
+                    "dtype": oid_info.get("dataType"),
+                    "specs": v_specs,
+                },
+            )
+
+        return catalog
+
     @classmethod
     def get_component_oid_by_name(cls, session, component_key, oid_name):
         """Get OID that is associated with a particular component
@@ -240,13 +378,17 @@ class GraphReference:
             list: list of asset details with it's 'parent' & 'children' information
         """
 
+        # parents of the components powering assets are fetched
+        # in the same query (server's parent is an asset powering its PSU)
         results = session.run(
             """
             MATCH (asset:Asset) WHERE NOT (asset)<-[:HAS_COMPONENT]-(:Asset)
             OPTIONAL MATCH (asset)-[:POWERED_BY]->(p:Asset)
-            OPTIONAL MATCH (asset)-[:HAS_COMPONENT]->(c) 
-            RETURN asset, collect(DISTINCT c) as children, 
-            collect(DISTINCT p) as parent
+            OPTIONAL MATCH (p:Component)-[:POWERED_BY]->(pp)
+            WITH asset, collect(DISTINCT p) as parent,
+            collect(DISTINCT {key: p.key, parent: pp}) as parent_sources
+            OPTIONAL MATCH (asset)-[:HAS_COMPONENT]->(c)
+            RETURN asset, collect(DISTINCT c) as children, parent, parent_sources
             """
         )
 
@@ -264,19 +406,11 @@ class GraphReference:
             if (
                 asset["type"] == "server" or asset["type"] == "serverwithbmc"
             ) and asset["parent"]:
-                keys = map(lambda x: x["key"], asset["parent"])
-                presults = session.run(
-                    """
-                    MATCH (c:Component)-[:POWERED_BY]->(parent) 
-                    WHERE c.key IN $list RETURN parent ORDER BY c.key
-                    """
-                    "",
-                    list=keys,
+                parent_sources = sorted(
+                    filter(lambda x: x["parent"], record["parent_sources"]),
+                    key=lambda x: x["key"],
                 )
-
-                asset["parent"] = []
-                for presult in presults:
-                    asset["parent"].append(dict(presult["parent"]))
+                asset["parent"] = [dict(x["parent"]) for x in parent_sources]
 
             ## Set asset children
             # format asset children as list of child_key: { child_info }
@@ -371,6 +505,33 @@ class GraphReference:
         asset["children"] = children
         return asset
 
+    @classmethod
+    def get_assets_and_components(cls, session):
+        """Get information about all the assets & their components
+        (bulk version of get_asset_and_components)
+
+        Args:
+            session: database session
+
+        Returns:
+            dict: asset details (see get_asset_and_components) by asset key
+        """
+        results = session.run(
+            """
+            MATCH (n:Asset) OPTIONAL MATCH (n)-[:HAS_COMPONENT]->(c)
+            RETURN n as asset, labels(n) as labels, collect(c.key) as children
+            """
+        )
+
+        assets = {}
+        for record in results:
+            asset = dict(record["asset"])
+            asset["labels"] = record["labels"]
+            asset["children"] = sorted(record["children"])
+            assets[asset["key"]] = asset
+
+        return assets
+
     @classmethod
     def save_layout(cls, session, layout, stage=None):
         """Save system layout (X, Y coordinates of the assets & stage) 
@@ -462,6 +623,61 @@ class GraphReference:
         )
         return list(map(lambda x: x.get("key"), results))
 
+    @classmethod
+    def get_power_topology(cls, session):
+        """Get all power connections in the system in bulk
+        (used to compile in-memory topology index)
+
+        Args:
+            session: database session
+        Returns:
+            tuple: consisting of 3 items:
+                    1) power links as (child key, parent key) pairs
+                    2) component links as (asset key, component key) pairs
+                    3) OIDs controlling power of the assets, each as dict with
+                       owner 'key', 'oid', 'name', 'specs' & powered 'asset_key'
+        """
+
+        results = session.run(
+            """
+            MATCH (child:Asset)-[:POWERED_BY]->(parent:Asset)
+            RETURN DISTINCT child.key as child_key, parent.key as parent_key
+            """
+        )
+        power_links = [(r.get("child_key"), r.get("parent_key")) for r in results]
+
+        results = session.run(
+            """
+            MATCH (asset:Asset)-[:HAS_COMPONENT]->(component:Asset)
+            RETURN DISTINCT asset.key as asset_key, component.key as component_key
+            """
+        )
+        component_links = [
+            (r.get("asset_key"), r.get("component_key")) for r in results
+        ]
+
+        results = session.run(
+            """
+            MATCH (asset:Asset)-[:POWERED_BY]->(oid:OID)<-[:HAS_OID]-(owner:Asset)
+            MATCH (oid)-[:HAS_STATE_DETAILS]->(oid_specs)
+            RETURN owner.key as key, oid.OID as oid, oid.OIDName as name,
+                   oid_specs, asset.key as asset_key
+            """
+        )
+
+        oids = [
+            {
+                "key": r.get("key"),
+                "oid": r.get("oid"),
+                "name": r.get("name"),
+                "specs": dict(r.get("oid_specs")),
+                "asset_key": r.get("asset_key"),
+            }
+            for r in results
+        ]
+
+        return power_links, component_links, oids
+
     @classmethod
     def format_target_elements(cls, results, t_format=None):
         """Format neo4j results as target sensors"""
@@ -595,6 +811,52 @@ class GraphReference:
         record = results.single()
         return dict(record.get("rel")) if record else None
 
+    @classmethod
+    def get_thermal_relationships(cls, session, server_key):
+        """Get ALL thermal relationships of the server
+        (sensor->sensor, sensor->storage & cpu->sensor)
+        Args:
+            session:  database session
+            server_key(int): key of the server sensors belong to
+        Returns:
+            dict: relationships by target type ("sensor", "storage" & "cpu")
+        """
+
+        results = session.run(
+            """
+            MATCH (:ServerWithBMC { key: $server })-[:HAS_SENSOR]->(source:Sensor)
+            MATCH (source)<-[rel:COOLED_BY|:HEATED_BY]-(target)
+            WHERE target:Sensor OR target:PhysicalDrive OR target:CacheVault
+            OPTIONAL MATCH (controller)-[:HAS_CACHEVAULT|:HAS_PHYSICAL_DRIVE]->(target)
+            RETURN source.name as source, target, labels(target) as labels,
+                   rel, controller
+            """,
+            server=server_key,
+        )
+
+        th_rels = {"sensor": [], "storage": [], "cpu": []}
+        for record in results:
+            rel = {
+                "source": record.get("source"),
+                "target": dict(record.get("target")),
+                "rel": dict(record.get("rel")),
+            }
+
+            if "Sensor" in record.get("labels"):
+                th_rels["sensor"].append(rel)
+                continue
+
+            rel["hd_type"] = (
+                "PhysicalDrive"
+                if "PhysicalDrive" in record.get("labels")
+                else "CacheVault"
+            )
+            rel["controller"] = dict(record.get("controller"))
+            th_rels["storage"].append(rel)
+
+        th_rels["cpu"] = cls.get_thermal_cpu_details(session, server_key)
+        return th_rels
+
     @classmethod
     def get_ambient_props(cls, session):
         """Get ambient properties of system environment
@@ -1120,6 +1382,52 @@ class GraphReference:
 
         return True, new_temp
 
+    @classmethod
+    def set_hd_components_temperature(cls, session, server_key, temperatures):
+        """Update temperatures of many storage components in one query
+        Args:
+            session:  database session
+            server_key(int): key of the server storage components belong to
+            temperatures(list): of dicts with "hd_type" (PhysicalDrive/CacheVault),
+                                "controller", "target" (DID or serial number)
+                                & "temperature" keys
+        """
+
+        drives, cache_vaults = [], []
+        for hd_temp in temperatures:
+            if hd_temp["hd_type"] == "PhysicalDrive":
+                drives.append(hd_temp)
+            else:
+                cache_vaults.append(hd_temp)
+
+        if drives:
+            session.run(
+                """
+            UNWIND $drives as hd_temp
+            MATCH (:ServerWithBMC { key: $server })-[:HAS_CONTROLLER]->(ctrl:Controller)
+            WHERE ctrl.controllerNum = hd_temp.controller
+            MATCH (ctrl)-[:HAS_PHYSICAL_DRIVE]->(hd_element:PhysicalDrive)
+            WHERE hd_element.DID = hd_temp.target
+            SET hd_element.temperature = hd_temp.temperature
+            """,
+                server=server_key,
+                drives=drives,
+            )
+
+        if cache_vaults:
+            session.run(
+                """
+            UNWIND $cache_vaults as hd_temp
+            MATCH (:ServerWithBMC { key: $server })-[:HAS_CONTROLLER]->(ctrl:Controller)
+            WHERE ctrl.controllerNum = hd_temp.controller
+            MATCH (ctrl)-[:HAS_CACHEVAULT]->(hd_element:CacheVault)
+            WHERE hd_element.serialNumber = hd_temp.target
+            SET hd_element.temperature = hd_temp.temperature
+            """,
+                server=server_key,
+                cache_vaults=cache_vaults,
+            )
+
     @classmethod
     def get_all_hd_thermal_elements(cls, session, server_key):
         """Retrieve all storage components that support temperature sensors"""
@@ -3,6 +3,7 @@ This wrapper can configure sensor definitions & manage ipmi_sim program instance
 """
 
 import os
+import re
 import subprocess
 import logging
 from distutils import dir_util
@@ -12,6 +13,7 @@ from string import Template
 
 from enginecore.model.supported_sensors import SUPPORTED_SENSORS
 from enginecore.state.agent.agent import Agent
+from enginecore.state.sensor.shared_table import SensorTable
 
 logger = logging.getLogger(__name__)
 
@@ -119,15 +121,23 @@ class IPMIAgent(Agent):
 
             # add sensor .emu command in format:
             # sensor_add <address & type> <poll file location>
+            # (or <poll shared sensor table & sensor name>, see haos_extend.c)
             ipmisim_emu_opt[s_type] += "sensor_add {} 0 {} {} {} ".format(
                 self._bmc_address,
                 sensor.address,
                 sensor.event,
                 sensor.event_reading_type,
             )
-            ipmisim_emu_opt[
-                s_type
-            ] += 'poll 2000 file $TEMP_IPMI_DIR"/sensor_dir/{}" \n'.format(sensor.name)
+            if self._sensor_repo.sensor_table is not None:
+                ipmisim_emu_opt[s_type] += (
+                    'poll 2000 simengine_table $TEMP_IPMI_DIR"/sensor_dir/{}" {} \n'
+                ).format(SensorTable.filename, sensor.name)
+            else:
+                ipmisim_emu_opt[
+                    s_type
+                ] += 'poll 2000 file $TEMP_IPMI_DIR"/sensor_dir/{}" \n'.format(
+                    sensor.name
+                )
 
         # Set server-specific includes
         if self._ipmi_config["num_components"] == 2:
@@ -137,12 +147,32 @@ class IPMIAgent(Agent):
             sdrs_opt["includes"] = 'include "{}"'.format(
                 os.path.join(self._ipmi_dir, "main_dual_psu.sdrs")
             )
+            self._keep_polled_files(os.path.join(self._ipmi_dir, "ipmisim1_psu.emu"))
 
         # populate templates with options
         self._substitute_template_file(self.lan_conf_path, lan_conf_opt)
         self._substitute_template_file(self.ipmisim_emu_path, ipmisim_emu_opt)
         self._substitute_template_file(self.sensor_def_path, sdrs_opt)
 
+    def _keep_polled_files(self, emu_path):
+        """Sensors polled from files by static .emu definitions keep their files
+        up-to-date when sensor values are stored in the shared sensor table
+        Args:
+            emu_path(str): path to .emu file with "poll file" sensor definitions
+        """
+        sensor_table = self._sensor_repo.sensor_table
+        if sensor_table is None:
+            return
+
+        with open(emu_path, encoding="utf-8") as emu_file:
+            polled_files = re.findall(r'sensor_dir/([^"]+)"', emu_file.read())
+
+        for s_name in polled_files:
+            if s_name in sensor_table:
+                sensor_table.set_file_backed(s_name)
+                sensor = self._sensor_repo.get_sensor_by_name(s_name)
+                sensor.sensor_value = sensor.sensor_value
+
     def _init_ipmi_dir(self):
         """Copy clean template files to the working ipmi directory"""
 
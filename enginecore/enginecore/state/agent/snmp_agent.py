@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 class SNMPAgent(Agent):
     """SNMP simulator/wrapper for snmpsimd.py process;
     initializes data/work environment for snmpsimd.py with redis variation module
-    and manages simulator instance.
+    (see script/variation/simengine_redis.py) and manages simulator instance.
     """
 
     def __init__(self, asset_key, snmp_conf):
@@ -61,7 +61,7 @@ class SNMPAgent(Agent):
 
         # get location of the lua script that will be executed by snmpsimd
         redis_script_sha = os.environ.get("SIMENGINE_SNMP_SHA")
-        snmpsim_config = "{}|:redis|key-spaces-id={},evalsha={}\n".format(
+        snmpsim_config = "{}|:simengine_redis|key-spaces-id={},evalsha={}\n".format(
             lookup_oid, self._asset_key, redis_script_sha
         )
 
@@ -75,13 +75,14 @@ class SNMPAgent(Agent):
         """Logic for starting up the agent """
 
         # TODO: get redis port/host from config
-        var_opt = "redis:host:127.0.0.1,port:6379,db:0,key-spaces-id:" + str(
+        var_opt = "simengine_redis:host:127.0.0.1,port:6379,db:0,key-spaces-id:" + str(
             self._asset_key
         )
 
         cmd = [
             "snmpsimd.py",
             "--agent-udpv4-endpoint={host}:{port}".format(**self._snmp_conf),
+            "--variation-modules-dir=" + os.environ.get("SIMENGINE_SNMP_VARIATION"),
             "--variation-module-options=" + var_opt,
             "--data-dir=" + self._snmp_rec_dir,
             "--cache-dir=" + self._snmp_rec_dir,
@@ -3,12 +3,13 @@ import random
 import math
 import json
 
-import redis
-
 from enginecore.model.graph_reference import GraphReference
 from enginecore.state.redis_channels import RedisChannels
 
 from enginecore.tools.recorder import RECORDER as record
+from enginecore.tools.tracer import TracedRedis
+from enginecore.tools.write_buffer import BufferedStore
+from enginecore.state.redis_streams import StreamTransport
 from enginecore.tools.randomizer import Randomizer
 
 
@@ -30,7 +31,9 @@ class ISystemEnvironment:
     def get_store(cls):
         """Get redis db handler """
         if not cls.redis_store:
-            cls.redis_store = redis.StrictRedis(host="localhost", port=6379)
+            cls.redis_store = BufferedStore(
+                StreamTransport(TracedRedis(host="localhost", port=6379))
+            )
 
         return cls.redis_store
 
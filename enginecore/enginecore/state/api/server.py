@@ -305,11 +305,20 @@ class IBMCServerStateManager(IServerStateManager):
 
     @classmethod
     def update_thermal_sensor_target(cls, attr):
-        """Create new or update existing thermal relationship between 2 sensors"""
-        new_rel = sys_modeler.set_thermal_sensor_target(attr)
-        if not new_rel:
-            return
+        """Create new or update existing thermal relationship between 2 sensors
+        (engine is notified so that sensors reload the relationship)"""
+        sys_modeler.set_thermal_sensor_target(attr)
+        cls._publish_thermal_sensor_target(attr)
 
+    @classmethod
+    def delete_thermal_sensor_target(cls, attr):
+        """Remove thermal relationship between 2 sensors"""
+        sys_modeler.delete_thermal_sensor_target(attr)
+        cls._publish_thermal_sensor_target(attr)
+
+    @classmethod
+    def _publish_thermal_sensor_target(cls, attr):
+        """Notify engine of the sensor->sensor relationship changes"""
         IStateManager.get_store().publish(
             RedisChannels.sensor_conf_th_channel,
             json.dumps(
@@ -326,13 +335,21 @@ class IBMCServerStateManager(IServerStateManager):
 
     @classmethod
     def update_thermal_storage_target(cls, attr):
-        """Add new storage entity affected by a sensor 
-        Notify sensors if the relationship is new"""
+        """Add new storage entity affected by a sensor or update the existing one
+        (engine is notified so that sensors reload the relationship)"""
+        sys_modeler.set_thermal_storage_target(attr)
+        cls._publish_thermal_storage_target(attr)
 
-        new_rel = sys_modeler.set_thermal_storage_target(attr)
-        if not new_rel:
-            return
+    @classmethod
+    def delete_thermal_storage_target(cls, attr):
+        """Remove existing relationship between a sensor and a storage element"""
+        deleted = sys_modeler.delete_thermal_storage_target(attr)
+        cls._publish_thermal_storage_target(attr)
+        return deleted
 
+    @classmethod
+    def _publish_thermal_storage_target(cls, attr):
+        """Notify engine of the sensor->storage relationship changes"""
         target_data = {
             "key": attr["asset_key"],
             "relationship": {
@@ -351,19 +368,22 @@ class IBMCServerStateManager(IServerStateManager):
 
         IStateManager.get_store().publish(channel, json.dumps(target_data))
 
-    @classmethod
-    def delete_thermal_storage_target(cls, attr):
-        """Remove existing relationship between a sensor and a storage element"""
-        return sys_modeler.delete_thermal_storage_target(attr)
-
     @classmethod
     def update_thermal_cpu_target(cls, attr):
         """Create new or update existing thermal
         relationship between CPU usage and sensor"""
-        new_rel = sys_modeler.set_thermal_cpu_target(attr)
-        if not new_rel:
-            return
+        sys_modeler.set_thermal_cpu_target(attr)
+        cls._publish_thermal_cpu_target(attr)
 
+    @classmethod
+    def delete_thermal_cpu_target(cls, attr):
+        """Remove thermal relationship between CPU usage and sensor"""
+        sys_modeler.delete_thermal_cpu_target(attr)
+        cls._publish_thermal_cpu_target(attr)
+
+    @classmethod
+    def _publish_thermal_cpu_target(cls, attr):
+        """Notify engine of the cpu->sensor relationship changes"""
         IStateManager.get_store().publish(
             RedisChannels.cpu_usg_conf_th_channel,
             json.dumps(
@@ -2,6 +2,7 @@
 OIDs & network configurations for snmp"""
 from collections import namedtuple
 import subprocess
+import threading
 
 from enginecore.state.api.state import IStateManager
 from enginecore.model.graph_reference import GraphReference
@@ -13,7 +14,11 @@ from enginecore.tools.randomizer import Randomizer
 class ISnmpDeviceStateManager(IStateManager):
     """Stores snmp-related interface features such as access to OIDs"""
 
-    ObjectIdentity = namedtuple("ObjectIdentity", "oid specs")
+    ObjectIdentity = namedtuple("ObjectIdentity", "oid specs data_type redis_key")
+
+    # OIDs by name keyed by asset key (see load_oid_catalog)
+    _oid_catalog = {}
+    _oid_catalog_lock = threading.Lock()
 
     @property
     def snmp_config(self):
@@ -92,12 +97,7 @@ class ISnmpDeviceStateManager(IStateManager):
             bool: true if oid was successfully updated
         """
 
-        with self._graph_ref.get_session() as db_s:
-            oid = ISnmpDeviceStateManager.ObjectIdentity(
-                *GraphReference.get_asset_oid_by_name(
-                    db_s, int(self._asset_key), oid_name
-                )
-            )
+        oid = self.get_oid_by_name(oid_name)
 
         if oid:
             new_oid_value = oid.specs[value] if use_spec and oid.specs else value
@@ -114,31 +114,89 @@ class ISnmpDeviceStateManager(IStateManager):
             oid_value(object): OID value in rfc1902 format 
         """
         redis_store = IStateManager.get_store()
-        rkey = format_as_redis_key(
+        rkey = object_id.redis_key or format_as_redis_key(
             str(self._asset_key), object_id.oid, key_formatted=False
         )
 
-        data_type = int(redis_store.get(rkey).decode().split("|")[0])
+        # data type is looked up in redis for OIDs missing it in the model
+        data_type = object_id.data_type
+        if data_type is None:
+            data_type = int(redis_store.get(rkey).decode().split("|")[0])
         rvalue = "{}|{}".format(data_type, oid_value)
 
         redis_store.set(rkey, rvalue)
 
     def get_oid_value(self, object_id, key=None):
         """Retrieve value for a specific OID """
-        if key is None:
-            key = self.key
-
         redis_store = IStateManager.get_store()
-        rkey = format_as_redis_key(str(key), object_id.oid, key_formatted=False)
+        if key is None and object_id.redis_key:
+            rkey = object_id.redis_key
+        else:
+            key = self.key if key is None else key
+            rkey = format_as_redis_key(str(key), object_id.oid, key_formatted=False)
         return redis_store.get(rkey).decode().split("|")[1]
 
     def get_oid_by_name(self, oid_name):
-        """Get oid by oid name"""
+        """Get oid by oid name (returns None if asset has no such oid)"""
+        return ISnmpDeviceStateManager.get_asset_oids(self._asset_key).get(oid_name)
+
+    @classmethod
+    def load_oid_catalog(cls):
+        """Look up OIDs of all the assets at once
+        (replaces OIDs cached by get_asset_oids)
+        Returns:
+            int: number of assets with OIDs
+        """
+        with GraphReference.session_scope() as session:
+            catalog = GraphReference.get_oid_catalog(session)
+
+        catalog = {
+            key: cls._to_object_ids(key, oids) for key, oids in catalog.items()
+        }
 
-        with self._graph_ref.get_session() as db_s:
-            oid = ISnmpDeviceStateManager.ObjectIdentity(
-                *GraphReference.get_asset_oid_by_name(
-                    db_s, int(self._asset_key), oid_name
-                )
+        with cls._oid_catalog_lock:
+            cls._oid_catalog = catalog
+
+        return len(catalog)
+
+    @classmethod
+    def clear_oid_catalog(cls):
+        """Drop cached OIDs (e.g. when system model is reloaded)"""
+        with cls._oid_catalog_lock:
+            cls._oid_catalog = {}
+
+    @classmethod
+    def get_asset_oids(cls, asset_key):
+        """Get OIDs of the asset by oid name
+        (OIDs are queried & cached if the asset is not in the catalog yet)
+        Args:
+            asset_key(int): key of the asset
+        Returns:
+            dict: object ids (ISnmpDeviceStateManager.ObjectIdentity) by oid name
+        """
+        asset_key = int(asset_key)
+        oids = cls._oid_catalog.get(asset_key)
+        if oids is not None:
+            return oids
+
+        with GraphReference.session_scope() as session:
+            catalog = GraphReference.get_oid_catalog(session, asset_key)
+
+        oids = cls._to_object_ids(asset_key, catalog.get(asset_key, {}))
+        with cls._oid_catalog_lock:
+            return cls._oid_catalog.setdefault(asset_key, oids)
+
+    @classmethod
+    def _to_object_ids(cls, asset_key, oids):
+        """Convert OID details returned by the graph db to object ids"""
+        return {
+            name: cls.ObjectIdentity(
+                oid=details["oid"],
+                specs=details["specs"],
+                data_type=details["dtype"],
+                redis_key=format_as_redis_key(
+                    str(asset_key), details["oid"], key_formatted=False
+                ),
             )
-        return oid
+            for name, details in oids.items()
+        }
@@ -1,18 +1,20 @@
 """Interface for asset state management"""
 
-import time
 from enum import Enum
-from functools import lru_cache
 import os
 import subprocess
 import json
-
-import redis
+import threading
 
 from enginecore.model.graph_reference import GraphReference
 from enginecore.state.redis_channels import RedisChannels
 
 from enginecore.tools.recorder import RECORDER as record
+from enginecore.tools.clock import CLOCK
+from enginecore.tools.tracer import TracedRedis
+from enginecore.tools.write_buffer import BufferedStore
+from enginecore.state.redis_streams import StreamTransport
+from enginecore.tools.state_cache import StateCache
 from enginecore.tools.randomizer import Randomizer
 from enginecore.state.api.environment import ISystemEnvironment
 
@@ -22,6 +24,13 @@ class IStateManager:
     """Base class for all the state managers """
 
     redis_store = None
+    # power state changes collected by set_power_batch (published together);
+    # batches are per-thread so engine threads keep publishing as usual
+    _batch = threading.local()
+    # state managers shared across the process by asset key
+    # (see get_state_manager_by_key)
+    _registry = {}
+    _registry_lock = threading.Lock()
 
     class PowerStateReason(Enum):
         """Describes reason behind asset power state"""
@@ -34,13 +43,22 @@ class IStateManager:
         signal_off = 6
 
     def __init__(self, asset_info):
-        self._graph_ref = GraphReference()
+        # db driver is created on the first query
+        self._graph_ref_instance = None
         self._asset_key = asset_info["key"]
         self._asset_info = asset_info
 
+    @property
+    def _graph_ref(self):
+        """Graph db reference used by the state manager"""
+        if self._graph_ref_instance is None:
+            self._graph_ref_instance = GraphReference()
+        return self._graph_ref_instance
+
     def close_connection(self):
         """Close bolt driver connections"""
-        self._graph_ref.close()
+        if self._graph_ref_instance is not None:
+            self._graph_ref_instance.close()
 
     @property
     def key(self) -> int:
@@ -200,7 +218,7 @@ class IStateManager:
     def _sleep_delay(self, delay_type):
         """Sleep for n number of ms determined by the delay_type"""
         if delay_type in self._asset_info:
-            time.sleep(self._asset_info[delay_type] / 1000.0)  # ms to sec
+            CLOCK.sleep(self._asset_info[delay_type] / 1000.0)  # ms to sec
 
     def _sleep_shutdown(self):
         """Hardware-specific shutdown delay"""
@@ -223,12 +241,17 @@ class IStateManager:
         self._publish_power(self.status, 0)
 
     def _publish_power(self, old_state, new_state):
-        """Notify daemon of power updates"""
+        """Notify daemon of power updates
+        (updates are held back while a batch is in progress, see set_power_batch)"""
+        state_update = {"key": self.key, "old_state": old_state, "new_state": new_state}
+
+        batched_updates = getattr(IStateManager._batch, "updates", None)
+        if batched_updates is not None:
+            batched_updates.append(state_update)
+            return
+
         IStateManager.get_store().publish(
-            RedisChannels.state_update_channel,
-            json.dumps(
-                {"key": self.key, "old_state": old_state, "new_state": new_state}
-            ),
+            RedisChannels.state_update_channel, json.dumps(state_update)
         )
 
     def _reset_boot_time(self):
@@ -236,7 +259,7 @@ class IStateManager:
         (see snmppub.lua)
         """
         IStateManager.get_store().set(
-            str(self._asset_key) + ":start_time", int(time.time())
+            str(self._asset_key) + ":start_time", int(CLOCK.time())
         )
 
     def _check_parents(
@@ -316,13 +339,49 @@ class IStateManager:
     def get_store(cls):
         """Get redis db handler """
         if not cls.redis_store:
-            cls.redis_store = redis.StrictRedis(host="localhost", port=6379)
+            cls.redis_store = BufferedStore(
+                StreamTransport(TracedRedis(host="localhost", port=6379))
+            )
 
         return cls.redis_store
 
+    @classmethod
+    def enable_state_cache(cls, listen=True):
+        """Serve asset state reads (status, load, voltage, battery, OIDs)
+        from in-process cache kept coherent with the redis store
+        Args:
+            listen(bool): invalidate values updated by other redis clients
+                          using keyspace notifications
+        Returns:
+            StateCache: cache wrapping the redis client
+        """
+        cls.disable_state_cache()
+        cache = StateCache(cls.get_store().store, listen=listen)
+        cls.redis_store = BufferedStore(cache)
+        ISystemEnvironment.redis_store = cls.redis_store
+        return cache
+
+    @classmethod
+    def disable_state_cache(cls):
+        """Stop caching asset state (if state cache is enabled)"""
+        cache = cls.get_store().store
+        if not isinstance(cache, StateCache):
+            return
+
+        cache.close()
+        cls.redis_store = BufferedStore(cache.store)
+        ISystemEnvironment.redis_store = cls.redis_store
+
+    @classmethod
+    def state_cache(cls):
+        """Get state cache (None if state reads are not cached)"""
+        cache = cls.get_store().store
+        return cache if isinstance(cache, StateCache) else None
+
     @classmethod
     def _get_assets_states(cls, assets, flatten=True):
         """Query redis store and find states for each asset
+        (states, loads & battery levels of all the assets are read at once)
 
         Args:
             flatten(bool): If false, the returned assets in the dict
@@ -330,36 +389,43 @@ class IStateManager:
         Returns:
             dict: Current information on assets including their states, load etc.
         """
-        asset_keys = assets.keys()
-
-        if not asset_keys:
+        if not assets:
             return None
 
-        asset_values = cls.get_store().mget(
-            list(map(lambda k: "{}-{}:state".format(k, assets[k]["type"]), asset_keys))
-        )
-
-        for rkey, rvalue in zip(assets, asset_values):
-            asset_state = cls.get_state_manager_by_key(rkey)
-
-            assets[rkey]["status"] = int(rvalue)
-            assets[rkey]["load"] = asset_state.load
-
-            if assets[rkey]["type"] == "ups":
-                assets[rkey]["battery"] = asset_state.battery_level
-
-            if not flatten and "children" in assets[rkey]:
-                # call recursively on children
-                assets[rkey]["children"] = cls._get_assets_states(
-                    assets[rkey]["children"]
-                )
+        # collect assets including nested children
+        all_assets = []
+        asset_dicts = [assets]
+        while asset_dicts:
+            for asset in asset_dicts.pop().values():
+                all_assets.append(asset)
+                if not flatten and isinstance(asset.get("children"), dict):
+                    asset_dicts.append(asset["children"])
+
+        rkeys = []
+        for asset in all_assets:
+            redis_key = "{}-{}".format(asset["key"], asset["type"])
+            rkeys.extend([redis_key + ":state", redis_key + ":load"])
+            if asset["type"] == "ups":
+                rkeys.append(redis_key + ":battery")
+
+        values = iter(cls.get_store().mget(rkeys))
+
+        for asset in all_assets:
+            asset["status"] = int(next(values))
+            load = next(values)
+            asset["load"] = float(load) if load else 0.0
+
+            if asset["type"] == "ups":
+                battery = next(values)
+                asset["battery"] = int(battery) if battery else 0
 
         return assets
 
     @classmethod
     def get_system_status(cls, flatten=True):
-        """Get states of all system components 
-        
+        """Get states of all system components
+        (topology is fetched with one graph query, states with one redis read)
+
         Args:
             flatten(bool): If false, the returned assets in the dict 
                            will have their child-components nested
@@ -375,19 +441,63 @@ class IStateManager:
             return cls._get_assets_states(assets, flatten)
 
     @classmethod
-    @lru_cache(maxsize=32)
+    def load_state_managers(cls, supported_assets=None):
+        """Instantiate state managers of all the assets in the system model
+        (replaces registered state managers, see get_state_manager_by_key)
+        Args:
+            supported_assets(dict): asset types by type name
+        Returns:
+            int: number of registered state managers
+        """
+        with GraphReference.session_scope() as session:
+            assets = GraphReference.get_assets_and_components(session)
+
+        registry = {
+            key: cls._create_state_manager(asset_info, supported_assets)
+            for key, asset_info in assets.items()
+        }
+
+        with cls._registry_lock:
+            cls._registry = registry
+
+        return len(registry)
+
+    @classmethod
+    def clear_state_managers(cls):
+        """Drop registered state managers (e.g. when system model is reloaded)"""
+        with cls._registry_lock:
+            cls._registry = {}
+
+    @classmethod
     def get_state_manager_by_key(cls, key, supported_assets=None):
-        """Infer asset manager from key"""
+        """Get state manager of the asset
+        (new instance is registered if the asset has no state manager yet)
+        Raises:
+            ValueError: if asset with the key does not exist
+        """
+        key = int(key)
+        state_manager = cls._registry.get(key)
+        if state_manager:
+            return state_manager
+
+        with GraphReference.session_scope() as session:
+            asset_info = GraphReference.get_asset_and_components(session, key)
+
+        if asset_info is None:
+            raise ValueError("Asset [{}] does not exist".format(key))
+
+        state_manager = cls._create_state_manager(asset_info, supported_assets)
+        with cls._registry_lock:
+            return cls._registry.setdefault(key, state_manager)
+
+    @classmethod
+    def _create_state_manager(cls, asset_info, supported_assets=None):
+        """Infer asset manager from asset type"""
         from enginecore.state.hardware.room import Asset
 
         if not supported_assets:
             supported_assets = Asset.get_supported_assets()
 
-        graph_ref = GraphReference()
-
-        with graph_ref.get_session() as session:
-            asset_info = GraphReference.get_asset_and_components(session, key)
-
         sm_mro = supported_assets[asset_info["type"]].StateManagerCls.mro()
 
         module = ".".join(__name__.split(".")[:-1])  # api module
@@ -395,6 +505,58 @@ class IStateManager:
             asset_info
         )
 
+    @classmethod
+    def set_power_batch(cls, asset_keys, power_up, hard=False):
+        """Power up/down many assets at once;
+        State changes are published as one batch so that the engine processes
+        them in a single power iteration
+        Args:
+            asset_keys(list): keys of the assets to be updated
+            power_up(bool): power up assets if True, power down otherwise
+            hard(bool): abrupt poweroff instead of shutdown
+        Returns:
+            list: published state updates (assets with changed state)
+        Raises:
+            ValueError: if any of the assets does not exist
+                        (no state is changed in that case)
+        """
+
+        # the whole batch is rejected before any of the assets is updated
+        state_managers, missing_keys = [], []
+        for key in asset_keys:
+            try:
+                state_managers.append(cls.get_state_manager_by_key(key))
+            except ValueError:
+                missing_keys.append(key)
+
+        if missing_keys:
+            raise ValueError(
+                "Assets {} do not exist, power batch is rejected".format(missing_keys)
+            )
+
+        IStateManager._batch.updates = []
+
+        try:
+            for state_manager in state_managers:
+                if power_up:
+                    state_manager.power_up()
+                elif hard:
+                    state_manager.power_off()
+                else:
+                    state_manager.shut_down()
+        finally:
+            state_updates = IStateManager._batch.updates
+            IStateManager._batch.updates = None
+
+            # updates that were already applied reach the engine even if batch failed
+            if state_updates:
+                cls.get_store().publish(
+                    RedisChannels.batch_state_update_channel,
+                    json.dumps({"updates": state_updates}),
+                )
+
+        return state_updates
+
     @classmethod
     def asset_exists(cls, key):
         """Check if asset with the key exists"""
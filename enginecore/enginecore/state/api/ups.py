@@ -1,5 +1,4 @@
 """UPS asset interface """
-import time
 import json
 from enum import Enum
 
@@ -7,6 +6,7 @@ from enginecore.state.redis_channels import RedisChannels
 from enginecore.state.api.state import IStateManager, ISystemEnvironment
 from enginecore.state.api.snmp_state import ISnmpDeviceStateManager
 from enginecore.tools.randomizer import Randomizer
+from enginecore.tools.clock import CLOCK
 
 
 @Randomizer.register
@@ -186,7 +186,7 @@ class IUPSStateManager(ISnmpDeviceStateManager):
 
     @Randomizer.randomize_method()
     def shut_down(self):
-        time.sleep(self.get_config_off_delay())
+        CLOCK.sleep(self.get_config_off_delay())
         powered = super().shut_down()
         if not powered:
             self._update_load(self.load - self.power_usage)
@@ -200,7 +200,7 @@ class IUPSStateManager(ISnmpDeviceStateManager):
 
         if self.battery_level and not self.status:
             self._sleep_powerup()
-            time.sleep(self.get_config_on_delay())
+            CLOCK.sleep(self.get_config_on_delay())
             # update machine start time & turn on
             self._reset_boot_time()
             self._set_state_on()
@@ -1,9 +1,11 @@
-import functools
 from enginecore.model.graph_reference import GraphReference
+from enginecore.tools.tracer import TRACER
+from enginecore.state.engine.topology import TopologyIndex
 
 
 class HardwareDataSource:
-    graph_ref = GraphReference()
+    # db connection is established by init_connection (not on import)
+    graph_ref = None
 
     @classmethod
     def get_all_assets(cls):
@@ -17,65 +19,99 @@ class HardwareDataSource:
     def get_mains_powered_assets(cls):
         return NotImplementedError()
 
+    @classmethod
+    def get_parent_assets(cls, asset_key):
+        return NotImplementedError()
+
+    @classmethod
+    def get_asset_oid_info(cls, asset_key, oid):
+        return NotImplementedError()
+
+    @classmethod
+    def reload(cls):
+        return NotImplementedError()
+
 
 class HardwareGraphDataSource(HardwareDataSource):
+    """Hardware data source backed by the graph database;
+    Topology is compiled into an in-memory index (see TopologyIndex) once the model
+    is (re)loaded so queries issued during engine iterations don't hit the db.
+    """
 
     graph_ref = None
+    topology = None
 
     @classmethod
     def init_connection(cls):
         cls.graph_ref = GraphReference()
+        TRACER.add_stats_source("neo4j_pool", GraphReference.pool_stats)
 
     @classmethod
-    def get_all_assets(cls):
+    def reload(cls):
+        """Re-build topology index from the graph database;
+        New index is compiled in full before it replaces the old one
+        Returns:
+            TopologyIndex: new topology index
+        """
         with cls.graph_ref.get_session() as session:
-            return GraphReference.get_assets_and_children(session)
+            assets = GraphReference.get_assets_and_children(session)
+            mains_outlets = GraphReference.get_mains_powered_outlets(session)
+            power_links, component_links, oids = GraphReference.get_power_topology(
+                session
+            )
+
+        version = cls.topology.version + 1 if cls.topology else 1
+
+        cls.topology = TopologyIndex(
+            assets,
+            power_links,
+            mains_outlets,
+            oids,
+            component_links=component_links,
+            version=version,
+        )
+        return cls.topology
 
     @classmethod
-    @functools.lru_cache(maxsize=200)
-    def get_affected_assets(cls, asset_key):
-        with cls.graph_ref.get_session() as session:
-            childen, parents, _ = GraphReference.get_affected_assets(session, asset_key)
+    def get_topology(cls):
+        """Get current topology index (compiled on the first use)"""
+        topology = cls.topology
+        return topology if topology else cls.reload()
 
-        return ([a["key"] for a in childen], [a["key"] for a in parents])
+    @classmethod
+    def get_all_assets(cls):
+        return list(cls.get_topology().assets)
+
+    @classmethod
+    def get_affected_assets(cls, asset_key):
+        return cls.get_topology().get_affected_assets(asset_key)
 
     @classmethod
-    @functools.lru_cache(maxsize=200)
     def get_mains_powered_assets(cls):
-        with cls.graph_ref.get_session() as session:
-            return GraphReference.get_mains_powered_outlets(session)
+        return cls.get_topology().mains_powered_outlets
 
     @classmethod
-    @functools.lru_cache(maxsize=200)
     def get_parent_assets(cls, asset_key):
         """Get parent asset keys (nodes that are powering the asset)
         Args:
             asset_key(int): child key
         Returns:
-            list: parent asset keys
+            tuple: parent asset keys
         """
-
-        with cls.graph_ref.get_session() as session:
-            parent_assets = GraphReference.get_parent_assets(session, asset_key)
-
-        return [a["key"] for a in parent_assets]
+        return cls.get_topology().get_parents(asset_key)
 
     @classmethod
-    @functools.lru_cache(maxsize=200)
     def get_asset_oid_info(cls, asset_key, oid):
         """Get oid information based on provided asset key and object id"""
-        with cls.graph_ref.get_session() as session:
-            return GraphReference.get_asset_oid_info(session, asset_key, oid)
+        return cls.get_topology().get_asset_oid_info(asset_key, oid)
 
     @classmethod
     def cache_clear_all(cls):
-        """clear all cached data"""
-        cls.get_affected_assets.cache_clear()
-        cls.get_mains_powered_assets.cache_clear()
-        cls.get_parent_assets.cache_clear()
-        cls.get_asset_oid_info.cache_clear()
+        """clear all cached data (topology is re-compiled on the next query)"""
+        cls.topology = None
 
     @classmethod
     def close(cls):
         """Close down driver"""
         cls.graph_ref.close()
+        GraphReference.close_driver()
@@ -1,16 +1,34 @@
 import logging
 
 import math
-from circuits import Component, Event
+import time
+from circuits import Component, Event, handler
 
 from enginecore.state.hardware.room import ServerRoom, Asset
+from enginecore.state.hardware.battery_scheduler import BATTERY_SCHEDULER
+from enginecore.state.sensor.thermal_scheduler import THERMAL_SCHEDULER
+from enginecore.state.sensor.repository import SensorRepository
 from enginecore.tools.recorder import RECORDER
-from enginecore.state.api import ISystemEnvironment
+from enginecore.tools.tracer import TRACER
+from enginecore.tools import write_buffer
+from enginecore.state.api import ISystemEnvironment, IStateManager
+from enginecore.state.api.snmp_state import ISnmpDeviceStateManager
 from enginecore.state.state_initializer import initialize, clear_temp
 
-from enginecore.state.engine.iteration import PowerIteration, ThermalIteration
+from enginecore.state.engine.iteration import (
+    EngineIteration,
+    PowerIteration,
+    PowerFlowIteration,
+    ThermalIteration,
+)
 from enginecore.state.engine.iteration_consumer import EngineIterationConsumer
+from enginecore.state.engine.power_domains import PowerDomains
 from enginecore.state.engine.data_source import HardwareGraphDataSource
+from enginecore.state.engine.power_solver import (
+    PowerFlowSolver,
+    PowerFlowSnapshot,
+    np,
+)
 from enginecore.state.engine import events
 
 logger = logging.getLogger(__name__)
@@ -31,11 +49,69 @@ class AllVoltageBranchesDone(Event):
 
 class AllLoadBranchesDone(Event):
     """Dispatched when power iteration finishes upstream
-    load event propagation across all load branches"""
+    load event propagation across all load branches
+    (completed power iteration is passed as event argument)"""
 
     success = True
 
 
+class SolvePowerFlow(Event):
+    """Dispatched when power flow iteration is launched
+    (power flow is solved within the engine's event loop)"""
+
+
+class PowerFlowApplier:
+    """Performs hardware asset updates requested by the power flow solver
+    (see PowerFlowSolver.solve)"""
+
+    def __init__(self, assets, power_iter):
+        self._assets = assets
+        self._power_iter = power_iter
+
+    def set_input_voltage(self, key, voltage):
+        """Update input voltage of an asset"""
+        self._assets[key].state.update_input_voltage(voltage)
+
+    def transition(self, key, power_up):
+        """Power asset up or down due to input voltage changes
+        Returns:
+            int: new asset state
+        """
+        asset = self._assets[key]
+        return asset.power_up() if power_up else asset.power_off()
+
+    def ups_voltage(self, key, old_voltage, new_voltage):
+        """Let UPS process input voltage change (it can transfer to battery
+        or back to input power)
+        Returns:
+            tuple: new UPS state, output voltage & battery status
+        """
+        ups = self._assets[key]
+
+        if old_voltage > new_voltage or new_voltage == 0:
+            volt_event_cls, process_voltage = (
+                events.InputVoltageDownEvent,
+                ups.on_input_voltage_down,
+            )
+        else:
+            volt_event_cls, process_voltage = (
+                events.InputVoltageUpEvent,
+                ups.on_input_voltage_up,
+            )
+
+        volt_event = volt_event_cls(
+            old_in_volt=old_voltage,
+            new_in_volt=new_voltage,
+            source_asset=None,
+            power_iter=self._power_iter,
+        )
+
+        asset_event = process_voltage(volt_event)
+        ups.detect_input_voltage(volt_event)
+
+        return ups.state.status, asset_event.out_volt.new, ups.state.on_battery
+
+
 class Engine(Component):
     """Top-level component that initializes assets & handles state changes
     (thermal, power, oid) by dispatching events against hardware assets.
@@ -46,9 +122,33 @@ class Engine(Component):
           or a power-supplying asset going down/up
           (InputVoltageUpEvent/InputVoltageUpEvent)
         - Load updates due to voltage changes
+
+    Power iterations are processed concurrently for independent power domains
+    (assets sharing no power path), wallpower changes act as a global barrier
+    (see PowerDomains);
+    Wallpower voltage changes can be resolved by the vectorized power flow solver
+    instead of chaining voltage & load events (vectorized_power option);
+    State updates made by the assets during an iteration are written to the store
+    in one round trip once the iteration completes (write_behind option);
+    Asset state reads can be served from in-process cache invalidated by
+    redis keyspace notifications (state_cache option);
+    BMC sensor values can be kept in a memory-mapped table shared with ipmi_sim
+    instead of a file per sensor (shared_sensors option);
+    Thermal relationships of a server can be advanced by the vectorized
+    thermal solver in one step instead of an impact per relationship
+    (vectorized_thermal option)
     """
 
-    def __init__(self, force_snmp_init=True, data_source=HardwareGraphDataSource):
+    def __init__(
+        self,
+        force_snmp_init=True,
+        data_source=HardwareGraphDataSource,
+        vectorized_power=False,
+        write_behind=False,
+        state_cache=False,
+        shared_sensors=False,
+        vectorized_thermal=False,
+    ):
         super(Engine, self).__init__()
 
         ### Set-up WebSocket & Redis listener ###
@@ -56,6 +156,8 @@ class Engine(Component):
 
         # assets will store all the devices/items including PDUs, switches etc.
         self._assets = {}
+        # keys of assets reacting to ambient changes
+        self._thermal_subscribers = []
 
         # completion trackers will be notified of events happening in the system
         self._completion_trackers = []
@@ -63,9 +165,29 @@ class Engine(Component):
         self._sys_environ = ServerRoom().register(self)
 
         # track iterations (thermal/power) in separate threads
-        self._power_iter_handler = EngineIterationConsumer("power_worker")
+        # (power consumers are created per power domain once topology is loaded)
+        self._power_domains = None
         self._thermal_iter_handler = EngineIterationConsumer("thermal_worker")
 
+        if vectorized_power and np is None:
+            logger.warning("numpy is not installed, vectorized power is disabled!")
+            vectorized_power = False
+
+        self._vectorized_power = vectorized_power
+        self._power_solver = None
+        EngineIteration.write_behind = write_behind
+        SensorRepository.shared_table = shared_sensors
+
+        if vectorized_thermal and np is None:
+            logger.warning("numpy is not installed, vectorized thermal is disabled!")
+            vectorized_thermal = False
+
+        SensorRepository.vectorized_thermal = vectorized_thermal
+
+        if state_cache:
+            cache = IStateManager.enable_state_cache()
+            TRACER.add_stats_source("state_cache", lambda: cache.stats)
+
         data_source.init_connection()
 
         self._data_source = data_source
@@ -74,6 +196,9 @@ class Engine(Component):
 
         # Register assets and reset power state
         self.reload_model(force_snmp_init)
+        TRACER.add_stats_source("queues", lambda: self.iteration_stats)
+        TRACER.add_stats_source("batteries", lambda: BATTERY_SCHEDULER.stats)
+        TRACER.add_stats_source("thermal_impacts", lambda: THERMAL_SCHEDULER.stats)
         logger.info("Physical Environment:\n%s", self._sys_environ)
 
     def reload_model(self, force_snmp_init=True):
@@ -90,15 +215,49 @@ class Engine(Component):
         clear_temp()
         initialize(force_snmp_init)
 
-        # get system topology
+        # state was re-initialized bypassing the cache
+        cache = IStateManager.state_cache()
+        if cache:
+            cache.invalidate()
+
+        # get system topology (re-compile in-memory topology index)
+        topology = self._data_source.reload()
         assets = self._data_source.get_all_assets()
 
+        # state managers are shared with api requests (e.g. websocket handlers)
+        num_managers = IStateManager.load_state_managers()
+        logger.info("State managers: %s", num_managers)
+
+        # OIDs are looked up by name on every SNMP state update
+        num_snmp_assets = ISnmpDeviceStateManager.load_oid_catalog()
+        logger.info("Assets with OIDs: %s", num_snmp_assets)
+
         for asset in assets:
             self._assets[asset["key"]] = Asset.get_supported_assets()[asset["type"]](
                 asset
             ).register(self)
 
-        self._power_iter_handler.start(on_iteration_launched=self._chain_power_events)
+        self._thermal_subscribers = [
+            k for k, a in self._assets.items() if a.thermal_subscriber
+        ]
+
+        self._power_solver = None
+        if self._vectorized_power:
+            try:
+                self._power_solver = PowerFlowSolver(topology)
+                logger.info(
+                    "Power flow solver levels: %s", self._power_solver.num_levels
+                )
+            except ValueError as error:
+                logger.warning("%s, vectorized power is disabled!", error)
+
+        if self._power_domains:
+            self._power_domains.stop()
+
+        self._power_domains = PowerDomains(topology)
+        self._power_domains.start(self._on_power_iteration_launched)
+        logger.info("Power domains: %s", topology.num_domains)
+
         self._thermal_iter_handler.start(
             on_iteration_launched=self._chain_thermal_events
         )
@@ -111,6 +270,14 @@ class Engine(Component):
         """Hardware assets that are present in the system topology"""
         return self._assets
 
+    @property
+    def iteration_stats(self):
+        """Power & thermal iteration queue stats"""
+        return {
+            "power": self._power_domains.stats,
+            "thermal": self._thermal_iter_handler.stats,
+        }
+
     def _notify_trackers(self, event):
         """Dispatch completion events to clients"""
 
@@ -126,16 +293,139 @@ class Engine(Component):
         self._completion_trackers.remove(tracker)
         tracker.unregister(self)
 
-    def _mark_load_branches_done(self):
+    @staticmethod
+    def _flush_writes(iteration):
+        """Write state updates buffered during the iteration to the store
+        (messages published during the iteration are sent after the updates)"""
+        if iteration.write_buffer:
+            iteration.write_buffer.flush(IStateManager.get_store())
+
+    def _mark_load_branches_done(self, power_iter):
         """Set status for all load branches as done
         (when all load branches are completed, power iteration
         worker thread is given permission to accept new power
         events)
         """
-        self._notify_trackers(AllLoadBranchesDone())
-        self._power_iter_handler.unfreeze_task_queue()
+        self._flush_writes(power_iter)
+
+        # iterations merged into this one are completed as well
+        for done_iter in [power_iter] + power_iter.merged_iterations:
+            self._notify_trackers(AllLoadBranchesDone(done_iter))
+
+        # (consumer may belong to power domains that were re-built since)
+        PowerDomains.complete_iteration(power_iter)
+
+    def _on_power_iteration_launched(self, consumer, *launch_results):
+        """Start processing power iteration dequeued by the power worker
+        of a power domain"""
+        power_iter = consumer.current_iteration
+        if isinstance(power_iter, PowerFlowIteration):
+            self.fire(SolvePowerFlow(power_iter), self)
+        else:
+            self._chain_power_events(power_iter, *launch_results)
+
+    def _power_flow_snapshot(self):
+        """Read power state of all the assets in one round trip
+        Returns:
+            PowerFlowSnapshot: asset states ordered as the solver keys
+        """
+        assets = [self._assets[key] for key in self._power_solver.keys]
 
-    def _chain_power_events(self, volt_events, load_events=None):
+        rkeys = []
+        for asset in assets:
+            rkeys.extend(
+                asset.state.redis_key + suffix
+                for suffix in (":state", ":in-voltage", ":load")
+            )
+
+        values = IStateManager.get_store().mget(rkeys)
+        to_float = lambda v: float(v) if v else 0.0
+
+        status = np.array([int(v or 0) for v in values[0::3]])
+        in_volt = np.array([to_float(v) for v in values[1::3]])
+        out_volt = in_volt * status
+        on_battery = np.zeros(len(assets), dtype=bool)
+        vm_active = np.ones(len(assets), dtype=bool)
+
+        for i, asset in enumerate(assets):
+            if asset.state.asset_type == "ups":
+                out_volt[i] = asset.state.output_voltage
+                on_battery[i] = asset.state.on_battery
+            elif asset.state.asset_type in ("server", "serverwithbmc"):
+                vm_active[i] = asset.state.vm_is_active()
+
+        return PowerFlowSnapshot(
+            status=status,
+            in_volt=in_volt,
+            out_volt=out_volt,
+            load=np.array([to_float(v) for v in values[2::3]]),
+            user_off=np.array(
+                [a.state_reason == a.state.PowerStateReason.turned_off for a in assets]
+            ),
+            on_battery=on_battery,
+            vm_active=vm_active,
+        )
+
+    @handler("SolvePowerFlow")
+    def _on_solve_power_flow(self, power_iter):
+        """Solve power flow for the whole topology, update asset loads
+        & notify completion trackers of the asset changes"""
+
+        # merged voltage changes cancelled each other out
+        if not power_iter.is_noop:
+            snapshot = self._power_flow_snapshot()
+
+            write_buffer.activate(power_iter.write_buffer)
+            try:
+                self._apply_power_flow(power_iter, snapshot)
+            finally:
+                write_buffer.activate(None)
+
+        power_iter.complete()
+        self._notify_trackers(AllVoltageBranchesDone())
+        self._mark_load_branches_done(power_iter)
+
+    def _apply_power_flow(self, power_iter, snapshot):
+        """Solve power flow & update hardware assets accordingly"""
+
+        result = self._power_solver.solve(
+            power_iter.voltage.new,
+            snapshot,
+            PowerFlowApplier(self._assets, power_iter),
+        )
+
+        for change in result.changes():
+            asset = self._assets[change.key]
+            old_load, new_load = change.load
+
+            power_changed = change.status[0] != change.status[1] or not all(
+                math.isclose(*volt) for volt in (change.in_volt, change.out_volt)
+            )
+
+            # assets affected by voltage changes report power events,
+            # the rest of the assets had their load updated by the children
+            if power_changed:
+                asset_event = events.AssetPowerEvent(
+                    asset=asset,
+                    old_out_volt=change.out_volt[0],
+                    new_out_volt=change.out_volt[1],
+                    old_state=change.status[0],
+                    new_state=change.status[1],
+                    power_iter=power_iter,
+                )
+            else:
+                asset_event = events.AssetLoadEvent(
+                    asset=asset,
+                    old_load=old_load,
+                    new_load=new_load,
+                    power_iter=power_iter,
+                )
+
+            asset_event.load.old, asset_event.load.new = old_load, new_load
+            asset.on_power_flow_solved(asset_event)
+            self._notify_trackers(asset_event)
+
+    def _chain_power_events(self, power_iter, volt_events, load_events=None):
         """Chain power events by dispatching input power events
         against children of the updated asset;
         Fire load events against parents of the updated asset if
@@ -143,43 +433,52 @@ class Engine(Component):
         """
 
         # reached the end of a stream of voltage updates
-        if self._power_iter_handler.current_iteration.all_voltage_branches_done:
+        if power_iter.all_voltage_branches_done:
             self._notify_trackers(AllVoltageBranchesDone())
-            if self._power_iter_handler.current_iteration.all_load_branches_done:
-                self._mark_load_branches_done()
+            if power_iter.all_load_branches_done:
+                self._mark_load_branches_done(power_iter)
 
-        for child_key, event in volt_events:
-            self.fire(event, self._assets[child_key])
+        self._dispatch_events(volt_events)
 
         if load_events:
-            for parent_key, event in load_events:
-                self.fire(event, self._assets[parent_key])
+            self._dispatch_events(load_events)
 
-    def _chain_load_events(self, load_events):
+    def _chain_load_events(self, power_iter, load_events):
         """Chain load events by dispatching more load events against
         parents of the updated child asset"""
 
         # load & voltage branches are completed
-        if self._power_iter_handler.current_iteration.iteration_done:
-            self._mark_load_branches_done()
+        if power_iter.iteration_done:
+            self._mark_load_branches_done(power_iter)
 
         if not load_events:
             return
 
-        for asset_key, event in load_events:
-            self.fire(event, self._assets[asset_key])
+        self._dispatch_events(load_events)
 
     def _chain_thermal_events(self, thermal_events):
         """Chain thermal events by dispatching them against assets"""
 
-        if self._thermal_iter_handler.current_iteration.iteration_done:
-            self._notify_trackers(AllThermalBranchesDone())
+        thermal_iter = self._thermal_iter_handler.current_iteration
+        if thermal_iter.iteration_done:
+            self._flush_writes(thermal_iter)
+            for _ in range(1 + len(thermal_iter.merged_iterations)):
+                self._notify_trackers(AllThermalBranchesDone())
             self._thermal_iter_handler.unfreeze_task_queue()
 
         if not thermal_events:
             return
 
-        for asset_key, event in thermal_events:
+        self._dispatch_events(thermal_events)
+
+    def _dispatch_events(self, asset_events):
+        """Fire events against hardware assets
+        Args:
+            asset_events(iterable): pairs of asset key & event
+        """
+        for asset_key, event in asset_events:
+            # time event spends in the queue is included in the hop latency
+            event.dispatched_at = time.perf_counter()
             self.fire(event, self._assets[asset_key])
 
     def handle_ambient_update(self, old_temp, new_temp):
@@ -187,6 +486,8 @@ class Engine(Component):
         Args:
             old_temp(float): old room temperature
             new_temp(float): new room temperature
+        Returns:
+            ThermalIteration: queued iteration (None if temperature is unchanged)
         """
 
         if math.isclose(old_temp, new_temp):
@@ -195,7 +496,11 @@ class Engine(Component):
         amb_event = events.AmbientEvent(old_temp=old_temp, new_temp=new_temp)
         self._notify_trackers(amb_event)
 
-        self._thermal_iter_handler.queue_iteration(ThermalIteration(amb_event))
+        thermal_iter = ThermalIteration(
+            amb_event, subscribers=self._thermal_subscribers
+        )
+        self._thermal_iter_handler.queue_iteration(thermal_iter)
+        return thermal_iter
 
     def handle_voltage_update(self, old_voltage, new_voltage):
         """Wallpower voltage changes to a new value,
@@ -203,6 +508,8 @@ class Engine(Component):
         Args:
             old_voltage(float): old voltage value
             new_voltage(float): new wallpower voltage value
+        Returns:
+            PowerIteration: queued iteration (None if voltage is unchanged)
         """
 
         if math.isclose(old_voltage, new_voltage):
@@ -217,7 +524,10 @@ class Engine(Component):
                 events.MainsPowerEvent(mains=int(math.isclose(old_voltage, 0.0)))
             )
 
-        self._power_iter_handler.queue_iteration(PowerIteration(volt_event))
+        power_iter_cls = PowerFlowIteration if self._power_solver else PowerIteration
+        power_iter = power_iter_cls(volt_event)
+        self._power_domains.queue_iteration(power_iter)
+        return power_iter
 
     def handle_state_update(self, asset_key, old_state, new_state):
         """Asset state changes to a new value,
@@ -225,6 +535,8 @@ class Engine(Component):
         Args:
             asset_key(int): key of the updated asset
             state(int): 0 for offline, 1 for online
+        Returns:
+            PowerIteration: queued iteration (None if state is unchanged)
         """
 
         if old_state == new_state:
@@ -237,11 +549,45 @@ class Engine(Component):
             events.PowerButtonOnEvent if new_state else events.PowerButtonOffEvent
         )
 
-        self._power_iter_handler.queue_iteration(
-            PowerIteration(
-                btn_event(old_state=old_state, new_state=new_state, asset=updated_asset)
-            )
+        power_iter = PowerIteration(
+            btn_event(old_state=old_state, new_state=new_state, asset=updated_asset)
         )
+        self._power_domains.queue_iteration(power_iter)
+        return power_iter
+
+    def handle_batch_state_update(self, state_updates):
+        """Many assets change their states at once, initiate a single chain of
+        power reactions (one power iteration for the whole batch)
+        Args:
+            state_updates(list): dicts with asset "key", "old_state" & "new_state"
+        Returns:
+            PowerIteration: queued iteration (None if no state has changed)
+        """
+
+        btn_events = []
+        for update in state_updates:
+            if update["old_state"] == update["new_state"]:
+                continue
+
+            btn_event = (
+                events.PowerButtonOnEvent
+                if update["new_state"]
+                else events.PowerButtonOffEvent
+            )
+            btn_events.append(
+                btn_event(
+                    old_state=update["old_state"],
+                    new_state=update["new_state"],
+                    asset=self._assets[update["key"]],
+                )
+            )
+
+        if not btn_events:
+            return
+
+        power_iter = PowerIteration(events.PowerButtonBatchEvent(btn_events=btn_events))
+        self._power_domains.queue_iteration(power_iter)
+        return power_iter
 
     def handle_oid_update(self, asset_key, oid, value):
         """React to OID update
@@ -249,6 +595,8 @@ class Engine(Component):
             asset_key(int): key of the asset oid belongs to
             oid(str): updated oid
             value(str): OID value
+        Returns:
+            PowerIteration: queued iteration (None if OID cannot be processed)
         """
         if asset_key not in self._assets:
             logger.warning("Asset [%s] does not exist!", asset_key)
@@ -272,7 +620,9 @@ class Engine(Component):
             oid_name=oid_details["name"],
         )
 
-        self._power_iter_handler.queue_iteration(PowerIteration(snmp_event))
+        power_iter = PowerIteration(snmp_event)
+        self._power_domains.queue_iteration(power_iter)
+        return power_iter
 
     def handle_battery_update(self, key, old_battery, new_battery):
         """When UPS updates its battery levels (engine only notifies any
@@ -298,15 +648,18 @@ class Engine(Component):
         (is can be used to gracefully stop engine and
         all the hardware assets it is managing)
         """
-        self._power_iter_handler.stop()
+        self._power_domains.stop()
         self._thermal_iter_handler.stop()
         self._sys_environ.stop()
 
         for asset_key in self._assets:
             self._assets[asset_key].stop()
 
-        HardwareGraphDataSource.cache_clear_all()
-        HardwareGraphDataSource.close()
+        self._data_source.cache_clear_all()
+        self._data_source.close()
+        IStateManager.clear_state_managers()
+        ISnmpDeviceStateManager.clear_oid_catalog()
+        IStateManager.disable_state_cache()
 
         super().stop(code)
 
@@ -315,20 +668,20 @@ class Engine(Component):
     # asset finishes processing incoming event)
 
     def _on_asset_power_event_success(self, asset_event):
-        """Notify current power iteration that hardware asset
+        """Notify power iteration (the event belongs to) that hardware asset
         finished processing power event"""
         self._notify_trackers(asset_event)
+        power_iter = asset_event.power_iter
         self._chain_power_events(
-            *self._power_iter_handler.current_iteration.process_power_event(asset_event)
+            power_iter, *power_iter.process_power_event(asset_event)
         )
 
     def _on_asset_load_event_success(self, asset_event):
-        """Notify current power iteration that hardware asset
+        """Notify power iteration (the event belongs to) that hardware asset
         finished processing load event"""
         self._notify_trackers(asset_event)
-        self._chain_load_events(
-            self._power_iter_handler.current_iteration.process_load_event(asset_event)
-        )
+        power_iter = asset_event.power_iter
+        self._chain_load_events(power_iter, power_iter.process_load_event(asset_event))
 
     def _on_asset_thermal_event_success(self, asset_event):
         """Notify current thermal iteration that hardware asset
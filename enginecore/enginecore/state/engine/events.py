@@ -69,6 +69,9 @@ class EngineEvent(Event):
         self._power_iter = kwargs["power_iter"] if "power_iter" in kwargs else None
         self._branch = kwargs["branch"] if "branch" in kwargs else None
 
+        # time event was dispatched against an asset (see Tracer)
+        self.dispatched_at = None
+
     @property
     def power_iter(self):
         """Power iteration power event belongs to"""
@@ -179,6 +182,49 @@ class PowerButtonOffEvent(PowerButtonEvent):
     """Asset was powered off by a user"""
 
 
+class PowerButtonBatchEvent(EngineEvent):
+    """Many assets had their power buttons pressed at once (e.g. a user
+    powering down a whole rack); button events are processed as part of
+    one power iteration
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if "btn_events" not in kwargs or not kwargs["btn_events"]:
+            raise KeyError("Needs arguments: btn_events")
+
+        self._btn_events = list(kwargs["btn_events"])
+
+    def __str__(self):
+        return "PowerButtonBatchEvent: [{}]".format(
+            ", ".join(
+                "{0.asset.key}: {0.state.old}->{0.state.new}".format(e)
+                for e in self._btn_events
+            )
+        )
+
+    @property
+    def btn_events(self):
+        """Power button events batched together"""
+        return self._btn_events
+
+    @property
+    def assets(self):
+        """Hardware assets affected by the batch"""
+        return [e.asset for e in self._btn_events]
+
+    @property
+    def power_iter(self):
+        """Power iteration batch (and its button events) belong to"""
+        return self._power_iter
+
+    @power_iter.setter
+    def power_iter(self, value):
+        self._power_iter = value
+        for btn_event in self._btn_events:
+            btn_event.power_iter = value
+
+
 class SignalEvent(EngineEvent):
     """Asset was signaled to update its power state through network interface"""
 
@@ -1,5 +1,40 @@
 """Tools for keeping track of the ongoing donwtream & upstream power event flow"""
+import math
+
 from enginecore.state.engine import events
+from enginecore.tools.tracer import TRACER
+from enginecore.tools.write_buffer import WriteBuffer
+
+
+def merge_wallpower_events(src_event, event):
+    """Collapse 2 consecutive wallpower voltage events into one transition
+    (from old voltage of the first event to new voltage of the second one);
+    Mains outage or restoration (0 volts) is never collapsed since it
+    leads to state changes (e.g. UPS transfer to battery);
+    Source event is left as is (it was already passed to the engine trackers)
+    Args:
+        src_event(AssetPowerEvent): event voltage change gets merged into
+        event(AssetPowerEvent): next voltage event
+    Returns:
+        AssetPowerEvent: new merged event, None if events cannot be merged
+    """
+
+    is_wallpower = lambda e: isinstance(e, events.AssetPowerEvent) and not e.asset
+    if not is_wallpower(src_event) or not is_wallpower(event):
+        return None
+
+    volt_values = (src_event.out_volt.old, src_event.out_volt.new, event.out_volt.new)
+    if any(math.isclose(v, 0.0) for v in volt_values):
+        return None
+
+    return events.AssetPowerEvent(
+        asset=None, old_out_volt=src_event.out_volt.old, new_out_volt=event.out_volt.new
+    )
+
+
+def is_noop_wallpower_event(event):
+    """True if wallpower voltage is back to where it was (e.g. 120->110->120)"""
+    return math.isclose(event.out_volt.old, event.out_volt.new)
 
 
 class EngineEventBranch:
@@ -53,9 +88,16 @@ class LoadBranch(EngineEventBranch):
 class BranchTracker:
     """Utility to keep track of power branches in progress/completed"""
 
-    def __init__(self):
+    def __init__(self, trace=None, branch_type=None):
+        """
+        Args:
+            trace(IterationTrace): records branch forks & completions if provided
+            branch_type(str): type of tracked branches (e.g. voltage)
+        """
         self._branches_active = []
         self._branches_done = []
+        self._trace = trace
+        self._branch_type = branch_type
 
     @property
     def num_branches_active(self):
@@ -76,19 +118,32 @@ class BranchTracker:
         """Remove branch from a list of completed branches"""
         self._branches_active.remove(branch)
         self._branches_done.append(branch)
+        if self._trace:
+            self._trace.branch_point("complete", self._branch_type)
 
     def add_branch(self, branch: EngineEventBranch):
         """Add branch to the collection of tracked branches"""
         self._branches_active.append(branch)
+        if self._trace:
+            self._trace.branch_point("start", self._branch_type)
 
     def extend(self, branches: list):
         """Add many branches to the collection of tracked branches"""
         self._branches_active.extend(branches)
+        if self._trace:
+            self._trace.branch_point("fork", self._branch_type, len(branches))
 
 
 class EngineIteration:
     """Iteration keeps track of event flow caused by one source event"""
 
+    # iterations are traced from the moment they are created
+    tracer = TRACER
+    # state updates made by assets processing iteration events are written
+    # to the store once iteration completes (see write_buffer, opt-in since
+    # other threads read stale state till then)
+    write_behind = False
+
     def __init__(self, src_event):
         """Initialize engine iteration 
         Args:
@@ -97,12 +152,66 @@ class EngineIteration:
         """
         self._src_event = src_event
         self._src_event.power_iter = self
+        self._merged_iterations = []
+        self._consumer = None
+        self._trace = self.tracer.new_trace(self)
+        self._write_buffer = WriteBuffer() if self.write_behind else None
+
+    @property
+    def trace(self):
+        """Iteration trace (None if tracing is disabled)"""
+        return self._trace
+
+    @property
+    def write_buffer(self):
+        """Buffered state updates (None if write-behind is disabled)"""
+        return self._write_buffer
+
+    @property
+    def src_event(self):
+        """Event that started this iteration"""
+        return self._src_event
+
+    def _replace_src_event(self, event):
+        """Replace source event with the one merged iterations were collapsed into"""
+        self._src_event = event
+        self._src_event.power_iter = self
+
+    @property
+    def merged_iterations(self):
+        """Iterations absorbed by this one (see merge)"""
+        return self._merged_iterations
+
+    @property
+    def consumer(self):
+        """Iteration consumer this iteration was queued in"""
+        return self._consumer
+
+    @consumer.setter
+    def consumer(self, value):
+        self._consumer = value
 
     @property
     def iteration_done(self):
         """Indicates if iteration is completed or not (still in progress)"""
         raise NotImplementedError()
 
+    def merge(self, iteration):
+        """Absorb iteration queued right after this one (if it is redundant);
+        Only iterations that haven't been launched yet can be merged
+        Args:
+            iteration(EngineIteration): next queued iteration
+        Returns:
+            bool: True if iteration was merged and can be discarded
+        """
+        return False
+
+    @property
+    def is_noop(self):
+        """True if iterations merged into this one cancel each other out
+        (such iteration is launched without dispatching any events)"""
+        return False
+
     def launch(self):
         """Start iteration processing"""
         raise NotImplementedError()
@@ -111,21 +220,49 @@ class EngineIteration:
 class ThermalIteration(EngineIteration):
     """Thermal Iteration is launched when room temperature either drops or
     rises;
+    Ambient event is only dispatched against thermal subscribers
+    (assets that react to ambient changes)
     """
 
     data_source = None
 
-    def __init__(self, src_event):
+    def __init__(self, src_event, subscribers=()):
+        """
+        Args:
+            src_event(AmbientEvent): room temperature change
+            subscribers(list): keys of assets subscribed to thermal events
+        """
         super().__init__(src_event)
-        self._thermal_branches = BranchTracker()
+        self._subscribers = tuple(subscribers)
+        self._thermal_branches = BranchTracker(self._trace, "thermal")
 
     @property
     def iteration_done(self):
         return self._thermal_branches.completed
 
     def launch(self):
+        if self.is_noop:
+            return ([],)
         return self.process_thermal_event(self._src_event)
 
+    def merge(self, iteration):
+        """Collapse consecutive ambient changes into one old->latest transition"""
+        if not isinstance(iteration, ThermalIteration):
+            return False
+
+        self._replace_src_event(
+            events.AmbientEvent(
+                old_temp=self._src_event.temperature.old,
+                new_temp=iteration.src_event.temperature.new,
+            )
+        )
+        return True
+
+    @property
+    def is_noop(self):
+        temperature = self._src_event.temperature
+        return bool(self._merged_iterations) and temperature.old == temperature.new
+
     def process_thermal_event(self, event):
         """Process thermal event"""
 
@@ -138,18 +275,15 @@ class ThermalIteration(EngineIteration):
             self._thermal_branches.complete_branch(event.branch)
             return None
 
-        all_asset_keys = [
-            a["key"] for a in ThermalIteration.data_source.get_all_assets()
-        ]
         new_thermal_branches = []
 
-        for _ in all_asset_keys:
+        for _ in self._subscribers:
             next_event = self._src_event.get_next_thermal_event()
             new_thermal_branches.append(ThermalBranch(next_event, self))
 
         self._thermal_branches.extend(new_thermal_branches)
 
-        return (zip(all_asset_keys, [b.src_event for b in new_thermal_branches]),)
+        return (zip(self._subscribers, [b.src_event for b in new_thermal_branches]),)
 
 
 class PowerIteration(EngineIteration):
@@ -167,12 +301,18 @@ class PowerIteration(EngineIteration):
     def __init__(self, src_event):
         super().__init__(src_event)
 
-        self._volt_branches = BranchTracker()
-        self._load_branches = BranchTracker()
+        self._volt_branches = BranchTracker(self._trace, "voltage")
+        self._load_branches = BranchTracker(self._trace, "load")
 
         self._last_processed_volt_event = None
         self._last_processed_load_event = None
 
+        # voltage branches of a power button batch that are yet to be processed
+        # by their assets (branch -> asset key) & load changes accumulated
+        # per parent till then (see _combine_batch_loads)
+        self._batch_pending = {}
+        self._batch_loads = {}
+
     def __str__(self):
         return (
             "Power Iteration due to incoming event:\n"
@@ -204,6 +344,24 @@ class PowerIteration(EngineIteration):
         power event propagation is exhausted"""
         return self.all_load_branches_done and self.all_voltage_branches_done
 
+    def merge(self, iteration):
+        """Collapse consecutive wallpower voltage changes"""
+        if not isinstance(iteration, PowerIteration):
+            return False
+
+        merged_event = merge_wallpower_events(self._src_event, iteration.src_event)
+        if not merged_event:
+            return False
+
+        self._replace_src_event(merged_event)
+        return True
+
+    @property
+    def is_noop(self):
+        return bool(self._merged_iterations) and is_noop_wallpower_event(
+            self._src_event
+        )
+
     def launch(self):
         """Start up power iteration by returning events
         Returns:
@@ -211,6 +369,8 @@ class PowerIteration(EngineIteration):
                 - ParentAssetVoltageEvent (either up or down)
                 - ChildLoadEvent     (either up or down)
         """
+        if self.is_noop:
+            return ([], None)
         return self.process_power_event(self._src_event)
 
     def process_power_event(self, event):
@@ -228,6 +388,8 @@ class PowerIteration(EngineIteration):
             return self._process_hardware_asset_event(event)
         if isinstance(event, events.PowerButtonEvent):
             return self._process_btn_asset_event(event)
+        if isinstance(event, events.PowerButtonBatchEvent):
+            return self._process_btn_batch_event(event)
 
         # wallpower voltage caused power loop
         return self._process_wallpower_event(event)
@@ -295,6 +457,18 @@ class PowerIteration(EngineIteration):
         self._volt_branches.add_branch(VoltageBranch(event, self))
         return (zip([event.asset.key], [event]),)
 
+    def _process_btn_batch_event(self, event):
+        """User "pressed" power buttons of many assets at once, every button event
+        starts its own voltage branch (load changes of the assets are propagated to
+        their parents together, see _combine_batch_loads)
+        Args:
+            event(PowerButtonBatchEvent): contains button events of all the assets
+        """
+        new_branches = [VoltageBranch(e, self) for e in event.btn_events]
+        self._batch_pending = {b: b.src_event.asset.key for b in new_branches}
+        self._volt_branches.extend(new_branches)
+        return (zip([e.asset.key for e in event.btn_events], event.btn_events),)
+
     def _process_hardware_asset_event(self, event):
         """One of the hardware assets went online/online
         Args:
@@ -321,22 +495,26 @@ class PowerIteration(EngineIteration):
         # when load needs to be forked in multiple direction,
         # asset needs to set streamed_load_updates on the asset_event
         if event.streamed_load_updates:
-            new_branches, parent_keys = [], []
-            for pkey in event.streamed_load_updates:
-                load_e = event.streamed_load_event(pkey)
-                if load_e:
-                    parent_keys.append(pkey)
-                    new_branches.append(
-                        LoadBranch(event.streamed_load_event(pkey), self)
-                    )
-            self._load_branches.extend(new_branches)
-            next_load_events = [b.src_event for b in new_branches]
+            parent_loads = [
+                (pkey, event.streamed_load_event(pkey))
+                for pkey in event.streamed_load_updates
+            ]
+            parent_loads = [(pkey, load_e) for pkey, load_e in parent_loads if load_e]
         # Process load for single parent
         elif parent_keys and event.get_next_load_event():
-            new_branches = [
-                LoadBranch(event.get_next_load_event(), self) for _ in parent_keys
-            ]
+            parent_loads = [(pkey, event.get_next_load_event()) for pkey in parent_keys]
+        else:
+            parent_loads = []
+
+        # asset was powered up/down as part of a batch
+        if self._batch_pending.get(event.branch) == event.asset.key:
+            del self._batch_pending[event.branch]
+            parent_loads = self._combine_batch_loads(parent_loads)
+
+        if parent_loads:
+            new_branches = [LoadBranch(load_e, self) for _, load_e in parent_loads]
             self._load_branches.extend(new_branches)
+            parent_keys = [pkey for pkey, _ in parent_loads]
             next_load_events = [b.src_event for b in new_branches]
 
         # delete voltage branch (power stream) when it forks, when
@@ -362,3 +540,103 @@ class PowerIteration(EngineIteration):
             zip(child_keys, next_volt_events),
             zip(parent_keys, next_load_events) if next_load_events else None,
         )
+
+    def _combine_batch_loads(self, parent_loads):
+        """Accumulate load changes of the assets in a power button batch per parent,
+        so that every parent processes one combined load change
+        Args:
+            parent_loads(list): pairs of parent key & load event of a batch asset
+        Returns:
+            list: pairs of parent key & combined load event once all the assets
+                  in the batch are processed (empty till then)
+        """
+        for pkey, load_e in parent_loads:
+            old_load, new_load = self._batch_loads.get(pkey, (0, 0))
+            self._batch_loads[pkey] = (
+                old_load + load_e.load.old,
+                new_load + load_e.load.new,
+            )
+
+        if self._batch_pending:
+            return []
+
+        combined_loads = []
+        for pkey, (old_load, new_load) in self._batch_loads.items():
+            if math.isclose(old_load, new_load):
+                continue
+
+            load_event = (
+                events.ChildLoadUpEvent
+                if new_load > old_load
+                else events.ChildLoadDownEvent
+            )
+            load_e = load_event(old_load=old_load, new_load=new_load, power_iter=self)
+            combined_loads.append((pkey, load_e))
+
+        self._batch_loads = {}
+        return combined_loads
+
+
+class PowerFlowIteration(EngineIteration):
+    """Power iteration resolved by the power flow solver in a single pass
+    (see power_solver.PowerFlowSolver);
+    It is launched on wallpower voltage changes & does not track any voltage or
+    load branches since all of the assets are updated at once.
+    """
+
+    def __init__(self, src_event):
+        super().__init__(src_event)
+        self._solved = False
+
+    def __str__(self):
+        return (
+            "Power Flow Iteration due to wallpower update:\n"
+            " | {0._src_event}\n"
+            " | Solved: {0._solved}\n"
+        ).format(self)
+
+    @property
+    def voltage(self):
+        """Wallpower voltage change (old/new values)"""
+        return self._src_event.out_volt
+
+    @property
+    def all_voltage_branches_done(self):
+        return self._solved
+
+    @property
+    def all_load_branches_done(self):
+        return self._solved
+
+    @property
+    def iteration_done(self):
+        return self._solved
+
+    def merge(self, iteration):
+        """Collapse consecutive wallpower voltage changes"""
+        if not isinstance(iteration, PowerFlowIteration):
+            return False
+
+        merged_event = merge_wallpower_events(self._src_event, iteration.src_event)
+        if not merged_event:
+            return False
+
+        self._replace_src_event(merged_event)
+        return True
+
+    @property
+    def is_noop(self):
+        return bool(self._merged_iterations) and is_noop_wallpower_event(
+            self._src_event
+        )
+
+    def launch(self):
+        """Power flow gets solved by the engine, no events to be chained
+        Returns:
+            tuple: no voltage events & no load events
+        """
+        return ([], None)
+
+    def complete(self):
+        """Mark power flow as solved"""
+        self._solved = True
@@ -1,25 +1,144 @@
 """An iteration-handling utility that watches for incoming events
-in a thread and launches an iteration"""
+and launches an iteration in a worker thread"""
 
-import queue
+import collections
 import threading
 
 
+class IterationWorkerPool:
+    """Bounded number of worker threads launching iterations queued by
+    one or more consumers; a consumer never has more than one iteration
+    in progress, so workers are only busy while an iteration is being launched
+    """
+
+    def __init__(self, name="unspecified", max_workers=1):
+        self._name = name
+        self._max_workers = max_workers
+        self._cond = threading.Condition()
+        self._consumers = []
+        self._workers = []
+        self._stopped = False
+
+    @property
+    def cond(self):
+        """Condition guarding consumer queues (notified on any queue changes)"""
+        return self._cond
+
+    @property
+    def num_workers(self):
+        """Number of worker threads"""
+        return len(self._workers)
+
+    def add_consumer(self, consumer):
+        """Let the pool launch iterations queued by the consumer"""
+        with self._cond:
+            self._consumers.append(consumer)
+
+    def start(self):
+        """Launch worker threads"""
+        num_workers = max(1, min(self._max_workers, len(self._consumers)))
+        for worker_num in range(num_workers):
+            worker = threading.Thread(
+                target=self._worker, name="{}:{}".format(self._name, worker_num)
+            )
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        """Join worker threads (iterations that are still queued are not launched)"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+        for worker in self._workers:
+            worker.join()
+
+    def _next_task(self):
+        """Find consumer that has an iteration ready to be launched"""
+        for consumer in self._consumers:
+            iteration = consumer.take_launchable()
+            if iteration:
+                return consumer, iteration
+        return None
+
+    def _worker(self):
+        """Launch queued iterations as they become available"""
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while not self._stopped and not task:
+                    self._cond.wait()
+                    task = self._next_task()
+
+                if self._stopped:
+                    return
+
+            consumer, iteration = task
+            consumer.launch(iteration)
+
+
 class EngineIterationConsumer:
-    """This wrapper watches an event queue in a separate thread
-    and launches a processing iteration (e.g. a chain of power events
-    that occurred due to power outage)"""
+    """This wrapper queues incoming iterations and launches a processing
+    iteration (e.g. a chain of power events that occurred due to power outage)
+    once the previous one is completed;
+    Redundant iterations are coalesced on arrival: a queued iteration that is
+    still waiting to be launched can absorb the next one (see EngineIteration.merge);
+    Consumers sharing an IterationGate launch iterations in the order the gate allows
+    and can share a worker pool (see PowerDomains)
+    """
 
-    def __init__(self, iteration_worker_name="unspecified"):
+    def __init__(
+        self, iteration_worker_name="unspecified", gate=None, barrier=False, pool=None
+    ):
 
-        # queue of engine events waiting to be processed
-        self._event_queue = queue.Queue()
-        self._iteration_done_event = threading.Event()
+        # iterations waiting to be processed
+        self._pending = collections.deque()
         # work-in-progress
         self._current_iteration = None
-        self._worker_thread = None
         self._on_iteration_launched = None
         self._iteration_worker_name = iteration_worker_name
+        self._gate = gate
+        self._barrier = barrier
+
+        # consumer runs its own worker thread if pool is not shared
+        self._owns_pool = pool is None
+        self._pool = pool or IterationWorkerPool(iteration_worker_name)
+        self._pool.add_consumer(self)
+
+        # iteration stats
+        self._num_queued = 0
+        self._num_merged = 0
+        self._num_completed = 0
+
+    def __str__(self):
+        return (
+            "Iteration Consumer [{0._iteration_worker_name}]:\n"
+            " | Queue depth: {0.queue_depth}\n"
+            " | Iterations queued: {0._num_queued}\n"
+            " | Iterations merged: {0._num_merged}\n"
+            " | Iterations completed: {0._num_completed}\n"
+        ).format(self)
+
+    @property
+    def name(self):
+        """Consumer name"""
+        return self._iteration_worker_name
+
+    @property
+    def queue_depth(self):
+        """Number of iterations waiting to be launched"""
+        return len(self._pending)
+
+    @property
+    def stats(self):
+        """Queue stats (depth, number of queued, merged & completed iterations)"""
+        return {
+            "queue_depth": self.queue_depth,
+            "queued": self._num_queued,
+            "merged": self._num_merged,
+            "completed": self._num_completed,
+        }
 
     @property
     def current_iteration(self):
@@ -28,75 +147,119 @@ class EngineIterationConsumer:
         return self._current_iteration
 
     def start(self, on_iteration_launched=None):
-        """Launches consumer thread
+        """Start launching queued iterations
         Args:
-            on_iteration_launched(callable): called when event queue returns
-                                             new iteration
+            on_iteration_launched(callable): called when a queued iteration
+                                             gets launched
         """
         self._on_iteration_launched = on_iteration_launched
 
-        # initialize processing thread
-        self._worker_thread = threading.Thread(
-            target=self._worker, name=self._iteration_worker_name
-        )
-        self._worker_thread.daemon = True
-        self._worker_thread.start()
-        self._iteration_done_event.set()
+        if self._owns_pool:
+            self._pool.start()
 
     def stop(self):
-        """Join consumer thread (stop processing power queued power iterations)"""
-        if self._current_iteration:
-            self._complete_task()
-            self._event_queue.join()
+        """Stop processing queued iterations (current iteration is completed,
+        iterations that haven't been launched yet are discarded)"""
+        with self._pool.cond:
+            if self._current_iteration:
+                self._complete_task()
 
-        self.queue_iteration(None)
-        self._iteration_done_event.set()
-        self._worker_thread.join()
+            while self._pending:
+                discarded = self._pending.popleft()
+                if self._gate:
+                    self._gate.release(discarded)
+
+        if self._owns_pool:
+            self._pool.stop()
 
     def queue_iteration(self, iteration):
         """Queue an iteration for later processing;
-        it will get dequeued once current_iteration is completed
+        it will get launched once current_iteration is completed
         Args:
-            iteration(EngineIteration): to be queued, event consumer will stop
-                                        if None is supplied
+            iteration(EngineIteration): to be queued
         """
-        self._event_queue.put(iteration)
-        if not self._current_iteration:
-            self._iteration_done_event.set()
+        with self._pool.cond:
+            self._num_queued += 1
+            iteration.consumer = self
 
-    def unfreeze_task_queue(self):
-        """Signal that current iteration is done (so handler can process
-         next event in a queue if available)"""
+            # merge into the last pending iteration if possible
+            if (
+                self._pending
+                and self._can_merge_into(self._pending[-1])
+                and self._pending[-1].merge(iteration)
+            ):
+                self._pending[-1].merged_iterations.append(iteration)
+                self._num_merged += 1
+                return
 
-        assert self.current_iteration.iteration_done
-        self._complete_task()
+            if self._gate:
+                self._gate.issue(iteration, barrier=self._barrier)
 
-    def _complete_task(self):
-        """Resets current iteration and signals _worker to accept new queued tasks"""
-        self._current_iteration = None
-        self._event_queue.task_done()
-        self._iteration_done_event.set()
+            self._pending.append(iteration)
+            self._pool.cond.notify_all()
 
-    def _worker(self):
-        """Consumer processing event queue, calls a callback supplied in
-        start()"""
+    def _can_merge_into(self, pending_iteration):
+        """Iterations queued by other consumers sharing the gate
+        must not be re-ordered by merging"""
+        return not self._gate or self._gate.is_latest(pending_iteration)
 
-        while True:
+    def take_launchable(self):
+        """Dequeue next iteration if it can be launched
+        (called by the worker pool while holding its condition)
+        Returns:
+            EngineIteration: iteration to be launched, None if current iteration
+                             is in progress or the next one has to wait its turn
+        """
+        if self._current_iteration or not self._pending:
+            return None
 
-            self._iteration_done_event.wait()
+        if self._gate and not self._gate.can_launch(self._pending[0]):
+            return None
 
-            # new processing iteration/loop was initialized
-            next_iter = self._event_queue.get()
+        self._current_iteration = self._pending.popleft()
+        return self._current_iteration
 
-            if not next_iter:
-                return
+    def launch(self, iteration):
+        """Launch iteration dequeued by take_launchable"""
+        trace = iteration.trace
+        if trace:
+            trace.launched()
+
+        launch_results = iteration.launch()
+
+        if trace:
+            trace.launch_returned()
+
+        if self._on_iteration_launched:
+            self._on_iteration_launched(*launch_results)
+
+    def unfreeze_task_queue(self):
+        """Signal that current iteration is done (so handler can process
+         next event in a queue if available)"""
+
+        iteration = self._current_iteration
+        if iteration is None:
+            return
 
-            assert self._current_iteration is None
+        assert iteration.iteration_done
+        self.complete_iteration(iteration)
 
-            self._current_iteration = next_iter
-            launch_results = self._current_iteration.launch()
+    def complete_iteration(self, iteration):
+        """Signal that iteration is done (ignored if iteration is no longer
+        in progress, e.g. consumer was stopped in the meantime)"""
+        with self._pool.cond:
+            if iteration is self._current_iteration:
+                self._complete_task()
 
-            if self._on_iteration_launched:
-                self._on_iteration_launched(*launch_results)
+    def _complete_task(self):
+        """Resets current iteration and signals workers to accept new queued tasks"""
+        if self._gate:
+            self._gate.release(self._current_iteration)
+
+        trace = self._current_iteration.trace
+        if trace:
+            trace.tracer.complete_trace(trace)
 
-            self._iteration_done_event.clear()
+        self._current_iteration = None
+        self._num_completed += 1
+        self._pool.cond.notify_all()
@@ -0,0 +1,163 @@
+"""Power iterations are processed per power domain (group of assets sharing
+power paths) so that iterations in disjoint parts of the topology do not
+wait on each other;
+Wallpower voltage changes affect every domain & act as a global barrier.
+"""
+import functools
+import threading
+
+from enginecore.state.engine import events
+from enginecore.state.engine.iteration_consumer import (
+    EngineIterationConsumer,
+    IterationWorkerPool,
+)
+
+
+class IterationGate:
+    """Orders iteration launches across multiple iteration consumers;
+    Each queued iteration gets a ticket (in order of arrival):
+        - regular iteration can be launched once all the barrier
+          iterations queued before it are done;
+        - barrier iteration waits for every iteration queued before it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._tickets = {}
+        self._barriers = set()
+
+    def issue(self, iteration, barrier=False):
+        """Assign ticket to a newly queued iteration"""
+        with self._cond:
+            self._tickets[iteration] = self._next_ticket
+            if barrier:
+                self._barriers.add(self._next_ticket)
+            self._next_ticket += 1
+
+    def is_latest(self, iteration):
+        """True if no other iteration was queued after this one"""
+        with self._cond:
+            return self._tickets.get(iteration) == self._next_ticket - 1
+
+    def can_launch(self, iteration):
+        """Check if iteration is allowed to be launched"""
+        with self._cond:
+            return self._can_launch(iteration)
+
+    def _can_launch(self, iteration):
+        ticket = self._tickets[iteration]
+
+        if ticket in self._barriers:
+            return min(self._tickets.values()) == ticket
+
+        return not any(b < ticket for b in self._barriers)
+
+    def release(self, iteration):
+        """Iteration was completed (or discarded)"""
+        with self._cond:
+            ticket = self._tickets.pop(iteration, None)
+            self._barriers.discard(ticket)
+
+
+class PowerDomains:
+    """Routes power iterations to iteration consumers running one per power
+    domain (see TopologyIndex.get_domain);
+    Iterations caused by wallpower changes (or by batched state changes
+    spanning multiple domains) are processed by a separate consumer acting
+    as a global barrier;
+    Consumers share a bounded pool of worker threads.
+    """
+
+    def __init__(self, topology, max_workers=4):
+        """
+        Args:
+            topology(TopologyIndex): power topology split into domains
+            max_workers(int): max number of threads launching power iterations
+        """
+        self._topology = topology
+        self._gate = IterationGate()
+        self._pool = IterationWorkerPool("power_worker", max_workers)
+
+        self._mains_consumer = EngineIterationConsumer(
+            "mains", gate=self._gate, barrier=True, pool=self._pool
+        )
+        self._domain_consumers = {
+            domain: EngineIterationConsumer(
+                str(domain), gate=self._gate, pool=self._pool
+            )
+            for domain in range(topology.num_domains)
+        }
+
+    @property
+    def consumers(self):
+        """All power iteration consumers"""
+        return [self._mains_consumer] + list(self._domain_consumers.values())
+
+    @property
+    def stats(self):
+        """Iteration stats aggregated for all of the domains
+        (with queue stats of every domain listed under "domains")"""
+        stats = {
+            "num_domains": len(self._domain_consumers),
+            "num_workers": self._pool.num_workers,
+            "domains": {},
+        }
+
+        for consumer in self.consumers:
+            consumer_stats = consumer.stats
+            stats["domains"][consumer.name] = consumer_stats
+            for stat, value in consumer_stats.items():
+                stats[stat] = stats.get(stat, 0) + value
+
+        return stats
+
+    def _get_consumer(self, iteration):
+        """Find consumer responsible for the iteration
+        (batches spanning multiple domains are processed as barriers)"""
+        src_event = iteration.src_event
+        if isinstance(src_event, events.PowerButtonBatchEvent):
+            assets = src_event.assets
+        else:
+            assets = [src_event.asset]
+
+        if None in assets:
+            return self._mains_consumer
+
+        domains = {self._topology.get_domain(a.key) for a in assets}
+        if len(domains) > 1:
+            return self._mains_consumer
+
+        return self._domain_consumers[domains.pop()]
+
+    def start(self, on_iteration_launched):
+        """Launch iteration consumers
+        Args:
+            on_iteration_launched(callable): called with consumer followed by
+                                             iteration launch results
+        """
+        for consumer in self.consumers:
+            consumer.start(
+                on_iteration_launched=functools.partial(on_iteration_launched, consumer)
+            )
+
+        self._pool.start()
+
+    def stop(self):
+        """Stop all the consumers (iterations that haven't been launched yet
+        are discarded)"""
+        for consumer in self.consumers:
+            consumer.stop()
+
+        self._pool.stop()
+
+    def queue_iteration(self, iteration):
+        """Queue power iteration in the domain it belongs to"""
+        self._get_consumer(iteration).queue_iteration(iteration)
+
+    @staticmethod
+    def complete_iteration(iteration):
+        """Signal that power iteration is done (so the domain consumer
+        can launch the next one); iteration is completed by the consumer it was
+        queued in even if the domains were re-built in the meantime"""
+        iteration.consumer.complete_iteration(iteration)
@@ -0,0 +1,333 @@
+"""Power flow solver resolves wallpower voltage changes for the whole topology
+at once instead of walking voltage & load branches one event at a time
+(see PowerIteration).
+
+Topology is compiled into topological levels (assets ordered by their distance from
+the power sources) and parent/child edge arrays; voltages & power states are
+computed downstream level-by-level and loads are accumulated upstream in the
+reverse order, each level being processed as a single vectorized operation.
+
+UPS devices are treated as scalar boundary nodes since their output depends on
+battery state (they are resolved by the UPS asset itself).
+"""
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # the solver is an optional engine mode
+    np = None
+
+
+# Per-asset power state read before the power flow is solved
+# (arrays are ordered as PowerFlowSolver.keys);
+# vm_active is only relevant to servers (all VMs are assumed active if omitted)
+PowerFlowSnapshot = namedtuple(
+    "PowerFlowSnapshot",
+    "status in_volt out_volt load user_off on_battery vm_active",
+    defaults=(None,),
+)
+
+# Asset power changes (each field other than key is an (old, new) pair)
+PowerFlowChange = namedtuple("PowerFlowChange", "key in_volt status out_volt load")
+
+
+class PowerFlowResult:
+    """Old & new power state of all the assets in the solved topology"""
+
+    def __init__(self, keys, old, new):
+        """
+        Args:
+            keys(list): asset keys in solver order
+            old(tuple): input voltage, status, output voltage & load arrays
+                        before the power flow was solved
+            new(tuple): same arrays after the power flow was solved
+        """
+        self._keys = keys
+        self._old = old
+        self._new = new
+
+    @property
+    def keys(self):
+        """Keys of the solved assets"""
+        return self._keys
+
+    def changes(self):
+        """Get power updates for the assets affected by the power flow
+        Yields:
+            PowerFlowChange: changes in asset voltage, status & load
+        """
+        changed = np.zeros(len(self._keys), dtype=bool)
+        for old_values, new_values in zip(self._old, self._new):
+            changed |= ~np.isclose(old_values, new_values)
+
+        for i in np.flatnonzero(changed):
+            yield PowerFlowChange(
+                self._keys[i],
+                *(
+                    (old_values[i].item(), new_values[i].item())
+                    for old_values, new_values in zip(self._old, self._new)
+                )
+            )
+
+
+class PowerFlowSolver:
+    """Compiled power topology capable of solving voltage, power state and load
+    of every asset in one pass;
+
+    Example:
+        solver = PowerFlowSolver(topology_index)
+        result = solver.solve(0.0, snapshot, applier) # mains outage
+        for change in result.changes():
+            ...
+
+    Power-state transitions are not decided by the solver alone: assets may refuse
+    to power up (e.g. outlet switched off through SNMP); the applier
+    passed to solve() performs transitions & reports back actual states
+    before the next level is computed.
+    """
+
+    KIND_DEVICE, KIND_SERVER, KIND_UPS = range(3)
+
+    def __init__(self, topology):
+        """Compile topology into levels and edge arrays
+        Args:
+            topology(TopologyIndex): power topology of the system
+        Raises:
+            ImportError: if numpy is not installed
+            ValueError: if power topology contains a loop
+        """
+
+        if np is None:
+            raise ImportError("numpy is required by the power flow solver")
+
+        self._topology_version = topology.version
+
+        assets = topology.assets
+        keys = [a["key"] for a in assets]
+        index = {k: i for i, k in enumerate(keys)}
+
+        # longest distance from a power source (Kahn's algorithm)
+        depth = [0] * len(keys)
+        num_parents = [
+            len([p for p in topology.get_parents(k) if p in index]) for k in keys
+        ]
+        queue = deque(i for i, n_parents in enumerate(num_parents) if not n_parents)
+        num_visited = 0
+
+        while queue:
+            i = queue.popleft()
+            num_visited += 1
+            for child_key in topology.get_children(keys[i]):
+                child = index[child_key]
+                depth[child] = max(depth[child], depth[i] + 1)
+                num_parents[child] -= 1
+                if not num_parents[child]:
+                    queue.append(child)
+
+        if num_visited != len(keys):
+            raise ValueError("Power topology contains a loop")
+
+        order = sorted(range(len(keys)), key=lambda i: depth[i])
+        position = {keys[i]: pos for pos, i in enumerate(order)}
+
+        self._keys = [keys[i] for i in order]
+        assets = [assets[i] for i in order]
+        depth = [depth[i] for i in order]
+
+        # assets sharing the same depth are stored as contiguous slices
+        self._levels = []
+        for level_depth in range(depth[-1] + 1 if depth else 0):
+            start = depth.index(level_depth)
+            self._levels.append(slice(start, start + depth.count(level_depth)))
+
+        # power links (parent -> child) grouped by level of the child
+        edges = sorted(
+            (position[k], position[p])
+            for k in self._keys
+            for p in topology.get_parents(k)
+            if p in position
+        )
+        self._edge_child = np.array([c for c, _ in edges], dtype=np.intp)
+        self._edge_parent = np.array([p for _, p in edges], dtype=np.intp)
+        self._level_edges = [
+            slice(*np.searchsorted(self._edge_child, [lvl.start, lvl.stop]))
+            for lvl in self._levels
+        ]
+
+        mains = set(topology.mains_powered_outlets)
+        kinds = {
+            "server": self.KIND_SERVER,
+            "serverwithbmc": self.KIND_SERVER,
+            "ups": self.KIND_UPS,
+        }
+
+        self._kind = np.array([kinds.get(a["type"], self.KIND_DEVICE) for a in assets])
+        self._mains = np.array([k in mains for k in self._keys], dtype=bool)
+        self._has_parents = np.array([d > 0 for d in depth], dtype=bool)
+        self._min_volt = np.array([a.get("minVoltage", 0) for a in assets], dtype=float)
+        self._power_on_ac = np.array([a.get("powerOnAc", True) for a in assets])
+        self._consumption = np.array(
+            [a.get("powerConsumption", 0) for a in assets], dtype=float
+        )
+        self._draw = np.array([a.get("draw", 1) for a in assets], dtype=float)
+
+    @property
+    def keys(self):
+        """Asset keys in the order expected by the snapshot arrays"""
+        return self._keys
+
+    @property
+    def topology_version(self):
+        """Version of the topology index the solver was compiled from"""
+        return self._topology_version
+
+    @property
+    def num_levels(self):
+        """Number of topological levels (longest power path)"""
+        return len(self._levels)
+
+    def solve(self, voltage, snapshot, applier):
+        """Solve power flow for the new wallpower voltage
+        Args:
+            voltage(float): new voltage supplied by the mains
+            snapshot(PowerFlowSnapshot): current state of the assets
+            applier: object performing asset updates as the flow is being solved,
+                     must implement:
+                        set_input_voltage(key, voltage),
+                        transition(key, power_up) -> new state,
+                        ups_voltage(key, old_voltage, new_voltage)
+                            -> (state, output voltage, on battery)
+        Returns:
+            PowerFlowResult: old & new power states of all the assets
+        """
+
+        in_volt = snapshot.in_volt.astype(float)
+        status = snapshot.status.astype(int)
+        out_volt = snapshot.out_volt.astype(float)
+        on_battery = snapshot.on_battery.astype(bool)
+
+        is_device = self._kind != self.KIND_UPS
+        is_server = self._kind == self.KIND_SERVER
+        vm_active = (
+            np.ones(len(self._keys), dtype=bool)
+            if snapshot.vm_active is None
+            else snapshot.vm_active.astype(bool)
+        )
+
+        for lvl, edges in zip(self._levels, self._level_edges):
+
+            # input voltage is the highest voltage supplied by any of the parents
+            lvl_in = np.zeros(lvl.stop - lvl.start)
+            np.maximum.at(
+                lvl_in,
+                self._edge_child[edges] - lvl.start,
+                out_volt[self._edge_parent[edges]],
+            )
+            lvl_in = np.where(
+                self._has_parents[lvl],
+                lvl_in,
+                np.where(self._mains[lvl], voltage, in_volt[lvl]),
+            )
+
+            old_in = in_volt[lvl].copy()
+            in_volt[lvl] = lvl_in
+            volt_changed = ~np.isclose(old_in, lvl_in)
+
+            for i in np.flatnonzero(volt_changed & is_device[lvl]) + lvl.start:
+                applier.set_input_voltage(self._keys[i], in_volt[i])
+
+            # UPS decides on its output (input power or battery) on its own
+            for i in np.flatnonzero(volt_changed & ~is_device[lvl]) + lvl.start:
+                status[i], out_volt[i], on_battery[i] = applier.ups_voltage(
+                    self._keys[i], old_in[i - lvl.start], in_volt[i]
+                )
+
+            # power down underpowered assets & power up the ones that are back online
+            lvl_status = status[lvl]
+            under_volt = lvl_in <= self._min_volt[lvl]
+            user_off = snapshot.user_off[lvl]
+            lvl_server = is_server[lvl]
+
+            power_down = is_device[lvl] & (lvl_status == 1) & under_volt
+
+            # same rules as in Asset/Server.on_input_voltage_up:
+            # devices stay off if they were turned off by a user,
+            # servers power up on voltage increase if offline or their VM is down
+            device_up = ~lvl_server & (lvl_status == 0) & ~user_off & ~under_volt
+            server_up = (
+                lvl_server
+                & volt_changed
+                & (lvl_in > old_in)
+                & ~np.isclose(lvl_in, 0.0)
+                & ((lvl_status == 0) | ~vm_active[lvl])
+            )
+            power_up = (
+                is_device[lvl]
+                & (device_up | server_up)
+                & ~power_down
+                & self._power_on_ac[lvl]
+            )
+
+            for i in np.flatnonzero(power_down | power_up) + lvl.start:
+                status[i] = applier.transition(
+                    self._keys[i], bool(power_up[i - lvl.start])
+                )
+
+            out_volt[lvl] = np.where(
+                is_device[lvl], in_volt[lvl] * status[lvl], out_volt[lvl]
+            )
+
+        load = self._solve_load(in_volt, status, out_volt, on_battery)
+
+        return PowerFlowResult(
+            self._keys,
+            old=(snapshot.in_volt, snapshot.status, snapshot.out_volt, snapshot.load),
+            new=(in_volt, status, out_volt, load),
+        )
+
+    def _edge_weights(self, out_volt):
+        """Get share of child load drawn from each parent (per edge);
+        Servers split their load among online PSUs by their draw percentage
+        (offline PSU share is distributed evenly among the online ones),
+        other assets draw full load from every parent supplying voltage
+        """
+
+        n_assets = len(self._keys)
+        edge_live = out_volt[self._edge_parent] > 0
+        edge_draw = self._draw[self._edge_parent]
+
+        live_draw, total_draw, num_live = (np.zeros(n_assets) for _ in range(3))
+        np.add.at(live_draw, self._edge_child, edge_draw * edge_live)
+        np.add.at(total_draw, self._edge_child, edge_draw)
+        np.add.at(num_live, self._edge_child, edge_live)
+
+        extra_draw = (total_draw - live_draw) / np.maximum(num_live, 1)
+        server_weights = edge_draw + extra_draw[self._edge_child]
+
+        is_server = self._kind[self._edge_child] == self.KIND_SERVER
+        return edge_live * np.where(is_server, server_weights, 1.0)
+
+    def _solve_load(self, in_volt, status, out_volt, on_battery):
+        """Accumulate load upstream starting with the leaf nodes"""
+
+        powered = (status == 1) & (in_volt > 0)
+        own_load = np.where(
+            powered, self._consumption / np.where(powered, in_volt, 1.0), 0.0
+        )
+
+        load = np.zeros(len(self._keys))
+        child_load = np.zeros(len(self._keys))
+        weights = self._edge_weights(out_volt)
+
+        for lvl, edges in zip(reversed(self._levels), reversed(self._level_edges)):
+            load[lvl] = own_load[lvl] + child_load[lvl]
+
+            # UPS running on battery does not draw power from its parents
+            children = self._edge_child[edges]
+            np.add.at(
+                child_load,
+                self._edge_parent[edges],
+                weights[edges] * load[children] * ~on_battery[children],
+            )
+
+        return load
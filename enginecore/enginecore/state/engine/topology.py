@@ -0,0 +1,171 @@
+"""In-memory snapshot of the hardware topology used by the engine on the hot path
+(power & load propagation, OID lookups) so that no database round trips are needed
+while iterations are in progress.
+"""
+
+
+class TopologyIndex:
+    """Compiled, read-only power topology of the system;
+    Index is versioned and never mutated once built: topology changes result in
+    a brand new index replacing the old one (see HardwareGraphDataSource.reload)
+
+    Example:
+        index = TopologyIndex(
+            assets=[{"key": 1, "type": "outlet"}, {"key": 2, "type": "lamp"}],
+            power_links=[(2, 1)],
+            mains_outlets=[1],
+        )
+        index.get_affected_assets(1) # -> ((2,), ())
+    """
+
+    def __init__(
+        self,
+        assets,
+        power_links,
+        mains_outlets,
+        oids=None,
+        component_links=None,
+        version=1,
+    ):
+        """Compile topology index
+        Args:
+            assets(list): asset details (as returned by get_assets_and_children)
+            power_links(list): (child key, parent key) pairs of POWERED_BY links
+            mains_outlets(list): keys of wall-powered outlets
+            oids(list): dicts describing power OIDs as
+                        {"key", "oid", "name", "specs", "asset_key"} where key is
+                        the asset OID belongs to & asset_key is powered by the OID
+            component_links(list): (asset key, component key) pairs
+            version(int): topology version
+        """
+
+        self._version = version
+        self._assets = tuple(sorted(assets, key=lambda a: a["key"]))
+        self._asset_types = {a["key"]: a["type"] for a in self._assets}
+
+        children, parents = {}, {}
+        for child_key, parent_key in power_links:
+            children.setdefault(parent_key, []).append(child_key)
+            parents.setdefault(child_key, []).append(parent_key)
+
+        # adjacency arrays (sorted for deterministic event ordering)
+        self._children = {k: tuple(sorted(v)) for k, v in children.items()}
+        self._parents = {k: tuple(sorted(v)) for k, v in parents.items()}
+
+        self._mains_outlets = tuple(sorted(mains_outlets))
+
+        self._domains = self._find_power_domains(
+            list(power_links) + list(component_links or [])
+        )
+
+        # (asset key, oid) -> (key of the asset powered by oid, oid details)
+        self._oids = {}
+        for oid_info in oids or []:
+            oid_key = (oid_info["key"], oid_info["oid"])
+            if oid_key in self._oids:
+                continue
+
+            self._oids[oid_key] = (
+                oid_info["asset_key"],
+                {"name": oid_info["name"], "specs": dict(oid_info["specs"])},
+            )
+
+    def __str__(self):
+        return (
+            "Topology Index (v{0.version}):\n"
+            " | Assets: {1}\n"
+            " | Power Links: {2}\n"
+            " | Mains-Powered Outlets: {3}\n"
+            " | Power OIDs: {4}\n"
+            " | Power Domains: {0.num_domains}\n"
+        ).format(
+            self,
+            len(self._assets),
+            sum(map(len, self._children.values())),
+            len(self._mains_outlets),
+            len(self._oids),
+        )
+
+    def _find_power_domains(self, links):
+        """Split assets into connected components (power domains);
+        assets that belong to different domains share no power path
+        Args:
+            links(list): pairs of linked asset keys
+        Returns:
+            dict: asset key mapped to its domain id
+        """
+
+        # union-find over the asset keys
+        roots = {k: k for k in self._asset_types}
+
+        def find(key):
+            while roots[key] != key:
+                roots[key] = roots[roots[key]]
+                key = roots[key]
+            return key
+
+        for key_1, key_2 in links:
+            if key_1 in roots and key_2 in roots:
+                roots[find(key_1)] = find(key_2)
+
+        domain_ids = {}
+        return {
+            k: domain_ids.setdefault(find(k), len(domain_ids))
+            for k in sorted(self._asset_types)
+        }
+
+    @property
+    def version(self):
+        """Topology version (incremented every time topology is re-built)"""
+        return self._version
+
+    @property
+    def assets(self):
+        """All assets present in the system topology ordered by key"""
+        return self._assets
+
+    @property
+    def asset_keys(self):
+        """Keys of all assets present in the system topology"""
+        return tuple(self._asset_types.keys())
+
+    @property
+    def num_domains(self):
+        """Number of independent power domains"""
+        return len(set(self._domains.values()))
+
+    def get_domain(self, asset_key):
+        """Get id of the power domain asset belongs to (None if not found)"""
+        return self._domains.get(asset_key)
+
+    def get_asset_type(self, asset_key):
+        """Get type of the asset by key (None if asset does not exist)"""
+        return self._asset_types.get(asset_key)
+
+    def get_children(self, asset_key):
+        """Keys of assets powered by the asset"""
+        return self._children.get(asset_key, ())
+
+    def get_parents(self, asset_key):
+        """Keys of assets powering the asset"""
+        return self._parents.get(asset_key, ())
+
+    def get_affected_assets(self, asset_key):
+        """Get neighbouring nodes of an asset
+        Returns:
+            tuple: child keys & parent keys
+        """
+        return self.get_children(asset_key), self.get_parents(asset_key)
+
+    @property
+    def mains_powered_outlets(self):
+        """Keys of outlets powered by the mains"""
+        return self._mains_outlets
+
+    def get_asset_oid_info(self, asset_key, oid):
+        """Get oid details & key of the asset affected by the oid
+        Returns:
+            tuple: key of the asset powered by oid & oid details including its
+                   name and state specs; (None, None) if oid does not control power
+        """
+        return self._oids.get((asset_key, oid), (None, None))
@@ -5,19 +5,40 @@
 # pylint: disable=W0613
 
 import logging
+import math
 import os
 from circuits import Component, handler
 from enginecore.state.hardware.asset_definition import SUPPORTED_ASSETS
 from enginecore.state.state_initializer import get_temp_workplace_dir
+from enginecore.tools import write_buffer
 
 logger = logging.getLogger(__name__)
 
+# events dispatched by the engine against hardware assets
+# (asset processing an event is recorded as a hop in the iteration trace)
+TRACED_EVENTS = (
+    "PowerButtonOnEvent",
+    "PowerButtonOffEvent",
+    "InputVoltageUpEvent",
+    "InputVoltageDownEvent",
+    "SignalUpEvent",
+    "SignalDownEvent",
+    "ChildLoadUpEvent",
+    "ChildLoadDownEvent",
+    "AmbientUpEvent",
+    "AmbientDownEvent",
+)
+
 
 class Asset(Component):
     """Top asset component that aggregates behaviour shared
     among all hardware devices; (all hardware assets must derive
     from here)"""
 
+    # assets reacting to ambient changes must subscribe to thermal events
+    # (ambient events are not dispatched against the rest of the assets)
+    thermal_subscriber = False
+
     def __init__(self, state):
         super(Asset, self).__init__()
         self._state = state
@@ -148,6 +169,39 @@ class Asset(Component):
 
         return asset_event
 
+    def on_power_flow_solved(self, asset_event):
+        """Called when asset power state/load was updated by the power flow solver
+        (in place of voltage & load event handlers); updates asset load
+        Args:
+            asset_event(AssetPowerEvent|AssetLoadEvent): changes applied to the asset
+        """
+        if not math.isclose(asset_event.load.old, asset_event.load.new):
+            self._update_load(asset_event.load.new)
+
+    @handler(*TRACED_EVENTS, priority=100)
+    def start_event_hop(self, event, *args, **kwargs):
+        """Start tracing asset handling an engine event & buffer state updates
+        made by the asset in the iteration write buffer
+        (called before every other handler due to priority set to 100)
+        """
+        if not event.power_iter:
+            return
+
+        write_buffer.activate(event.power_iter.write_buffer)
+        if event.power_iter.trace:
+            event.power_iter.trace.hop_started()
+
+    @handler(*TRACED_EVENTS, priority=-100)
+    def finish_event_hop(self, event, *args, **kwargs):
+        """Record event hop in the iteration trace & stop buffering state updates
+        (called after every other handler due to priority set to -100)
+        """
+        write_buffer.activate(None)
+
+        trace = event.power_iter.trace if event.power_iter else None
+        if trace:
+            trace.hop(self, event.name, event.dispatched_at)
+
     @handler("ChildLoadUpEvent", "ChildLoadDownEvent")
     def on_child_load_update(self, event, *args, **kwargs):
         """Process child asset load changes by updating load of this device
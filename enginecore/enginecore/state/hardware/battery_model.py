@@ -0,0 +1,136 @@
+"""Analytic model of the UPS battery
+
+Battery level changes linearly while the UPS load, input voltage & speed
+factors remain the same, so instead of integrating battery level every second
+the model calculates it for any point in time & tells when the next
+observable change (battery percentage, low battery threshold, etc.) happens;
+battery simulations (see UPS._drain_battery) only wake up at these points.
+"""
+import bisect
+import math
+
+# extra time added to the wake-up delay so that the level is past the threshold
+# once the simulation wakes up (in simulated seconds)
+THRESHOLD_MARGIN = 1e-6
+
+
+class BatteryModel:
+    """Runtime curve of the UPS model & battery level calculations
+
+    Example:
+        model = BatteryModel({"100": 185, "200": 91}, max_level=1000)
+        rate = model.discharge_rate(wattage=150) # battery level drop per second
+        model.time_to_empty(level=1000, rate=rate) # in seconds
+        model.next_change(level=1000, rate=-rate) # seconds till 99%
+    """
+
+    # battery level units per one percent
+    percent_step = 10
+
+    def __init__(self, runtime_details, max_level):
+        """
+        Args:
+            runtime_details(dict): known runtime minutes of the fully-charged battery
+                                   by wattage (runtime graph)
+            max_level(int): level of the fully-charged battery
+        """
+        self._max_level = max_level
+
+        if not runtime_details:
+            raise ValueError("UPS runtime graph is empty!")
+
+        # runtime points are ordered by wattage, ties between
+        # the equally close points go to the one listed first
+        points = sorted(
+            (int(wattage), idx, minutes)
+            for idx, (wattage, minutes) in enumerate(runtime_details.items())
+        )
+        self._wattages = [wattage for wattage, _, _ in points]
+        self._order = [idx for _, idx, _ in points]
+        # wattage * minutes remains the same along the curve segment
+        self._energy = [wattage * minutes for wattage, _, minutes in points]
+
+    @property
+    def max_level(self):
+        """Level of the fully-charged battery"""
+        return self._max_level
+
+    def _closest_point(self, wattage):
+        """Index of the runtime graph point closest to the wattage"""
+        idx = bisect.bisect_left(self._wattages, wattage)
+        if idx == 0:
+            return 0
+        if idx == len(self._wattages):
+            return idx - 1
+
+        below, above = wattage - self._wattages[idx - 1], self._wattages[idx] - wattage
+        if math.isclose(below, above):
+            return min(idx - 1, idx, key=lambda i: self._order[i])
+        return idx - 1 if below < above else idx
+
+    def full_power_runtime(self, wattage, in_voltage=0, low_threshold=0):
+        """Runtime estimation (minutes) for the fully-charged battery
+        Args:
+            wattage(float): power draw
+            in_voltage(float): input voltage (UPS is assisted by low input voltage)
+            low_threshold(float): input voltage UPS transfers to battery at
+        """
+        # Prevent from TimeTick value failing bounding constraints
+        wattage = max(wattage, 0.1)
+
+        # inverse proportion to the closest known point
+        runtime = self._energy[self._closest_point(wattage)] / wattage
+
+        if 0 < in_voltage <= low_threshold:
+            runtime += runtime * (in_voltage / low_threshold)
+
+        return runtime
+
+    def discharge_rate(self, wattage, in_voltage=0, low_threshold=0):
+        """Battery level drop per second"""
+        runtime = self.full_power_runtime(wattage, in_voltage, low_threshold)
+        return self._max_level / (runtime * 60)
+
+    def time_left(self, level, wattage, in_voltage=0, low_threshold=0):
+        """Runtime estimation (minutes) for the current battery level"""
+        runtime = self.full_power_runtime(wattage, in_voltage, low_threshold)
+        return runtime * level / self._max_level
+
+    def level_after(self, level, rate, seconds):
+        """Battery level after seconds of charge (positive rate)
+        or discharge (negative rate)"""
+        return min(max(level + rate * seconds, 0), self._max_level)
+
+    def time_to_empty(self, level, rate):
+        """Seconds till the battery is depleted at the discharge rate"""
+        return level / rate if rate > 0 else math.inf
+
+    def time_to_full(self, level, rate):
+        """Seconds till the battery is fully charged at the charge rate"""
+        return (self._max_level - level) / rate if rate > 0 else math.inf
+
+    def next_change(self, level, rate, thresholds=()):
+        """Seconds till the battery level crosses the next percentage point
+        (or one of the thresholds) when charged (positive rate)
+        or discharged (negative rate)
+        Args:
+            level(float): current battery level
+            rate(float): battery level change per second
+            thresholds(iterable): extra battery levels of interest
+        Returns:
+            float: seconds till the next change (inf if level doesn't change)
+        """
+        if rate == 0:
+            return math.inf
+
+        step = self.percent_step
+        if rate > 0:
+            targets = [(math.floor(level / step) + 1) * step, self._max_level]
+            targets.extend(t for t in thresholds if t > level)
+            target = min(targets)
+        else:
+            targets = [(math.ceil(level / step) - 1) * step, 0]
+            targets.extend(t for t in thresholds if t < level)
+            target = max(targets)
+
+        return max((target - level) / rate, 0) + THRESHOLD_MARGIN
@@ -0,0 +1,205 @@
+"""Battery simulations (drain/charge) of all the UPSes advanced by one thread
+
+UPS battery simulations are generators yielding the number of simulated seconds
+till their next step (one second if None is yielded, see UPS._drain_battery);
+the scheduler advances all the due simulations in one tick & writes
+their state updates (battery level, OIDs, power messages) to redis
+in one round trip, so the number of threads stays the same no matter
+how many UPSes are running on battery.
+"""
+import logging
+import threading
+
+from enginecore.state.api.state import IStateManager
+from enginecore.tools import write_buffer
+from enginecore.tools.clock import CLOCK
+
+logger = logging.getLogger(__name__)
+
+
+class _BatteryTask:
+    """Scheduled battery simulation"""
+
+    def __init__(self, simulation, name, due):
+        self.simulation = simulation
+        self.name = name
+        self.due = due
+        # time of the requested wake-up (see BatteryScheduler.wake)
+        self.wake_at = None
+
+
+class BatteryScheduler:
+    """Runs battery simulations of the UPSes once per (simulated) second;
+    Scheduler thread is started on demand & exits once there are no simulations
+
+    Example:
+        BATTERY_SCHEDULER.schedule(ups.key, ups._drain_battery(), "battery_drain")
+        BATTERY_SCHEDULER.is_scheduled(ups.key, "battery_drain") # -> True
+        BATTERY_SCHEDULER.cancel(ups.key)
+    """
+
+    # simulated seconds between the simulation steps (unless yielded otherwise)
+    tick_interval = 1
+    # max number of simulated seconds between the simulation steps
+    max_interval = 60
+    # simulations due within this many simulated seconds are advanced together
+    batch_window = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # tasks are not replaced/cancelled while a tick is in progress
+        self._tick_lock = threading.RLock()
+        self._tasks = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._num_ticks = 0
+        self._num_steps = 0
+
+    def schedule(self, key, simulation, name):
+        """Advance simulation every tick until it is exhausted
+        (replaces simulation scheduled for the same UPS);
+        The first step is taken right away.
+        Args:
+            key(int): key of the UPS
+            simulation(generator): battery simulation, one step per iteration
+            name(str): simulation type (e.g. "battery_drain")
+        """
+        with self._tick_lock:
+            with self._lock:
+                replaced = self._tasks.pop(key, None)
+                self._tasks[key] = _BatteryTask(simulation, name, CLOCK.time())
+
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="battery_scheduler"
+                    )
+                    self._thread.daemon = True
+                    self._thread.start()
+
+            if replaced is not None:
+                replaced.simulation.close()
+
+        self._wakeup.set()
+
+    def cancel(self, key):
+        """Stop battery simulation of the UPS
+        (waits for the simulation step in progress to complete)
+        Args:
+            key(int): key of the UPS
+        """
+        with self._tick_lock:
+            with self._lock:
+                task = self._tasks.pop(key, None)
+
+            if task is not None:
+                task.simulation.close()
+
+        self._wakeup.set()
+
+    def wake(self, key, delay=0):
+        """Take the next step of the UPS battery simulation early
+        (e.g. when battery discharge rate changes)
+        Args:
+            key(int): key of the UPS
+            delay(float): simulated seconds till the step
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                return
+            task.wake_at = CLOCK.time() + delay
+            task.due = min(task.due, task.wake_at)
+
+        self._wakeup.set()
+
+    def is_scheduled(self, key, name=None):
+        """Returns true if simulation (of the given type) is running for the UPS"""
+        task = self._tasks.get(key)
+        return task is not None and (name is None or task.name == name)
+
+    @property
+    def stats(self):
+        """Number of running simulations, ticks & simulation steps taken"""
+        return {
+            "simulations": len(self._tasks),
+            "ticks": self._num_ticks,
+            "steps": self._num_steps,
+        }
+
+    def _run(self):
+        """Scheduler loop, exits when there are no simulations left"""
+        while True:
+            self._wakeup.clear()
+
+            with self._lock:
+                if not self._tasks:
+                    self._thread = None
+                    return
+                next_due = min(task.due for task in self._tasks.values())
+
+            timeout = next_due - CLOCK.time()
+            if timeout > 0 and CLOCK.wait(self._wakeup, timeout):
+                continue
+
+            self._tick()
+
+    def _tick(self):
+        """Take a step in all the due simulations, state updates are buffered
+        & written to the store once all the steps are taken"""
+        buffer = write_buffer.WriteBuffer()
+
+        with self._tick_lock:
+            now = CLOCK.time()
+            with self._lock:
+                due_tasks = [
+                    (key, task)
+                    for key, task in self._tasks.items()
+                    if task.due <= now + self.batch_window
+                ]
+
+            write_buffer.activate(buffer)
+            try:
+                for key, task in due_tasks:
+                    self._step(key, task, now)
+            finally:
+                write_buffer.activate(None)
+
+            buffer.flush(IStateManager.get_store())
+            self._num_ticks += 1
+
+    def _step(self, key, task, now):
+        """Advance one simulation, exhausted (or failed) simulations are dropped"""
+        try:
+            delay = next(task.simulation)
+        except StopIteration:
+            self._drop(key, task)
+            return
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Battery simulation %s:%s failed", task.name, key)
+            self._drop(key, task)
+            return
+
+        self._num_steps += 1
+        with self._lock:
+            if delay is not None:
+                task.due = now + min(delay, self.max_interval)
+            else:
+                task.due += self.tick_interval
+                # don't try to catch up with the missed steps
+                if task.due <= now:
+                    task.due = now + self.tick_interval
+
+            # wake-up requested while the step was in progress
+            if task.wake_at is not None:
+                if task.wake_at > now:
+                    task.due = min(task.due, task.wake_at)
+                task.wake_at = None
+
+    def _drop(self, key, task):
+        """Remove finished simulation (unless it was replaced)"""
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+
+BATTERY_SCHEDULER = BatteryScheduler()
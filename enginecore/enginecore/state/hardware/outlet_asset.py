@@ -4,7 +4,6 @@ Includes both wall-powered outlet and a output power outlet for UPS/PDU
 # **due to circuit callback signature
 # pylint: disable=W0613
 
-import time
 
 from circuits import handler
 
@@ -12,6 +11,7 @@ import enginecore.state.hardware.internal_state as in_state
 from enginecore.state.hardware.asset import Asset
 
 from enginecore.state.hardware.asset_definition import register_asset
+from enginecore.tools.clock import CLOCK
 
 
 @register_asset
@@ -48,7 +48,7 @@ class Outlet(Asset):
     def on_power_off_request_received(self, event, *args, **kwargs):
         """ React to events with power down """
         if "delayed" in kwargs and kwargs["delayed"]:
-            time.sleep(self.state.get_config_off_delay())
+            CLOCK.sleep(self.state.get_config_off_delay())
 
         asset_event = event.get_next_power_event(self)
         asset_event.state.new = self.power_off()
@@ -60,7 +60,7 @@ class Outlet(Asset):
         """ React to events with power up """
 
         if "delayed" in kwargs and kwargs["delayed"]:
-            time.sleep(self.state.get_config_on_delay())
+            CLOCK.sleep(self.state.get_config_on_delay())
 
         asset_event = event.get_next_power_event(self)
         asset_event.state.new = self.power_up()
@@ -1,5 +1,4 @@
 """Components controlling physical space of server racks"""
-import time
 import operator
 from threading import Thread, Event
 import logging
@@ -17,6 +16,7 @@ from enginecore.state.hardware.pdu_asset import PDU
 from enginecore.state.hardware.server_asset import Server, ServerWithBMC, PSU
 from enginecore.state.hardware.static_asset import StaticAsset, Lamp
 from enginecore.state.hardware.outlet_asset import Outlet
+from enginecore.tools.clock import CLOCK
 
 # pylint: enable=unused-import
 
@@ -110,7 +110,7 @@ class ServerRoom(Component):
 
         while not self._stop_event.is_set():
 
-            self._stop_event.wait(amb_props["rate"])
+            CLOCK.wait(self._stop_event, amb_props["rate"])
 
             # check if room environment matches the conditions
             # required for ambient update
@@ -145,7 +145,7 @@ class ServerRoom(Component):
 
         while not self._stop_event.is_set():
 
-            self._stop_event.wait(volt_props["rate"])
+            CLOCK.wait(self._stop_event, volt_props["rate"])
 
             if not volt_props["enabled"] or not in_state.StateManager.mains_status():
                 volt_props = in_state.StateManager.get_voltage_props()
@@ -20,7 +20,7 @@ import enginecore.state.hardware.internal_state as in_state
 
 from enginecore.state.agent import IPMIAgent, StorCLIEmulator
 from enginecore.state.sensor.repository import SensorRepository
-from enginecore.state.engine.events import EventDataPair
+from enginecore.state.engine.events import EventDataPair, AssetPowerEvent
 
 logger = logging.getLogger(__name__)
 
@@ -294,6 +294,7 @@ class ServerWithBMC(Server):
 
     channel = "engine-bmc"
     StateManagerCls = in_state.BMCServerStateManager
+    thermal_subscriber = True
 
     def __init__(self, asset_info):
         super(ServerWithBMC, self).__init__(asset_info)
@@ -532,6 +533,27 @@ class PSU(StaticAsset):
         psu_fan = self._sensor_repo.get_sensor_by_name(self._psu_sensor_names["psuFan"])
         return psu_fan
 
+    def on_power_flow_solved(self, asset_event):
+        """Update BMC sensors (load & fan) on power flow changes"""
+        super().on_power_flow_solved(asset_event)
+        if not self._state.supports_bmc:
+            return
+
+        if not asset_event.load.unchanged():
+            self._update_load_sensors(asset_event.load.new)
+
+        if (
+            not isinstance(asset_event, AssetPowerEvent)
+            or asset_event.state.unchanged()
+        ):
+            return
+
+        psu_fan = self._get_fan_sensor()
+        if psu_fan and asset_event.state.new:
+            psu_fan.set_to_defaults()
+        elif psu_fan:
+            psu_fan.set_to_off()
+
     @handler("ChildLoadUpEvent", "ChildLoadDownEvent", priority=1)
     def update_load_sensors(self, event, *args, **kwargs):
         """Change values of BMC sensors associated with load
@@ -8,16 +8,18 @@ For example, it switches to battery if upstream power is offline or voltage is t
 import logging
 import json
 import math
-from datetime import datetime as dt
+from threading import Thread
 
-from threading import Thread, Event
 from circuits import handler
 import enginecore.state.hardware.internal_state as in_state
 from enginecore.state.hardware.asset import Asset
+from enginecore.state.hardware.battery_model import BatteryModel
+from enginecore.state.hardware.battery_scheduler import BATTERY_SCHEDULER
 from enginecore.state.hardware.snmp_asset import SNMPSim
 from enginecore.state.api.environment import ISystemEnvironment
 
 from enginecore.state.hardware.asset_definition import register_asset
+from enginecore.tools.clock import CLOCK
 
 logger = logging.getLogger(__name__)
 
@@ -49,16 +51,16 @@ class UPS(Asset, SNMPSim):
 
         # Store known { wattage: time_remaining } key/value pairs (runtime graph)
         self._runtime_details = json.loads(asset_info["runtime"])
+        self._battery_model = BatteryModel(
+            self._runtime_details, self.state.battery_max_level
+        )
 
         # Track upstream power availability
         self._charge_speed_factor = 1
         self._drain_speed_factor = 1
 
-        # Threads responsible for battery charge/discharge
-        self._battery_drain_t = None
-        self._battery_charge_t = None
-        self._stop_event = Event()
-
+        # battery charge/discharge is simulated by the shared scheduler
+        # (see _drain_battery & _charge_battery)
         self._start_time_battery = None
 
         # set battery level to max
@@ -78,24 +80,11 @@ class UPS(Asset, SNMPSim):
     def _calc_full_power_time_left(self, wattage):
         """Approximate runtime estimation for the fully-charged battery"""
 
-        # Prevent from TimeTick value failing bounding constraints
-        if wattage < 0.1:
-            wattage = 0.1
-
-        close_wattage = min(self._runtime_details, key=lambda x: abs(int(x) - wattage))
-        close_timeleft = self._runtime_details[close_wattage]
-
-        # inverse proportion, calculate full power time left
-        fp_time_left = (close_timeleft * int(close_wattage)) / wattage
-
         # see if input voltage is present -> adjust time left
         lower_threshold = int(self.state.get_oid_value(self._low_volt_th_oid))
-        in_voltage = self.state.input_voltage
-
-        if 0 < in_voltage <= lower_threshold:
-            fp_time_left += fp_time_left * (in_voltage / lower_threshold)
-
-        return fp_time_left
+        return self._battery_model.full_power_runtime(
+            wattage, self.state.input_voltage, lower_threshold
+        )
 
     def _calc_battery_discharge(self):
         """Approximate battery discharge per second based on 
@@ -105,9 +94,10 @@ class UPS(Asset, SNMPSim):
             float: discharge per second 
         """
 
-        wattage = self.state.wattage
-        fp_estimated_timeleft = self._calc_full_power_time_left(wattage)
-        return self.state.battery_max_level / (fp_estimated_timeleft * 60)
+        lower_threshold = int(self.state.get_oid_value(self._low_volt_th_oid))
+        return self._battery_model.discharge_rate(
+            self.state.wattage, self.state.input_voltage, lower_threshold
+        )
 
     def _increase_transfer_severity(self):
         """Increase severity of the input power event
@@ -129,47 +119,76 @@ class UPS(Asset, SNMPSim):
         self.state.update_transfer_reason(new_reason)
 
     def _drain_battery(self):
-        """When parent is not available -> drain battery 
+        """When parent is not available -> drain battery
+        (battery simulation waking up once battery percentage changes,
+        battery level drops linearly in-between, see BatteryModel)
         """
 
+        model = self._battery_model
         battery_level = self.state.battery_level
         old_battery_lvl = -1
+        discharge_rate = 0
+        updated_at = CLOCK.time()
 
         outage = False
         to_adv_percentage = lambda x: int(x * 0.1)
 
-        # keep draining battery while its level remains above 0
-        # UPS is on and parent is down
-        while (
-            battery_level > 0
-            and self.state.status
-            and self.state.on_battery
-            and not self._stop_event.is_set()
-        ):
-
-            # calculate new battery level
-            battery_level = battery_level - (
-                self._calc_battery_discharge() * self._drain_speed_factor
-            )
-
-            if to_adv_percentage(battery_level) != to_adv_percentage(old_battery_lvl):
-                logger.info("on battery: %s %%", to_adv_percentage(battery_level))
-
-            seconds_on_battery = (dt.now() - self._start_time_battery).seconds
-
-            # update state details
-            self.state.update_battery(battery_level)
-            self.state.update_time_left(
-                self._cacl_time_left(self.state.wattage) * 60 * 100
+        try:
+            # keep draining battery while its level remains above 0
+            # UPS is on and parent is down
+            while battery_level > 0 and self.state.status and self.state.on_battery:
+
+                # calculate new battery level
+                now = CLOCK.time()
+                battery_level = model.level_after(
+                    battery_level, -discharge_rate, now - updated_at
+                )
+                updated_at = now
+
+                if to_adv_percentage(battery_level) != to_adv_percentage(
+                    old_battery_lvl
+                ):
+                    logger.info("on battery: %s %%", to_adv_percentage(battery_level))
+
+                seconds_on_battery = now - self._start_time_battery
+
+                # update state details
+                self.state.update_battery(battery_level)
+                self.state.update_time_left(
+                    self._cacl_time_left(self.state.wattage) * 60 * 100
+                )
+                self.state.update_time_on_battery(int(seconds_on_battery) * 100)
+
+                if seconds_on_battery >= self.state.momentary_event_period:
+                    if not outage:
+                        self._increase_transfer_severity()
+                    outage = True
+
+                old_battery_lvl = battery_level
+                if battery_level <= 0:
+                    break
+
+                # sleep till the next observable change
+                discharge_rate = (
+                    self._calc_battery_discharge() * self._drain_speed_factor
+                )
+                next_step = model.next_change(battery_level, -discharge_rate)
+                if not outage:
+                    next_step = min(
+                        next_step,
+                        self.state.momentary_event_period - seconds_on_battery,
+                    )
+
+                yield next_step
+
+        except GeneratorExit:
+            # battery charge took over, save level reached by now
+            self.state.update_battery(
+                model.level_after(
+                    battery_level, -discharge_rate, CLOCK.time() - updated_at
+                )
             )
-            self.state.update_time_on_battery(seconds_on_battery * 100)
-
-            if seconds_on_battery >= self.state.momentary_event_period and not outage:
-                outage = True
-                self._increase_transfer_severity()
-
-            old_battery_lvl = battery_level
-            self._stop_event.wait(1)
+            raise
 
         # kill the thing if still breathing
         if self.state.status and self.state.on_battery:
@@ -178,62 +197,107 @@ class UPS(Asset, SNMPSim):
 
     def _charge_battery(self, power_up_on_charge=False):
         """Charge battery when there's upstream power source & battery is not full
-                
+        (battery simulation waking up once battery percentage changes,
+        battery level grows linearly in-between, see BatteryModel)
+
         Args:
             power_up_on_charge(boolean): indicates if the asset should be powered up
                                          when min charge level is achieved
 
         """
 
+        model = self._battery_model
         battery_level = self.state.battery_level
         old_battery_lvl = -1
+        charge_rate = 0
+        updated_at = CLOCK.time()
         powered = False
+        power_up_t = None
 
         to_adv_percentage = lambda x: int(x * 0.1)
 
-        # keep charging battery while its level is less than max & parent is up
-        while (
-            battery_level < self.state.battery_max_level
-            and not self.state.on_battery
-            and not self._stop_event.is_set()
-        ):
-            # calculate new battery level
-            battery_level = battery_level + (
-                self._charge_per_second * self._charge_speed_factor
-            )
-
-            if to_adv_percentage(battery_level) != to_adv_percentage(old_battery_lvl):
-                logger.info("charging battery: %s %%", to_adv_percentage(battery_level))
-
-            # update state details
-            self.state.update_battery(battery_level)
-            self.state.update_time_left(
-                self._cacl_time_left(self.state.wattage) * 60 * 100
-            )
-
-            # power up on min charge level
-            if (not powered and power_up_on_charge) and (
-                battery_level > self.state.min_restore_charge_level
+        try:
+            # keep charging battery while its level is less than max & parent is up
+            while (
+                battery_level < self.state.battery_max_level
+                and not self.state.on_battery
             ):
-                old_state = self.state.status
-                powered = self.power_up()
-                self.state.publish_power(old_state, self.state.status)
+                # calculate new battery level
+                now = CLOCK.time()
+                battery_level = model.level_after(
+                    battery_level, charge_rate, now - updated_at
+                )
+                updated_at = now
+
+                if to_adv_percentage(battery_level) != to_adv_percentage(
+                    old_battery_lvl
+                ):
+                    logger.info(
+                        "charging battery: %s %%", to_adv_percentage(battery_level)
+                    )
+
+                # update state details
+                self.state.update_battery(battery_level)
+                self.state.update_time_left(
+                    self._cacl_time_left(self.state.wattage) * 60 * 100
+                )
+
+                # power up on min charge level (power-up waits for the on-delay,
+                # done in a separate thread not to stall the battery scheduler)
+                if power_up_t is not None and not power_up_t.is_alive():
+                    powered = bool(self.state.status)
+                    power_up_t = None
+
+                if (not powered and power_up_t is None and power_up_on_charge) and (
+                    battery_level > self.state.min_restore_charge_level
+                ):
+                    power_up_t = Thread(
+                        target=self._power_up_on_charge,
+                        name="ups_power_up:{}".format(self.key),
+                        daemon=True,
+                    )
+                    power_up_t.start()
+
+                old_battery_lvl = battery_level
+                if battery_level >= self.state.battery_max_level:
+                    break
+
+                # sleep till the next observable change
+                charge_rate = self._charge_per_second * self._charge_speed_factor
+                thresholds = (
+                    (self.state.min_restore_charge_level,)
+                    if power_up_on_charge and not powered
+                    else ()
+                )
+                yield model.next_change(battery_level, charge_rate, thresholds)
+
+        except GeneratorExit:
+            # battery drain took over, save level reached by now
+            self.state.update_battery(
+                model.level_after(battery_level, charge_rate, CLOCK.time() - updated_at)
+            )
+            raise
 
-            old_battery_lvl = battery_level
-            self._stop_event.wait(1)
+    def _power_up_on_charge(self):
+        """Power up UPS once battery is charged to min restore level;
+        Battery charge is resumed when done (see _charge_battery)"""
+        old_state = self.state.status
+        self.power_up()
+        self.state.publish_power(old_state, self.state.status)
+        BATTERY_SCHEDULER.wake(self.key)
 
     def _launch_battery_drain(
         self, t_reason=in_state.UPSStateManager.InputLineFailCause.deepMomentarySag
     ):
-        """Start a thread that will decrease battery level """
+        """Start decreasing battery level (replaces battery charge)"""
 
-        if self._battery_drain_t and self._battery_drain_t.isAlive():
+        if self.draining_battery:
             logger.warning("Battery drain is already running!")
             self.state.update_transfer_reason(t_reason)
             self._increase_transfer_severity()
             return
 
-        self._start_time_battery = dt.now()
+        self._start_time_battery = CLOCK.time()
 
         # update state details
         self.state.update_ups_output_status(
@@ -241,21 +305,12 @@ class UPS(Asset, SNMPSim):
         )
         self.state.update_transfer_reason(t_reason)
 
-        # wait for other thread to finish
-        if self._battery_charge_t:
-            self._battery_charge_t.join()
-
-        # launch a thread
-        self._battery_drain_t = Thread(
-            target=self._drain_battery, name="battery_drain:{}".format(self.key)
-        )
-        self._battery_drain_t.daemon = True
-        self._battery_drain_t.start()
+        BATTERY_SCHEDULER.schedule(self.key, self._drain_battery(), "battery_drain")
 
     def _launch_battery_charge(self, power_up_on_charge=False):
-        """Start a thread that will charge battery level """
+        """Start charging battery (replaces battery drain)"""
 
-        if self._battery_charge_t and self._battery_charge_t.isAlive():
+        if self.charging_battery:
             logger.warning("Battery is already charging!")
             return
 
@@ -269,18 +324,9 @@ class UPS(Asset, SNMPSim):
             in_state.UPSStateManager.InputLineFailCause.noTransfer
         )
 
-        # wait for battery drain thread to wrap up before charging
-        if self._battery_drain_t:
-            self._battery_drain_t.join()
-
-        # launch a thread
-        self._battery_charge_t = Thread(
-            target=self._charge_battery,
-            args=(power_up_on_charge,),
-            name="battery_charge:{}".format(self.key),
+        BATTERY_SCHEDULER.schedule(
+            self.key, self._charge_battery(power_up_on_charge), "battery_charge"
         )
-        self._battery_charge_t.daemon = True
-        self._battery_charge_t.start()
 
     @handler("SignalDownEvent")
     def on_signal_down_received(self, event, *args, **kwargs):
@@ -427,12 +473,12 @@ class UPS(Asset, SNMPSim):
     @property
     def draining_battery(self):
         """Returns true if UPS battery is being drained"""
-        return self._battery_drain_t is not None and self._battery_drain_t.isAlive()
+        return BATTERY_SCHEDULER.is_scheduled(self.key, "battery_drain")
 
     @property
     def charging_battery(self):
         """Returns true if UPS battery is getting re-charged"""
-        return self._battery_charge_t is not None and self._battery_charge_t.isAlive()
+        return BATTERY_SCHEDULER.is_scheduled(self.key, "battery_charge")
 
     @property
     def charge_speed_factor(self):
@@ -442,6 +488,7 @@ class UPS(Asset, SNMPSim):
     @charge_speed_factor.setter
     def charge_speed_factor(self, speed):
         self._charge_speed_factor = speed
+        BATTERY_SCHEDULER.wake(self.key)
 
     @property
     def drain_speed_factor(self):
@@ -451,10 +498,14 @@ class UPS(Asset, SNMPSim):
     @drain_speed_factor.setter
     def drain_speed_factor(self, speed):
         self._drain_speed_factor = speed
+        BATTERY_SCHEDULER.wake(self.key)
 
     def _update_load(self, new_load):
         """Ups needs to update runtime left for battery when load is updated"""
         upd_result = self.state.update_load(new_load)
+        # battery discharge rate depends on the load
+        # (which can be buffered till the end of engine iteration)
+        BATTERY_SCHEDULER.wake(self.key, delay=BATTERY_SCHEDULER.tick_interval)
         # re-calculate time left based on updated load
         if not math.isclose(self.state.wattage, 0):
             self.state.update_time_left(
@@ -465,19 +516,15 @@ class UPS(Asset, SNMPSim):
     def __str__(self):
         return super().__str__() + (
             " [charge-state]\n"
-            "   - thread active: {0.charging_battery}\n"
+            "   - active: {0.charging_battery}\n"
             "   - speed factor: {0.charge_speed_factor}\n"
             " [drain-state]\n"
-            "   - thread active: {0.draining_battery}\n"
+            "   - active: {0.draining_battery}\n"
             "   - speed factor: {0.drain_speed_factor}\n"
         ).format(self)
 
     def stop(self, code=None):
         self._snmp_agent.stop_agent()
-        self._stop_event.set()
-
-        for thread in [self._battery_charge_t, self._battery_drain_t]:
-            if thread is not None and thread.isAlive():
-                thread.join()
+        BATTERY_SCHEDULER.cancel(self.key)
 
         super().stop(code)
@@ -148,6 +148,20 @@ class StateClient:
 
         return json.loads(self._ws_client.recv())["payload"]["executed"]
 
+    @classmethod
+    def set_power_batch(cls, asset_keys, power_up, hard=False):
+        """Send request to power up/down many assets at once
+        (state changes are processed by the engine in one power iteration)
+        Args:
+            asset_keys(list): keys of the assets to be updated
+            power_up(bool): power up assets if True, power down otherwise
+            hard(bool): flag for abrupt poweroff
+        """
+        StateClient._send_request(
+            ClientToServerRequests.set_power_batch,
+            {"status": int(power_up), "keys": list(asset_keys), "hard": hard},
+        )
+
     @classmethod
     def power_outage(cls):
         """Send power outage request to ws-simengine (init blackout)"""
@@ -260,6 +274,25 @@ class StateClient:
 
         return json.loads(ws_client.recv())["payload"]["status"]
 
+    @classmethod
+    def get_engine_stats(cls, num_traces: int = 5) -> dict:
+        """Retrieve engine iteration traces & latency histograms
+        Args:
+            num_traces: number of the most recent iteration traces to be included
+        Returns:
+            dictionary containing latency "histograms" (per asset type & handler),
+            recent iteration "traces" & iteration "queues" stats (per power domain)
+        """
+        ws_client = StateClient._get_ws_client()
+
+        StateClient._send_request(
+            ClientToServerRequests.get_engine_stats,
+            {"num_traces": num_traces},
+            ws_client=ws_client,
+        )
+
+        return json.loads(ws_client.recv())["payload"]["stats"]
+
     @classmethod
     def rand_actions(cls, rand_options: dict):
         """Request Sim-Engine to perform random action
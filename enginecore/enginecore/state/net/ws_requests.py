@@ -27,6 +27,8 @@ class ServerToClientRequests(Enum):
     cmd_executed_status = 8
     # is sent when everything load power loop reaches the end
     load_loop_done = 9
+    # engine iteration traces & latency histograms
+    engine_stats = 10
 
 
 class ClientToServerRequests(Enum):
@@ -37,6 +39,8 @@ class ClientToServerRequests(Enum):
     set_power = 1
     # get overall system layout, status etc.
     get_sys_status = 2
+    # toggle power of many assets at once (in a single power iteration)
+    set_power_batch = 3
 
     # == MISC
     # update UI layout
@@ -68,6 +72,10 @@ class ClientToServerRequests(Enum):
     # execute random action
     exec_rand_actions = 26
 
+    # == Engine diagnostics
+    # get iteration traces & latency histograms
+    get_engine_stats = 30
+
     # == BMC-asset commands
     # set sensor status
     set_sensor_status = 40
@@ -12,6 +12,7 @@ from circuits.net.events import write
 from enginecore.state.api import IStateManager, ISystemEnvironment
 from enginecore.model.graph_reference import GraphReference
 from enginecore.tools.recorder import RECORDER as recorder
+from enginecore.tools.tracer import TRACER as tracer
 from enginecore.tools.randomizer import Randomizer
 
 from enginecore.state.net.ws_requests import (
@@ -88,6 +89,19 @@ class WebSocket(Component):
         else:
             state_manager.shut_down()
 
+    @handler(ClientToServerRequests.set_power_batch.name)
+    def _handle_power_batch_request(self, details):
+        """Power up/down a group of assets"""
+
+        try:
+            IStateManager.set_power_batch(
+                details["payload"]["keys"],
+                power_up=details["payload"]["status"],
+                hard=details["payload"].get("hard", False),
+            )
+        except ValueError as error:
+            logger.error(error)
+
     @handler(ClientToServerRequests.set_layout.name)
     def _handle_layout_request(self, details):
         """Save assets' positions/coordinates"""
@@ -223,6 +237,16 @@ class WebSocket(Component):
             {"status": {"replaying": recorder.replaying, "enabled": recorder.enabled}},
         )
 
+    @handler(ClientToServerRequests.get_engine_stats.name)
+    def _handle_engine_stats_request(self, details):
+        """Send engine iteration traces & latency histograms to the client"""
+        payload = details["payload"] or {}
+        self._write_data(
+            details["client"],
+            ServerToClientRequests.engine_stats,
+            {"stats": tracer.stats(num_traces=payload.get("num_traces", 5))},
+        )
+
     @handler(ClientToServerRequests.set_sensor_status.name)
     def _handle_sensor_state_request(self, details):
         """Update runtime value of a IPMI/BMC sensor"""
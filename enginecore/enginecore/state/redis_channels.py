@@ -6,15 +6,21 @@ class RedisChannels:
     
     - load is fired every time asset's load is updated
     - state is only fired when notification is enabled on asset's state manager
+    - batch state is fired when many assets change their states at once
     - mains update is fired when wall power becomes unavailable
     - oid udpate is fired every time SET command is issued agains an oid 
                     (done by SNMPsim by executing evalsha in 'scripts/snmppub.lua')
     - model update is fired upon asset topology changes
+
+    Channels the engine listens to are grouped into streams (see engine_streams);
+    messages are appended to redis streams instead of being published
+    if streams transport is enabled (see enginecore.state.redis_streams)
     """
 
     # power
     load_update_channel = "load-upd"
     state_update_channel = "state-upd"
+    batch_state_update_channel = "batch-state-upd"
     mains_update_channel = "mains-upd"
     voltage_update_channel = "voltage-upd"
 
@@ -33,3 +39,27 @@ class RedisChannels:
     # misc
     oid_update_channel = "oid-upd"
     model_update_channel = "model-upd"
+
+    # engine input channels grouped by stream
+    engine_streams = {
+        "power": (
+            state_update_channel,  # power state changes
+            batch_state_update_channel,  # group power state changes
+            mains_update_channel,  # wall power updates
+            model_update_channel,  # model changes
+            voltage_update_channel,  # wallpower voltage changes
+        ),
+        "thermal": (
+            ambient_update_channel,  # on ambient changes
+            sensor_conf_th_channel,  # new sensor->sensor relationship
+            cpu_usg_conf_th_channel,  # new cpu_usage->sensor relationship
+            str_cv_conf_th_channel,  # new sensor->cache_vault relationship
+            str_drive_conf_th_channel,  # new sensor->phys_drive relationship
+        ),
+        "battery": (
+            battery_update_channel,  # battery level updates
+            battery_conf_drain_channel,  # update drain speed (factor)
+            battery_conf_charge_channel,  # update charge speed (factor)
+        ),
+        "snmp": (oid_update_channel,),  # snmp oid updates
+    }
@@ -1,8 +1,8 @@
 """RedisStateHandler handles published data in enginecore redis pub/sub channels"""
 import logging
 import os
-import math
-from queue import Queue, Empty
+import threading
+import weakref
 
 from circuits.web import Logger, Server, Static
 from circuits.web.dispatchers import WebSocketsDispatcher
@@ -20,19 +20,35 @@ class EngineStateTracker(Component):
 
     def __init__(self):
         super().__init__()
-        self._load_done_queue = Queue()
+        self._load_done_cond = threading.Condition()
+        # iterations nobody waits for are dropped once garbage-collected
+        self._load_done_iterations = weakref.WeakSet()
 
     @handler("AllLoadBranchesDone")
-    def on_load_branch_done(self, event, *args, **kwargs):
+    def on_load_branch_done(self, event, power_iter):
         """Handler waits for engine to complete a power iteration"""
-        self._load_done_queue.put(event)
-
-    def wait_load_queue(self):
-        """Block execution until load iteration is completed"""
-        try:
-            return self._load_done_queue.get(timeout=EngineStateTracker.timeout)
-        except Empty:
-            pass
+        with self._load_done_cond:
+            self._load_done_iterations.add(power_iter)
+            self._load_done_cond.notify_all()
+
+    def wait_load_queue(self, power_iter):
+        """Block execution until load iteration is completed
+        Args:
+            power_iter(PowerIteration): iteration to wait for
+                                        (other domains' iterations are ignored)
+        Returns:
+            bool: False if iteration did not complete before timeout
+        """
+        if power_iter is None:
+            return True
+
+        with self._load_done_cond:
+            done = self._load_done_cond.wait_for(
+                lambda: power_iter in self._load_done_iterations,
+                timeout=EngineStateTracker.timeout,
+            )
+            self._load_done_iterations.discard(power_iter)
+            return done
 
 
 class RedisStateHandler(Component):
@@ -74,18 +90,24 @@ class RedisStateHandler(Component):
     @handler(RedisChannels.state_update_channel)
     def on_asset_power_state_change(self, data):
         """On user changing asset status"""
-        self._engine.handle_state_update(
+        power_iter = self._engine.handle_state_update(
             data["key"], data["old_state"], data["new_state"]
         )
-        if data["old_state"] != data["new_state"]:
-            self._state_tracker.wait_load_queue()
+        self._state_tracker.wait_load_queue(power_iter)
+
+    @handler(RedisChannels.batch_state_update_channel)
+    def on_batch_power_state_change(self, data):
+        """On user changing status of many assets at once"""
+        power_iter = self._engine.handle_batch_state_update(data["updates"])
+        self._state_tracker.wait_load_queue(power_iter)
 
     @handler(RedisChannels.voltage_update_channel)
     def on_voltage_state_change(self, data):
         """React to voltage drop or voltage restoration"""
-        self._engine.handle_voltage_update(data["old_voltage"], data["new_voltage"])
-        if not math.isclose(data["old_voltage"], data["new_voltage"]):
-            self._state_tracker.wait_load_queue()
+        power_iter = self._engine.handle_voltage_update(
+            data["old_voltage"], data["new_voltage"]
+        )
+        self._state_tracker.wait_load_queue(power_iter)
 
     @handler(RedisChannels.oid_update_channel)
     def on_snmp_device_oid_change(self, data):
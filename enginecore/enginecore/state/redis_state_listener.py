@@ -4,16 +4,25 @@ to the Redis state handler for further processing;
 import json
 import logging
 import os
+import threading
 
-from circuits import Component, Event, Timer
+from circuits import Component, Event, handler
 import redis
 
 from enginecore.state.redis_channels import RedisChannels
+from enginecore.state import redis_streams
 from enginecore.state.redis_state_handler import RedisStateHandler
 from enginecore.state.state_initializer import configure_env
+from enginecore.tools.tracer import TRACER
 
 logger = logging.getLogger(__name__)
-REDIS_LISTENER_SLEEP_TIME = 0.5
+# max time listener threads block waiting for new messages
+# (listeners check if they should stop in between)
+REDIS_LISTENER_TIMEOUT = 1.0
+
+
+class StreamMessagesHandled(Event):
+    """Engine handlers are done with a batch of stream messages"""
 
 
 class StateListener(Component):
@@ -25,9 +34,16 @@ class StateListener(Component):
     @RedisChannels.some_redis_update
     def handle_some_redis_update_here(...):
         ...
+
+    Each pub/sub stream is monitored by a dedicated thread blocking on
+    the stream connection; messages are dispatched in the order they were
+    published as soon as they arrive.
+    Engine input messages are read from redis streams in batches instead
+    if streams transport is enabled (see redis_streams); pubsub channels are
+    still monitored for messages sent before publishers switch transport.
     """
 
-    def __init__(self, engine_cls, debug=False, force_snmp_init=False):
+    def __init__(self, engine_cls, debug=False, force_snmp_init=False, streams=False):
         super(StateListener, self).__init__()
 
         # env space configuration
@@ -43,10 +59,24 @@ class StateListener(Component):
         self._redis_store = redis.StrictRedis(**redis_conf)
 
         self._pubsub_streams = {}
-        for stream_name in ["power", "thermal", "battery", "snmp"]:
+        for stream_name in RedisChannels.engine_streams:
             self._pubsub_streams[stream_name] = self._redis_store.pubsub()
 
+        self._stop_event = threading.Event()
+        self._listener_threads = []
+
         self._subscribe_to_channels()
+
+        # consumers reading engine input streams (streams transport)
+        self._stream_consumers = {}
+        if streams:
+            for stream_name in RedisChannels.engine_streams:
+                self._stream_consumers[stream_name] = redis_streams.StreamConsumer(
+                    self._redis_store, stream_name
+                )
+            TRACER.add_stats_source("streams", lambda: self.stream_stats)
+
+        redis_streams.set_transport(self._redis_store, streams)
         self._redis_state_handler = RedisStateHandler(
             engine_cls, debug, force_snmp_init
         ).register(self)
@@ -56,46 +86,23 @@ class StateListener(Component):
 
         logger.info("Initializing redis subscriptions...")
 
-        # State Channels
-        self._pubsub_streams["power"].psubscribe(
-            RedisChannels.state_update_channel,  # power state changes
-            RedisChannels.mains_update_channel,  # wall power updates
-            RedisChannels.model_update_channel,  # model changes
-            RedisChannels.voltage_update_channel,  # wallpower voltage changes
-        )
-
-        # Thermal Channels
-        self._pubsub_streams["thermal"].psubscribe(
-            RedisChannels.ambient_update_channel,  # on ambient changes
-            RedisChannels.sensor_conf_th_channel,  # new sensor->sensor relationship
-            RedisChannels.cpu_usg_conf_th_channel,  # new cpu_usage->sensor relationship
-            # new sensor->cache_vault relationship
-            RedisChannels.str_cv_conf_th_channel,
-            # new sensor->phys_drive relationship
-            RedisChannels.str_drive_conf_th_channel,
-        )
+        # State, Thermal, Battery & SNMPsimd channels
+        # (see RedisChannels.engine_streams)
+        for stream_name, channels in RedisChannels.engine_streams.items():
+            self._pubsub_streams[stream_name].psubscribe(*channels)
 
-        # Battery Channel
-        self._pubsub_streams["battery"].psubscribe(
-            RedisChannels.battery_update_channel,  # battery level updates
-            RedisChannels.battery_conf_drain_channel,  # update drain speed (factor)
-            RedisChannels.battery_conf_charge_channel,  # update charge speed (factor)
-        )
+    @property
+    def stream_stats(self):
+        """Backlog of the engine input streams (streams transport only)"""
+        return {name: c.stats for name, c in self._stream_consumers.items()}
 
-        # SNMPsimd channel
-        self._pubsub_streams["snmp"].psubscribe(
-            RedisChannels.oid_update_channel  # snmp oid updates
-        )
-
-    def monitor_redis(self, pubsub_group, json_format=True):
-        """Monitors redis pubsub channels for new messages & dispatches
-        corresponding events to the Engine
+    def _dispatch_message(self, message, json_format=True):
+        """Dispatch event corresponding to the published message to the Engine
         Args:
-            pubsub_group (redis.client.PubSub): group of pubsub channels to be monitored
+            message(dict): message received from a pubsub channel
+            json_format(bool): message data is json-encoded
         """
-
-        message = pubsub_group.get_message()
-        # validate message
+        # validate message (skip subscription confirmations)
         if (
             (not message)
             or ("data" not in message)
@@ -114,6 +121,63 @@ class StateListener(Component):
             self._redis_state_handler,
         )
 
+    def monitor_redis(self, pubsub_group, json_format=True):
+        """Monitors redis pubsub channels for new messages & dispatches
+        corresponding events to the Engine (runs in a listener thread)
+        Args:
+            pubsub_group (redis.client.PubSub): group of pubsub channels to be monitored
+            json_format(bool): messages published to the channels are json-encoded
+        """
+
+        while not self._stop_event.is_set():
+            try:
+                message = pubsub_group.get_message(timeout=REDIS_LISTENER_TIMEOUT)
+                # drain all the messages received so far
+                while message:
+                    self._dispatch_message(message, json_format)
+                    message = pubsub_group.get_message()
+            except redis.ConnectionError as error:
+                # pubsub re-subscribes to the channels once reconnected
+                logger.error("Lost connection to redis: %s", error)
+                self._stop_event.wait(REDIS_LISTENER_TIMEOUT)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to process redis message")
+
+    def monitor_stream(self, consumer, json_format=True):
+        """Reads engine input messages from the stream in batches & dispatches
+        corresponding events to the Engine (runs in a listener thread)
+        Args:
+            consumer (redis_streams.StreamConsumer): reader of the stream
+            json_format(bool): messages sent to the stream channels are json-encoded
+        """
+
+        while not self._stop_event.is_set():
+            try:
+                messages = consumer.read(block=int(REDIS_LISTENER_TIMEOUT * 1000))
+                for message in messages:
+                    self._dispatch_message(message, json_format)
+
+                # events are handled in the order they were fired, messages
+                # are acknowledged once the handlers of the batch returned
+                if messages:
+                    self.fire(
+                        StreamMessagesHandled(consumer, [m["id"] for m in messages])
+                    )
+            except redis.ConnectionError as error:
+                logger.error("Lost connection to redis: %s", error)
+                self._stop_event.wait(REDIS_LISTENER_TIMEOUT)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to process redis stream messages")
+
+    @handler("StreamMessagesHandled")
+    def on_stream_messages_handled(self, consumer, entry_ids):
+        """Acknowledge stream messages handled by the engine (messages that
+        were not acknowledged are reported as pending in the stream stats)"""
+        try:
+            consumer.ack(entry_ids)
+        except redis.ConnectionError as error:
+            logger.error("Failed to acknowledge stream messages: %s", error)
+
     def started(self, _):
         """
             Called on start: initialize redis subscriptions
@@ -121,20 +185,38 @@ class StateListener(Component):
 
         logger.info("Initializing pub/sub event handlers...")
 
-        # timers will be monitoring new published messages every .5 seconds
-        for stream_name in ["power", "thermal", "battery"]:
-            stream = self._pubsub_streams[stream_name]
-            Timer(
-                REDIS_LISTENER_SLEEP_TIME,
-                Event.create("monitor_redis", pubsub_group=stream),
-                persist=True,
-            ).register(self)
-
-        # configure snmp channel:
-        snmp_event = Event.create(
-            "monitor_redis", self._pubsub_streams["snmp"], json_format=False
-        )
-        Timer(REDIS_LISTENER_SLEEP_TIME, snmp_event, persist=True).register(self)
+        # listener threads are blocking till new messages are published
+        listeners = [
+            (self.monitor_redis, "redis-listener:" + name, name, stream)
+            for name, stream in self._pubsub_streams.items()
+        ] + [
+            (self.monitor_stream, "redis-stream:" + name, name, consumer)
+            for name, consumer in self._stream_consumers.items()
+        ]
+
+        for target, thread_name, stream_name, stream in listeners:
+            listener_t = threading.Thread(
+                target=target,
+                args=(stream,),
+                kwargs={"json_format": stream_name != "snmp"},
+                name=thread_name,
+                daemon=True,
+            )
+            listener_t.start()
+            self._listener_threads.append(listener_t)
+
+    @handler("stopped")
+    def on_stopped(self, _):
+        """Stop listener threads & close pubsub connections"""
+        self._stop_event.set()
+        for listener_t in self._listener_threads:
+            listener_t.join()
+
+        for stream in self._pubsub_streams.values():
+            stream.close()
+
+        # publishers fall back to pubsub
+        redis_streams.set_transport(self._redis_store, streams=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+"""Redis Streams transport for the engine input events
+
+Messages sent to the channels engine listens to (see RedisChannels.engine_streams)
+are lost if they are published while the engine is busy or reloading;
+With streams transport enabled, the messages are appended to redis streams
+(one stream per channel group) instead & the engine reads them in batches
+as a member of a consumer group.
+
+The transport is enabled by the engine (see set_transport) so that publishers
+running in other processes (including snmpsimd, see snmppub.lua) can switch to
+streams as well.
+"""
+import socket
+import time
+
+from enginecore.state.redis_channels import RedisChannels
+
+# key storing the transport engine listens to ("streams" or "pubsub")
+TRANSPORT_KEY = "engine-transport"
+# consumer group engine reads the streams as
+CONSUMER_GROUP = "engine"
+# streams are capped at (about) this many entries
+STREAM_MAXLEN = 10000
+
+
+def get_stream_key(stream_name):
+    """Redis key of the stream with channel group messages"""
+    return "engine-stream:" + stream_name
+
+
+# stream key for each channel
+_CHANNEL_STREAMS = {
+    channel: get_stream_key(stream_name)
+    for stream_name, channels in RedisChannels.engine_streams.items()
+    for channel in channels
+}
+
+
+def set_transport(store, streams):
+    """Let publishers know which transport the engine listens to
+    Args:
+        store: redis client
+        streams(bool): streams transport is used if True, pubsub otherwise
+    """
+    store.set(TRANSPORT_KEY, "streams" if streams else "pubsub")
+
+
+class StreamTransport:
+    """Redis store proxy appending messages sent to the engine input channels
+    to redis streams (if streams transport is enabled by the engine);
+    Messages sent to other channels are published as usual.
+
+    Example:
+        store = StreamTransport(redis.StrictRedis())
+        store.publish(RedisChannels.state_update_channel, "...") # XADD (or PUBLISH)
+    """
+
+    # transport setting is re-read after this many seconds
+    transport_ttl = 5.0
+
+    def __init__(self, store):
+        self._store = store
+        self._streams_enabled = False
+        self._checked_at = None
+
+    @property
+    def store(self):
+        """Redis client messages are sent to"""
+        return self._store
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    @property
+    def streams_enabled(self):
+        """True if engine listens to streams"""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at > self.transport_ttl:
+            self._streams_enabled = self._store.get(TRANSPORT_KEY) == b"streams"
+            self._checked_at = now
+
+        return self._streams_enabled
+
+    def _stream_for(self, channel):
+        """Stream key the channel messages are appended to (None if published)"""
+        stream_key = _CHANNEL_STREAMS.get(channel)
+        return stream_key if stream_key and self.streams_enabled else None
+
+    def publish(self, channel, message):
+        """Send message to the channel"""
+        stream_key = self._stream_for(channel)
+        if not stream_key:
+            return self._store.publish(channel, message)
+
+        self._store.xadd(
+            stream_key, {"channel": channel, "data": message}, maxlen=STREAM_MAXLEN
+        )
+        return 1
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """Pipeline sending channel messages over the engine transport"""
+        return StreamPipeline(self, self._store.pipeline(transaction, shard_hint))
+
+
+class StreamPipeline:
+    """Pipeline proxy appending messages to streams (see StreamTransport)"""
+
+    def __init__(self, transport, pipe):
+        self._transport = transport
+        self._pipe = pipe
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._pipe.__exit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    def publish(self, channel, message):
+        """Buffer channel message"""
+        # pylint: disable=protected-access
+        stream_key = self._transport._stream_for(channel)
+        if not stream_key:
+            self._pipe.publish(channel, message)
+        else:
+            self._pipe.xadd(
+                stream_key, {"channel": channel, "data": message}, maxlen=STREAM_MAXLEN
+            )
+        return self
+
+
+class StreamConsumer:
+    """Reads channel group messages from the stream as a member
+    of the engine consumer group
+
+    Example:
+        consumer = StreamConsumer(store, "power")
+        messages = consumer.read()
+        for message in messages:
+            ... # message has the same format as pubsub messages
+        consumer.ack([m["id"] for m in messages])
+    """
+
+    def __init__(self, store, stream_name, count=100):
+        """
+        Args:
+            store: redis client
+            stream_name(str): name of the channel group
+                              (see RedisChannels.engine_streams)
+            count(int): max number of messages read at once
+        """
+        self._store = store
+        self._stream_key = get_stream_key(stream_name)
+        self._consumer = "{}:{}".format(socket.gethostname(), stream_name)
+        self._count = count
+        self._num_read = 0
+
+        self._create_group()
+
+    def _create_group(self):
+        """Join consumer group skipping messages sent before the engine started
+        (engine state is re-initialized on start)"""
+        groups = [
+            g["name"].decode() if isinstance(g["name"], bytes) else g["name"]
+            for g in self._get_groups()
+        ]
+        if CONSUMER_GROUP in groups:
+            self._store.xgroup_setid(self._stream_key, CONSUMER_GROUP, id="$")
+        else:
+            self._store.xgroup_create(
+                self._stream_key, CONSUMER_GROUP, id="$", mkstream=True
+            )
+
+    def _get_groups(self):
+        """Consumer groups of the stream"""
+        if not self._store.exists(self._stream_key):
+            return []
+        return self._store.xinfo_groups(self._stream_key)
+
+    def read(self, block=1000):
+        """Read new messages (messages should be acknowledged once processed)
+        Args:
+            block(int): max milliseconds to wait for new messages
+        Returns:
+            list: messages formatted as pubsub messages
+                  (with stream entry "id" used for acknowledgement)
+        """
+        response = self._store.xreadgroup(
+            CONSUMER_GROUP,
+            self._consumer,
+            {self._stream_key: ">"},
+            count=self._count,
+            block=block,
+        )
+
+        messages = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                messages.append(
+                    {
+                        "id": entry_id,
+                        "type": "message",
+                        "channel": fields[b"channel"],
+                        "data": fields[b"data"],
+                    }
+                )
+
+        self._num_read += len(messages)
+        return messages
+
+    def ack(self, entry_ids):
+        """Acknowledge processed messages (messages stay pending till then)
+        Args:
+            entry_ids(list): ids of the messages returned by read
+        """
+        if entry_ids:
+            self._store.xack(self._stream_key, CONSUMER_GROUP, *entry_ids)
+
+    @property
+    def stats(self):
+        """Stream length, number of messages delivered but not acknowledged (pending)
+        & number of messages yet to be delivered (lag, requires redis 7)"""
+        group = next(
+            (
+                g
+                for g in self._get_groups()
+                if g["name"] in (CONSUMER_GROUP, CONSUMER_GROUP.encode())
+            ),
+            {},
+        )
+        return {
+            "length": self._store.xlen(self._stream_key),
+            "read": self._num_read,
+            "pending": group.get("pending", 0),
+            "lag": group.get("lag"),
+        }
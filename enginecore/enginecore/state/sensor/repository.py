@@ -3,18 +3,45 @@ present in a particular asset/machine
 """
 import os
 import logging
+import threading
+from contextlib import ExitStack
 
 from enginecore.state.state_initializer import get_temp_workplace_dir
 from enginecore.model.graph_reference import GraphReference
+from enginecore.state.api.environment import ISystemEnvironment
+from enginecore.tools.clock import CLOCK
 
 from enginecore.state.sensor.file_locks import SensorFileLocks
 from enginecore.state.sensor.sensor import Sensor, SensorGroups
+from enginecore.state.sensor.shared_table import SensorTable
+from enginecore.state.sensor.thermal_relationships import ThermalRelationships
+from enginecore.state.sensor.thermal_scheduler import THERMAL_SCHEDULER
+from enginecore.state.sensor.thermal_solver import (
+    ThermalSolver,
+    CPU_IMPACT_RATE,
+    np,
+)
 
 logger = logging.getLogger(__name__)
 
+# storage temperatures updated in memory are written to the graph every 5 seconds
+STORAGE_FLUSH_RATE = 5
+
 
 class SensorRepository:
-    """A sensor repository for a particular IPMI device"""
+    """A sensor repository for a particular IPMI device;
+    Sensor values are stored in a file per sensor, or in one memory-mapped table
+    shared with ipmi_sim (shared_table option, see SensorTable);
+    Thermal relationships are updated by an impact per relationship, or by one
+    vectorized step for the whole server (vectorized_thermal option, see ThermalSolver)
+    """
+
+    # keep sensor values in a shared memory-mapped table
+    # (set by the engine, repositories of other processes attach to existing table)
+    shared_table = False
+    # advance thermal relationships of the server with the thermal solver
+    # (set by the engine, requires numpy)
+    vectorized_thermal = False
 
     def __init__(self, server_key, enable_thermal=False):
         self._server_key = server_key
@@ -30,22 +57,45 @@ class SensorRepository:
 
         with self._graph_ref.get_session() as session:
             sensors = GraphReference.get_asset_sensors(session, server_key)
-            for sensor_info in sensors:
-                sensor = Sensor(
-                    self._sensor_dir,
-                    server_key,
-                    sensor_info,
-                    self._sensor_file_locks,
-                    graph_ref=self._graph_ref,
-                )
-                self._sensors[sensor.name] = sensor
+
+        if enable_thermal and not os.path.isdir(self._sensor_dir):
+            os.mkdir(self._sensor_dir)
+
+        table_path = os.path.join(self._sensor_dir, SensorTable.filename)
+        if enable_thermal and SensorRepository.shared_table:
+            self._sensor_table = SensorTable.create(
+                table_path, [s["specs"]["name"] for s in sensors]
+            )
+        else:
+            self._sensor_table = SensorTable.attach(table_path)
+
+        # thermal relationships are loaded once the thermal impact is started
+        self._thermal_rels = ThermalRelationships(server_key, self._graph_ref)
+        self._thermal_rels.vectorized = (
+            enable_thermal and SensorRepository.vectorized_thermal
+        )
+        # thermal switch of the vectorized thermal model
+        self._thermal_event = threading.Event()
+        # storage temperatures are written whether the thermal model is on or not
+        # (impacts per relationship are switched by their sensors)
+        self._storage_flush_event = threading.Event()
+        self._storage_flush_event.set()
+
+        for sensor_info in sensors:
+            sensor = Sensor(
+                self._sensor_dir,
+                server_key,
+                sensor_info,
+                self._sensor_file_locks,
+                graph_ref=self._graph_ref,
+                s_table=self._sensor_table,
+                th_rels=self._thermal_rels,
+            )
+            self._sensors[sensor.name] = sensor
 
         if enable_thermal:
             self._load_thermal = True
 
-            if not os.path.isdir(self._sensor_dir):
-                os.mkdir(self._sensor_dir)
-
             for s_name in self._sensors:
                 self._sensors[s_name].set_to_defaults()
 
@@ -64,10 +114,14 @@ class SensorRepository:
     def enable_thermal_impact(self):
         """Set thermal event switch """
         list(map(lambda sn: self._sensors[sn].enable_thermal_impact(), self._sensors))
+        self._thermal_event.set()
+        THERMAL_SCHEDULER.resume(self)
 
     def disable_thermal_impact(self):
         """Clear thermal event switch"""
         list(map(lambda sn: self._sensors[sn].disable_thermal_impact(), self._sensors))
+        self._thermal_event.clear()
+        self._thermal_rels.flush_storage_temperatures()
 
     def shut_down_sensors(self):
         """Set all sensors to offline"""
@@ -127,14 +181,103 @@ class SensorRepository:
         if self._load_thermal is True:
             self._load_thermal = False
 
+            THERMAL_SCHEDULER.schedule(
+                self,
+                self._flush_storage_temperatures(),
+                "server:[{}] storage".format(self._server_key),
+                self._storage_flush_event,
+            )
+
+            if self._thermal_rels.vectorized:
+                THERMAL_SCHEDULER.schedule(
+                    self,
+                    self._thermal_model(),
+                    "server:[{}]".format(self._server_key),
+                    self._thermal_event,
+                )
+                self.enable_thermal_impact()
+                return
+
             for s_name in self._sensors:
                 self._sensors[s_name].start_thermal_impact()
 
+    def _flush_storage_temperatures(self):
+        """Keep writing updated temperatures of the storage components to the graph
+        (thermal impacts update them in memory, see ThermalRelationships);
+        This generator is advanced by the thermal scheduler
+        Yields:
+            int: seconds till the next write
+        """
+        while True:
+            self._thermal_rels.flush_storage_temperatures()
+            yield STORAGE_FLUSH_RATE
+
+    def _thermal_model(self):
+        """Keep updating all the thermal targets of the server (sensors & storage)
+        with one thermal solver step at a time; This generator is advanced by the
+        thermal scheduler while thermal event switch is set, solver is re-compiled
+        every time relationships are updated
+        Yields:
+            float: seconds till the next step
+        """
+
+        # avoid circular imports with the server
+        from enginecore.state.api import IStateManager
+
+        # shared state manager (keeps one libvirt connection per server)
+        server_sm = IStateManager.get_state_manager_by_key(self._server_key)
+
+        solver = None
+        while True:
+            if solver is None or solver.version != self._thermal_rels.version:
+                solver = ThermalSolver(self._thermal_rels, previous=solver)
+                logger.info(
+                    "Thermal solver of server [%s]: %s relationship(s)",
+                    self._server_key,
+                    solver.num_relationships,
+                )
+
+            now = CLOCK.time()
+            if solver.sensors_due(now) or solver.storage_due(now):
+                self._step_thermal_model(solver, now, server_sm.cpu_load)
+
+            next_due = solver.next_due()
+            yield CPU_IMPACT_RATE if next_due is None else next_due - now
+
+    def _step_thermal_model(self, solver, now, cpu_load):
+        """Read sensor values, advance the thermal targets with the solver
+        & write the updated ones back (storage temperatures are kept by the solver
+        & written to the graph in batches, see _flush_storage_temperatures)"""
+
+        sensors = [self._sensors[s_name] for s_name in solver.sensor_names]
+
+        with ExitStack() as stack:
+            # solver sensor names are sorted (locks are taken in the same order)
+            for s_name in solver.sensor_names:
+                stack.enter_context(self._sensor_file_locks.get_lock(s_name))
+
+            values = np.array([int(sensor.sensor_value) for sensor in sensors])
+
+            new_values, hd_updates = solver.step(
+                now, values, ISystemEnvironment.get_ambient(), cpu_load
+            )
+
+            for idx in np.flatnonzero(new_values != values):
+                sensors[idx].sensor_value = int(new_values[idx])
+
+        if hd_updates:
+            self._thermal_rels.set_storage_temperatures(hd_updates)
+
     @property
     def sensor_dir(self):
         """Get temp IPMI state dir"""
         return self._sensor_dir
 
+    @property
+    def sensor_table(self):
+        """Get shared sensor table (None if sensor values are stored in files)"""
+        return self._sensor_table
+
     @property
     def sensors(self):
         """Get all sensors in a sensor repo"""
@@ -146,5 +289,10 @@ class SensorRepository:
         return self._server_key
 
     def stop(self):
-        """Closes all the open connections"""
+        """Removes thermal updates & closes all the open connections"""
+        for s_name in self._sensors:
+            self._sensors[s_name].stop_thermal_impact()
+        self._thermal_event.clear()
+        THERMAL_SCHEDULER.cancel(self)
+        self._thermal_rels.flush_storage_temperatures()
         self._graph_ref.close()
@@ -5,14 +5,14 @@ sensors & sensors, sensors & storage components, cpu & sensors
 import os
 import threading
 import logging
-import time
-import json
 import operator
 from collections import OrderedDict
 from enum import Enum
 
 from enginecore.state.api.environment import ISystemEnvironment
 from enginecore.model.graph_reference import GraphReference
+from enginecore.state.sensor.thermal_relationships import ThermalRelationships
+from enginecore.state.sensor.thermal_scheduler import THERMAL_SCHEDULER
 
 logger = logging.getLogger(__name__)
 
@@ -41,9 +41,20 @@ class Sensor:
 
     thresholds_types = ["lnr", "lcr", "lnc", "unc", "ucr", "unr"]
 
-    def __init__(self, sensor_dir, server_key, s_details, s_locks, graph_ref):
+    def __init__(
+        self,
+        sensor_dir,
+        server_key,
+        s_details,
+        s_locks,
+        graph_ref,
+        s_table=None,
+        th_rels=None,
+    ):
         self._s_dir = sensor_dir
         self._server_key = server_key
+        # shared memory-mapped table of sensor values (None if files are used)
+        self._s_table = s_table
 
         self._s_specs = s_details["specs"]
         self._s_address_space = s_details["address_space"]
@@ -66,6 +77,13 @@ class Sensor:
 
         self._graph_ref = graph_ref
 
+        # thermal relationships of the server (loaded once & shared by its sensors)
+        self._th_rels = (
+            th_rels if th_rels else ThermalRelationships(server_key, graph_ref)
+        )
+        # guards scheduled impacts (_th_*_t) against relationship updates
+        self._th_lock = threading.RLock()
+
         if "index" in self._s_specs:
             self._s_addr = hex(
                 int(s_details["address_space"]["address"], 16) + self._s_specs["index"]
@@ -93,7 +111,12 @@ class Sensor:
             )
 
             # display sensor file location
-            s_str.append(" - Sensor File: '{}'".format(self._get_sensor_file_path()))
+            if self._s_table is not None:
+                s_str.append(" - Sensor Table: '{}'".format(self._s_table.path))
+            else:
+                s_str.append(
+                    " - Sensor File: '{}'".format(self._get_sensor_file_path())
+                )
 
             # print any thermal connections
             if thermal_rel["targets"]:
@@ -126,8 +149,8 @@ class Sensor:
 
             return "\n".join(s_str)
 
-    def _launch_thermal_sensor_thread(self, target, event):
-        """Add a new impact thread 
+    def _schedule_thermal_sensor_impact(self, target, event):
+        """Add a new impact (updated by the thermal scheduler)
         Args:
             target(str): name of the target sensor current sensor is affecting
             event(str): name of the source event affecting target sensor
@@ -136,313 +159,243 @@ class Sensor:
         if target not in self._th_sensor_t:
             self._th_sensor_t[target] = {}
 
-        self._th_sensor_t[target][event] = threading.Thread(
-            target=self._target_sensor,
-            args=(target, event),
-            name=self._th_sensor_t_name_fmt.format(
+        self._th_sensor_t[target][event] = self._target_sensor(target, event)
+        THERMAL_SCHEDULER.schedule(
+            self,
+            self._th_sensor_t[target][event],
+            self._th_sensor_t_name_fmt.format(
                 source=self._s_name, target=target, event=event
             ),
+            self._s_thermal_event,
         )
 
-        self._th_sensor_t[target][event].daemon = True
-        self._th_sensor_t[target][event].start()
-
-    def _launch_thermal_cpu_thread(self):
+    def _schedule_thermal_cpu_impact(self):
         """Enable CPU impact upon the sensor
         """
-        self._th_cpu_t = threading.Thread(
-            target=self._cpu_impact,
-            name=self._th_cpu_t_name_fmt.format(target=self.name),
+        self._th_cpu_t = self._cpu_impact()
+        THERMAL_SCHEDULER.schedule(
+            self,
+            self._th_cpu_t,
+            self._th_cpu_t_name_fmt.format(target=self.name),
+            self._s_thermal_event,
         )
 
-        self._th_cpu_t.daemon = True
-        self._th_cpu_t.start()
+    def _schedule_thermal_storage_impact(self, controller, hd_element, hd_type, event):
+        """Add a new storage impact (updated by the thermal scheduler)"""
 
-    def _launch_thermal_storage_thread(self, controller, hd_element, hd_type, event):
-
-        thread_name = "{}-{}".format(hd_type.name, hd_element)
-        if (
-            thread_name in self._th_storage_t
-            and event in self._th_storage_t[thread_name]
-        ):
-            raise ValueError("Thread already exists")
         if hd_element not in self._th_storage_t:
             self._th_storage_t[hd_element] = {}
 
-        self._th_storage_t[hd_element][event] = threading.Thread(
-            target=self._target_storage,
-            args=(controller, hd_element, hd_type, event),
-            name=self._th_storage_t_name_fmt.format(
+        self._th_storage_t[hd_element][event] = self._target_storage(
+            controller, hd_element, hd_type, event
+        )
+        THERMAL_SCHEDULER.schedule(
+            self,
+            self._th_storage_t[hd_element][event],
+            self._th_storage_t_name_fmt.format(
                 ctrl=controller, source=self._s_name, target=hd_element, event=event
             ),
+            self._s_thermal_event,
         )
 
-        self._th_storage_t[hd_element][event].daemon = True
-        self._th_storage_t[hd_element][event].start()
-
     def _init_thermal_impact(self):
         """Initialize thermal imact based on the saved inter-connections"""
 
-        with self._graph_ref.get_session() as session:
-            thermal_sensor_rel_details = GraphReference.get_affected_sensors(
-                session, self._server_key, self._s_name
-            )
-
+        with self._th_lock:
             # for each target & for each set of relationships with the target
-            for target in thermal_sensor_rel_details["targets"]:
-                for rel in target["rel"]:
-                    self._launch_thermal_sensor_thread(target["name"], rel["event"])
-
-            thermal_storage_rel_details = GraphReference.get_affected_hd_elements(
-                session, self._server_key, self._s_name
-            )
-
-            for target in thermal_storage_rel_details["targets"]:
-                if "DID" in target and target["DID"]:
-                    hd_type = HDComponents.PhysicalDrive
-                    hd_element = target["DID"]
-                else:
-                    hd_type = HDComponents.CacheVault
-                    hd_element = target["serialNumber"]
-
-                for rel in target["rel"]:
-                    self._launch_thermal_storage_thread(
-                        target["controller"]["controllerNum"],
-                        hd_element,
-                        hd_type,
-                        rel["event"],
+            for target, event in self._th_rels.sensor_targets(self._s_name):
+                if event not in self._th_sensor_t.get(target, {}):
+                    self._schedule_thermal_sensor_impact(target, event)
+
+            for hd_type, controller, hd_element, event in self._th_rels.storage_targets(
+                self._s_name
+            ):
+                if hd_type == HDComponents.PhysicalDrive.name:
+                    hd_element = int(hd_element)
+
+                if event not in self._th_storage_t.get(hd_element, {}):
+                    self._schedule_thermal_storage_impact(
+                        controller, hd_element, HDComponents[hd_type], event
                     )
 
-        self._launch_thermal_cpu_thread()
-
-    def _calc_approx_value(self, model, current_value, inverse=False):
-        """Approximate value based on the model provided"""
-
-        nbr_model_key = min(model, key=lambda x: abs(int(x) - current_value))
-        nbr_value = int(model[nbr_model_key])
-
-        multiplier = int(nbr_model_key if inverse else current_value)
-        divisor = int(current_value if inverse else nbr_model_key)
-
-        return int((nbr_value * multiplier) / int(divisor))
+            if self._th_rels.cpu_rel(self._s_name) and self._th_cpu_t is None:
+                self._schedule_thermal_cpu_impact()
 
     def _cpu_impact(self):
         """Keep updating *this sensor based on cpu load changes
-        This function waits for the thermal event switch and exits when the connection between this sensor & cpu load
-        is removed;
+        This generator is advanced by the thermal scheduler (while thermal event switch
+        is set) and exits when the connection between this sensor & cpu load is removed;
+        Yields:
+            int: seconds till the next update
         """
 
         # avoid circular imports with the server
         from enginecore.state.api import IBMCServerStateManager
 
         with self._graph_ref.get_session() as session:
-
             asset_info = GraphReference.get_asset_and_components(
                 session, self._server_key
             )
-            server_sm = IBMCServerStateManager(asset_info)
-
-            cpu_impact_degrees_1 = 0
-            cpu_impact_degrees_2 = 0
+        server_sm = IBMCServerStateManager(asset_info)
 
-            while True:
-                self._s_thermal_event.wait()
+        cpu_impact_degrees_1 = 0
+        cpu_impact_degrees_2 = 0
 
-                rel_details = GraphReference.get_cpu_thermal_rel(
-                    session, self._server_key, self.name
-                )
+        while True:
+            with self._th_lock:
+                rel = self._th_rels.cpu_rel(self.name)
 
                 # relationship was deleted
-                if not rel_details:
+                if not rel:
+                    self._th_cpu_t = None
                     return
 
-                with self._s_file_locks.get_lock(self.name):
+            with self._s_file_locks.get_lock(self.name):
 
-                    current_cpu_load = server_sm.cpu_load
+                current_cpu_load = server_sm.cpu_load
 
-                    # calculate cpu impact based on the model
-                    cpu_impact_degrees_2 = self._calc_approx_value(
-                        json.loads(rel_details["model"]), current_cpu_load
-                    )
-                    new_calc_value = (
-                        int(self.sensor_value)
-                        + cpu_impact_degrees_2
-                        - cpu_impact_degrees_1
+                # calculate cpu impact based on the model
+                cpu_impact_degrees_2 = rel["model"].approx(current_cpu_load)
+                new_calc_value = (
+                    int(self.sensor_value) + cpu_impact_degrees_2 - cpu_impact_degrees_1
+                )
+
+                # meaning update is needed
+                if cpu_impact_degrees_1 != cpu_impact_degrees_2:
+                    ambient = ISystemEnvironment.get_ambient()
+                    self.sensor_value = (
+                        new_calc_value if new_calc_value > ambient else int(ambient)
                     )
 
-                    # meaning update is needed
-                    if cpu_impact_degrees_1 != cpu_impact_degrees_2:
-                        ambient = ISystemEnvironment.get_ambient()
-                        self.sensor_value = (
-                            new_calc_value if new_calc_value > ambient else int(ambient)
-                        )
+                    logger.debug(
+                        "Thermal impact of CPU load at (%s%%) updated: (%s°)->(%s°)",
+                        current_cpu_load,
+                        cpu_impact_degrees_1,
+                        cpu_impact_degrees_2,
+                    )
 
-                        logger.debug(
-                            "Thermal impact of CPU load at (%s%%) updated: (%s°)->(%s°)",
-                            current_cpu_load,
-                            cpu_impact_degrees_1,
-                            cpu_impact_degrees_2,
-                        )
+                cpu_impact_degrees_1 = cpu_impact_degrees_2
 
-                    cpu_impact_degrees_1 = cpu_impact_degrees_2
-                    time.sleep(5)
+            yield 5
 
     def _target_storage(self, controller, target, hd_type, event):
-        with self._graph_ref.get_session() as session:
-            while True:
-
-                self._s_thermal_event.wait()
-
-                # target
-                if hd_type == HDComponents.CacheVault:
-                    target_attr = "serialNumber"
-                    target_value = '"{}"'.format(target)
-                elif hd_type == HDComponents.PhysicalDrive:
-                    target_attr = "DID"
-                    target_value = target
-                else:
-                    raise ValueError("Unknown hardware component!")
-
-                rel_details = GraphReference.get_sensor_thermal_rel(
-                    session,
-                    self._server_key,
-                    relationship={
-                        "source": self._s_name,
-                        "target": {"attribute": target_attr, "value": target_value},
-                        "event": event,
-                    },
+        """Keep updating temperature of the storage component (advanced by the thermal
+        scheduler), exits when the relationship is removed;
+        Yields:
+            int: seconds till the next update
+        """
+
+        while True:
+
+            with self._th_lock:
+                rel = self._th_rels.storage_rel(
+                    self._s_name, hd_type.name, controller, target, event
                 )
 
-                if not rel_details:
+                if not rel:
                     del self._th_storage_t[target][event]
                     return
 
-                rel = rel_details["rel"]
-                causes_heating = rel["action"] == "increase"
-                source_sensor_status = (
-                    operator.eq if rel["event"] == "down" else operator.ne
+            causes_heating = rel["action"] == "increase"
+            source_sensor_status = (
+                operator.eq if rel["event"] == "down" else operator.ne
+            )
+            degrees = rel["degrees"] if "degrees" in rel else None
+
+            # if model is specified -> use the runtime mappings
+            if "model" in rel and rel["model"]:
+                degrees = rel["model"].approx(int(self.sensor_value) * 10)
+                source_sensor_status = operator.ne
+
+            if source_sensor_status(int(self.sensor_value), 0):
+                # kept in memory, written to the graph in batches
+                # (see SensorRepository._flush_storage_temperatures)
+                updated, new_temp = self._th_rels.add_to_storage_temperature(
+                    (hd_type.name, controller, target),
+                    temp_change=degrees * 1 if causes_heating else -1,
+                    limit={
+                        "lower": ISystemEnvironment.get_ambient(),
+                        "upper": rel["pauseAt"] if causes_heating else None,
+                    },
                 )
 
-                # if model is specified -> use the runtime mappings
-                if "model" in rel and rel["model"]:
-                    rel["degrees"] = self._calc_approx_value(
-                        json.loads(rel["model"]), int(self.sensor_value) * 10
-                    )
+                if updated:
+                    logger.info("temperature sensor was updated to %s°", new_temp)
 
-                    source_sensor_status = operator.ne
-
-                if source_sensor_status(int(self.sensor_value), 0):
-                    updated, new_temp = GraphReference.add_to_hd_component_temperature(
-                        session,
-                        target={
-                            "server_key": self._server_key,
-                            "controller": controller,
-                            "attribute": target_attr,
-                            "value": target_value,
-                            "hd_type": hd_type.name,
-                        },
-                        temp_change=rel["degrees"] * 1 if causes_heating else -1,
-                        limit={
-                            "lower": ISystemEnvironment.get_ambient(),
-                            "upper": rel["pauseAt"] if causes_heating else None,
-                        },
-                    )
-
-                    if updated:
-                        logger.info("temperature sensor was updated to %s°", new_temp)
-
-                time.sleep(rel["rate"])
+            yield rel["rate"]
 
     def _target_sensor(self, target, event):
         """Keep updating the target sensor based on the relationship between this sensor and the target;
-        This function waits for the thermal event switch and exits when the connection between source & target
-        is removed;
+        This generator is advanced by the thermal scheduler (while thermal event switch
+        is set) and exits when the connection between source & target is removed;
         Args:
             target(str): name of the target sensor
             event(str): name of the event that enables thermal impact
+        Yields:
+            int: seconds till the next update
         """
 
-        with self._graph_ref.get_session() as session:
-            while True:
-
-                self._s_thermal_event.wait()
+        while True:
 
-                rel_details = GraphReference.get_sensor_thermal_rel(
-                    session,
-                    self._server_key,
-                    relationship={
-                        "source": self.name,
-                        "target": {"attribute": "name", "value": '"{}"'.format(target)},
-                        "event": event,
-                    },
-                )
+            with self._th_lock:
+                rel = self._th_rels.sensor_rel(self.name, target, event)
 
-                # shut down thread upon relationship removal
-                if not rel_details:
+                # stop updates upon relationship removal
+                if not rel:
                     del self._th_sensor_t[target][event]
                     return
 
-                rel = rel_details["rel"]
-                causes_heating = rel["action"] == "increase"
+            causes_heating = rel["action"] == "increase"
 
-                source_sensor_status = (
-                    operator.eq if rel["event"] == "down" else operator.ne
-                )
-                bound_op = operator.lt if causes_heating else operator.gt
-                arith_op = operator.add if causes_heating else operator.sub
+            source_sensor_status = (
+                operator.eq if rel["event"] == "down" else operator.ne
+            )
+            bound_op = operator.lt if causes_heating else operator.gt
+            arith_op = operator.add if causes_heating else operator.sub
 
-                # if model is specified -> use the runtime mappings
-                if "model" in rel and rel["model"]:
+            # if model is specified -> use the runtime mappings
+            if "model" in rel and rel["model"]:
 
-                    calc_new_sv = arith_op
-                    arith_op = lambda sv, _: calc_new_sv(
-                        sv,
-                        self._calc_approx_value(
-                            json.loads(rel["model"]), int(self.sensor_value) * 10
-                        ),
-                    )
-
-                    source_sensor_status = operator.ne
+                calc_new_sv = arith_op
+                arith_op = lambda sv, _: calc_new_sv(
+                    sv, rel["model"].approx(int(self.sensor_value) * 10)
+                )
 
-                # verify that sensor value doesn't go below room temp
-                if causes_heating or rel["pauseAt"] > ISystemEnvironment.get_ambient():
-                    pause_at = rel["pauseAt"]
-                else:
-                    pause_at = ISystemEnvironment.get_ambient()
+                source_sensor_status = operator.ne
 
-                # update target sensor value
-                with self._s_file_locks.get_lock(target), open(
-                    os.path.join(self._s_dir, target), "r+"
-                ) as sf_handler:
+            # verify that sensor value doesn't go below room temp
+            if causes_heating or rel["pauseAt"] > ISystemEnvironment.get_ambient():
+                pause_at = rel["pauseAt"]
+            else:
+                pause_at = ISystemEnvironment.get_ambient()
 
-                    current_value = int(sf_handler.read())
+            # update target sensor value
+            with self._s_file_locks.get_lock(target):
 
-                    change_by = (
-                        int(rel["degrees"])
-                        if "degrees" in rel and rel["degrees"]
-                        else 0
-                    )
-                    new_sensor_value = arith_op(current_value, change_by)
+                current_value = int(self._read_value(target))
 
-                    # Source sensor status activated thermal impact
-                    if source_sensor_status(int(self.sensor_value), 0):
-                        needs_update = bound_op(new_sensor_value, pause_at)
-                        if not needs_update and bound_op(current_value, pause_at):
-                            needs_update = True
-                            new_sensor_value = int(pause_at)
+                change_by = (
+                    int(rel["degrees"]) if "degrees" in rel and rel["degrees"] else 0
+                )
+                new_sensor_value = arith_op(current_value, change_by)
 
-                        if needs_update:
-                            logger.info(
-                                "Current sensor value (%s°) will be updated to %s°",
-                                current_value,
-                                int(new_sensor_value),
-                            )
+                # Source sensor status activated thermal impact
+                if source_sensor_status(int(self.sensor_value), 0):
+                    needs_update = bound_op(new_sensor_value, pause_at)
+                    if not needs_update and bound_op(current_value, pause_at):
+                        needs_update = True
+                        new_sensor_value = int(pause_at)
+
+                    if needs_update:
+                        logger.info(
+                            "Current sensor value (%s°) will be updated to %s°",
+                            current_value,
+                            int(new_sensor_value),
+                        )
 
-                            sf_handler.seek(0)
-                            sf_handler.truncate()
-                            sf_handler.write(str(new_sensor_value))
+                        self._write_value(target, new_sensor_value)
 
-                time.sleep(int(rel["rate"]))
+            yield int(rel["rate"])
 
     def _get_sensor_file_path(self):
         """Full path to the sensor file"""
@@ -452,44 +405,86 @@ class Sensor:
         """Name of the file sensor is pulling data from"""
         return self.name
 
+    def _read_value(self, s_name):
+        """Read value of a sensor (this one or a thermal target)
+        from the shared sensor table or the sensor file"""
+        if self._s_table is not None:
+            return str(self._s_table.read(s_name))
+
+        with open(os.path.join(self._s_dir, s_name)) as sf_handler:
+            return sf_handler.read()
+
+    def _write_value(self, s_name, value):
+        """Update value of a sensor (this one or a thermal target),
+        file is only written if the sensor is not in the shared table
+        (or the file is still polled by ipmi_sim)"""
+        if self._s_table is not None:
+            self._s_table.write(s_name, value)
+            if not self._s_table.is_file_backed(s_name):
+                return
+
+        with open(os.path.join(self._s_dir, s_name), "w+") as filein:
+            filein.write(str(value))
+
+    def _update_thermal_storage_impact(self, controller, hd_element, hd_type, event):
+        """Refresh relationship between this sensor & storage component
+        (scheduling a new impact if the relationship is new)"""
+        with self._th_lock:
+            rel = self._th_rels.reload_storage_rel(
+                self._s_name, hd_type.name, controller, hd_element, event
+            )
+
+            # picked up by the thermal solver of the server on its next step
+            if self._th_rels.vectorized:
+                return
+
+            if rel and event not in self._th_storage_t.get(hd_element, {}):
+                self._schedule_thermal_storage_impact(
+                    controller, hd_element, hd_type, event
+                )
+
     def add_cv_thermal_impact(self, controller, cv, event):
-        self._launch_thermal_storage_thread(
+        """Set (or update) a cache vault affected by the current source sensor"""
+        self._update_thermal_storage_impact(
             controller, cv, HDComponents.CacheVault, event
         )
 
     def add_pd_thermal_impact(self, controller, pd, event):
-        self._launch_thermal_storage_thread(
-            controller, pd, HDComponents.PhysicalDrive, event
+        """Set (or update) a physical drive affected by the current source sensor"""
+        self._update_thermal_storage_impact(
+            controller, int(pd), HDComponents.PhysicalDrive, event
         )
 
     def add_sensor_thermal_impact(self, target, event):
         """Set a target sensor that will be affected by the current source sensor values
+        (relationship that was updated or deleted is refreshed)
         Args:
             target(str): Name of the target sensor
             event(str): Source event causing the thermal impact to trigger
         """
-        if target in self._th_sensor_t and event in self._th_sensor_t[target]:
-            raise ValueError("Thread already exists")
+        with self._th_lock:
+            rel = self._th_rels.reload_sensor_rel(self.name, target, event)
 
-        with self._graph_ref.get_session() as session:
-
-            rel_details = GraphReference.get_sensor_thermal_rel(
-                session,
-                self._server_key,
-                relationship={
-                    "source": self.name,
-                    "target": {"attribute": "name", "value": '"{}"'.format(target)},
-                    "event": event,
-                },
-            )
+            # picked up by the thermal solver of the server on its next step
+            if self._th_rels.vectorized:
+                return
 
-            if rel_details:
-                self._launch_thermal_sensor_thread(target, rel_details["rel"]["event"])
+            if rel and event not in self._th_sensor_t.get(target, {}):
+                self._schedule_thermal_sensor_impact(target, event)
 
     def add_cpu_thermal_impact(self):
         """Set this sensor as one affected by the CPU-load
+        (relationship that was updated or deleted is refreshed)
         """
-        self._launch_thermal_cpu_thread()
+        with self._th_lock:
+            rel = self._th_rels.reload_cpu_rel(self.name)
+
+            # picked up by the thermal solver of the server on its next step
+            if self._th_rels.vectorized:
+                return
+
+            if rel and self._th_cpu_t is None:
+                self._schedule_thermal_cpu_impact()
 
     @property
     def name(self):
@@ -509,8 +504,7 @@ class Sensor:
     @property
     def sensor_value(self):
         """Current sensor reading value"""
-        with open(self._get_sensor_file_path()) as sf_handler:
-            return sf_handler.read()
+        return self._read_value(self._get_sensor_filename())
 
     @property
     def thresholds(self):
@@ -555,36 +549,41 @@ class Sensor:
 
     @sensor_value.setter
     def sensor_value(self, new_value):
-        with open(self._get_sensor_file_path(), "w+") as filein:
-            filein.write(str(new_value))
+        self._write_value(self._get_sensor_filename(), new_value)
 
     def start_thermal_impact(self):
-        """Enable thread execution responsible for thermal updates"""
+        """Schedule thermal updates caused by this sensor"""
         self._init_thermal_impact()
         self.enable_thermal_impact()
 
     def enable_thermal_impact(self):
+        """Resume thermal updates (parked by the thermal scheduler)"""
         self._s_thermal_event.set()
+        THERMAL_SCHEDULER.resume(self)
 
     def disable_thermal_impact(self):
-        """Disable thread execution responsible for thermal updates"""
+        """Pause thermal updates caused by this sensor"""
+        self._s_thermal_event.clear()
+
+    def stop_thermal_impact(self):
+        """Remove all the thermal updates caused by this sensor"""
         self._s_thermal_event.clear()
+        THERMAL_SCHEDULER.cancel(self)
 
     def set_to_off(self):
-        with open(self._get_sensor_file_path(), "w+") as filein:
-            off_value = self._s_specs["offValue"] if "offValue" in self._s_specs else 0
-            filein.write(str(off_value))
+        """Set the sensor value to the specified off value"""
+        off_value = self._s_specs["offValue"] if "offValue" in self._s_specs else 0
+        self.sensor_value = off_value
 
     def set_to_defaults(self):
         """Reset the sensor value to the specified default value"""
 
-        with open(self._get_sensor_file_path(), "w+") as filein:
-            if self.group == SensorGroups.fan:
-                default_value = int(self._s_specs["defaultValue"] * 0.1)
-            else:
-                default_value = self._s_specs["defaultValue"]
+        if self.group == SensorGroups.fan:
+            default_value = int(self._s_specs["defaultValue"] * 0.1)
+        else:
+            default_value = self._s_specs["defaultValue"]
 
-            off_value = self._s_specs["offValue"] if "offValue" in self._s_specs else 0
-            filein.write(
-                str(default_value if "defaultValue" in self._s_specs else off_value)
-            )
+        off_value = self._s_specs["offValue"] if "offValue" in self._s_specs else 0
+        self.sensor_value = (
+            default_value if "defaultValue" in self._s_specs else off_value
+        )
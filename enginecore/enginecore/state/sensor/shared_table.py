@@ -0,0 +1,210 @@
+"""Memory-mapped sensor table shared by the engine & ipmi_sim plugin
+
+Sensor readings of a server are kept in one file with a fixed layout
+(instead of one text file per sensor), the file is memory-mapped by every process
+accessing the sensors (engine, simengine-cli) and by the ipmi_sim plugin
+(see ipmi_sim/haos_extend.c) so that updating & polling sensor values
+doesn't involve any syscalls.
+
+Layout (little-endian):
+    header (64 bytes): magic(8s) version(u32) num_slots(u32) slot_size(u32)
+    slot   (64 bytes): seq(u32) flags(u32) value(i64) name(48s)
+
+Slot values are protected with a seqlock: a writer makes the sequence number odd,
+updates the value & makes the sequence number even again; readers retry if the
+sequence number is odd or changed while the value was read.
+"""
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b"SIMSENS\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 64
+
+SLOT_SIZE = 64
+SEQ = struct.Struct("<I")
+FLAGS = struct.Struct("<I")
+VALUE = struct.Struct("<q")
+NAME_SIZE = 48
+SLOT = struct.Struct("<IIq{}s".format(NAME_SIZE))
+
+# slot flags:
+# value is also written to the sensor file (polled by ipmi_sim "file" handler)
+FLAG_FILE_BACKED = 0x1
+
+
+def to_int(value):
+    """Convert sensor value (e.g. 42, "0x08", "21.5") to the table's integer"""
+    if isinstance(value, str):
+        try:
+            return int(value, 0)
+        except ValueError:
+            return int(float(value))
+    return int(value)
+
+
+class SensorTable:
+    """Fixed-layout table of sensor values backed by a memory-mapped file,
+    tables are shared by all the sensor repositories of the process
+
+    Example:
+        table = SensorTable.create("/tmp/simengine/1/sensor_dir/sensor_table", names)
+        table.write("CPU_TEMP", 40)
+        table.read("CPU_TEMP") # -> 40
+    """
+
+    filename = "sensor_table"
+
+    _tables = {}
+    _tables_lock = threading.Lock()
+
+    def __init__(self, path, fileobj):
+        self._path = path
+        self._file = fileobj
+        self._mmap = mmap.mmap(fileobj.fileno(), 0)
+        # writers of the same slot are serialized within the process
+        self._write_lock = threading.Lock()
+
+        magic, version, num_slots, slot_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            raise ValueError("'{}' is not a sensor table!".format(path))
+
+        self._offsets = {}
+        for idx in range(num_slots):
+            offset = HEADER_SIZE + idx * SLOT_SIZE
+            name = SLOT.unpack_from(self._mmap, offset)[3]
+            self._offsets[name.rstrip(b"\0").decode()] = offset
+
+    @classmethod
+    def create(cls, path, names):
+        """Create sensor table with a slot per sensor name
+        (table that already exists is reused)
+        Args:
+            path(str): location of the table file
+            names(iterable): sensor names
+        Returns:
+            SensorTable: shared sensor table
+        """
+        names = list(names)
+
+        with cls._tables_lock:
+            if path in cls._tables or os.path.exists(path):
+                table = cls._attach(path)
+                if all(name in table for name in names):
+                    return table
+
+            for name in names:
+                if len(name.encode()) >= NAME_SIZE:
+                    raise ValueError("Sensor name '{}' is too long".format(name))
+
+            data = bytearray(HEADER_SIZE + len(names) * SLOT_SIZE)
+            HEADER.pack_into(data, 0, MAGIC, VERSION, len(names), SLOT_SIZE)
+            for idx, name in enumerate(names):
+                SLOT.pack_into(
+                    data, HEADER_SIZE + idx * SLOT_SIZE, 0, 0, 0, name.encode()
+                )
+
+            # table is renamed into place once complete (readers never see it partial)
+            tmp_path = "{}.{}".format(path, os.getpid())
+            with open(tmp_path, "wb") as table_file:
+                table_file.write(data)
+            os.rename(tmp_path, path)
+
+            return cls._attach(path)
+
+    @classmethod
+    def attach(cls, path):
+        """Get sensor table if it exists
+        Returns:
+            SensorTable: shared sensor table, None if there is no table at path
+        """
+        with cls._tables_lock:
+            if path not in cls._tables and not os.path.exists(path):
+                return None
+            return cls._attach(path)
+
+    @classmethod
+    def _attach(cls, path):
+        """Map the table file (once per process)"""
+        table = cls._tables.get(path)
+        if table is not None and table.is_current():
+            return table
+
+        cls._tables[path] = cls(path, open(path, "r+b"))
+        return cls._tables[path]
+
+    @classmethod
+    def close_all(cls):
+        """Unmap all the tables of the process"""
+        with cls._tables_lock:
+            for table in cls._tables.values():
+                table.close()
+            cls._tables = {}
+
+    def is_current(self):
+        """False if the table file was removed or re-created (e.g. on reload)"""
+        try:
+            return os.path.samestat(os.fstat(self._file.fileno()), os.stat(self._path))
+        except (OSError, ValueError):
+            return False
+
+    def close(self):
+        """Unmap the table"""
+        self._mmap.close()
+        self._file.close()
+
+    def __contains__(self, name):
+        return name in self._offsets
+
+    @property
+    def path(self):
+        """Location of the table file"""
+        return self._path
+
+    @property
+    def names(self):
+        """Sensor names in slot order"""
+        return list(self._offsets)
+
+    def read(self, name):
+        """Consistent sensor value (retried while it is being written)"""
+        offset = self._offsets[name]
+        while True:
+            seq = SEQ.unpack_from(self._mmap, offset)[0]
+            if seq & 1:
+                continue
+
+            value = VALUE.unpack_from(self._mmap, offset + 8)[0]
+            if SEQ.unpack_from(self._mmap, offset)[0] == seq:
+                return value
+
+    def write(self, name, value):
+        """Update sensor value
+        Args:
+            name(str): sensor name
+            value(int|str): new value (see to_int)
+        """
+        offset = self._offsets[name]
+        value = to_int(value)
+
+        with self._write_lock:
+            seq = SEQ.unpack_from(self._mmap, offset)[0]
+            SEQ.pack_into(self._mmap, offset, (seq + 1) & 0xFFFFFFFF)
+            VALUE.pack_into(self._mmap, offset + 8, value)
+            SEQ.pack_into(self._mmap, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def is_file_backed(self, name):
+        """True if sensor value is also kept in the sensor file"""
+        return bool(FLAGS.unpack_from(self._mmap, self._offsets[name] + 4)[0])
+
+    def set_file_backed(self, name):
+        """Keep sensor value in the sensor file as well as in the table
+        (for sensors polled by ipmi_sim from the files)"""
+        offset = self._offsets[name] + 4
+        with self._write_lock:
+            flags = FLAGS.unpack_from(self._mmap, offset)[0]
+            FLAGS.pack_into(self._mmap, offset, flags | FLAG_FILE_BACKED)
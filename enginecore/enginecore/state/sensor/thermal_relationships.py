@@ -0,0 +1,393 @@
+"""Thermal relationships of a server kept in memory
+
+Thermal impacts (see Sensor._target_sensor) look up their relationship on every
+update to find out if it still exists & what its parameters are; relationships
+of the server are loaded once & refreshed only when they are updated or deleted
+(see IBMCServerStateManager.update_thermal_sensor_target & sensor_conf_th_channel),
+so thermal updates don't query the graph database.
+
+Temperatures of the storage components (drives, cache vaults) targeted by the
+relationships are kept in memory as well & written to the graph database in
+one query per batch of changes (see flush_storage_temperatures).
+"""
+import bisect
+import json
+import threading
+
+from enginecore.model.graph_reference import GraphReference
+
+
+class ThermalModel:
+    """Runtime mappings of a thermal relationship (e.g. {"10": 1, "50": 5})
+    compiled for lookups of the closest known point
+
+    Example:
+        model = ThermalModel('{"10": 1, "50": 5}')
+        model.approx(40) # -> 4 (proportional to the closest point)
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model(str|dict): json mappings of value -> impact
+        """
+        if isinstance(model, str):
+            model = json.loads(model)
+
+        if not model:
+            raise ValueError("Thermal model is empty!")
+
+        # ties between the equally close points go to the one listed first
+        points = sorted(
+            (int(key), idx, int(value))
+            for idx, (key, value) in enumerate(model.items())
+        )
+        self._keys = [key for key, _, _ in points]
+        self._order = [idx for _, idx, _ in points]
+        self._values = [value for _, _, value in points]
+
+    def _closest_point(self, current_value):
+        """Index of the model point closest to the value"""
+        idx = bisect.bisect_left(self._keys, current_value)
+        if idx == 0:
+            return 0
+        if idx == len(self._keys):
+            return idx - 1
+
+        below = current_value - self._keys[idx - 1]
+        above = self._keys[idx] - current_value
+        if below == above:
+            return min(idx - 1, idx, key=lambda i: self._order[i])
+        return idx - 1 if below < above else idx
+
+    def approx(self, current_value, inverse=False):
+        """Approximate value based on the model"""
+        idx = self._closest_point(current_value)
+        nbr_model_key, nbr_value = self._keys[idx], self._values[idx]
+
+        multiplier = int(nbr_model_key if inverse else current_value)
+        divisor = int(current_value if inverse else nbr_model_key)
+
+        return int((nbr_value * multiplier) / int(divisor))
+
+
+class ThermalRelationships:
+    """Thermal relationships (sensor->sensor, sensor->storage, cpu->sensor)
+    of one server, loaded from the graph database on the first lookup
+
+    Example:
+        th_rels = ThermalRelationships(server_key=1)
+        th_rels.sensor_rel("Ambient", "CPU_TEMP", "up") # -> {"rate": 5, ...}
+        th_rels.reload_sensor_rel("Ambient", "CPU_TEMP", "up") # on notification
+    """
+
+    def __init__(self, server_key, graph_ref=None):
+        self._server_key = server_key
+        self._graph_ref = graph_ref if graph_ref else GraphReference()
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        # incremented every time relationships change (see ThermalSolver)
+        self._version = 0
+        # relationships are advanced by the server's ThermalSolver
+        # instead of an impact per relationship (see SensorRepository)
+        self.vectorized = False
+
+        # (source, target, event) -> relationship
+        self._sensor_rels = {}
+        # (source, hd type, controller, target, event) -> relationship
+        self._storage_rels = {}
+        # target -> relationship
+        self._cpu_rels = {}
+
+        # (hd type, controller, target) -> temperature of the storage component
+        self._hd_temps = {}
+        # storage components with temperatures not written to the database yet
+        self._hd_updated = set()
+
+    @staticmethod
+    def _compile(rel):
+        """Parse runtime mappings of the relationship once"""
+        rel = dict(rel)
+        if "model" in rel and rel["model"]:
+            rel["model"] = ThermalModel(rel["model"])
+        return rel
+
+    def _load(self):
+        """Query all the thermal relationships of the server"""
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            with self._graph_ref.get_session() as session:
+                th_rels = GraphReference.get_thermal_relationships(
+                    session, self._server_key
+                )
+
+            for rel in th_rels["sensor"]:
+                key = (rel["source"], rel["target"]["name"], rel["rel"]["event"])
+                self._sensor_rels[key] = self._compile(rel["rel"])
+
+            for rel in th_rels["storage"]:
+                if rel["hd_type"] == "PhysicalDrive":
+                    target = rel["target"]["DID"]
+                else:
+                    target = rel["target"]["serialNumber"]
+
+                key = self._storage_key(
+                    rel["source"],
+                    rel["hd_type"],
+                    rel["controller"]["controllerNum"],
+                    target,
+                    rel["rel"]["event"],
+                )
+                self._storage_rels[key] = self._compile(rel["rel"])
+                self._hd_temps.setdefault(key[1:4], rel["target"].get("temperature", 0))
+
+            for rel in th_rels["cpu"]:
+                self._cpu_rels[rel["sensor"]["name"]] = self._compile(rel["rel"])
+
+            self._loaded = True
+            self._version += 1
+
+    def _load_storage_temperatures(self):
+        """Query temperatures of the storage components missing from memory
+        (components that became targets after relationships were loaded)"""
+        with self._graph_ref.get_session() as session:
+            hd_elements = GraphReference.get_all_hd_thermal_elements(
+                session, self._server_key
+            )
+
+        with self._lock:
+            for hd_element in hd_elements:
+                component = hd_element["component"]
+                if "DID" in component:
+                    hd_type, target = "PhysicalDrive", component["DID"]
+                else:
+                    hd_type, target = "CacheVault", component["serialNumber"]
+
+                hd_key = self._hd_key(
+                    hd_type, hd_element["controller"]["controllerNum"], target
+                )
+                self._hd_temps.setdefault(hd_key, component.get("temperature", 0))
+
+    @staticmethod
+    def _storage_key(source, hd_type, controller, target, event):
+        """Drive DIDs & cache vault serial numbers are looked up as strings"""
+        return (source, hd_type, int(controller), str(target), event)
+
+    @staticmethod
+    def _hd_key(hd_type, controller, target):
+        """Storage component as (hd type, controller, target)"""
+        return (hd_type, int(controller), str(target))
+
+    @property
+    def version(self):
+        """Version of the relationships (changes on every update or removal)"""
+        return self._version
+
+    def snapshot(self):
+        """All the relationships of the server at their current version
+        Returns:
+            tuple: version, sensor, storage & cpu relationships
+                   (dicts keyed as sensor_rel, storage_rel & cpu_rel arguments)
+        """
+        self._load()
+        with self._lock:
+            return (
+                self._version,
+                dict(self._sensor_rels),
+                dict(self._storage_rels),
+                dict(self._cpu_rels),
+            )
+
+    def sensor_targets(self, source):
+        """Sensors affected by the source sensor
+        Returns:
+            list: of (target name, event) tuples
+        """
+        self._load()
+        return [(t, e) for s, t, e in list(self._sensor_rels) if s == source]
+
+    def storage_targets(self, source):
+        """Storage components affected by the source sensor
+        Returns:
+            list: of (hd type, controller, target, event) tuples
+        """
+        self._load()
+        return [key[1:] for key in list(self._storage_rels) if key[0] == source]
+
+    def sensor_rel(self, source, target, event):
+        """Relationship between 2 sensors (None if it doesn't exist)"""
+        self._load()
+        return self._sensor_rels.get((source, target, event))
+
+    def storage_rel(self, source, hd_type, controller, target, event):
+        """Relationship between a sensor & a storage component
+        Args:
+            hd_type(str): CacheVault or PhysicalDrive
+            controller(int): controller number
+            target: serial number of the cache vault or DID of the drive
+        """
+        self._load()
+        return self._storage_rels.get(
+            self._storage_key(source, hd_type, controller, target, event)
+        )
+
+    def cpu_rel(self, target):
+        """Relationship between CPU load & a sensor"""
+        self._load()
+        return self._cpu_rels.get(target)
+
+    def storage_temperatures(self, hd_keys):
+        """Current temperatures of the storage components
+        Args:
+            hd_keys(list): of (hd type, controller, target) tuples
+        Returns:
+            list: temperatures ordered as hd_keys
+        """
+        self._load()
+        hd_keys = [self._hd_key(*hd_key) for hd_key in hd_keys]
+        if any(hd_key not in self._hd_temps for hd_key in hd_keys):
+            self._load_storage_temperatures()
+
+        with self._lock:
+            return [self._hd_temps.get(hd_key, 0) for hd_key in hd_keys]
+
+    def set_storage_temperatures(self, temperatures):
+        """Update temperatures of the storage components in memory
+        (written to the database by flush_storage_temperatures)
+        Args:
+            temperatures(dict): temperatures by (hd type, controller, target)
+        """
+        with self._lock:
+            for hd_key, temperature in temperatures.items():
+                hd_key = self._hd_key(*hd_key)
+                self._hd_temps[hd_key] = int(temperature)
+                self._hd_updated.add(hd_key)
+
+    def add_to_storage_temperature(self, hd_key, temp_change, limit):
+        """Add to temperature of the storage component
+        (see GraphReference.add_to_hd_component_temperature)
+        Args:
+            hd_key(tuple): storage component as (hd type, controller, target)
+            temp_change(int): value to be added to the target temperature
+            limit(dict): target temp cannot go beyond this limit (upper & lower)
+        Returns:
+            tuple: True if the temp value was updated & current temp value (updated)
+        """
+        current_temp = self.storage_temperatures([hd_key])[0]
+
+        new_temp = max(current_temp + temp_change, limit["lower"])
+        if "upper" in limit and limit["upper"]:
+            new_temp = min(new_temp, limit["upper"])
+
+        if new_temp == current_temp:
+            return False, current_temp
+
+        self.set_storage_temperatures({hd_key: new_temp})
+        return True, new_temp
+
+    def flush_storage_temperatures(self):
+        """Write updated temperatures of the storage components to the database
+        in one query
+        Returns:
+            int: number of the storage components written
+        """
+        with self._lock:
+            updated = [
+                {
+                    "hd_type": hd_type,
+                    "controller": controller,
+                    "target": int(target) if hd_type == "PhysicalDrive" else target,
+                    "temperature": self._hd_temps[(hd_type, controller, target)],
+                }
+                for hd_type, controller, target in sorted(self._hd_updated)
+            ]
+            self._hd_updated.clear()
+
+        if updated:
+            with self._graph_ref.get_session() as session:
+                GraphReference.set_hd_components_temperature(
+                    session, self._server_key, updated
+                )
+
+        return len(updated)
+
+    def reload_sensor_rel(self, source, target, event):
+        """Refresh relationship between 2 sensors after it was updated/deleted
+        Returns:
+            dict: relationship, None if it was deleted
+        """
+        self._load()
+        with self._graph_ref.get_session() as session:
+            rel_details = GraphReference.get_sensor_thermal_rel(
+                session,
+                self._server_key,
+                relationship={
+                    "source": source,
+                    "target": {"attribute": "name", "value": '"{}"'.format(target)},
+                    "event": event,
+                },
+            )
+
+        return self._refresh(
+            self._sensor_rels,
+            (source, target, event),
+            rel_details["rel"] if rel_details else None,
+        )
+
+    def reload_storage_rel(self, source, hd_type, controller, target, event):
+        """Refresh relationship between a sensor & a storage component
+        after it was updated/deleted
+        Returns:
+            dict: relationship, None if it was deleted
+        """
+        self._load()
+
+        if hd_type == "CacheVault":
+            target_attr, target_value = "serialNumber", '"{}"'.format(target)
+        else:
+            target_attr, target_value = "DID", target
+
+        with self._graph_ref.get_session() as session:
+            rel_details = GraphReference.get_sensor_thermal_rel(
+                session,
+                self._server_key,
+                relationship={
+                    "source": source,
+                    "target": {"attribute": target_attr, "value": target_value},
+                    "event": event,
+                },
+            )
+
+        return self._refresh(
+            self._storage_rels,
+            self._storage_key(source, hd_type, controller, target, event),
+            rel_details["rel"] if rel_details else None,
+        )
+
+    def reload_cpu_rel(self, target):
+        """Refresh relationship between CPU load & a sensor
+        after it was updated/deleted
+        Returns:
+            dict: relationship, None if it was deleted
+        """
+        self._load()
+        with self._graph_ref.get_session() as session:
+            rel = GraphReference.get_cpu_thermal_rel(session, self._server_key, target)
+
+        return self._refresh(self._cpu_rels, target, rel)
+
+    def _refresh(self, rels, key, rel):
+        """Replace (or remove) cached relationship"""
+        with self._lock:
+            if rel:
+                rels[key] = self._compile(rel)
+            else:
+                rels.pop(key, None)
+            self._version += 1
+            return rels.get(key)
@@ -0,0 +1,196 @@
+"""Thermal relationships (sensor->sensor, sensor->storage, cpu->sensor)
+of all the servers advanced by one thread
+
+Thermal impacts are generators yielding the number of simulated seconds
+till their next update (relationship rate, see Sensor._target_sensor);
+the scheduler keeps them in a heap ordered by the time of the next update,
+so the number of threads stays the same no matter how dense thermal models are
+or how many servers are running.
+"""
+import heapq
+import itertools
+import logging
+import threading
+
+from enginecore.tools.clock import CLOCK
+
+logger = logging.getLogger(__name__)
+
+
+class _ThermalTask:
+    """Scheduled thermal impact"""
+
+    def __init__(self, impact, owner, name, enabled):
+        self.impact = impact
+        self.owner = owner
+        self.name = name
+        self.enabled = enabled
+        self.done = False
+
+
+class ThermalScheduler:
+    """Runs thermal impacts when their relationship rate is due;
+    Impacts of disabled sources are parked till the source is resumed.
+    Scheduler thread is started on demand & exits once there are no impacts
+
+    Example:
+        THERMAL_SCHEDULER.schedule(sensor, impact, "s:[a]->t:[b]", sensor_event)
+        sensor_event.clear() # impacts of the sensor will be parked
+        sensor_event.set(); THERMAL_SCHEDULER.resume(sensor)
+        THERMAL_SCHEDULER.cancel(sensor)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # impacts are not cancelled while one of them is being updated
+        self._step_lock = threading.RLock()
+        # heap of (due time, sequence number, task)
+        self._queue = []
+        self._seq = itertools.count()
+        # owner -> its tasks
+        self._tasks = {}
+        # owner -> tasks waiting for the owner to be resumed
+        self._parked = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._num_steps = 0
+
+    def schedule(self, owner, impact, name, enabled):
+        """Run thermal impact until it is exhausted, the first update is done
+        right away (unless the source is disabled)
+        Args:
+            owner(object): source of the thermal impact (e.g. sensor)
+            impact(generator): thermal impact yielding seconds till its next update
+            name(str): human-readable name of the relationship
+            enabled(threading.Event): impact is parked while the event is cleared
+        """
+        task = _ThermalTask(impact, owner, name, enabled)
+
+        with self._lock:
+            self._tasks.setdefault(owner, []).append(task)
+            self._push(task, CLOCK.time())
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="thermal_scheduler"
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+        self._wakeup.set()
+
+    def resume(self, owner):
+        """Requeue parked impacts of the owner
+        (to be called once the owner's enabled event is set)"""
+        with self._lock:
+            parked = self._parked.pop(owner, [])
+            now = CLOCK.time()
+            for task in parked:
+                self._push(task, now)
+
+        if parked:
+            self._wakeup.set()
+
+    def cancel(self, owner):
+        """Stop all the thermal impacts of the owner
+        (waits for the update in progress to complete)"""
+        with self._step_lock:
+            with self._lock:
+                tasks = self._tasks.pop(owner, [])
+                self._parked.pop(owner, None)
+                for task in tasks:
+                    task.done = True
+
+            for task in tasks:
+                task.impact.close()
+
+        self._wakeup.set()
+
+    @property
+    def stats(self):
+        """Number of running & parked thermal impacts, updates done"""
+        return {
+            "impacts": sum(len(tasks) for tasks in self._tasks.values()),
+            "parked": sum(len(tasks) for tasks in self._parked.values()),
+            "steps": self._num_steps,
+        }
+
+    def _push(self, task, due):
+        heapq.heappush(self._queue, (due, next(self._seq), task))
+
+    def _run(self):
+        """Scheduler loop, exits when there are no impacts left"""
+        while True:
+            self._wakeup.clear()
+
+            with self._lock:
+                if not self._tasks:
+                    self._thread = None
+                    return
+
+                # cancelled tasks are removed lazily
+                while self._queue and self._queue[0][2].done:
+                    heapq.heappop(self._queue)
+                next_due = self._queue[0][0] if self._queue else None
+
+            # all the impacts are parked
+            if next_due is None:
+                self._wakeup.wait()
+                continue
+
+            timeout = next_due - CLOCK.time()
+            if timeout > 0 and CLOCK.wait(self._wakeup, timeout):
+                continue
+
+            self._run_due()
+
+    def _run_due(self):
+        """Update all the impacts that are due"""
+        now = CLOCK.time()
+
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > now:
+                    return
+
+                _, _, task = heapq.heappop(self._queue)
+                if task.done:
+                    continue
+
+                # checked under the lock so that resume cannot miss the task
+                if not task.enabled.is_set():
+                    self._parked.setdefault(task.owner, []).append(task)
+                    continue
+
+            with self._step_lock:
+                if not task.done:
+                    self._step(task, now)
+
+    def _step(self, task, now):
+        """Update one impact, exhausted (or failed) impacts are dropped"""
+        try:
+            delay = next(task.impact)
+        except StopIteration:
+            self._drop(task)
+            return
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Thermal impact %s failed", task.name)
+            self._drop(task)
+            return
+
+        self._num_steps += 1
+        with self._lock:
+            self._push(task, now + max(delay, 0))
+
+    def _drop(self, task):
+        """Remove finished impact"""
+        with self._lock:
+            task.done = True
+            tasks = self._tasks.get(task.owner, [])
+            if task in tasks:
+                tasks.remove(task)
+            if not tasks:
+                self._tasks.pop(task.owner, None)
+
+
+THERMAL_SCHEDULER = ThermalScheduler()
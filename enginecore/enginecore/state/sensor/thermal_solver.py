@@ -0,0 +1,315 @@
+"""Thermal solver advances all the thermal relationships of a server at once
+instead of updating one relationship at a time (see Sensor._target_sensor,
+Sensor._target_storage & Sensor._cpu_impact).
+
+Temperatures of the sensors & storage components (drives, cache vaults) involved
+in thermal relationships form a state vector; relationships are compiled into
+edge arrays (source index, target index, degrees, pauseAt bound, rate) and every
+step computes changes caused by all the relationships that are due as a single
+vectorized operation, changes are then accumulated per target.
+
+Storage temperatures stay in the solver between steps (carried over when the
+solver is re-compiled), only the changed ones are handed back to be written.
+
+Relationships are evaluated against the temperatures at the start of the step
+(impacts of the same step don't see each other's updates);
+runtime models (e.g. {"10": 1, "50": 5}) are looked up per relationship.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # the solver is an optional engine mode
+    np = None
+
+
+# cpu load impact is re-evaluated every 5 seconds (same as Sensor._cpu_impact)
+CPU_IMPACT_RATE = 5
+
+
+class _ThermalEdges:
+    """Compiled relationships of one kind (sensor->sensor or sensor->storage)"""
+
+    def __init__(self, keys, sources, targets, rels, previous=None):
+        """
+        Args:
+            keys(list): relationship keys (see ThermalRelationships.snapshot)
+            sources(list): indices of the source sensors
+            targets(list): indices of the targets
+            rels(list): relationship properties
+            previous(_ThermalEdges): edges compiled for the older version of
+                                     relationships (next updates are kept)
+        """
+        self.keys = keys
+        self.src = np.array(sources, dtype=np.intp)
+        self.dst = np.array(targets, dtype=np.intp)
+
+        self.heating = np.array([r["action"] == "increase" for r in rels], dtype=bool)
+        # runtime models are active while the source sensor is not 0
+        self.on_down = np.array(
+            [r["event"] == "down" and not r.get("model") for r in rels], dtype=bool
+        )
+        self.degrees = np.array([int(r.get("degrees") or 0) for r in rels])
+        # relationships without the bound are not paused
+        self.pause_at = np.array(
+            [math.inf if r.get("pauseAt") is None else r["pauseAt"] for r in rels],
+            dtype=float,
+        )
+        self.rate = np.array([int(r["rate"]) for r in rels], dtype=float)
+        self.models = [(i, r["model"]) for i, r in enumerate(rels) if r.get("model")]
+
+        # simulated time of the next update (new relationships are due right away)
+        prev_due = dict(zip(previous.keys, previous.next_due)) if previous else {}
+        self.next_due = np.array([prev_due.get(k, -math.inf) for k in keys])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def due(self, now):
+        """Mask of the relationships to be updated at the time"""
+        return self.next_due <= now
+
+    def active(self, due, values):
+        """Mask of the due relationships enabled by their source sensor status
+        Args:
+            due(numpy.ndarray): mask of the due relationships
+            values(numpy.ndarray): sensor values
+        """
+        src_values = values[self.src]
+        return due & np.where(self.on_down, src_values == 0, src_values != 0)
+
+    def step_degrees(self, values):
+        """Degrees of the relationships (runtime models use source sensor value)"""
+        if not self.models:
+            return self.degrees
+
+        degrees = self.degrees.copy()
+        for i, model in self.models:
+            degrees[i] = model.approx(int(values[self.src[i]]) * 10)
+        return degrees
+
+    def advance(self, due, now):
+        """Schedule next updates of the due relationships"""
+        self.next_due[due] = now + self.rate[due]
+
+
+class ThermalSolver:
+    """Compiled thermal relationships of a server capable of updating
+    temperatures of all the thermal targets in one step;
+
+    Example:
+        solver = ThermalSolver(th_rels)
+        values, hd_updates = solver.step(now, values, ambient, cpu_load)
+        th_rels.set_storage_temperatures(hd_updates)
+        delay = solver.next_due() - now
+    """
+
+    def __init__(self, th_rels, previous=None):
+        """Compile relationships into edge arrays
+        Args:
+            th_rels(ThermalRelationships): thermal relationships of the server
+            previous(ThermalSolver): solver compiled for the older version of
+                                     relationships (its schedule is carried over)
+        Raises:
+            ImportError: if numpy is not installed
+        """
+
+        if np is None:
+            raise ImportError("numpy is required by the thermal solver")
+
+        self._version, sensor_rels, storage_rels, cpu_rels = th_rels.snapshot()
+
+        names = set()
+        for source, target, _ in sensor_rels:
+            names.update((source, target))
+        names.update(key[0] for key in storage_rels)
+        names.update(cpu_rels)
+
+        self._sensor_names = sorted(names)
+        index = {name: i for i, name in enumerate(self._sensor_names)}
+
+        # storage components: (hd type, controller, target)
+        self._storage_keys = sorted({key[1:4] for key in storage_rels})
+        hd_index = {hd_key: i for i, hd_key in enumerate(self._storage_keys)}
+
+        # temperatures of the storage components (new ones are looked up once)
+        prev_temps = (
+            dict(zip(previous._storage_keys, previous._hd_temps.tolist()))
+            if previous
+            else {}
+        )
+        new_keys = [k for k in self._storage_keys if k not in prev_temps]
+        if new_keys:
+            prev_temps.update(zip(new_keys, th_rels.storage_temperatures(new_keys)))
+        self._hd_temps = np.array(
+            [prev_temps[k] for k in self._storage_keys], dtype=np.int64
+        )
+
+        sensor_keys = list(sensor_rels)
+        self._sensor_edges = _ThermalEdges(
+            sensor_keys,
+            [index[s] for s, _, _ in sensor_keys],
+            [index[t] for _, t, _ in sensor_keys],
+            [sensor_rels[k] for k in sensor_keys],
+            previous._sensor_edges if previous else None,
+        )
+
+        storage_keys = list(storage_rels)
+        self._storage_edges = _ThermalEdges(
+            storage_keys,
+            [index[k[0]] for k in storage_keys],
+            [hd_index[k[1:4]] for k in storage_keys],
+            [storage_rels[k] for k in storage_keys],
+            previous._storage_edges if previous else None,
+        )
+
+        # cpu load -> sensor (impact of the previous step is replaced by the new one)
+        self._cpu_targets = list(cpu_rels)
+        self._cpu_dst = np.array([index[t] for t in self._cpu_targets], dtype=np.intp)
+        self._cpu_models = [cpu_rels[t]["model"] for t in self._cpu_targets]
+
+        prev_impact = (
+            dict(zip(previous._cpu_targets, previous._cpu_impact)) if previous else {}
+        )
+        self._cpu_impact = np.array(
+            [prev_impact.get(t, 0) for t in self._cpu_targets], dtype=np.int64
+        )
+        self._cpu_next_due = (
+            previous._cpu_next_due if previous and previous._cpu_targets else -math.inf
+        )
+
+    @property
+    def version(self):
+        """Version of the relationships solver was compiled for"""
+        return self._version
+
+    @property
+    def sensor_names(self):
+        """Names of the sensors in the state vector"""
+        return self._sensor_names
+
+    @property
+    def storage_keys(self):
+        """Storage components in the state vector as (hd type, controller, target)"""
+        return self._storage_keys
+
+    @property
+    def num_relationships(self):
+        """Number of the compiled relationships"""
+        return (
+            len(self._sensor_edges) + len(self._storage_edges) + len(self._cpu_targets)
+        )
+
+    def next_due(self):
+        """Time of the next update (None if there are no relationships)"""
+        due = [edges.next_due.min() for edges in self._edges() if len(edges)]
+        if self._cpu_targets:
+            due.append(self._cpu_next_due)
+        return min(due) if due else None
+
+    def sensors_due(self, now):
+        """True if any of the sensors are to be updated at the time"""
+        return bool(self._sensor_edges.due(now).any()) or self._cpu_due(now)
+
+    def storage_due(self, now):
+        """True if any of the storage components are to be updated at the time"""
+        return bool(self._storage_edges.due(now).any())
+
+    @property
+    def storage_temperatures(self):
+        """Current temperatures of the storage components ordered as storage_keys"""
+        return self._hd_temps
+
+    def step(self, now, values, ambient, cpu_load=0):
+        """Apply all the relationships that are due
+        Args:
+            now(float): simulated time of the step
+            values(numpy.ndarray): sensor values ordered as sensor_names
+            ambient(int): current room temperature
+            cpu_load(int): current cpu load of the server (percentage)
+        Returns:
+            tuple: new sensor values & temperatures of the storage components
+                   changed by the step (by (hd type, controller, target))
+        """
+
+        values = np.asarray(values, dtype=np.int64)
+        new_values = values + self._sensor_delta(now, values, ambient)
+
+        if self._cpu_due(now):
+            impact = np.array([m.approx(cpu_load) for m in self._cpu_models])
+            delta = impact - self._cpu_impact
+            changed = np.zeros(len(values), dtype=bool)
+            changed[self._cpu_dst[delta != 0]] = True
+
+            new_values += np.bincount(
+                self._cpu_dst, weights=delta, minlength=len(values)
+            ).astype(np.int64)
+            # cpu impact doesn't cool the sensor below the room temperature
+            new_values[changed] = np.maximum(new_values[changed], int(ambient))
+
+            self._cpu_impact = impact
+            self._cpu_next_due = now + CPU_IMPACT_RATE
+
+        hd_updates = {}
+        if self.storage_due(now):
+            hd_temps = self._hd_temps
+            self._hd_temps = hd_temps + self._storage_delta(
+                now, values, ambient, hd_temps
+            )
+            hd_updates = {
+                self._storage_keys[i]: int(self._hd_temps[i])
+                for i in np.flatnonzero(self._hd_temps != hd_temps)
+            }
+
+        return new_values, hd_updates
+
+    def _edges(self):
+        return self._sensor_edges, self._storage_edges
+
+    def _cpu_due(self, now):
+        return bool(self._cpu_targets) and self._cpu_next_due <= now
+
+    def _sensor_delta(self, now, values, ambient):
+        """Sensor changes caused by sensor->sensor relationships (bounded by pauseAt,
+        cooling never goes below the room temperature)"""
+        edges = self._sensor_edges
+        due = edges.due(now)
+        if not due.any():
+            return np.zeros(len(values), dtype=np.int64)
+
+        active = edges.active(due, values)
+        degrees = edges.step_degrees(values)
+        current = values[edges.dst]
+
+        pause_at = np.where(
+            edges.heating, edges.pause_at, np.maximum(edges.pause_at, ambient)
+        )
+        heat = np.clip(np.minimum(degrees, pause_at - current), 0, None)
+        cool = np.clip(np.minimum(degrees, current - pause_at), 0, None)
+        edge_delta = np.where(edges.heating, heat, -cool) * active
+
+        edges.advance(due, now)
+        return np.bincount(edges.dst, weights=edge_delta, minlength=len(values)).astype(
+            np.int64
+        )
+
+    def _storage_delta(self, now, values, ambient, hd_temps):
+        """Storage temperature changes caused by sensor->storage relationships
+        (heating is bounded by pauseAt, cooling is done by 1° at a time,
+        temperature doesn't go below the room temperature)"""
+        edges = self._storage_edges
+        due = edges.due(now)
+
+        active = edges.active(due, values)
+        change = np.where(edges.heating, edges.step_degrees(values), -1)
+        # storage heating is not bounded if pauseAt is not set (or 0)
+        upper = np.where(edges.heating & (edges.pause_at != 0), edges.pause_at, np.inf)
+        current = hd_temps[edges.dst]
+
+        new_temps = np.minimum(np.maximum(current + change, ambient), upper)
+        edge_delta = (new_temps - current) * active
+
+        edges.advance(due, now)
+        return np.bincount(
+            edges.dst, weights=edge_delta, minlength=len(hd_temps)
+        ).astype(np.int64)
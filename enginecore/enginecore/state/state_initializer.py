@@ -3,6 +3,7 @@ import os
 import subprocess
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 import redis
 
@@ -33,12 +34,16 @@ def configure_env(relative=False):
         ipmi_templ_path = os.path.abspath("ipmi_template")
         storcli_templ_path = os.path.abspath("storcli_template")
         lua_script_path = os.path.join("script", "snmppub.lua")
+        snmp_variation_path = os.path.abspath(os.path.join("script", "variation"))
     else:
         share_dir = os.path.join(os.sep, "usr", "share", "simengine")
         static_path = os.path.join(share_dir, "data")
         ipmi_templ_path = os.path.join(share_dir, "enginecore", "ipmi_template")
         storcli_templ_path = os.path.join(share_dir, "enginecore", "storcli_template")
         lua_script_path = os.path.join(share_dir, "enginecore", "script", "snmppub.lua")
+        snmp_variation_path = os.path.join(
+            share_dir, "enginecore", "script", "variation"
+        )
 
     os.environ["SIMENGINE_STATIC_DATA"] = os.environ.get(
         "SIMENGINE_STATIC_DATA", static_path
@@ -49,6 +54,9 @@ def configure_env(relative=False):
     os.environ["SIMENGINE_STORCLI_TEMPL"] = os.environ.get(
         "SIMENGINE_STORCLI_TEMPL", storcli_templ_path
     )
+    os.environ["SIMENGINE_SNMP_VARIATION"] = os.environ.get(
+        "SIMENGINE_SNMP_VARIATION", snmp_variation_path
+    )
     os.environ["SIMENGINE_SOCKET_HOST"] = os.environ.get(
         "SIMENGINE_SOCKET_HOST", "0.0.0.0"
     )
@@ -87,8 +95,75 @@ def clear_temp():
         os.makedirs(simengine_temp)
 
 
+# max number of keys written by one command when loading .snmprec data
+SNMPREC_BATCH_SIZE = 5000
+# number of assets loaded in parallel
+INIT_WORKERS = 8
+
+
+def read_snmprec(static_oid_file):
+    """Parse static .snmprec file
+    Args:
+        static_oid_file(str): file name (relative to SIMENGINE_STATIC_DATA)
+    Returns:
+        list: tuples of OID padded in SNMPSim format (without asset key),
+              OID, data type & value ordered by padded OID
+    """
+    static_oid_path = os.path.join(
+        os.environ.get("SIMENGINE_STATIC_DATA"), static_oid_file
+    )
+
+    snmprec = []
+    with open(static_oid_path, "r") as sfile_handler:
+        for line in sfile_handler:
+            oid, dtype, value = line.replace("\n", "").split("|")
+            snmprec.append((format_as_redis_key("", oid), oid, dtype, value))
+
+    return sorted(snmprec)
+
+
+def _load_snmprec(redis_store, asset_key, snmprec, graph_oids):
+    """Write .snmprec data of an asset in the SNMPSim format
+    (OID values & their ordering) in one round trip;
+    OID keys are also indexed in a sorted set so that snmppub.lua
+    can answer GETNEXT/GETBULK requests with a single lexicographical range query
+    Args:
+        redis_store: redis client
+        asset_key(str): key of the asset
+        snmprec(list): parsed .snmprec file (see read_snmprec)
+        graph_oids(dict): OIDs defined in the graph db overriding snmprec values
+    """
+    formatted_key = asset_key.zfill(10)
+    ordering_key = formatted_key + "-oids_ordering"
+    index_key = formatted_key + "-oids_index"
+
+    oid_values = {}
+    for padded_oid, oid, dtype, value in snmprec:
+        if oid in graph_oids:
+            dtype = graph_oids[oid]["dtype"]
+            value = graph_oids[oid]["value"]
+
+        oid_values[formatted_key + padded_oid] = "{}|{}".format(dtype, value)
+
+    # keys are already ordered (snmprec is sorted by padded OID)
+    keys = list(oid_values)
+
+    pipe = redis_store.pipeline(transaction=False)
+    pipe.delete(ordering_key, index_key)
+    for idx in range(0, len(keys), SNMPREC_BATCH_SIZE):
+        batch = keys[idx : idx + SNMPREC_BATCH_SIZE]
+        pipe.mset({k: oid_values[k] for k in batch})
+        pipe.rpush(ordering_key, *batch)
+        pipe.zadd(index_key, dict.fromkeys(batch, 0))
+    pipe.rpush(asset_key, formatted_key)
+    pipe.execute()
+
+
 def initialize(force_snmp_init=False):
-    """ Initialize redis state using topology defined in the graph db """
+    """ Initialize redis state using topology defined in the graph db;
+    Static .snmprec files are parsed once per device model & loaded for
+    all the SNMP devices in parallel
+    """
 
     graph_ref = GraphReference()
     redis_store = redis.StrictRedis(host="localhost", port=6379)
@@ -100,51 +175,63 @@ def initialize(force_snmp_init=False):
             return asset, collect(oid) as oids
             """
         )
-
-    for record in results:
-        asset_type = record["asset"].get("type")
-        asset_key = str(record["asset"].get("key"))
-
-        init_from_snmprec = (
-            not redis_store.exists("{}-{}:state".format(asset_key, asset_type))
-        ) or force_snmp_init
-        redis_store.set("{}-{}:state".format(asset_key, asset_type), 1)
-        formatted_key = asset_key.zfill(10)
-        temp_ordering_key = formatted_key + "-temp_oids_ordering"
-
-        graph_oids = {}
-        for oid in record["oids"]:  # loop over oids that are defined in the graph db
-            graph_oids[oid.get("OID")] = {
-                "dtype": oid.get("dataType"),
-                "value": oid.get("defaultValue"),
-            }
-
-        # Set-up in the SNMPSim format
-        if "SNMPSim" in record["asset"].labels and record["oids"] and init_from_snmprec:
+        records = list(results)
+
+    state_keys = [
+        "{}-{}:state".format(r["asset"].get("key"), r["asset"].get("type"))
+        for r in records
+    ]
+
+    # check which assets were initialized before & set their states
+    pipe = redis_store.pipeline(transaction=False)
+    for state_key in state_keys:
+        pipe.exists(state_key)
+    initialized = pipe.execute()
+
+    if state_keys:
+        redis_store.mset({state_key: 1 for state_key in state_keys})
+
+    # parsed .snmprec files by file name
+    snmprec_files = {}
+    loads = []
+
+    with ThreadPoolExecutor(max_workers=INIT_WORKERS) as executor:
+        for record, was_initialized in zip(records, initialized):
+            init_from_snmprec = not was_initialized or force_snmp_init
+
+            # Set-up in the SNMPSim format
+            if not (
+                "SNMPSim" in record["asset"].labels
+                and record["oids"]
+                and init_from_snmprec
+            ):
+                continue
+
+            graph_oids = {}
+            for oid in record["oids"]:  # loop over oids defined in the graph db
+                graph_oids[oid.get("OID")] = {
+                    "dtype": oid.get("dataType"),
+                    "value": oid.get("defaultValue"),
+                }
 
             # Read a file containing static .snmprec data
             static_oid_file = record["asset"].get("staticOidFile")
-            static_oid_path = os.path.join(
-                os.environ.get("SIMENGINE_STATIC_DATA"), static_oid_file
+            if static_oid_file not in snmprec_files:
+                snmprec_files[static_oid_file] = read_snmprec(static_oid_file)
+
+            loads.append(
+                executor.submit(
+                    _load_snmprec,
+                    redis_store,
+                    str(record["asset"].get("key")),
+                    snmprec_files[static_oid_file],
+                    graph_oids,
+                )
             )
 
-            with open(static_oid_path, "r") as sfile_handler:
-                for line in sfile_handler:
-
-                    oid, dtype, value = line.replace("\n", "").split("|")
-                    if oid in graph_oids:
-                        dtype = graph_oids[oid]["dtype"]
-                        value = graph_oids[oid]["value"]
-
-                    key_and_oid = format_as_redis_key(formatted_key, oid)
-                    redis_store.lpush(temp_ordering_key, key_and_oid)
-                    redis_store.set(key_and_oid, "{}|{}".format(dtype, value))
-
-            redis_store.sort(
-                temp_ordering_key, store=formatted_key + "-oids_ordering", alpha=True
-            )
-            redis_store.delete(temp_ordering_key)
-            redis_store.rpush(asset_key, formatted_key)
+        # re-raise loading errors
+        for load in loads:
+            load.result()
 
 
 if __name__ == "__main__":
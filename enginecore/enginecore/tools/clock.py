@@ -0,0 +1,149 @@
+"""Simulation clock shared by the engine threads (battery drain/charge loops,
+room temperature & voltage updates, sensor thermal loops, asset power delays etc.)
+
+Clock can run in one of the modes:
+    - real: clock follows wall time
+    - scaled: simulated time passes 'speed' times faster than wall time
+    - discrete: discrete-event mode, sleeping threads are woken up in order
+      of their deadlines & simulated time jumps straight to the next deadline
+      (scenarios run as fast as possible)
+"""
+import heapq
+import itertools
+import threading
+import time
+from enum import Enum
+
+
+class ClockMode(Enum):
+    """Supported clock modes"""
+
+    real = 1
+    scaled = 2
+    discrete = 3
+
+
+class Clock:
+    """Pluggable clock (see CLOCK)
+
+    Example:
+        CLOCK.configure(ClockMode.scaled, speed=100)
+        CLOCK.sleep(60) # returns in 0.6 seconds
+        CLOCK.wait(stop_event, 1) # same as stop_event.wait(1) in real mode
+    """
+
+    # wall time discrete clock waits for other threads to go to sleep
+    # (with an earlier deadline) before jumping to the next deadline
+    settle_time = 0.005
+
+    def __init__(self, mode=ClockMode.real, speed=1):
+        self._cond = threading.Condition()
+        self._sleepers = []
+        self._sleeper_ids = itertools.count()
+        self._mode = ClockMode.real
+        self._speed = 1
+        self._now = time.time()
+        self._real_start = time.monotonic()
+        self.configure(mode, speed)
+
+    def __str__(self):
+        return "Clock [{0.mode.name}] x{0.speed}".format(self)
+
+    @property
+    def mode(self):
+        """Clock mode (see ClockMode)"""
+        return self._mode
+
+    @property
+    def speed(self):
+        """How many times simulated time passes faster than the wall time
+        (scaled mode only)"""
+        return self._speed
+
+    def configure(self, mode, speed=1):
+        """Switch clock mode, simulated time continues from the current value
+        Args:
+            mode(ClockMode): new clock mode
+            speed(float): speed factor for the scaled mode (e.g. x10, x100)
+        """
+        if speed <= 0:
+            raise ValueError("Clock speed must be positive!")
+
+        with self._cond:
+            self._now = self.time()
+            self._real_start = time.monotonic()
+            self._mode = mode
+            self._speed = speed if mode == ClockMode.scaled else 1
+            self._cond.notify_all()
+
+    def time(self):
+        """Current simulated time (seconds since the epoch)"""
+        if self._mode == ClockMode.real:
+            return time.time()
+
+        if self._mode == ClockMode.scaled:
+            return self._now + (time.monotonic() - self._real_start) * self._speed
+
+        return self._now
+
+    def sleep(self, seconds):
+        """Suspend calling thread for the amount of simulated seconds"""
+        self.wait(None, seconds)
+
+    def wait(self, event, timeout):
+        """Block until event is set or timeout (in simulated seconds) expires
+        Args:
+            event(threading.Event): event to wait for (None to sleep)
+            timeout(float): max number of simulated seconds to wait
+        Returns:
+            bool: True if event is set
+        """
+        if self._mode == ClockMode.discrete:
+            return self._wait_discrete(event, timeout)
+
+        timeout = max(timeout, 0) / self._speed
+        if event is None:
+            time.sleep(timeout)
+            return False
+
+        return event.wait(timeout)
+
+    def _wait_discrete(self, event, timeout):
+        """Wait till all the sleepers with earlier deadlines are woken up,
+        then jump to this sleeper's deadline"""
+
+        with self._cond:
+            sleeper = (self._now + max(timeout, 0), next(self._sleeper_ids))
+            heapq.heappush(self._sleepers, sleeper)
+
+            while True:
+                if event is not None and event.is_set():
+                    self._sleepers.remove(sleeper)
+                    heapq.heapify(self._sleepers)
+                    self._cond.notify_all()
+                    return True
+
+                # clock mode was switched while sleeping
+                if self._mode != ClockMode.discrete:
+                    self._sleepers.remove(sleeper)
+                    heapq.heapify(self._sleepers)
+                    break
+
+                if self._sleepers[0] is sleeper and not self._cond.wait(
+                    self.settle_time
+                ):
+                    # no other thread went to sleep in the meantime
+                    if self._sleepers[0] is sleeper:
+                        heapq.heappop(self._sleepers)
+                        self._now = max(self._now, sleeper[0])
+                        self._cond.notify_all()
+                        return event is not None and event.is_set()
+                elif self._sleepers[0] is not sleeper:
+                    # events set by other threads are polled
+                    self._cond.wait(self.settle_time)
+
+        # continue waiting in real/scaled mode
+        return self.wait(event, max(sleeper[0] - self.time(), 0))
+
+
+CLOCK = Clock()
@@ -10,6 +10,8 @@ import pickle
 import json
 import codecs
 
+from enginecore.tools.clock import CLOCK
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,7 +55,7 @@ class Recorder:
                 self._actions.append(
                     {
                         "work": functools.update_wrapper(partial_func, work),
-                        "time": dt.now(),
+                        "time": dt.fromtimestamp(CLOCK.time()),
                     }
                 )
             return work(asset_self, *f_args, **f_kwargs)
@@ -256,7 +258,7 @@ class Recorder:
             if next_action:
                 next_delay = (next_action["time"] - action["time"]).seconds
                 logger.info("Paused for %s seconds...", next_delay)
-                time.sleep(next_delay)
+                CLOCK.sleep(next_delay)
 
         self._replaying = False
         self.enabled = pre_replay_enabled_status
@@ -0,0 +1,286 @@
+"""In-process read-through cache of asset state stored in Redis
+
+Asset state properties (power status, load, input voltage, UPS battery & OIDs
+such as UPS transfer reason) are read from the store on every access;
+StateCache serves repeated reads from memory while staying coherent:
+    - writes made through the cache update cached values;
+    - keys updated by other processes (e.g. snmpsimd or simengine-cli)
+      are invalidated by Redis keyspace notifications.
+Nothing is cached while keyspace notifications are not being received.
+"""
+import logging
+import threading
+
+from enginecore.tools.write_buffer import encode_value
+
+logger = logging.getLogger(__name__)
+
+
+class StateCache:
+    """Redis store proxy caching values of the asset state keys
+
+    Example:
+        store = StateCache(redis.StrictRedis())
+        store.get("1-outlet:state") # hits redis
+        store.get("1-outlet:state") # served from memory
+        store.stats # -> {"size": 1, "hits": 1, "misses": 1, "listening": True}
+    """
+
+    # suffixes of the asset state keys ({key}-{type}:state etc.)
+    state_suffixes = (":state", ":load", ":in-voltage", ":battery")
+
+    # keyspace events required for invalidation: keyspace channel (K),
+    # string commands ($), generic commands (g) & expired keys (x)
+    keyspace_events = "K$gx"
+
+    def __init__(self, store, listen=True):
+        """
+        Args:
+            store: redis client
+            listen(bool): invalidate keys updated by other redis clients
+                          (nothing is cached if not listening)
+        """
+        self._store = store
+        self._lock = threading.Lock()
+        self._values = {}
+        # bumped on every update so that values read before the update
+        # don't get cached
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+
+        self._enabled = True
+        self._listening = False
+        self._stop_event = threading.Event()
+        self._listener = None
+
+        if listen:
+            self._start_listener()
+
+    @property
+    def store(self):
+        """Redis client the values are read from"""
+        return self._store
+
+    @property
+    def stats(self):
+        """Cache size, number of hits & misses"""
+        with self._lock:
+            return {
+                "size": len(self._values),
+                "hits": self._hits,
+                "misses": self._misses,
+                "listening": self._listening,
+            }
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def _start_listener(self):
+        """Subscribe to keyspace notifications & start invalidating keys"""
+        if not hasattr(self._store, "pubsub"):
+            logger.warning("Store does not support pub/sub, state won't be cached!")
+            return
+
+        flags = self._store.config_get("notify-keyspace-events").get(
+            "notify-keyspace-events", ""
+        )
+        # 'A' is an alias for all the event types except 'K' & 'E'
+        missing = [
+            f
+            for f in self.keyspace_events
+            if f not in flags and not ("A" in flags and f != "K")
+        ]
+        if missing:
+            self._store.config_set("notify-keyspace-events", flags + "".join(missing))
+
+        pubsub = self._store.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe("__keyspace@*__:*")
+
+        self._listening = True
+        self._listener = threading.Thread(
+            target=self._listen, args=(pubsub,), name="state_cache", daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self, pubsub):
+        """Invalidate keys updated in the store"""
+        try:
+            while not self._stop_event.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message["type"] == "pmessage":
+                    self.invalidate(message["channel"].decode().split(":", 1)[1])
+        except Exception:  # pylint: disable=broad-except
+            # cached values cannot be trusted without notifications
+            logger.exception("Lost keyspace notifications, state cache is disabled!")
+            with self._lock:
+                self._enabled = False
+        finally:
+            # values cannot be invalidated anymore
+            with self._lock:
+                self._listening = False
+                self._values.clear()
+            pubsub.close()
+
+    def _cacheable(self, name):
+        """Check if key value can be cached
+        (values are cached only while updates made by other processes
+        invalidate them)"""
+        if not self._listening:
+            return False
+
+        if isinstance(name, bytes):
+            name = name.decode()
+
+        if name.endswith(self.state_suffixes):
+            return self._enabled
+
+        # oids are updated by snmpsimd ({zero-padded key}-{padded oid})
+        return name[10:11] == "-" and name[:10].isdigit()
+
+    def _update(self, name, value):
+        """Cache value written to the store (or drop it if value is None)"""
+        with self._lock:
+            self._generation += 1
+            if value is None or not self._enabled or not self._listening:
+                self._values.pop(name, None)
+            else:
+                self._values[name] = encode_value(value)
+
+    def invalidate(self, name=None):
+        """Drop cached key value (or all the values if key is not provided)"""
+        with self._lock:
+            self._generation += 1
+            if name is None:
+                self._values.clear()
+            else:
+                self._values.pop(name, None)
+
+    def get(self, name):
+        """Get key value (cached value if there's one)"""
+        if not self._cacheable(name):
+            return self._store.get(name)
+
+        with self._lock:
+            if name in self._values:
+                self._hits += 1
+                return self._values[name]
+            self._misses += 1
+            generation = self._generation
+
+        value = self._store.get(name)
+        self._cache_read(generation, [(name, value)])
+        return value
+
+    def mget(self, keys, *args):
+        """Get values of multiple keys (store is queried for the keys that
+        are not cached)"""
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        keys.extend(args)
+
+        values = {}
+        with self._lock:
+            for key in keys:
+                if key in self._values:
+                    values[key] = self._values[key]
+            self._hits += len(values)
+            self._misses += len(keys) - len(values)
+            generation = self._generation
+
+        missing = [k for k in keys if k not in values]
+        if missing:
+            stored = list(zip(missing, self._store.mget(missing)))
+            values.update(stored)
+            self._cache_read(
+                generation, [(k, v) for k, v in stored if self._cacheable(k)]
+            )
+
+        return [values[k] for k in keys]
+
+    def _cache_read(self, generation, key_values):
+        """Cache values read from the store unless keys were updated in the meantime"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            if not self._enabled or not self._listening:
+                return
+
+            for key, value in key_values:
+                if value is not None:
+                    self._values[key] = value
+
+    def set(self, name, value, *args, **kwargs):
+        """Set key value"""
+        result = self._store.set(name, value, *args, **kwargs)
+        if self._cacheable(name):
+            # values set with extra options (e.g. nx) are re-read
+            self._update(name, None if args or kwargs else value)
+        return result
+
+    def mset(self, mapping):
+        """Set multiple key values"""
+        result = self._store.mset(mapping)
+        for name, value in mapping.items():
+            if self._cacheable(name):
+                self._update(name, value)
+        return result
+
+    def delete(self, *names):
+        """Remove keys"""
+        result = self._store.delete(*names)
+        for name in names:
+            self._update(name, None)
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """Pipeline updating cached values once it is executed"""
+        return CachedPipeline(self, self._store.pipeline(transaction, shard_hint))
+
+    def close(self):
+        """Stop listening to keyspace notifications"""
+        self._stop_event.set()
+        if self._listener:
+            self._listener.join()
+
+
+class CachedPipeline:
+    """Pipeline proxy applying SET & MSET commands to the state cache
+    after the pipeline is executed"""
+
+    def __init__(self, cache, pipe):
+        self._cache = cache
+        self._pipe = pipe
+        self._updates = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._updates = []
+        return self._pipe.__exit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    def set(self, name, value, *args, **kwargs):
+        """Buffer SET command"""
+        self._pipe.set(name, value, *args, **kwargs)
+        self._updates.append((name, None if args or kwargs else value))
+        return self
+
+    def mset(self, mapping):
+        """Buffer MSET command"""
+        self._pipe.mset(mapping)
+        self._updates.extend(mapping.items())
+        return self
+
+    def execute(self):
+        """Send buffered commands & update cached values"""
+        updates, self._updates = self._updates, []
+        result = self._pipe.execute()
+
+        for name, value in updates:
+            if self._cache._cacheable(name):  # pylint: disable=protected-access
+                self._cache._update(name, value)  # pylint: disable=protected-access
+
+        return result
@@ -0,0 +1,361 @@
+"""Engine iteration tracing: records what happened during each power/thermal
+iteration (hops through hardware assets, branch forks & completions,
+Redis & Neo4j calls) and aggregates latency histograms per asset type & handler.
+
+Tracing is cheap enough to stay enabled: only timestamps & counters are
+collected on the hot path, a limited number of recent traces is retained.
+Store calls are counted per thread so calls made by iterations running
+concurrently (in different power domains) are not mixed up.
+"""
+import bisect
+import collections
+import threading
+import time
+
+import redis
+
+
+class LatencyHistogram:
+    """Latency distribution with fixed (log-like) millisecond buckets"""
+
+    buckets = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    @property
+    def count(self):
+        """Number of recorded samples"""
+        return self._count
+
+    def add(self, latency):
+        """Record new sample
+        Args:
+            latency(float): duration in seconds
+        """
+        latency_ms = latency * 1000
+        self._counts[bisect.bisect_left(self.buckets, latency_ms)] += 1
+        self._count += 1
+        self._total += latency_ms
+        self._max = max(self._max, latency_ms)
+
+    def percentile(self, pct):
+        """Get approximate percentile (upper bound of the bucket it falls into)
+        Args:
+            pct(float): percentile in range of (0, 100]
+        Returns:
+            float: latency in ms (None if histogram is empty)
+        """
+        if not self._count:
+            return None
+
+        threshold = self._count * pct / 100
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self._counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(bucket, self._max)
+
+        return self._max
+
+    def to_dict(self):
+        """Histogram summary (latencies are in ms)"""
+        return {
+            "count": self._count,
+            "mean": self._total / self._count if self._count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self._max,
+            "buckets": dict(zip([*map(str, self.buckets), "inf"], self._counts)),
+        }
+
+
+class IterationTrace:
+    """Trace of a single engine iteration from the moment it gets queued
+    till its completion"""
+
+    def __init__(self, iteration, tracer):
+        self._iteration = iteration
+        self._tracer = tracer
+        self.iteration_type = type(iteration).__name__
+
+        self.queued_at = time.perf_counter()
+        self.launched_at = None
+        self.completed_at = None
+
+        # (asset key, asset type, handler, start, end, redis calls, neo4j calls)
+        self.hops = []
+        # (fork/complete, branch type, number of branches, time)
+        self.branch_points = []
+
+        self._lock = threading.Lock()
+        self.redis_calls = 0
+        self.neo4j_calls = 0
+
+    @property
+    def tracer(self):
+        """Tracer this trace belongs to"""
+        return self._tracer
+
+    def _add_calls(self, redis_calls, neo4j_calls):
+        with self._lock:
+            self.redis_calls += redis_calls
+            self.neo4j_calls += neo4j_calls
+
+    def launched(self):
+        """Iteration was dequeued & is being launched
+        (store calls made by this thread are counted till launch_returned)"""
+        self.launched_at = time.perf_counter()
+        self._tracer.start_counting()
+
+    def launch_returned(self):
+        """Iteration launch is over"""
+        self._add_calls(*self._tracer.stop_counting())
+
+    def completed(self):
+        """Iteration is done"""
+        self.completed_at = time.perf_counter()
+
+    def hop_started(self):
+        """Hardware asset started processing an event
+        (store calls made by this thread are counted till hop is recorded)"""
+        self._tracer.start_counting()
+
+    def hop(self, asset, handler, start=None):
+        """Hardware asset finished processing an event
+        Args:
+            asset(Asset): asset that handled the event
+            handler(str): name of the handled event
+            start(float): time event was dispatched against the asset
+        """
+        end = time.perf_counter()
+        redis_calls, neo4j_calls = self._tracer.stop_counting()
+        asset_type = type(asset).__name__
+        start = start or end
+
+        self._add_calls(redis_calls, neo4j_calls)
+        self.hops.append(
+            (asset.key, asset_type, handler, start, end, redis_calls, neo4j_calls)
+        )
+        self._tracer.add_sample("{}:{}".format(asset_type, handler), end - start)
+
+    def branch_point(self, point, branch_type, num_branches=1):
+        """Branches were forked or completed"""
+        self.branch_points.append(
+            (point, branch_type, num_branches, time.perf_counter())
+        )
+
+    def to_dict(self):
+        """Serializable trace details (timings are in ms since iteration was
+        queued)"""
+        since_queued = lambda t: (t - self.queued_at) * 1000 if t else None
+
+        return {
+            "iteration": self.iteration_type,
+            "source": str(self._iteration.src_event),
+            "launched": since_queued(self.launched_at),
+            "completed": since_queued(self.completed_at),
+            "redis_calls": self.redis_calls,
+            "neo4j_calls": self.neo4j_calls,
+            "hops": [
+                {
+                    "key": key,
+                    "type": asset_type,
+                    "handler": handler,
+                    "start": since_queued(start),
+                    "end": since_queued(end),
+                    "redis_calls": redis_calls,
+                    "neo4j_calls": neo4j_calls,
+                }
+                for (
+                    key,
+                    asset_type,
+                    handler,
+                    start,
+                    end,
+                    redis_calls,
+                    neo4j_calls,
+                ) in self.hops
+            ],
+            "branches": [
+                {
+                    "point": point,
+                    "type": branch_type,
+                    "num_branches": num_branches,
+                    "time": since_queued(at),
+                }
+                for point, branch_type, num_branches, at in self.branch_points
+            ],
+        }
+
+
+class Tracer:
+    """Collects iteration traces & latency histograms
+
+    Example:
+        trace = TRACER.new_trace(iteration) # None if tracing is disabled
+        ...
+        TRACER.stats() # -> histograms & recent traces
+    """
+
+    def __init__(self, max_traces=50):
+        self._enabled = True
+        self._lock = threading.Lock()
+        self._traces = collections.deque(maxlen=max_traces)
+        self._histograms = collections.defaultdict(LatencyHistogram)
+        self._redis_calls = 0
+        self._neo4j_calls = 0
+        # calls counted by the current thread (see start_counting)
+        self._thread_calls = threading.local()
+        # callables reporting extra stats (e.g. engine queue stats)
+        self._stats_sources = {}
+
+    @property
+    def enabled(self):
+        """Tracer status indicating if new iterations are traced"""
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        self._enabled = value
+
+    @property
+    def calls(self):
+        """Total number of Redis & Neo4j calls made so far"""
+        return self._redis_calls, self._neo4j_calls
+
+    def start_counting(self):
+        """Start counting store calls made by the current thread"""
+        self._thread_calls.counts = [0, 0]
+
+    def stop_counting(self):
+        """Stop counting calls made by the current thread
+        Returns:
+            tuple: number of Redis & Neo4j calls made since start_counting
+        """
+        counts = getattr(self._thread_calls, "counts", None) or [0, 0]
+        self._thread_calls.counts = None
+        return tuple(counts)
+
+    def _count_call(self, store_idx):
+        counts = getattr(self._thread_calls, "counts", None)
+        if counts:
+            counts[store_idx] += 1
+
+        with self._lock:
+            if store_idx:
+                self._neo4j_calls += 1
+            else:
+                self._redis_calls += 1
+
+    def redis_call(self):
+        """Count a call to the Redis store"""
+        self._count_call(0)
+
+    def neo4j_call(self):
+        """Count a Neo4j query"""
+        self._count_call(1)
+
+    def add_stats_source(self, name, source):
+        """Include stats reported by source in Tracer.stats
+        Args:
+            name(str): key stats are listed under
+            source(callable): returns serializable stats
+        """
+        self._stats_sources[name] = source
+
+    def new_trace(self, iteration):
+        """Start tracing an iteration
+        Returns:
+            IterationTrace: new trace, None if tracing is disabled
+        """
+        if not self._enabled:
+            return None
+
+        return IterationTrace(iteration, self)
+
+    def complete_trace(self, trace):
+        """Store completed trace & record iteration latency"""
+        trace.completed()
+        with self._lock:
+            self._traces.append(trace)
+
+        if trace.launched_at:
+            self.add_sample(
+                "iteration:" + trace.iteration_type,
+                trace.completed_at - trace.queued_at,
+            )
+
+    def add_sample(self, name, latency):
+        """Record latency sample in a histogram"""
+        with self._lock:
+            self._histograms[name].add(latency)
+
+    def stats(self, num_traces=5):
+        """Get latency histograms & details on the most recent traces
+        Args:
+            num_traces(int): number of recent traces to be included
+        """
+        with self._lock:
+            recent = list(self._traces)[-num_traces:] if num_traces else []
+            stats = {
+                "enabled": self._enabled,
+                "redis_calls": self._redis_calls,
+                "neo4j_calls": self._neo4j_calls,
+                "histograms": {
+                    n: h.to_dict() for n, h in sorted(self._histograms.items())
+                },
+                "traces": [t.to_dict() for t in recent],
+            }
+
+        for name, source in self._stats_sources.items():
+            stats[name] = source()
+
+        return stats
+
+    def reset(self):
+        """Discard collected traces & histograms"""
+        with self._lock:
+            self._traces.clear()
+            self._histograms.clear()
+
+
+class TracedRedis(redis.StrictRedis):
+    """Redis client counting calls made to the store (see Tracer.calls)"""
+
+    def execute_command(self, *args, **options):
+        TRACER.redis_call()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        # pipeline is sent in one round trip
+        TRACER.redis_call()
+        return super().pipeline(transaction, shard_hint)
+
+
+class TracedSession:
+    """Neo4j session counting queries it runs (see Tracer.calls)"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._session.__exit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def run(self, statement, parameters=None, **kwparameters):
+        """Run Cypher statement"""
+        TRACER.neo4j_call()
+        return self._session.run(statement, parameters, **kwparameters)
+
+
+TRACER = Tracer()
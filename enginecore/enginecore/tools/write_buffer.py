@@ -0,0 +1,167 @@
+"""Write-behind buffering of Redis state updates made during engine iterations
+
+Hardware assets update their state (input voltage, load, power state, OIDs)
+with separate SET calls; while an asset is processing an engine event these
+updates (and channel messages) are collected in the write buffer of the
+iteration the event belongs to & sent as one MULTI/EXEC pipeline once
+the iteration completes.
+
+Buffers are activated per thread so only the thread processing
+iteration events is affected (see BufferedStore); reads made while a buffer
+is active see the buffered values.
+"""
+import threading
+
+
+def encode_value(value):
+    """Encode value the same way redis client does (values are read as bytes)"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+
+class WriteBuffer:
+    """State mutations & channel messages collected during one iteration
+
+    Example:
+        buffer = WriteBuffer()
+        activate(buffer)
+        store.set("1-outlet:load", 0.5) # buffered (store is BufferedStore)
+        store.get("1-outlet:load") # -> b"0.5"
+        activate(None)
+        buffer.flush(store) # values are written, messages are published
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._messages = []
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values) + len(self._messages)
+
+    def set(self, name, value):
+        """Buffer a key update (only the latest value is written)"""
+        with self._lock:
+            self._values[name] = encode_value(value)
+        return True
+
+    def publish(self, channel, message):
+        """Buffer channel message (published after the values are written)"""
+        with self._lock:
+            self._messages.append((channel, message))
+        return 0
+
+    def lookup(self, name):
+        """Get buffered value
+        Returns:
+            tuple: True if key is buffered & its value
+        """
+        with self._lock:
+            return name in self._values, self._values.get(name)
+
+    def flush(self, store):
+        """Write buffered values & publish messages in one round trip
+        Args:
+            store: redis client (or BufferedStore) the values are written to
+        """
+        with self._lock:
+            values, messages = self._values, self._messages
+            self._values, self._messages = {}, []
+
+        if not values and not messages:
+            return
+
+        pipe = store.pipeline(transaction=True)
+        if values:
+            pipe.mset(values)
+        for channel, message in messages:
+            pipe.publish(channel, message)
+        pipe.execute()
+
+
+_THREAD_BUFFER = threading.local()
+
+
+def activate(buffer):
+    """Direct writes made by the current thread to buffer
+    (writes go straight to the store if buffer is None)"""
+    _THREAD_BUFFER.buffer = buffer
+
+
+def active_buffer():
+    """Write buffer active in the current thread (None if writes are not buffered)"""
+    return getattr(_THREAD_BUFFER, "buffer", None)
+
+
+class BufferedStore:
+    """Redis store proxy: SET, MSET & PUBLISH commands issued while a write buffer
+    is active in the current thread are buffered, GET & MGET see buffered values;
+    the rest of the commands are passed through to the store
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    @property
+    def store(self):
+        """Redis client the values are written to"""
+        return self._store
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def set(self, name, value, *args, **kwargs):
+        """Set key value (buffered unless extra SET options are provided)"""
+        buffer = active_buffer()
+        if buffer is None or args or kwargs:
+            return self._store.set(name, value, *args, **kwargs)
+
+        return buffer.set(name, value)
+
+    def mset(self, mapping):
+        """Set multiple key values"""
+        buffer = active_buffer()
+        if buffer is None:
+            return self._store.mset(mapping)
+
+        for name, value in mapping.items():
+            buffer.set(name, value)
+        return True
+
+    def publish(self, channel, message):
+        """Publish message to the channel"""
+        buffer = active_buffer()
+        if buffer is None:
+            return self._store.publish(channel, message)
+
+        return buffer.publish(channel, message)
+
+    def get(self, name):
+        """Get key value (buffered value if there's one)"""
+        buffer = active_buffer()
+        if buffer is not None:
+            buffered, value = buffer.lookup(name)
+            if buffered:
+                return value
+
+        return self._store.get(name)
+
+    def mget(self, keys, *args):
+        """Get values of multiple keys (store is queried for the keys that
+        are not buffered)"""
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        keys.extend(args)
+
+        buffer = active_buffer()
+        if buffer is None:
+            return self._store.mget(keys)
+
+        lookups = [buffer.lookup(k) for k in keys]
+        missing = [k for k, (buffered, _) in zip(keys, lookups) if not buffered]
+        stored = iter(self._store.mget(missing) if missing else [])
+
+        return [value if buffered else next(stored) for buffered, value in lookups]
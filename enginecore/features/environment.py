@@ -8,6 +8,8 @@ import os
 
 from behave import fixture, use_fixture
 
+from enginecore.tools.clock import CLOCK, ClockMode
+
 # plyint: enable=no-name-in-module
 def configure_logger(_):
     """Configure logger for debugging purpose"""
@@ -36,6 +38,10 @@ def shut_down_threads(context, scenario):
 
 def before_all(context):
     """Pre-test configuration"""
+    CLOCK.configure(
+        ClockMode[context.config.userdata.get("clock", "real")],
+        speed=float(context.config.userdata.get("clock_speed", 10)),
+    )
 
 
 #     use_fixture(configure_logger, context)
@@ -11,13 +11,15 @@ from hamcrest import *
 
 import enginecore.model.system_modeler as sm
 from enginecore.state.api.state import IStateManager
+from enginecore.state.api.snmp_state import ISnmpDeviceStateManager
 
 
 @given("the system model is empty")
 def step_impl(context):
     sm.drop_model()
     context.hardware = {}
-    IStateManager.get_state_manager_by_key.cache_clear()
+    IStateManager.clear_state_managers()
+    ISnmpDeviceStateManager.clear_oid_catalog()
 
 
 @given('Outlet asset with key "{key:d}" is created')
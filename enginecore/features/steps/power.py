@@ -6,7 +6,6 @@
 import logging
 import os
 import sys
-import time
 from queue import Queue
 
 from threading import Thread, Event
@@ -18,6 +17,7 @@ from hamcrest import *
 from enginecore.state.state_initializer import configure_env
 from enginecore.state.engine.engine import Engine
 from enginecore.state.api.environment import ISystemEnvironment
+from enginecore.tools.clock import CLOCK
 
 
 class TestCompletionTracker(Component):
@@ -83,7 +83,7 @@ def step_impl(context):
 
 @when('pause for "{delay:d}" seconds')
 def step_impl(_, delay):
-    time.sleep(delay)
+    CLOCK.sleep(delay)
 
 
 @when("power outage happens")
@@ -150,7 +150,7 @@ def step_impl(context, key, state):
 
 @then('after "{seconds:d}" seconds, asset "{key:d}" is "{state}"')
 def step_impl(context, seconds, key, state):
-    time.sleep(seconds)
+    CLOCK.sleep(seconds)
     state_num = 1 if state == "online" else 0
     assert_that(context.hardware[key].status, equal_to(state_num))
 
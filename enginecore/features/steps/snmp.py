@@ -4,13 +4,14 @@ of hardware assets that support SNMP interface (UPS/PDU etc.)
 
 # pylint: disable=no-name-in-module,function-redefined,missing-docstring,unused-import,unused-wildcard-import, wildcard-import
 
-import time
 from pysnmp import hlapi
 from behave import given, when, then, step
 
 from hamcrest import *
 from pysnmp.proto.rfc1902 import *
 
+from enginecore.tools.clock import CLOCK
+
 
 def query_snmp_interface(oid, host="localhost", port=1024):
     """Helper function to query snmp interface of a device"""
@@ -120,5 +121,5 @@ def step_impl(context, key, snmp_state):
     'after "{seconds:d}" seconds, SNMP interface for asset "{key:d}" is "{snmp_state}"'
 )
 def step_impl(context, seconds, key, snmp_state):
-    time.sleep(seconds)
+    CLOCK.sleep(seconds)
     _ping_snmp(context.hardware[key].asset_info, snmp_state)
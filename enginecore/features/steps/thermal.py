@@ -1,10 +1,10 @@
 # pylint: disable=no-name-in-module,function-redefined,missing-docstring,unused-import,unused-wildcard-import, wildcard-import
 
-import time
 import math
 from behave import given, when, then, step
 from hamcrest import *
 from enginecore.state.api.environment import ISystemEnvironment
+from enginecore.tools.clock import CLOCK
 
 
 @given("server room has the following ambient properties")
@@ -32,7 +32,7 @@ def step_impl(context, temp):
 
 @then('ambient is set to "{temp:d}" after "{delay:d}" seconds')
 def step_impl(_, temp, delay):
-    time.sleep(delay)
+    CLOCK.sleep(delay)
     ambient = ISystemEnvironment.get_ambient()
     assert_that(ambient, equal_to(temp))
 
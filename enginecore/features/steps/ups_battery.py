@@ -4,11 +4,12 @@ OID key/value pairs
 # pylint: disable=no-name-in-module,function-redefined,missing-docstring,unused-import,unused-wildcard-import, wildcard-import
 
 import logging
-import time
 
 from hamcrest import *
 from behave import given, when, then, step
 
+from enginecore.tools.clock import CLOCK
+
 from snmp import query_snmp_interface
 
 
@@ -94,7 +95,7 @@ def step_impl(context, key, t_reason):
 @then('after "{seconds:d}" seconds, transfer reason for UPS "{key:d}" is "{t_reason}"')
 def step_impl(context, seconds, key, t_reason):
 
-    time.sleep(seconds + 1)
+    CLOCK.sleep(seconds + 1)
     context.execute_steps(
         'then UPS "{key:d}" transfer reason is set to "{t_reason}"'.format(
             key=key, t_reason=t_reason
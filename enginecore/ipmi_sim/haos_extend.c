@@ -20,6 +20,8 @@
 #include <sys/stat.h>
 #include <fcntl.h>
 #include <semaphore.h>
+#include <stdint.h>
+#include <sys/mman.h>
 
 #include <OpenIPMI/ipmi_msgbits.h>
 #include <OpenIPMI/ipmi_bits.h>
@@ -35,6 +37,42 @@
 static lmc_data_t *bmc_mc;
 static unsigned int server_id = 0;
 
+/*
+ * Shared sensor table (see enginecore/state/sensor/shared_table.py)
+ * sensor values are polled from the memory-mapped table maintained by
+ * the engine instead of a file per sensor
+ */
+#define SENSOR_TABLE_MAGIC "SIMSENS"
+#define SENSOR_TABLE_VERSION 1
+#define SENSOR_NAME_SIZE 48
+#define SEQLOCK_MAX_RETRIES 1000
+
+struct sensor_table_header
+{
+  char magic[8];
+  uint32_t version;
+  uint32_t num_slots;
+  uint32_t slot_size;
+  char reserved[44];
+};
+
+struct sensor_table_slot
+{
+  /* odd while the value is being updated (seqlock) */
+  uint32_t seq;
+  uint32_t flags;
+  int64_t value;
+  char name[SENSOR_NAME_SIZE];
+};
+
+static struct sensor_table_header *sensor_table = NULL;
+
+struct table_sensor
+{
+  struct sensor_table_slot *slot;
+  unsigned int div;
+};
+
 static struct board_info
 {
   sys_data_t *sys;
@@ -136,6 +174,174 @@ bmc_set_chassis_control(lmc_data_t *mc, int op, unsigned char *val,
   return 0;
 }
 
+/**************************************************************************
+ * Shared sensor table polling
+ *************************************************************************/
+static int
+map_sensor_table(const char *path, const char **errstr)
+{
+  struct stat st;
+  struct sensor_table_header *table;
+  int fd;
+
+  /* all the sensors of the server share one table */
+  if (sensor_table)
+  {
+    return 0;
+  }
+
+  fd = open(path, O_RDONLY);
+  if (fd < 0)
+  {
+    *errstr = "Unable to open sensor table";
+    return errno;
+  }
+
+  if (fstat(fd, &st) || st.st_size < (off_t)sizeof(*table))
+  {
+    close(fd);
+    *errstr = "Invalid sensor table";
+    return EINVAL;
+  }
+
+  table = mmap(NULL, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+  close(fd);
+
+  if (table == MAP_FAILED)
+  {
+    *errstr = "Unable to map sensor table";
+    return errno;
+  }
+
+  if (memcmp(table->magic, SENSOR_TABLE_MAGIC, sizeof(table->magic)) != 0 ||
+      table->version != SENSOR_TABLE_VERSION ||
+      table->slot_size != sizeof(struct sensor_table_slot) ||
+      st.st_size < (off_t)(sizeof(*table) + table->num_slots * table->slot_size))
+  {
+    munmap(table, st.st_size);
+    *errstr = "Invalid sensor table";
+    return EINVAL;
+  }
+
+  sensor_table = table;
+  return 0;
+}
+
+static int
+table_sensor_poll(void *cb_data, unsigned int *val, const char **errstr)
+{
+  struct table_sensor *sensor = cb_data;
+  uint32_t seq;
+  int64_t value;
+  int i;
+
+  for (i = 0; i < SEQLOCK_MAX_RETRIES; i++)
+  {
+    seq = __atomic_load_n(&sensor->slot->seq, __ATOMIC_ACQUIRE);
+    if (seq & 1)
+    {
+      continue;
+    }
+
+    value = __atomic_load_n(&sensor->slot->value, __ATOMIC_RELAXED);
+    __atomic_thread_fence(__ATOMIC_ACQUIRE);
+
+    if (__atomic_load_n(&sensor->slot->seq, __ATOMIC_RELAXED) == seq)
+    {
+      *val = value > 0 ? value / sensor->div : 0;
+      return 0;
+    }
+  }
+
+  *errstr = "Sensor value is being updated";
+  return EAGAIN;
+}
+
+/*
+ * sensor_add ... poll <period> simengine_table <table path> <sensor name> [div=n]
+ */
+static int
+table_sensor_init(lmc_data_t *mc, unsigned char lun, unsigned char num,
+                  char **toks, void *cb_data, void **rcb_data,
+                  const char **errstr)
+{
+  struct sensor_table_slot *slots;
+  struct table_sensor *sensor;
+  char *path, *name;
+  const char *opt;
+  unsigned int i;
+  int rv;
+
+  rv = get_delim_str(toks, &path, errstr);
+  if (rv)
+  {
+    return rv;
+  }
+
+  rv = map_sensor_table(path, errstr);
+  free(path);
+  if (rv)
+  {
+    return rv;
+  }
+
+  rv = get_delim_str(toks, &name, errstr);
+  if (rv)
+  {
+    return rv;
+  }
+
+  sensor = calloc(1, sizeof(*sensor));
+  if (!sensor)
+  {
+    free(name);
+    *errstr = "Out of memory";
+    return ENOMEM;
+  }
+
+  slots = (struct sensor_table_slot *)(sensor_table + 1);
+  for (i = 0; i < sensor_table->num_slots; i++)
+  {
+    if (strncmp(slots[i].name, name, SENSOR_NAME_SIZE) == 0)
+    {
+      sensor->slot = &slots[i];
+      break;
+    }
+  }
+  free(name);
+
+  if (!sensor->slot)
+  {
+    free(sensor);
+    *errstr = "Sensor is not in the sensor table";
+    return EINVAL;
+  }
+
+  sensor->div = 1;
+  while ((opt = mystrtok(NULL, " \t\n", toks)))
+  {
+    if (strncmp(opt, "div=", 4) == 0 && strtoul(opt + 4, NULL, 0) > 0)
+    {
+      sensor->div = strtoul(opt + 4, NULL, 0);
+    }
+    else
+    {
+      free(sensor);
+      *errstr = "Invalid simengine_table option";
+      return EINVAL;
+    }
+  }
+
+  *rcb_data = sensor;
+  return 0;
+}
+
+static ipmi_sensor_handler_t table_sensor_handler = {
+    .name = "simengine_table",
+    .poll = table_sensor_poll,
+    .init = table_sensor_init,
+};
+
 /**************************************************************************
  * Module initialization
  *************************************************************************/
@@ -172,5 +378,13 @@ int ipmi_sim_module_init(sys_data_t *sys, const char *options)
   // power control
   ipmi_mc_set_chassis_control_func(bmc_mc, bmc_set_chassis_control, bmc_get_chassis_control, sys);
 
+  // sensors polled from the shared sensor table
+  rv = ipmi_sensor_add_handler(&table_sensor_handler);
+  if (rv)
+  {
+    sys->log(sys, OS_ERROR, NULL, "Unable to add sensor table handler: %s", strerror(rv));
+    return rv;
+  }
+
   return 0;
 }
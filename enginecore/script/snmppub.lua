@@ -1,17 +1,45 @@
-if table.getn(ARGV) > 0 then
-    redis.call('PUBLISH', 'oid-upd', KEYS[1])
-    return redis.call('set', KEYS[1], ARGV[1])
-else
-    local rkey = KEYS[1]
+-- value stored under OID key (sysUpTime is calculated from the asset start time)
+local function get_oid_value(rkey)
     local key, oid = rkey:match("(.*)%-(.*)")
     oid = oid:gsub("%s+", "")
-    
+
     if oid == "1.3.6.1.2.1.1.3.0" then
         local formatted_key, _ = key:gsub('0', '')
         local start_time = redis.call('get', (tonumber(formatted_key)..":start_time"))
         local now = redis.call('TIME')
         return "67".."|"..tostring(100*(now[1] - start_time))
     else
-        return redis.call('get', KEYS[1])
+        return redis.call('get', rkey)
+    end
+end
+
+if ARGV[1] == 'getnext' then
+    -- next ARGV[2] OID keys following KEYS[1] in walk order (see state_initializer.py)
+    -- returned as a flat array of key, value pairs
+    local key_space = KEYS[1]:match("(.*)%-")
+    local next_keys = redis.call(
+        'ZRANGEBYLEX', key_space..'-oids_index', '('..KEYS[1], '+', 'LIMIT', 0, tonumber(ARGV[2])
+    )
+
+    local reply = {}
+    for _, next_key in ipairs(next_keys) do
+        table.insert(reply, next_key)
+        table.insert(reply, get_oid_value(next_key) or false)
+    end
+    return reply
+elseif table.getn(ARGV) > 0 then
+    -- oids set for the first time need to be indexed for the walks
+    if redis.call('exists', KEYS[1]) == 0 then
+        redis.call('ZADD', KEYS[1]:match("(.*)%-")..'-oids_index', 0, KEYS[1])
     end
+
+    -- oid updates are sent over the transport engine listens to (see redis_streams.py)
+    if redis.call('get', 'engine-transport') == 'streams' then
+        redis.call('XADD', 'engine-stream:snmp', 'MAXLEN', '~', 10000, '*', 'channel', 'oid-upd', 'data', KEYS[1])
+    else
+        redis.call('PUBLISH', 'oid-upd', KEYS[1])
+    end
+    return redis.call('set', KEYS[1], ARGV[1])
+else
+    return get_oid_value(KEYS[1])
 end
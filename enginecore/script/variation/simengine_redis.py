@@ -0,0 +1,186 @@
+"""SNMPSim variation module serving simengine devices from redis
+
+Drop-in replacement for snmpsim's stock 'redis' variation module that relies on
+'snmppub.lua' script for all the OID lookups:
+GETNEXT requests are answered with one 'getnext' script call (instead of a
+binary search over the '-oids_ordering' list costing a redis round trip per step);
+the OIDs following the requested one are prefetched in the same call and
+served to the walks & GETBULK requests that continue from there.
+
+Module initialization parameters are:
+
+host:<redis-host>,port:<redis-port>,db:<redis-db>,prefetch:<n>,max-age:<seconds>
+
+Data file records should be formatted as:
+
+<oid>|:simengine_redis|key-spaces-id=<asset-key>,evalsha=<snmppub.lua sha>
+"""
+import time
+
+from pysnmp.smi.error import WrongValueError
+from snmpsim import error, log
+from snmpsim.grammar.snmprec import SnmprecGrammar
+from snmpsim.mltsplit import split
+from snmpsim.record.snmprec import SnmprecRecord
+
+try:
+    from redis import StrictRedis
+except ImportError:
+    StrictRedis = None
+
+# number of OIDs fetched at once for GETNEXT requests
+PREFETCH = 64
+# prefetched values are served for at most this many seconds
+MAX_AGE = 1.0
+
+
+unpackTag = SnmprecRecord().unpackTag
+
+
+def _to_str(value):
+    """Decode redis reply (python 3 clients return bytes)"""
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode()
+    return value
+
+
+def init(**context):
+    """Connect to redis"""
+    options = {}
+    if context["options"]:
+        options.update(dict([split(x, ":") for x in split(context["options"], ",")]))
+
+    connect_params = dict(
+        [
+            (k, options[k])
+            for k in options
+            if k in ("host", "port", "password", "db", "unix_socket")
+        ]
+    )
+    for k in "port", "db":
+        if k in connect_params:
+            connect_params[k] = int(connect_params[k])
+
+    if not connect_params:
+        raise error.SnmpsimError("Redis connect parameters not specified")
+
+    if StrictRedis is None:
+        raise error.SnmpsimError("redis-py Python package must be installed!")
+
+    moduleContext["dbConn"] = StrictRedis(**connect_params)
+    moduleContext["prefetch"] = int(options.get("prefetch", PREFETCH))
+    moduleContext["max-age"] = float(options.get("max-age", MAX_AGE))
+
+
+def variate(oid, tag, value, **context):
+    """Read/write OID value stored in the asset key-space"""
+    if "dbConn" not in moduleContext:
+        raise error.SnmpsimError("variation module not initialized")
+
+    db_conn = moduleContext["dbConn"]
+
+    if "settings" not in recordContext:
+        settings = recordContext["settings"] = dict(
+            [split(x, "=") for x in split(value, ",")]
+        )
+        if "key-spaces-id" not in settings or "evalsha" not in settings:
+            log.msg("simengine_redis: key-spaces-id & evalsha options are mandatory")
+            return context["origOid"], tag, context["errorStatus"]
+
+        if not db_conn.script_exists(settings["evalsha"])[0]:
+            log.msg(
+                "simengine_redis: lua script %s does not exist at Redis"
+                % settings["evalsha"]
+            )
+            return context["origOid"], tag, context["errorStatus"]
+
+        # simengine assets have one key-space (no cycling through recordings)
+        recordContext["key-space"] = "%.10d" % int(settings["key-spaces-id"])
+        recordContext["next-cache"] = {}
+        recordContext["ready"] = True
+
+    if "ready" not in recordContext:
+        return context["origOid"], tag, context["errorStatus"]
+
+    script = recordContext["settings"]["evalsha"]
+    orig_oid = context["origOid"]
+    db_oid = ".".join(["%10s" % x for x in str(orig_oid).split(".")])
+    oid_key = recordContext["key-space"] + "-" + db_oid
+
+    if context["setFlag"]:
+        return _set_value(db_conn, script, oid_key, **context)
+
+    if context["nextFlag"]:
+        oid_key, tag_and_value = _get_next(db_conn, script, oid_key)
+    else:
+        tag_and_value = db_conn.evalsha(script, 1, oid_key)
+
+    if not tag_and_value:
+        return orig_oid, tag, context["errorStatus"]
+
+    text_oid = ".".join([x.strip() for x in oid_key.split("-", 1)[1].split(".")])
+    text_tag, text_value = _to_str(tag_and_value).split("|", 1)
+
+    return text_oid, text_tag, text_value
+
+
+def _get_next(db_conn, script, oid_key):
+    """Key & value of the OID following oid_key
+    (served from the prefetched OIDs if the walk continues from the last one)"""
+    cache = recordContext["next-cache"]
+
+    if (
+        cache.get("after") == oid_key
+        and cache["entries"]
+        and time.time() - cache["fetched_at"] < moduleContext["max-age"]
+    ):
+        next_key, tag_and_value = cache["entries"].pop(0)
+        cache["after"] = next_key
+        return next_key, tag_and_value
+
+    reply = db_conn.evalsha(script, 1, oid_key, "getnext", moduleContext["prefetch"])
+    entries = [(_to_str(reply[i]), reply[i + 1]) for i in range(0, len(reply), 2)]
+
+    if not entries:
+        cache.clear()
+        return oid_key, None
+
+    next_key, tag_and_value = entries.pop(0)
+    cache.update(after=next_key, entries=entries, fetched_at=time.time())
+    return next_key, tag_and_value
+
+
+def _set_value(db_conn, script, oid_key, **context):
+    """Update OID value (type of the existing OID cannot be changed)"""
+    if "hexvalue" in context:
+        text_tag = context["hextag"]
+        text_value = context["hexvalue"]
+    else:
+        text_tag = SnmprecGrammar().getTagByType(context["origValue"])
+        text_value = str(context["origValue"])
+
+    prev_tag_and_value = db_conn.evalsha(script, 1, oid_key)
+    if prev_tag_and_value:
+        prev_tag = _to_str(prev_tag_and_value).split("|", 1)[0]
+        if unpackTag(prev_tag)[0] != unpackTag(text_tag)[0]:
+            raise WrongValueError(
+                name=context["origOid"],
+                idx=max(0, context["varsTotal"] - context["varsRemaining"] - 1),
+            )
+
+    # new OIDs are added to the walk index by the script
+    db_conn.evalsha(script, 1, oid_key, text_tag + "|" + text_value)
+    recordContext["next-cache"].clear()
+
+    return context["origOid"], text_tag, context["origValue"]
+
+
+def record(oid, tag, value, **context):
+    """Recording is done with the stock 'redis' module"""
+    raise error.SnmpsimError("simengine_redis module does not support recording")
+
+
+def shutdown(**context):
+    """Release redis connection"""
+    if "dbConn" in moduleContext:
+        moduleContext.pop("dbConn")
@@ -14,6 +14,7 @@ setup(
         "libvirt-python",
         "websocket-client",
     ],
+    extras_require={"solver": ["numpy"]},
     author="Seneca OSTEP & Alteeve",
     author_email="olga.belavina@senecacollege.ca",
     description="Simulation platform for High-Availability systems",
@@ -0,0 +1,71 @@
+"""Unittests for the analytic UPS battery model"""
+import json
+import os
+import unittest
+
+from enginecore.state.hardware.battery_model import BatteryModel
+
+PRESET = os.path.join(
+    os.path.dirname(__file__),
+    os.pardir,
+    "enginecore",
+    "model",
+    "presets",
+    "apc_ups.json",
+)
+
+
+class BatteryModelTests(unittest.TestCase):
+    """Tests battery level & runtime calculations"""
+
+    def setUp(self):
+        with open(PRESET) as preset_file:
+            runtime = json.loads(preset_file.read())["modelRuntime"]
+
+        # runtime graph is stored the same way by the system modeler
+        self.runtime = json.loads(json.dumps(runtime, sort_keys=True))
+        self.model = BatteryModel(self.runtime, max_level=1000)
+
+    def test_runtime(self):
+        """Runtime is estimated from the closest known point of the runtime graph"""
+        for wattage in [0, 0.05, 49, 75, 150, 333.3, 650, 899, 2000]:
+            capped = max(wattage, 0.1)
+            closest = min(self.runtime, key=lambda x: abs(int(x) - capped))
+            expected = self.runtime[closest] * int(closest) / capped
+
+            self.assertAlmostEqual(expected, self.model.full_power_runtime(wattage))
+
+        # low input voltage prolongs runtime
+        self.assertAlmostEqual(
+            1.5 * self.model.full_power_runtime(100),
+            self.model.full_power_runtime(100, in_voltage=50, low_threshold=100),
+        )
+
+    def test_next_change(self):
+        """Battery wakes up once level crosses percentage point or a threshold"""
+        self.assertAlmostEqual(10, self.model.next_change(1000, -1), places=5)
+        self.assertAlmostEqual(5, self.model.next_change(995, -1), places=5)
+        self.assertAlmostEqual(0.5, self.model.next_change(98, 4), places=5)
+        self.assertAlmostEqual(
+            1, self.model.next_change(98, 1, thresholds=[99]), places=5
+        )
+        self.assertEqual(float("inf"), self.model.next_change(500, 0))
+
+    def test_fast_forward(self):
+        """Multi-hour drain takes one step per percentage point"""
+        rate = self.model.discharge_rate(wattage=50)
+        level, elapsed, num_steps = 1000, 0, 0
+
+        while level > 0:
+            seconds = self.model.next_change(level, -rate)
+            level = self.model.level_after(level, -rate, seconds)
+            elapsed += seconds
+            num_steps += 1
+
+        self.assertEqual(100, num_steps)
+        self.assertAlmostEqual(320 * 60, elapsed, places=2)
+        self.assertAlmostEqual(320 * 60, self.model.time_to_empty(1000, rate))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""Unittests for the shared UPS battery simulation scheduler"""
+import threading
+import unittest
+from unittest import mock
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.state.api import IStateManager
+from enginecore.state.hardware import battery_scheduler
+from enginecore.state.hardware.battery_scheduler import BatteryScheduler
+from enginecore.state.hardware.ups_asset import UPS
+from enginecore.tools.clock import Clock, ClockMode
+from enginecore.tools.write_buffer import BufferedStore
+
+
+class BatterySchedulerTests(unittest.TestCase):
+    """Tests battery simulations being advanced together by one thread"""
+
+    def setUp(self):
+        self.saved_store = IStateManager.redis_store
+        self.redis = InMemoryRedis()
+        self.redis.pipeline = mock.MagicMock(wraps=self.redis.pipeline)
+        IStateManager.redis_store = BufferedStore(self.redis)
+
+        clock_patcher = mock.patch.object(
+            battery_scheduler, "CLOCK", Clock(ClockMode.discrete)
+        )
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+
+        self.scheduler = BatteryScheduler()
+
+    def tearDown(self):
+        IStateManager.redis_store = self.saved_store
+
+    def _simulate(self, key, num_steps):
+        """Battery simulation writing its level every step"""
+        for level in range(num_steps):
+            IStateManager.get_store().set("{}-ups:battery".format(key), level)
+            yield
+
+    def _wait(self):
+        """Wait for the scheduler thread to run out of simulations"""
+        # pylint: disable=protected-access
+        thread = self.scheduler._thread
+        if thread is not None:
+            thread.join(5)
+        self.assertIsNone(self.scheduler._thread)
+
+    def test_batched(self):
+        """Simulations are advanced in the same tick & their writes are batched"""
+        with self.scheduler._tick_lock:  # pylint: disable=protected-access
+            self.scheduler.schedule(1, self._simulate(1, 3), "battery_drain")
+            self.scheduler.schedule(2, self._simulate(2, 3), "battery_charge")
+            self.assertTrue(self.scheduler.is_scheduled(1, "battery_drain"))
+            self.assertFalse(self.scheduler.is_scheduled(2, "battery_drain"))
+
+        self._wait()
+
+        self.assertEqual(b"2", self.redis.get("1-ups:battery"))
+        self.assertEqual(b"2", self.redis.get("2-ups:battery"))
+        self.assertEqual(3, self.redis.pipeline.call_count)
+        self.assertEqual(6, self.scheduler.stats["steps"])
+
+    def test_replace(self):
+        """Scheduling a simulation for the same UPS replaces the running one"""
+        with self.scheduler._tick_lock:  # pylint: disable=protected-access
+            drain = self._simulate(1, 100)
+            self.scheduler.schedule(1, drain, "battery_drain")
+            self.scheduler.schedule(1, self._simulate(1, 2), "battery_charge")
+
+        self._wait()
+
+        self.assertIsNone(drain.gi_frame)
+        self.assertEqual(b"1", self.redis.get("1-ups:battery"))
+
+    def test_delay(self):
+        """Simulations sleep for the yielded number of seconds & can be woken up"""
+        steps = []
+
+        def simulate():
+            for delay in [3600, 7200, None]:
+                steps.append(battery_scheduler.CLOCK.time())
+                yield delay
+
+        with self.scheduler._tick_lock:  # pylint: disable=protected-access
+            self.scheduler.schedule(1, simulate(), "battery_drain")
+            self.scheduler.wake(1, delay=10)
+
+        self._wait()
+
+        # 1st step is woken up early, 2nd step is capped by max interval
+        self.assertEqual([10, 70], [t - steps[0] for t in steps[1:]])
+
+    def test_cancel(self):
+        """Cancelled simulations are stopped"""
+        with self.scheduler._tick_lock:  # pylint: disable=protected-access
+            self.scheduler.schedule(1, self._simulate(1, 100), "battery_drain")
+            self.scheduler.cancel(1)
+
+        self._wait()
+        self.assertFalse(self.scheduler.is_scheduled(1))
+        self.assertIsNone(self.redis.get("1-ups:battery"))
+
+
+class UPSChargeTests(unittest.TestCase):
+    """Tests UPS battery charge simulation"""
+
+    # pylint: disable=protected-access
+
+    def setUp(self):
+        self.ups = mock.MagicMock()
+        self.ups.state.status = 0
+        self.ups.state.on_battery = False
+        self.ups.state.battery_level = 0
+        self.ups.state.battery_max_level = 1000
+        self.ups.state.min_restore_charge_level = 100
+        self.ups._battery_model.level_after.side_effect = lambda lvl, rate, secs: (
+            lvl + 200
+        )
+        self.ups._battery_model.next_change.return_value = 1
+
+    def test_power_up(self):
+        """Charge steps are not blocked by the power-up on min charge level"""
+        powering_up = threading.Event()
+        power_up_done = threading.Event()
+
+        def power_up():
+            powering_up.set()
+            power_up_done.wait(5)
+            self.ups.state.status = 1
+
+        self.ups._power_up_on_charge.side_effect = power_up
+        charge = UPS._charge_battery(self.ups, power_up_on_charge=True)
+
+        next(charge)
+        self.assertTrue(powering_up.wait(5))
+        next(charge)
+        self.ups._power_up_on_charge.assert_called_once_with()
+
+        power_up_done.set()
+        for _ in charge:
+            pass
+        self.ups._power_up_on_charge.assert_called_once_with()
+        self.ups.state.update_battery.assert_called_with(1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
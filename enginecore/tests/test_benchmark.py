@@ -0,0 +1,129 @@
+"""Unittests for the benchmark topology generator, stand-ins & reports"""
+
+import unittest
+
+from enginecore.model.graph_reference import GraphReference
+from enginecore.tools.tracer import TRACER
+from enginecore.benchmark.report import compare_reports
+from enginecore.benchmark.standins import InMemoryGraph, InMemoryRedis
+from enginecore.benchmark.topology import SyntheticTopology
+
+
+class SyntheticTopologyTests(unittest.TestCase):
+    """Tests parameterized topology layout"""
+
+    def setUp(self):
+        self.topology = SyntheticTopology(
+            num_ups=3, num_pdus=2, num_outlets=4, num_servers=3
+        )
+
+    def test_layout(self):
+        """Every rack is a separate power domain with dual-PSU servers"""
+        # mains outlet, ups + outlets, pdus + outlets, servers + psus
+        num_assets = 3 * (1 + 3 + 2 * 5 + 3 * 3)
+        keys = [a["key"] for a in self.topology.assets]
+
+        self.assertEqual(num_assets, len(set(keys)))
+        self.assertEqual(3, self.topology.to_index().num_domains)
+        self.assertEqual(3, len(self.topology.mains_outlets))
+
+    def test_psus_spread_across_pdus(self):
+        """Server PSUs are plugged into different PDUs"""
+        for rack in self.topology.racks:
+            for server_key in rack["servers"]:
+                psus = self.topology.get_parents(server_key)
+                self.assertEqual(2, len(psus))
+
+                pdus = {
+                    self.topology.get_parents(self.topology.get_parents(p)[0])[0]
+                    for p in psus
+                }
+                self.assertEqual(set(rack["pdus"]), pdus)
+
+    def test_not_enough_outlets(self):
+        """PDUs must have enough outlets for every PSU"""
+        with self.assertRaises(ValueError):
+            SyntheticTopology(num_pdus=1, num_outlets=4, num_servers=3)
+
+
+class StandInTests(unittest.TestCase):
+    """Tests in-memory Redis & graph db stand-ins"""
+
+    def test_redis(self):
+        """Values are stored as bytes, pipeline is a single call"""
+        store = InMemoryRedis()
+        calls = TRACER.calls[0]
+
+        store.set("1-outlet:state", 1)
+        store.mset({"1-outlet:load": 0.5, "ambient": "21"})
+        self.assertEqual(
+            [b"1", b"0.5", None], store.mget(["1-outlet:state", "1-outlet:load", "x"])
+        )
+
+        with store.pipeline() as pipe:
+            results = (
+                pipe.delete("ambient").exists("ambient", "1-outlet:state").execute()
+            )
+
+        self.assertEqual([1, 1], results)
+        self.assertEqual(4, TRACER.calls[0] - calls)
+
+    def test_graph(self):
+        """Graph queries are answered from the topology while installed"""
+        topology = SyntheticTopology(num_servers=1)
+        server_key = topology.racks[0]["servers"][0]
+        graph = InMemoryGraph(topology)
+        query = GraphReference.__dict__["get_asset_and_components"]
+
+        graph.install()
+        try:
+            graph_ref = GraphReference()
+            with graph_ref.get_session() as session:
+                asset = GraphReference.get_asset_and_components(session, server_key)
+                GraphReference.set_ambient_props(
+                    session, {"event": "up", "degrees": 1, "pause_at": 21, "start": 19}
+                )
+                ambient = GraphReference.get_ambient_props(session)
+        finally:
+            graph.uninstall()
+
+        self.assertEqual("server", asset["type"])
+        self.assertEqual([server_key * 10 + 1, server_key * 10 + 2], asset["children"])
+        self.assertEqual(19, ambient["start"])
+        self.assertEqual(21, ambient["up"]["pauseAt"])
+        self.assertIs(query, GraphReference.__dict__["get_asset_and_components"])
+
+
+class ReportTests(unittest.TestCase):
+    """Tests comparison of benchmark reports"""
+
+    @staticmethod
+    def make_report(elapsed, p95):
+        return {
+            "scenarios": {
+                "mains_loss_restore": {
+                    "elapsed": elapsed,
+                    "events_per_sec": 100 / elapsed,
+                    "iterations": {
+                        "PowerIteration": {"p50": 1, "p95": p95, "p99": p95}
+                    },
+                }
+            }
+        }
+
+    def test_compare(self):
+        """Changes are reported per metric & marked as improvements/regressions"""
+        rows = compare_reports(self.make_report(2.0, 10), self.make_report(1.0, 20))
+        rows = {
+            metric: (change, improved) for _, metric, _, _, change, improved in rows
+        }
+
+        self.assertEqual((-50, True), rows["elapsed"])
+        self.assertEqual((100, True), rows["events_per_sec"])
+        self.assertEqual((100, False), rows["PowerIteration:p95"])
+        self.assertEqual((0, False), rows["PowerIteration:p50"])
+        self.assertNotIn("redis_calls", rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Unittests for the simulation clock"""
+import threading
+import time
+import unittest
+
+from enginecore.tools.clock import Clock, ClockMode
+
+
+class ClockTests(unittest.TestCase):
+    """Tests real, scaled & discrete clock modes"""
+
+    def test_scaled(self):
+        """Simulated time passes faster than wall time"""
+        clock = Clock(ClockMode.scaled, speed=100)
+        start, wall_start = clock.time(), time.monotonic()
+
+        clock.sleep(10)
+
+        self.assertLess(time.monotonic() - wall_start, 1)
+        self.assertGreaterEqual(clock.time() - start, 10)
+
+    def test_discrete_order(self):
+        """Sleepers are woken up in order of their deadlines"""
+        clock = Clock(ClockMode.discrete)
+        start, wall_start = clock.time(), time.monotonic()
+        woken_up = []
+
+        def sleeper(seconds):
+            clock.sleep(seconds)
+            woken_up.append((seconds, clock.time() - start))
+
+        threads = [threading.Thread(target=sleeper, args=(s,)) for s in (600, 60)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([(60, 60), (600, 600)], woken_up)
+        self.assertLess(time.monotonic() - wall_start, 1)
+
+    def test_discrete_event(self):
+        """Waiting is interrupted by the event set by another thread"""
+        clock = Clock(ClockMode.discrete)
+        # give woken up thread plenty of time to set the event
+        clock.settle_time = 0.2
+        start = clock.time()
+        stop_event = threading.Event()
+
+        def stopper():
+            clock.sleep(10)
+            stop_event.set()
+
+        stop_thread = threading.Thread(target=stopper)
+        stop_thread.start()
+
+        self.assertTrue(clock.wait(stop_event, 3600))
+        self.assertEqual(10, clock.time() - start)
+        stop_thread.join()
+
+    def test_switch_mode(self):
+        """Simulated time continues from the current value"""
+        clock = Clock(ClockMode.discrete)
+        clock.sleep(3600)
+        expected = clock.time()
+
+        clock.configure(ClockMode.scaled, speed=10)
+        self.assertGreaterEqual(clock.time(), expected)
+        self.assertEqual(10, clock.speed)
+
+        with self.assertRaises(ValueError):
+            clock.configure(ClockMode.scaled, speed=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
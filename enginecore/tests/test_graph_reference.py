@@ -0,0 +1,52 @@
+"""Unittests for the process-wide graph db driver"""
+import unittest
+from unittest import mock
+
+from enginecore.model.graph_reference import GraphReference
+
+
+class SharedDriverTests(unittest.TestCase):
+    """Tests graph references sharing one connection pool"""
+
+    def setUp(self):
+        GraphReference.close_driver()
+        patcher = mock.patch("enginecore.model.graph_reference.GraphDatabase.driver")
+        self.driver_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(GraphReference.close_driver)
+
+    def test_shared(self):
+        """Driver is created once & survives closing graph references"""
+        graph_ref = GraphReference()
+        graph_ref.close()
+        GraphReference().get_session()
+
+        self.assertEqual(1, self.driver_cls.call_count)
+        self.driver_cls.return_value.close.assert_not_called()
+
+    def test_configure(self):
+        """Driver is re-created with the new settings"""
+        GraphReference()
+        saved = dict(GraphReference._driver_config)  # pylint: disable=protected-access
+        try:
+            GraphReference.configure(uri="bolt://db:7687", pool_size=5)
+            GraphReference()
+        finally:
+            GraphReference._driver_config = saved  # pylint: disable=protected-access
+
+        self.assertEqual(2, self.driver_cls.call_count)
+        self.driver_cls.return_value.close.assert_called_once()
+        self.assertEqual(("bolt://db:7687",), self.driver_cls.call_args[0])
+        self.assertEqual(5, self.driver_cls.call_args[1]["max_connection_pool_size"])
+
+    def test_session_scope(self):
+        """Nested scopes of the same thread reuse the session"""
+        with GraphReference.session_scope() as session:
+            with GraphReference.session_scope() as nested_session:
+                self.assertIs(session, nested_session)
+
+        self.assertEqual(1, self.driver_cls.return_value.session.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,359 @@
+"""Unittests for iteration queueing, coalescing & thermal fan-out"""
+import threading
+import types
+import unittest
+
+from enginecore.state.engine import events
+from enginecore.state.engine.iteration import (
+    EngineIteration,
+    PowerIteration,
+    ThermalIteration,
+)
+from enginecore.state.engine.iteration_consumer import EngineIterationConsumer
+from enginecore.state.engine.power_domains import IterationGate, PowerDomains
+from enginecore.state.engine.topology import TopologyIndex
+
+
+def volt_iteration(old_voltage, new_voltage):
+    """Wallpower voltage iteration"""
+    return PowerIteration(
+        events.AssetPowerEvent(
+            asset=None, old_out_volt=old_voltage, new_out_volt=new_voltage
+        )
+    )
+
+
+def button_iteration(asset):
+    """Power button iteration"""
+    return PowerIteration(
+        events.PowerButtonOffEvent(old_state=1, new_state=0, asset=asset)
+    )
+
+
+def batch_iteration(asset_keys):
+    """Power button iteration for a group of assets"""
+    return PowerIteration(
+        events.PowerButtonBatchEvent(
+            btn_events=[
+                events.PowerButtonOffEvent(
+                    old_state=1, new_state=0, asset=types.SimpleNamespace(key=key)
+                )
+                for key in asset_keys
+            ]
+        )
+    )
+
+
+def ambient_iteration(old_temp, new_temp):
+    """Ambient update iteration"""
+    return ThermalIteration(events.AmbientEvent(old_temp=old_temp, new_temp=new_temp))
+
+
+class DomainIteration(EngineIteration):
+    """Iteration of an asset that produces no events
+    (it is done as soon as it is launched)"""
+
+    def __init__(self, asset_key):
+        super().__init__(
+            events.PowerButtonOffEvent(
+                old_state=1, new_state=0, asset=types.SimpleNamespace(key=asset_key)
+            )
+        )
+
+    @property
+    def iteration_done(self):
+        return True
+
+    def launch(self):
+        return ()
+
+
+class IterationConsumerTests(unittest.TestCase):
+    """Tests coalescing of pending iterations (consumer is not started
+    so all the iterations stay in the queue)"""
+
+    def setUp(self):
+        self.consumer = EngineIterationConsumer("test_worker")
+
+    def test_voltage_merged(self):
+        """Consecutive voltage changes collapse into one transition"""
+        first_iter = volt_iteration(120, 115)
+        first_event = first_iter.src_event
+        self.consumer.queue_iteration(first_iter)
+        self.consumer.queue_iteration(volt_iteration(115, 110))
+        self.consumer.queue_iteration(volt_iteration(110, 100))
+
+        self.assertEqual(1, self.consumer.queue_depth)
+        self.assertEqual(2, self.consumer.stats["merged"])
+        self.assertEqual((120, 100), first_iter.src_event.out_volt())
+        self.assertIs(first_iter, first_iter.src_event.power_iter)
+        # event passed to the engine trackers is not changed by merging
+        self.assertEqual((120, 115), first_event.out_volt())
+        # completion is reported for every absorbed iteration
+        self.assertEqual(2, len(first_iter.merged_iterations))
+
+    def test_noop_merged(self):
+        """Merged changes cancelling each other out dispatch no events"""
+        power_iter = volt_iteration(120, 110)
+        thermal_iter = ThermalIteration(
+            events.AmbientEvent(old_temp=21, new_temp=25), subscribers=[3]
+        )
+        self.consumer.queue_iteration(power_iter)
+        self.consumer.queue_iteration(volt_iteration(110, 120))
+        self.assertTrue(power_iter.is_noop)
+
+        thermal_consumer = EngineIterationConsumer("thermal_worker")
+        thermal_consumer.queue_iteration(thermal_iter)
+        self.assertFalse(thermal_iter.is_noop)
+        thermal_consumer.queue_iteration(ambient_iteration(25, 21))
+        self.assertTrue(thermal_iter.is_noop)
+
+        self.assertEqual(([], None), power_iter.launch())
+        self.assertEqual(([],), thermal_iter.launch())
+        self.assertTrue(power_iter.iteration_done)
+        self.assertTrue(thermal_iter.iteration_done)
+
+    def test_outage_not_merged(self):
+        """Mains outage & restoration act as barriers"""
+        self.consumer.queue_iteration(volt_iteration(120, 110))
+        self.consumer.queue_iteration(volt_iteration(110, 0))
+        self.consumer.queue_iteration(volt_iteration(0, 120))
+        self.consumer.queue_iteration(volt_iteration(120, 118))
+
+        self.assertEqual(4, self.consumer.queue_depth)
+        self.assertEqual(0, self.consumer.stats["merged"])
+
+    def test_ambient_merged(self):
+        """Ambient changes are collapsed in the thermal queue"""
+        first_iter = ambient_iteration(21, 22)
+        first_event = first_iter.src_event
+        self.consumer.queue_iteration(first_iter)
+        self.consumer.queue_iteration(ambient_iteration(22, 23))
+        self.consumer.queue_iteration(ambient_iteration(23, 20))
+
+        self.assertEqual(1, self.consumer.queue_depth)
+        self.assertEqual((21, 20), first_iter.src_event.temperature())
+        self.assertEqual((21, 22), first_event.temperature())
+        self.assertEqual(3, self.consumer.stats["queued"])
+
+
+class IterationGateTests(unittest.TestCase):
+    """Tests launch ordering of iterations queued by consumers sharing a gate"""
+
+    def setUp(self):
+        self.gate = IterationGate()
+        self.mains_consumer = EngineIterationConsumer(
+            "mains_worker", gate=self.gate, barrier=True
+        )
+        self.domain_consumer = EngineIterationConsumer("domain_worker", gate=self.gate)
+
+    def test_barrier_order(self):
+        """Domain iterations wait for the wallpower changes queued before them
+        and wallpower changes wait for everything queued earlier"""
+        btn_iter_1, btn_iter_2 = button_iteration(None), button_iteration(None)
+        volt_iter = volt_iteration(120, 0)
+
+        self.domain_consumer.queue_iteration(btn_iter_1)
+        self.mains_consumer.queue_iteration(volt_iter)
+        self.domain_consumer.queue_iteration(btn_iter_2)
+
+        self.assertTrue(self.gate.can_launch(btn_iter_1))
+        self.assertFalse(self.gate.can_launch(volt_iter))
+        self.assertFalse(self.gate.can_launch(btn_iter_2))
+
+        self.gate.release(btn_iter_1)
+        self.assertTrue(self.gate.can_launch(volt_iter))
+        self.assertFalse(self.gate.can_launch(btn_iter_2))
+
+        self.gate.release(volt_iter)
+        self.assertTrue(self.gate.can_launch(btn_iter_2))
+
+    def test_merge_not_reordered(self):
+        """Voltage changes are not merged across iterations of other consumers"""
+        self.mains_consumer.queue_iteration(volt_iteration(120, 115))
+        self.domain_consumer.queue_iteration(button_iteration(None))
+        self.mains_consumer.queue_iteration(volt_iteration(115, 110))
+
+        self.assertEqual(2, self.mains_consumer.queue_depth)
+        self.assertEqual(0, self.mains_consumer.stats["merged"])
+
+
+class PowerDomainsTests(unittest.TestCase):
+    """Tests power iterations launched by a worker pool shared across domains"""
+
+    timeout = 5
+
+    def setUp(self):
+        # 8 power domains consisting of a single outlet each
+        self.index = TopologyIndex(
+            assets=[{"key": k, "type": "outlet"} for k in range(1, 9)],
+            power_links=[],
+            mains_outlets=list(range(1, 9)),
+        )
+
+    def test_bounded_workers(self):
+        """Iterations of every domain are launched by a bounded number of workers"""
+        domains = PowerDomains(self.index, max_workers=2)
+        all_done = threading.Event()
+
+        def on_launched(consumer, *_):
+            PowerDomains.complete_iteration(consumer.current_iteration)
+            if domains.stats["completed"] == 8:
+                all_done.set()
+
+        domains.start(on_launched)
+        for asset_key in range(1, 9):
+            domains.queue_iteration(DomainIteration(asset_key))
+
+        self.assertTrue(all_done.wait(PowerDomainsTests.timeout))
+        domains.stop()
+
+        stats = domains.stats
+        self.assertEqual(2, stats["num_workers"])
+        self.assertEqual(8, stats["num_domains"])
+        # mains consumer is listed alongside 8 domain queues
+        self.assertEqual(9, len(stats["domains"]))
+        self.assertEqual(0, stats["queue_depth"])
+
+    def test_completed_after_rebuild(self):
+        """Iteration still in progress when domains are re-built is completed
+        by the consumer it was queued in"""
+        launched = threading.Event()
+        old_domains = PowerDomains(self.index)
+        old_domains.start(lambda *_: launched.set())
+
+        power_iter = DomainIteration(1)
+        old_domains.queue_iteration(power_iter)
+        self.assertTrue(launched.wait(PowerDomainsTests.timeout))
+        old_consumer = power_iter.consumer
+
+        old_domains.stop()
+        new_domains = PowerDomains(self.index)
+        new_domains.start(lambda *_: None)
+
+        PowerDomains.complete_iteration(power_iter)
+        new_domains.stop()
+
+        self.assertIsNone(old_consumer.current_iteration)
+        self.assertEqual(0, new_domains.stats["completed"])
+
+    def test_batch_routing(self):
+        """Batch within one domain is queued in that domain,
+        batch spanning multiple domains acts as a barrier"""
+        index = TopologyIndex(
+            assets=[{"key": k, "type": "outlet"} for k in range(1, 4)],
+            power_links=[(2, 1)],
+            mains_outlets=[1, 3],
+        )
+        domains = PowerDomains(index)
+
+        single_domain = batch_iteration([1, 2])
+        domains.queue_iteration(single_domain)
+        self.assertEqual(str(index.get_domain(1)), single_domain.consumer.name)
+
+        multi_domain = batch_iteration([2, 3])
+        domains.queue_iteration(multi_domain)
+        self.assertEqual("mains", multi_domain.consumer.name)
+
+
+class BatchIterationTests(unittest.TestCase):
+    """Tests power iteration started by a batch of button events"""
+
+    def test_launch(self):
+        """Every button event is dispatched in its own voltage branch"""
+        power_iter = batch_iteration([1, 2, 3])
+        (volt_events,) = power_iter.launch()
+        volt_events = list(volt_events)
+
+        self.assertEqual([1, 2, 3], [k for k, _ in volt_events])
+        for _, btn_event in volt_events:
+            self.assertIs(power_iter, btn_event.power_iter)
+            self.assertIsNotNone(btn_event.branch)
+
+        self.assertFalse(power_iter.all_voltage_branches_done)
+
+    def test_combined_load(self):
+        """Load changes of the batch assets are sent to every parent at once"""
+        power_iter = batch_iteration([1, 2, 3])
+        power_iter.data_source = types.SimpleNamespace(
+            get_affected_assets=lambda key: ([], [20] if key == 3 else [10])
+        )
+        (volt_events,) = power_iter.launch()
+
+        load_events = []
+        for _, btn_event in volt_events:
+            asset_event = events.AssetPowerEvent(
+                asset=btn_event.asset,
+                old_out_volt=120,
+                new_out_volt=0,
+                power_iter=power_iter,
+                branch=btn_event.branch,
+            )
+            asset_event.load.old, asset_event.load.new = 1.5, 0
+            _, next_load_events = power_iter.process_power_event(asset_event)
+            load_events.append(list(next_load_events or []))
+
+        # nothing is propagated till the last asset in the batch is processed
+        self.assertEqual([[], []], load_events[:2])
+
+        combined = dict(load_events[2])
+        self.assertEqual([10, 20], sorted(combined))
+        self.assertEqual((3.0, 0), combined[10].load())
+        self.assertEqual((1.5, 0), combined[20].load())
+        self.assertIsInstance(combined[10], events.ChildLoadDownEvent)
+
+        self.assertTrue(power_iter.all_voltage_branches_done)
+        self.assertFalse(power_iter.all_load_branches_done)
+
+    def test_not_merged(self):
+        """Batches are never coalesced"""
+        self.assertFalse(batch_iteration([1]).merge(batch_iteration([2])))
+
+
+class ThermalIterationTests(unittest.TestCase):
+    """Tests ambient event fan-out"""
+
+    def test_subscribers_only(self):
+        """Ambient events are dispatched against thermal subscribers only"""
+        amb_event = events.AmbientEvent(old_temp=21, new_temp=25)
+        thermal_iter = ThermalIteration(amb_event, subscribers=[3, 7])
+
+        (thermal_events,) = thermal_iter.launch()
+        self.assertEqual([3, 7], [k for k, _ in thermal_events])
+        self.assertFalse(thermal_iter.iteration_done)
+
+    def test_no_subscribers(self):
+        """Iteration is done right away when nothing reacts to ambient"""
+        thermal_iter = ambient_iteration(21, 25)
+        (thermal_events,) = thermal_iter.launch()
+
+        self.assertEqual([], list(thermal_events))
+        self.assertTrue(thermal_iter.iteration_done)
+
+    def test_no_subscribers_queued(self):
+        """Iterations completed inside the launch callback do not stall
+        the worker (nor consumer shutdown)"""
+        consumer = EngineIterationConsumer("thermal_worker")
+        completed = threading.Semaphore(0)
+
+        def on_launched(*_):
+            # same as engine: iteration with no subscribers is done right away
+            if consumer.current_iteration.iteration_done:
+                consumer.unfreeze_task_queue()
+                completed.release()
+
+        consumer.start(on_iteration_launched=on_launched)
+        for old_temp, new_temp in [(21, 25), (25, 22)]:
+            consumer.queue_iteration(ambient_iteration(old_temp, new_temp))
+            self.assertTrue(completed.acquire(timeout=5))
+
+        stop_thread = threading.Thread(target=consumer.stop, daemon=True)
+        stop_thread.start()
+        stop_thread.join(timeout=5)
+
+        self.assertFalse(stop_thread.is_alive())
+        self.assertEqual(2, consumer.stats["completed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Unittests for powering a group of assets at once"""
+import json
+import unittest
+from unittest import mock
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.model.graph_reference import GraphReference
+from enginecore.state.api import IStateManager
+from enginecore.state.redis_channels import RedisChannels
+
+
+class FakeStateManager:
+    """Records power updates in the batch in progress"""
+
+    def __init__(self, key, fail=False):
+        self.key = key
+        self.fail = fail
+        self.powered_up = False
+
+    def power_up(self):
+        if self.fail:
+            raise RuntimeError("power up failed")
+        self.powered_up = True
+        # pylint: disable=protected-access
+        IStateManager._batch.updates.append({"key": self.key, "new_state": 1})
+
+
+class PowerBatchTests(unittest.TestCase):
+    """Tests batch validation & publishing of the applied updates"""
+
+    def setUp(self):
+        self.saved_store = IStateManager.redis_store
+        self.redis = InMemoryRedis()
+        self.redis.publish = mock.MagicMock()
+        IStateManager.redis_store = self.redis
+        self.addCleanup(setattr, IStateManager, "redis_store", self.saved_store)
+
+        for patcher in [
+            mock.patch.object(GraphReference, "session_scope"),
+            mock.patch.object(
+                GraphReference, "get_asset_and_components", return_value=None
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.state_managers = {1: FakeStateManager(1), 2: FakeStateManager(2)}
+        # pylint: disable=protected-access
+        IStateManager._registry = dict(self.state_managers)
+        self.addCleanup(IStateManager.clear_state_managers)
+
+    def test_missing_asset(self):
+        """Batch with an unknown asset is rejected before anything is updated"""
+        with self.assertRaises(ValueError):
+            IStateManager.set_power_batch([1, 2, 3], power_up=True)
+
+        self.assertFalse(any(sm.powered_up for sm in self.state_managers.values()))
+        self.redis.publish.assert_not_called()
+
+    def test_partially_applied(self):
+        """Updates applied before the batch failed are still published"""
+        self.state_managers[2].fail = True
+
+        with self.assertRaises(RuntimeError):
+            IStateManager.set_power_batch([1, 2], power_up=True)
+
+        channel, message = self.redis.publish.call_args[0]
+        self.assertEqual(RedisChannels.batch_state_update_channel, channel)
+        self.assertEqual([{"key": 1, "new_state": 1}], json.loads(message)["updates"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Unittests for the vectorized power flow solver"""
+
+import unittest
+
+from enginecore.state.engine.topology import TopologyIndex
+from enginecore.state.engine.power_solver import (
+    PowerFlowSolver,
+    PowerFlowSnapshot,
+    np,
+)
+
+
+class FakeApplier:
+    """Records asset updates requested by the solver"""
+
+    def __init__(self, refuse_power_up=None):
+        self.voltages = {}
+        self.transitions = {}
+        self._refuse_power_up = refuse_power_up or []
+
+    def set_input_voltage(self, key, voltage):
+        self.voltages[key] = voltage
+
+    def transition(self, key, power_up):
+        self.transitions[key] = power_up
+        return int(power_up and key not in self._refuse_power_up)
+
+    def ups_voltage(self, key, old_voltage, new_voltage):
+        # switch to battery on power loss
+        return 1, 120.0, new_voltage == 0
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class PowerFlowSolverTests(unittest.TestCase):
+    """Tests voltage, state & load propagation across the topology"""
+
+    def setUp(self):
+        # outlet(1) -> pdu(2) -> outlets(3, 4) -> psus(51, 52) -> server(5)
+        # outlet(1) -> lamp(6)
+        # outlet(7) -> ups(8) -> lamp(9)
+        assets = [
+            {"key": 1, "type": "outlet"},
+            {"key": 2, "type": "pdu"},
+            {"key": 3, "type": "outlet"},
+            {"key": 4, "type": "outlet"},
+            {"key": 5, "type": "server", "powerConsumption": 240},
+            {"key": 6, "type": "lamp", "powerConsumption": 120},
+            {"key": 7, "type": "outlet"},
+            {"key": 8, "type": "ups"},
+            {"key": 9, "type": "lamp", "powerConsumption": 120},
+            {"key": 51, "type": "psu", "powerConsumption": 6, "draw": 0.5},
+            {"key": 52, "type": "psu", "powerConsumption": 6, "draw": 0.5},
+        ]
+
+        power_links = [(2, 1), (3, 2), (4, 2), (51, 3), (52, 4), (5, 51), (5, 52)]
+        power_links += [(6, 1), (8, 7), (9, 8)]
+
+        self.solver = PowerFlowSolver(TopologyIndex(assets, power_links, [1, 7]))
+
+    def _snapshot(self, online):
+        num_assets = len(self.solver.keys)
+        volt = 120.0 if online else 0.0
+
+        return PowerFlowSnapshot(
+            status=np.full(num_assets, int(online)),
+            in_volt=np.full(num_assets, volt),
+            out_volt=np.full(num_assets, volt),
+            load=np.zeros(num_assets),
+            user_off=np.zeros(num_assets, dtype=bool),
+            on_battery=np.zeros(num_assets, dtype=bool),
+        )
+
+    def _solve(self, voltage, online, applier=None):
+        result = self.solver.solve(voltage, self._snapshot(online), applier)
+        return {c.key: c for c in result.changes()}
+
+    def test_levels(self):
+        """Assets are ordered by distance from the mains"""
+        self.assertEqual(5, self.solver.num_levels)
+        self.assertEqual([1, 7], self.solver.keys[:2])
+        self.assertEqual(5, self.solver.keys[-1])
+
+    def test_power_restored(self):
+        """Assets power up & load is accumulated upstream"""
+        applier = FakeApplier()
+        changes = self._solve(120.0, online=False, applier=applier)
+
+        self.assertTrue(all(applier.transitions.values()))
+        self.assertNotIn(8, applier.transitions)  # ups handles voltage itself
+
+        self.assertAlmostEqual(2.0, changes[5].load[1])
+        self.assertAlmostEqual(1.05, changes[51].load[1])
+        self.assertAlmostEqual(1.05, changes[52].load[1])
+        self.assertAlmostEqual(2.1, changes[2].load[1])
+        self.assertAlmostEqual(3.1, changes[1].load[1])
+        self.assertAlmostEqual(1.0, changes[7].load[1])
+
+    def test_power_outage(self):
+        """Assets go offline, UPS keeps powering its children"""
+        applier = FakeApplier()
+        changes = self._solve(0.0, online=True, applier=applier)
+
+        self.assertFalse(any(applier.transitions.values()))
+        self.assertEqual((1, 0), changes[5].status)
+        self.assertEqual((120.0, 0.0), changes[7].in_volt)
+
+        # lamp powered by ups is not affected, ups is not drawing any power
+        self.assertEqual((120.0, 120.0), changes[9].in_volt)
+        self.assertEqual((1, 1), changes[9].status)
+        self.assertAlmostEqual(0.0, changes[7].load[1])
+
+    def test_user_off(self):
+        """Devices turned off by a user stay off, servers follow their own rules"""
+        snapshot = self._snapshot(online=False)
+        user_off = np.isin(self.solver.keys, [5, 6])
+        applier = FakeApplier()
+
+        self.solver.solve(120.0, snapshot._replace(user_off=user_off), applier)
+
+        self.assertNotIn(6, applier.transitions)
+        self.assertTrue(applier.transitions[5])
+
+    def test_vm_inactive(self):
+        """Online server with VM down is powered up on voltage increase"""
+        snapshot = self._snapshot(online=False)
+        status = np.isin(self.solver.keys, [5]).astype(int)
+        vm_active = ~np.isin(self.solver.keys, [5])
+        applier = FakeApplier()
+
+        self.solver.solve(
+            120.0, snapshot._replace(status=status, vm_active=vm_active), applier
+        )
+        self.assertTrue(applier.transitions[5])
+
+    def test_psu_takes_over_load(self):
+        """Online PSU takes over the share of the offline one"""
+        applier = FakeApplier(refuse_power_up=[4])
+        changes = self._solve(120.0, online=False, applier=applier)
+
+        self.assertNotIn(52, changes)
+        self.assertAlmostEqual(2.05, changes[51].load[1])
+        self.assertAlmostEqual(2.05, changes[2].load[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
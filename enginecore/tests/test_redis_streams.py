@@ -0,0 +1,79 @@
+"""Unittests for redis streams transport of the engine input events"""
+import unittest
+from unittest import mock
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.state.redis_channels import RedisChannels
+from enginecore.state import redis_streams
+from enginecore.state.redis_streams import StreamConsumer, StreamTransport
+
+
+class StreamTransportTests(unittest.TestCase):
+    """Tests messages being routed to streams once engine enables them"""
+
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.redis.xadd = mock.MagicMock()
+        self.store = StreamTransport(self.redis)
+
+    def test_pubsub(self):
+        """Messages are published unless streams are enabled"""
+        self.store.publish(RedisChannels.state_update_channel, "{}")
+        self.assertEqual(1, self.redis.published[RedisChannels.state_update_channel])
+        self.redis.xadd.assert_not_called()
+
+    def test_streams(self):
+        """Engine input messages are appended to the channel group stream"""
+        redis_streams.set_transport(self.redis, streams=True)
+
+        self.store.publish(RedisChannels.ambient_update_channel, "{}")
+        self.store.publish(RedisChannels.load_update_channel, "{}")
+
+        self.redis.xadd.assert_called_once_with(
+            "engine-stream:thermal",
+            {"channel": RedisChannels.ambient_update_channel, "data": "{}"},
+            maxlen=redis_streams.STREAM_MAXLEN,
+        )
+        self.assertEqual(1, self.redis.published[RedisChannels.load_update_channel])
+
+
+class StreamConsumerTests(unittest.TestCase):
+    """Tests batched reads of the stream messages"""
+
+    def setUp(self):
+        self.redis = mock.MagicMock()
+        self.redis.exists.return_value = False
+        self.consumer = StreamConsumer(self.redis, "power", count=10)
+
+    def test_group(self):
+        """Consumer group is created starting with new messages"""
+        self.redis.xgroup_create.assert_called_once_with(
+            "engine-stream:power", "engine", id="$", mkstream=True
+        )
+
+    def test_read(self):
+        """Messages are formatted as pubsub messages & acknowledged by id"""
+        channel = RedisChannels.state_update_channel.encode()
+        self.redis.xreadgroup.return_value = [
+            [
+                b"engine-stream:power",
+                [
+                    (b"1-0", {b"channel": channel, b"data": b"{}"}),
+                    (b"1-1", {b"channel": channel, b"data": b"[]"}),
+                ],
+            ]
+        ]
+
+        messages = self.consumer.read()
+        self.assertEqual([b"{}", b"[]"], [m["data"] for m in messages])
+        self.assertEqual({channel}, {m["channel"] for m in messages})
+
+        self.consumer.ack([])
+        self.consumer.ack([m["id"] for m in messages])
+        self.redis.xack.assert_called_once_with(
+            "engine-stream:power", "engine", b"1-0", b"1-1"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
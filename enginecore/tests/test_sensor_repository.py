@@ -0,0 +1,94 @@
+"""Unittests for the sensor repository of a server"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from enginecore.model.graph_reference import GraphReference
+from enginecore.state.api import IStateManager
+from enginecore.state.sensor import repository
+from enginecore.state.sensor.repository import SensorRepository
+from enginecore.state.sensor.thermal_scheduler import THERMAL_SCHEDULER
+
+
+class SensorRepositoryTests(unittest.TestCase):
+    """Tests thermal updates of the server sensors & storage"""
+
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        os.mkdir(os.path.join(temp_dir, "1"))
+
+        self.temperatures_written = threading.Event()
+        patchers = [
+            mock.patch.object(
+                repository, "get_temp_workplace_dir", return_value=temp_dir
+            ),
+            mock.patch.object(GraphReference, "get_driver"),
+            mock.patch.object(GraphReference, "get_asset_sensors", return_value=[]),
+            mock.patch.object(
+                GraphReference,
+                "get_thermal_relationships",
+                return_value={"sensor": [], "storage": [], "cpu": []},
+            ),
+            mock.patch.object(
+                GraphReference,
+                "get_all_hd_thermal_elements",
+                return_value=[
+                    {
+                        "controller": {"controllerNum": 0},
+                        "component": {"DID": 1, "temperature": 30},
+                    }
+                ],
+            ),
+            mock.patch.object(
+                GraphReference,
+                "set_hd_components_temperature",
+                side_effect=lambda *_: self.temperatures_written.set(),
+            ),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        self.set_hd_temps = mocks[-1]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        self.repo = SensorRepository(1, enable_thermal=True)
+        self.addCleanup(self.repo.stop)
+
+    def test_storage_flush(self):
+        """Storage temperatures updated by the impacts per relationship
+        are written to the graph"""
+        # pylint: disable=protected-access
+        self.repo._thermal_rels.add_to_storage_temperature(
+            ("PhysicalDrive", 0, 1), 2, {"lower": 21, "upper": 40}
+        )
+        self.repo.adjust_thermal_sensors(old_ambient=20, new_ambient=21)
+
+        self.assertTrue(self.temperatures_written.wait(5))
+        self.assertEqual(
+            [
+                {
+                    "hd_type": "PhysicalDrive",
+                    "controller": 0,
+                    "target": 1,
+                    "temperature": 32,
+                }
+            ],
+            self.set_hd_temps.call_args[0][2],
+        )
+        self.assertIn(self.repo, THERMAL_SCHEDULER._tasks)
+
+    def test_thermal_model_state(self):
+        """Thermal model reads cpu load from the shared server state manager"""
+        with mock.patch.object(
+            IStateManager, "get_state_manager_by_key"
+        ) as get_state_manager:
+            get_state_manager.return_value.cpu_load = 0
+            # pylint: disable=protected-access
+            thermal_model = self.repo._thermal_model()
+            next(thermal_model)
+            thermal_model.close()
+
+        get_state_manager.assert_called_once_with(1)
@@ -0,0 +1,117 @@
+"""Unittests for the memory-mapped sensor table shared with ipmi_sim"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# sensors are loaded by the state api (avoids circular imports)
+import enginecore.state.api  # pylint: disable=unused-import
+from enginecore.state.sensor.file_locks import SensorFileLocks
+from enginecore.state.sensor.sensor import Sensor
+from enginecore.state.sensor.shared_table import SensorTable, to_int
+
+
+def sensor_details(name, default_value):
+    """Sensor specs as returned by the graph reference"""
+    return {
+        "specs": {
+            "name": name,
+            "type": "cpuTemperature",
+            "group": "temperature",
+            "address": "0x1",
+            "defaultValue": default_value,
+        },
+        "address_space": None,
+    }
+
+
+class SensorTableTests(unittest.TestCase):
+    """Tests sensor values being stored in the shared table"""
+
+    def setUp(self):
+        self.sensor_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.sensor_dir)
+        self.addCleanup(SensorTable.close_all)
+
+        self.table_path = os.path.join(self.sensor_dir, SensorTable.filename)
+        self.table = SensorTable.create(self.table_path, ["CPU_TEMP", "PSU_STATUS"])
+
+    def test_read_write(self):
+        """Values are read back from any mapping of the table"""
+        self.table.write("CPU_TEMP", 40)
+        self.table.write("PSU_STATUS", "0x08")
+
+        SensorTable.close_all()
+        table = SensorTable.attach(self.table_path)
+
+        self.assertEqual(40, table.read("CPU_TEMP"))
+        self.assertEqual(8, table.read("PSU_STATUS"))
+        self.assertEqual(["CPU_TEMP", "PSU_STATUS"], table.names)
+        self.assertIsNone(SensorTable.attach(self.table_path + "_missing"))
+
+    def test_to_int(self):
+        """Sensor values are stored as integers"""
+        self.assertEqual([8, 21, -5, 7], list(map(to_int, ["0x08", "21.5", -5, 7.9])))
+
+    def test_reuse(self):
+        """Existing table is reused unless sensors are missing from it"""
+        self.table.write("CPU_TEMP", 40)
+
+        same = SensorTable.create(self.table_path, ["CPU_TEMP"])
+        self.assertIs(self.table, same)
+
+        extended = SensorTable.create(self.table_path, ["CPU_TEMP", "FAN_1"])
+        self.assertIn("FAN_1", extended)
+        self.assertEqual(0, extended.read("CPU_TEMP"))
+        self.assertFalse(self.table.is_current())
+
+    def test_concurrent(self):
+        """Readers never see a half-written value"""
+        values = [0x0102030405060708, -1]
+        stop = threading.Event()
+
+        def write():
+            i = 0
+            while not stop.is_set():
+                self.table.write("CPU_TEMP", values[i % 2])
+                i += 1
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(10000):
+                self.assertIn(self.table.read("CPU_TEMP"), values + [0])
+        finally:
+            stop.set()
+            writer.join()
+
+    def test_sensor(self):
+        """Sensors use the table (and keep files only if they are polled by ipmi_sim)"""
+        locks = SensorFileLocks()
+        cpu, psu = [
+            Sensor(
+                self.sensor_dir,
+                1,
+                sensor_details(name, value),
+                locks,
+                graph_ref=None,
+                s_table=self.table,
+            )
+            for name, value in [("CPU_TEMP", 30), ("PSU_STATUS", "0x01")]
+        ]
+
+        self.table.set_file_backed("PSU_STATUS")
+        cpu.set_to_defaults()
+        psu.set_to_defaults()
+
+        self.assertEqual("30", cpu.sensor_value)
+        self.assertEqual("1", psu.sensor_value)
+        self.assertFalse(os.path.exists(os.path.join(self.sensor_dir, "CPU_TEMP")))
+
+        with open(os.path.join(self.sensor_dir, "PSU_STATUS")) as sf_handler:
+            self.assertEqual("0x01", sf_handler.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
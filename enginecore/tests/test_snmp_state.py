@@ -0,0 +1,87 @@
+"""Unittests for OID lookups of SNMP devices"""
+import unittest
+from unittest import mock
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.model.graph_reference import GraphReference
+from enginecore.state.api import IStateManager, IUPSStateManager
+from enginecore.state.api.snmp_state import ISnmpDeviceStateManager
+from enginecore.tools.utils import format_as_redis_key
+
+
+OID_CATALOG = {
+    7: {
+        "BasicOutputStatus": {
+            "oid": "1.3.6.1.4.1.318.1.1.1.4.1.1.0",
+            "dtype": 2,
+            "specs": {"onLine": 2, "onBattery": 3},
+        },
+        "TimeOnBattery": {
+            "oid": "1.3.6.1.4.1.318.1.1.1.2.1.2.0",
+            "dtype": 67,
+            "specs": None,
+        },
+    }
+}
+
+
+class OidCatalogTests(unittest.TestCase):
+    """Tests OIDs being looked up once & updated with a single write"""
+
+    def setUp(self):
+        self.saved_store = IStateManager.redis_store
+        self.redis = InMemoryRedis()
+        self.redis.get = mock.MagicMock(wraps=self.redis.get)
+        IStateManager.redis_store = self.redis
+
+        patcher = mock.patch.object(
+            GraphReference,
+            "get_oid_catalog",
+            side_effect=lambda session, asset_key=None: OID_CATALOG,
+        )
+        self.get_oid_catalog = patcher.start()
+        self.addCleanup(patcher.stop)
+        scope_patcher = mock.patch.object(GraphReference, "session_scope")
+        scope_patcher.start()
+        self.addCleanup(scope_patcher.stop)
+
+        ISnmpDeviceStateManager.clear_oid_catalog()
+        self.state = IUPSStateManager({"key": 7, "type": "ups"})
+
+    def tearDown(self):
+        IStateManager.redis_store = self.saved_store
+        ISnmpDeviceStateManager.clear_oid_catalog()
+
+    def test_lookup(self):
+        """Asset OIDs are queried once & cached"""
+        oid = self.state.get_oid_by_name("TimeOnBattery")
+        self.state.get_oid_by_name("BasicOutputStatus")
+
+        self.assertEqual("1.3.6.1.4.1.318.1.1.1.2.1.2.0", oid.oid)
+        self.assertIsNone(self.state.get_oid_by_name("PowerOff"))
+        self.get_oid_catalog.assert_called_once_with(mock.ANY, 7)
+
+    def test_load(self):
+        """OIDs of all the assets are looked up with one query"""
+        self.assertEqual(1, ISnmpDeviceStateManager.load_oid_catalog())
+        self.state.get_oid_by_name("TimeOnBattery")
+
+        self.get_oid_catalog.assert_called_once_with(mock.ANY)
+
+    def test_update(self):
+        """OID values are written without reading their data type"""
+        # pylint: disable=protected-access
+        self.assertTrue(
+            self.state._update_oid_by_name("BasicOutputStatus", "onBattery", True)
+        )
+        self.assertFalse(self.state._update_oid_by_name("PowerOff", 1))
+
+        rkey = format_as_redis_key("7", "1.3.6.1.4.1.318.1.1.1.4.1.1.0", False)
+        self.redis.get.assert_not_called()
+        self.assertEqual(b"2|3", self.redis.get(rkey))
+        oid = self.state.get_oid_by_name("BasicOutputStatus")
+        self.assertEqual("3", self.state.get_oid_value(oid))
+
+
+if __name__ == "__main__":
+    unittest.main()
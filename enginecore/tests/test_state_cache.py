@@ -0,0 +1,102 @@
+"""Unittests for in-process cache of asset state"""
+import time
+import unittest
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.tools.state_cache import StateCache
+
+
+class StateCacheTests(unittest.TestCase):
+    """Tests read-through caching of asset state keys"""
+
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.redis.set("1-outlet:state", 1)
+        self.redis.set("1-outlet:agent", 1234)
+        self.redis.set("0000000001-1.3.6.1.2.1.1.1.0", "ups")
+        self.cache = StateCache(self.redis)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def _wait_invalidated(self, name):
+        """Wait for the keyspace notification to drop cached value"""
+        deadline = time.time() + 2
+        # pylint: disable=protected-access
+        while name in self.cache._values and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_read_through(self):
+        """Repeated state reads are served from memory"""
+        self.assertEqual(b"1", self.cache.get("1-outlet:state"))
+        self.assertEqual(b"1", self.cache.get("1-outlet:state"))
+        self.assertEqual(
+            {"size": 1, "hits": 1, "misses": 1, "listening": True}, self.cache.stats
+        )
+
+        self.cache.invalidate("1-outlet:state")
+        self.assertEqual(b"1", self.cache.get("1-outlet:state"))
+        self.assertEqual(2, self.cache.stats["misses"])
+
+    def test_updated_by_other_client(self):
+        """Values updated by other redis clients are invalidated"""
+        self.cache.get("1-outlet:state")
+        self.cache.get("0000000001-1.3.6.1.2.1.1.1.0")
+        self.assertEqual(2, self.cache.stats["size"])
+
+        self.redis.set("1-outlet:state", 0)
+        self.redis.set("0000000001-1.3.6.1.2.1.1.1.0", "pdu")
+        self._wait_invalidated("1-outlet:state")
+        self._wait_invalidated("0000000001-1.3.6.1.2.1.1.1.0")
+
+        self.assertEqual(b"0", self.cache.get("1-outlet:state"))
+        self.assertEqual(b"pdu", self.cache.get("0000000001-1.3.6.1.2.1.1.1.0"))
+
+    def test_not_cached(self):
+        """Keys other than asset state & OIDs are not cached"""
+        self.cache.get("1-outlet:agent")
+        self.assertEqual(0, self.cache.stats["size"])
+
+    def test_not_listening(self):
+        """Nothing is cached if updates made by other clients are not received"""
+        self.cache.close()
+        self.cache = StateCache(self.redis, listen=False)
+
+        self.cache.get("1-outlet:state")
+        self.cache.set("1-outlet:load", 0.5)
+        self.redis.set("1-outlet:state", 0)
+
+        self.assertEqual(0, self.cache.stats["size"])
+        self.assertEqual(b"0", self.cache.get("1-outlet:state"))
+
+    def test_writes(self):
+        """Cached values are updated by writes made through the cache"""
+        self.cache.mget(["1-outlet:state", "1-outlet:load"])
+        self.cache.set("1-outlet:state", 0)
+        self.cache.mset({"1-outlet:load": 0.5})
+        self.assertEqual(
+            [b"0", b"0.5"], self.cache.mget("1-outlet:state", "1-outlet:load")
+        )
+
+        pipe = self.cache.pipeline()
+        pipe.mset({"1-outlet:load": 1.5})
+        self.assertEqual(b"0.5", self.cache.get("1-outlet:load"))
+        pipe.execute()
+        self.assertEqual(b"1.5", self.cache.get("1-outlet:load"))
+        self.assertEqual(b"1.5", self.redis.get("1-outlet:load"))
+
+        self.cache.delete("1-outlet:state")
+        self.assertIsNone(self.cache.get("1-outlet:state"))
+
+    def test_stale_read(self):
+        """Values read before a concurrent update are not cached"""
+        generation = self.cache._generation  # pylint: disable=protected-access
+        self.cache.invalidate("1-outlet:state")
+        self.cache._cache_read(  # pylint: disable=protected-access
+            generation, [("1-outlet:state", b"1")]
+        )
+        self.assertEqual(0, self.cache.stats["size"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Unittests for bulk loading of the static SNMP data"""
+import os
+import unittest
+from unittest import mock
+
+from enginecore.state import state_initializer
+from enginecore.tools.utils import format_as_redis_key
+
+STATIC_DATA = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "data")
+
+
+@mock.patch.dict(os.environ, {"SIMENGINE_STATIC_DATA": STATIC_DATA})
+class SnmprecLoadingTests(unittest.TestCase):
+    """Tests .snmprec data being written in SNMPSim format"""
+
+    def test_read(self):
+        """OIDs are ordered the way SNMPSim walks them"""
+        snmprec = state_initializer.read_snmprec(os.path.join("pdu", "apc-pdu.snmprec"))
+        self.assertTrue(snmprec)
+
+        keys = [format_as_redis_key("0000000007", oid) for _, oid, _, _ in snmprec]
+        self.assertEqual(sorted(keys), keys)
+
+    def test_load(self):
+        """Values, ordering & walk index are sent in batches
+        with graph OIDs taking precedence"""
+        snmprec = [
+            (format_as_redis_key("", oid), oid, "2", "1")
+            for oid in sorted(["1.3.6.1.2.1.1.5.0", "1.3.6.1.2.1.1.6.0", "1.3.6.1.4"])
+        ]
+        graph_oids = {"1.3.6.1.2.1.1.6.0": {"dtype": "4", "value": "server room"}}
+        redis_store = mock.MagicMock()
+        pipe = redis_store.pipeline.return_value
+
+        with mock.patch.object(state_initializer, "SNMPREC_BATCH_SIZE", 2):
+            state_initializer._load_snmprec(  # pylint: disable=protected-access
+                redis_store, "7", snmprec, graph_oids
+            )
+
+        values = {}
+        for call in pipe.mset.call_args_list:
+            values.update(call[0][0])
+        ordering = [k for c in pipe.rpush.call_args_list[:-1] for k in c[0][1:]]
+        index = {}
+        for call in pipe.zadd.call_args_list:
+            self.assertEqual("0000000007-oids_index", call[0][0])
+            index.update(call[0][1])
+
+        self.assertEqual(2, pipe.mset.call_count)
+        self.assertEqual(
+            [format_as_redis_key("0000000007", s[1]) for s in snmprec], ordering
+        )
+        self.assertEqual(dict.fromkeys(ordering, 0), index)
+        pipe.delete.assert_called_once_with(
+            "0000000007-oids_ordering", "0000000007-oids_index"
+        )
+        self.assertEqual(
+            "4|server room",
+            values[format_as_redis_key("0000000007", "1.3.6.1.2.1.1.6.0")],
+        )
+        pipe.rpush.assert_called_with("7", "0000000007")
+        pipe.execute.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Unittests for the state listener reading engine input streams"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from circuits import Component, handler
+
+from enginecore.state.redis_channels import RedisChannels
+from enginecore.state import redis_state_listener
+from enginecore.state.redis_state_listener import StateListener
+
+
+class SlowStateHandler(Component):
+    """Stands in for the redis state handler, takes a while to handle updates"""
+
+    def __init__(self, *_):
+        super(SlowStateHandler, self).__init__()
+        self.handled = []
+
+    @handler(RedisChannels.state_update_channel)
+    def on_state_update(self, data):
+        """Record the update once done with it"""
+        time.sleep(0.1)
+        self.handled.append(data)
+
+
+class StreamAckTests(unittest.TestCase):
+    """Tests stream messages being acknowledged once handled"""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(redis_state_listener, "configure_env"),
+            mock.patch.dict("os.environ", {"SIMENGINE_REDIS_PORT": "6379"}),
+            mock.patch.object(redis_state_listener.redis, "StrictRedis"),
+            mock.patch.object(
+                redis_state_listener, "RedisStateHandler", SlowStateHandler
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        pubsub = redis_state_listener.redis.StrictRedis.return_value.pubsub
+        pubsub.return_value.get_message.return_value = None
+
+        self.listener = StateListener(engine_cls=None)
+        self.state_handler = self.listener._redis_state_handler
+
+    def test_ack_after_handled(self):
+        """Batch is acknowledged after the handler returned"""
+        channel = RedisChannels.state_update_channel.encode()
+        acked = threading.Event()
+        consumer = mock.MagicMock()
+        batches = [
+            [
+                {"id": b"1-0", "channel": channel, "data": b"1"},
+                {"id": b"1-1", "channel": channel, "data": b"2"},
+            ]
+        ]
+
+        def read(block):
+            if not batches:
+                # stop listening once the batch is dispatched
+                self.listener._stop_event.set()
+                return []
+            return batches.pop()
+
+        consumer.read.side_effect = read
+
+        def ack(entry_ids):
+            self.assertEqual([1, 2], self.state_handler.handled)
+            self.assertEqual([b"1-0", b"1-1"], entry_ids)
+            acked.set()
+
+        consumer.ack.side_effect = ack
+        self.listener.start()
+        self.addCleanup(self.listener.stop)
+        self.listener.monitor_stream(consumer)
+        self.assertTrue(acked.wait(5))
@@ -0,0 +1,126 @@
+"""Unittests for bulk system status queries & shared state managers"""
+import unittest
+from unittest import mock
+
+from enginecore.benchmark.standins import InMemoryGraph, InMemoryRedis
+from enginecore.benchmark.topology import SyntheticTopology
+from enginecore.state.api import IStateManager
+from enginecore.tools.tracer import TRACER
+from enginecore.tools.write_buffer import BufferedStore
+
+
+class SystemStatusTests(unittest.TestCase):
+    """Tests asset states being read from the store in one round trip"""
+
+    def setUp(self):
+        self.saved_store = IStateManager.redis_store
+        self.redis = InMemoryRedis()
+        IStateManager.redis_store = BufferedStore(self.redis)
+
+        self.redis.mset(
+            {
+                "1-ups:state": 1,
+                "1-ups:load": 2.5,
+                "1-ups:battery": 1000,
+                "2-pdu:state": 1,
+                "2-pdu:load": 2.5,
+                "21-outlet:state": 0,
+                "21-outlet:load": 0.0,
+            }
+        )
+
+    def tearDown(self):
+        IStateManager.redis_store = self.saved_store
+
+    def test_nested(self):
+        """States of nested children are read along with their parents"""
+        assets = {
+            1: {"key": 1, "type": "ups"},
+            2: {
+                "key": 2,
+                "type": "pdu",
+                "children": {21: {"key": 21, "type": "outlet"}},
+            },
+        }
+
+        calls = TRACER.calls[0]
+        # pylint: disable=protected-access
+        IStateManager._get_assets_states(assets, flatten=False)
+        self.assertEqual(1, TRACER.calls[0] - calls)
+
+        self.assertEqual(
+            (1, 2.5, 1000),
+            tuple(assets[1][k] for k in ("status", "load", "battery")),
+        )
+        self.assertEqual((1, 2.5), (assets[2]["status"], assets[2]["load"]))
+        self.assertEqual(0, assets[2]["children"][21]["status"])
+        self.assertNotIn("battery", assets[2])
+
+    def test_flat(self):
+        """Children listed by key are not traversed when status is flattened"""
+        assets = {
+            2: {"key": 2, "type": "pdu", "children": [21]},
+            21: {"key": 21, "type": "outlet"},
+        }
+
+        # pylint: disable=protected-access
+        IStateManager._get_assets_states(assets)
+        self.assertEqual([1, 0], [assets[k]["status"] for k in (2, 21)])
+        self.assertEqual(0.0, assets[21]["load"])
+        self.assertIsNone(IStateManager._get_assets_states({}))
+
+
+class StateManagerRegistryTests(unittest.TestCase):
+    """Tests state managers being instantiated once per asset"""
+
+    def setUp(self):
+        self.topology = SyntheticTopology(
+            num_ups=1, num_pdus=1, num_outlets=2, num_servers=1
+        )
+        self.graph = InMemoryGraph(self.topology)
+        self.graph.install()
+        IStateManager.clear_state_managers()
+
+        patcher = mock.patch("enginecore.state.api.server.libvirt")
+        self.libvirt = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        IStateManager.clear_state_managers()
+        self.graph.uninstall()
+
+    def test_load(self):
+        """State managers of all the assets are built with one query"""
+        calls = TRACER.calls[1]
+        num_managers = IStateManager.load_state_managers()
+
+        self.assertEqual(len(self.topology.assets), num_managers)
+        self.assertEqual(1, TRACER.calls[1] - calls)
+
+        # vm connection is made when the registry is built
+        lookup = self.libvirt.open.return_value.lookupByName
+        self.assertEqual(1, lookup.call_count)
+
+        server = next(a for a in self.topology.assets if a["type"] == "server")
+        state_manager = IStateManager.get_state_manager_by_key(str(server["key"]))
+        self.assertIs(
+            state_manager, IStateManager.get_state_manager_by_key(server["key"])
+        )
+        self.assertEqual(
+            self.topology.get_components(server["key"]),
+            state_manager.asset_info["children"],
+        )
+        self.assertEqual(1, TRACER.calls[1] - calls)
+
+    def test_lazy(self):
+        """State managers missing from the registry are built on demand"""
+        key = self.topology.assets[0]["key"]
+        state_manager = IStateManager.get_state_manager_by_key(key)
+        self.assertIs(state_manager, IStateManager.get_state_manager_by_key(key))
+
+        IStateManager.clear_state_managers()
+        self.assertIsNot(state_manager, IStateManager.get_state_manager_by_key(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
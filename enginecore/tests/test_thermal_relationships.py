@@ -0,0 +1,191 @@
+"""Unittests for the in-memory thermal relationships of a server"""
+import json
+import unittest
+from unittest import mock
+
+from enginecore.model.graph_reference import GraphReference
+from enginecore.state.sensor.thermal_relationships import (
+    ThermalModel,
+    ThermalRelationships,
+)
+
+
+def old_approx_value(model, current_value, inverse=False):
+    """Model lookup as it was done before the models were compiled"""
+    nbr_model_key = min(model, key=lambda x: abs(int(x) - current_value))
+    nbr_value = int(model[nbr_model_key])
+
+    multiplier = int(nbr_model_key if inverse else current_value)
+    divisor = int(current_value if inverse else nbr_model_key)
+
+    return int((nbr_value * multiplier) / int(divisor))
+
+
+class ThermalModelTests(unittest.TestCase):
+    """Tests compiled thermal models"""
+
+    def test_approx(self):
+        """Compiled model approximates values the same way as the plain mappings"""
+        for model in [
+            {"10": 1, "50": 5},
+            {"50": 5, "10": 1, "30": 2},
+            {"30": 2, "10": 1, "20": 4, "40": 3},
+        ]:
+            compiled = ThermalModel(json.dumps(model))
+            for value in range(1, 80):
+                for inverse in [False, True]:
+                    self.assertEqual(
+                        old_approx_value(model, value, inverse),
+                        compiled.approx(value, inverse),
+                        msg="{} {} {}".format(model, value, inverse),
+                    )
+
+    def test_empty(self):
+        """Empty models are rejected"""
+        with self.assertRaises(ValueError):
+            ThermalModel("{}")
+
+
+class ThermalRelationshipsTests(unittest.TestCase):
+    """Tests relationships being loaded once & refreshed on changes"""
+
+    def setUp(self):
+        th_rels = {
+            "sensor": [
+                {
+                    "source": "Ambient",
+                    "target": {"name": "CPU_TEMP"},
+                    "rel": {"event": "up", "rate": 5, "degrees": 1},
+                }
+            ],
+            "storage": [
+                {
+                    "source": "Ambient",
+                    "target": {"DID": 1, "temperature": 30},
+                    "hd_type": "PhysicalDrive",
+                    "controller": {"controllerNum": 0},
+                    "rel": {"event": "up", "rate": 5, "degrees": 2},
+                }
+            ],
+            "cpu": [
+                {
+                    "sensor": {"name": "CPU_TEMP"},
+                    "rel": {"model": '{"10": 1, "50": 5}'},
+                }
+            ],
+        }
+
+        patchers = [
+            mock.patch.object(
+                GraphReference, "get_thermal_relationships", return_value=th_rels
+            ),
+            mock.patch.object(GraphReference, "get_sensor_thermal_rel"),
+            mock.patch.object(GraphReference, "get_cpu_thermal_rel"),
+            mock.patch.object(GraphReference, "get_all_hd_thermal_elements"),
+            mock.patch.object(GraphReference, "set_hd_components_temperature"),
+        ]
+        (
+            self.get_all,
+            self.get_sensor_rel,
+            self.get_cpu_rel,
+            self.get_hd_temps,
+            self.set_hd_temps,
+        ) = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        self.th_rels = ThermalRelationships(1, graph_ref=mock.MagicMock())
+
+    def test_load_once(self):
+        """All the relationships are queried with the first lookup only"""
+        sensor_rel = self.th_rels.sensor_rel("Ambient", "CPU_TEMP", "up")
+        storage_rel = self.th_rels.storage_rel("Ambient", "PhysicalDrive", "0", 1, "up")
+
+        self.assertEqual(5, sensor_rel["rate"])
+        self.assertEqual(2, storage_rel["degrees"])
+        self.assertIsNone(self.th_rels.sensor_rel("Ambient", "CPU_TEMP", "down"))
+        self.assertEqual(4, self.th_rels.cpu_rel("CPU_TEMP")["model"].approx(40))
+
+        self.assertEqual([("CPU_TEMP", "up")], self.th_rels.sensor_targets("Ambient"))
+        self.assertEqual(
+            [("PhysicalDrive", 0, "1", "up")], self.th_rels.storage_targets("Ambient")
+        )
+        self.assertEqual(1, self.get_all.call_count)
+
+    def test_reload(self):
+        """Updated relationships are replaced, deleted ones are removed"""
+        self.get_sensor_rel.return_value = {"rel": {"event": "up", "rate": 1}}
+        rel = self.th_rels.reload_sensor_rel("Ambient", "CPU_TEMP", "up")
+        self.assertEqual(1, rel["rate"])
+        self.assertIs(rel, self.th_rels.sensor_rel("Ambient", "CPU_TEMP", "up"))
+
+        self.get_sensor_rel.return_value = None
+        self.assertIsNone(
+            self.th_rels.reload_storage_rel("Ambient", "PhysicalDrive", 0, 1, "up")
+        )
+        self.assertEqual([], self.th_rels.storage_targets("Ambient"))
+
+        self.get_cpu_rel.return_value = None
+        self.assertIsNone(self.th_rels.reload_cpu_rel("CPU_TEMP"))
+        self.assertIsNone(self.th_rels.cpu_rel("CPU_TEMP"))
+        self.assertEqual(1, self.get_all.call_count)
+
+    def test_storage_temperature(self):
+        """Storage temperatures are updated in memory & written in one query"""
+        hd_key = ("PhysicalDrive", 0, 1)
+        limit = {"lower": 21, "upper": 33}
+
+        self.assertEqual(
+            (True, 32), self.th_rels.add_to_storage_temperature(hd_key, 2, limit)
+        )
+        self.assertEqual(
+            (True, 33), self.th_rels.add_to_storage_temperature(hd_key, 2, limit)
+        )
+        self.assertEqual(
+            (False, 33), self.th_rels.add_to_storage_temperature(hd_key, 2, limit)
+        )
+        self.get_hd_temps.assert_not_called()
+        self.set_hd_temps.assert_not_called()
+
+        self.assertEqual(1, self.th_rels.flush_storage_temperatures())
+        self.assertEqual(
+            [
+                {
+                    "hd_type": "PhysicalDrive",
+                    "controller": 0,
+                    "target": 1,
+                    "temperature": 33,
+                }
+            ],
+            self.set_hd_temps.call_args[0][2],
+        )
+
+        # nothing changed since the last write
+        self.assertEqual(0, self.th_rels.flush_storage_temperatures())
+        self.assertEqual(1, self.set_hd_temps.call_count)
+
+    def test_new_storage_target(self):
+        """Temperatures of the components missing from memory are queried once"""
+        self.get_hd_temps.return_value = [
+            {
+                "controller": {"controllerNum": 0},
+                "component": {"serialNumber": "SV1", "temperature": 25},
+            },
+            {
+                "controller": {"controllerNum": 0},
+                "component": {"DID": 1, "temperature": 0},
+            },
+        ]
+
+        self.assertEqual(
+            [25, 30],
+            self.th_rels.storage_temperatures(
+                [("CacheVault", 0, "SV1"), ("PhysicalDrive", 0, 1)]
+            ),
+        )
+        self.th_rels.storage_temperatures([("CacheVault", "0", "SV1")])
+        self.assertEqual(1, self.get_hd_temps.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Unittests for the shared thermal impact scheduler"""
+import threading
+import unittest
+from unittest import mock
+
+from enginecore.state.sensor import thermal_scheduler
+from enginecore.state.sensor.thermal_scheduler import ThermalScheduler
+from enginecore.tools.clock import Clock, ClockMode
+
+
+class ThermalSchedulerTests(unittest.TestCase):
+    """Tests thermal relationships being updated by one thread at their rates"""
+
+    def setUp(self):
+        self.clock = Clock(ClockMode.discrete)
+        clock_patcher = mock.patch.object(thermal_scheduler, "CLOCK", self.clock)
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+
+        self.scheduler = ThermalScheduler()
+        self.updates = []
+
+    def _impact(self, name, rate, num_updates):
+        """Thermal impact recording time of its updates"""
+        for _ in range(num_updates):
+            self.updates.append((self.clock.time(), name))
+            yield rate
+
+    def _wait(self):
+        """Wait for the scheduler thread to run out of impacts"""
+        # pylint: disable=protected-access
+        thread = self.scheduler._thread
+        if thread is not None:
+            thread.join(5)
+        self.assertIsNone(self.scheduler._thread)
+
+    def test_rates(self):
+        """Impacts of many sources are updated by one thread in order of their rates"""
+        enabled = threading.Event()
+        enabled.set()
+        num_threads = threading.active_count()
+
+        with self.scheduler._step_lock:  # pylint: disable=protected-access
+            for owner in range(50):
+                self.scheduler.schedule(
+                    owner, self._impact(owner, owner + 1, 2), str(owner), enabled
+                )
+            self.assertEqual(num_threads + 1, threading.active_count())
+
+        self._wait()
+
+        start = min(t for t, _ in self.updates)
+        second_updates = sorted(self.updates)[50:]
+        self.assertEqual(
+            [(owner + 1, owner) for owner in range(50)],
+            [(t - start, owner) for t, owner in second_updates],
+        )
+        self.assertEqual(100, self.scheduler.stats["steps"])
+
+    def test_parked(self):
+        """Impacts of the disabled source are parked till it is resumed"""
+        enabled = threading.Event()
+
+        self.scheduler.schedule("a", self._impact("a", 5, 2), "a", enabled)
+        self.scheduler.schedule("a", self._impact("a", 5, 2), "a", enabled)
+
+        for _ in range(50):
+            if self.scheduler.stats["parked"] == 2:
+                break
+            threading.Event().wait(0.1)
+
+        self.assertEqual(2, self.scheduler.stats["parked"])
+        self.assertEqual([], self.updates)
+
+        enabled.set()
+        self.scheduler.resume("a")
+        self._wait()
+
+        self.assertEqual(4, len(self.updates))
+        self.assertEqual(0, self.scheduler.stats["parked"])
+
+    def test_cancel(self):
+        """Cancelled impacts are closed"""
+        enabled = threading.Event()
+        enabled.set()
+
+        with self.scheduler._step_lock:  # pylint: disable=protected-access
+            impact = self._impact("a", 5, 100)
+            self.scheduler.schedule("a", impact, "a", enabled)
+            self.scheduler.cancel("a")
+
+        self._wait()
+        self.assertIsNone(impact.gi_frame)
+        self.assertEqual({"impacts": 0, "parked": 0, "steps": 0}, self.scheduler.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""Unittests for the vectorized thermal solver"""
+import unittest
+
+from enginecore.state.sensor.thermal_relationships import ThermalModel
+from enginecore.state.sensor.thermal_solver import ThermalSolver, np
+
+
+class FakeThermalRelationships:
+    """Relationships as provided by ThermalRelationships.snapshot"""
+
+    def __init__(self, sensor=None, storage=None, cpu=None, hd_temps=None):
+        self.version = 1
+        self.sensor = sensor or {}
+        self.storage = storage or {}
+        self.cpu = cpu or {}
+        self.hd_temps = hd_temps or {}
+        self.hd_lookups = []
+
+    def snapshot(self):
+        return self.version, dict(self.sensor), dict(self.storage), dict(self.cpu)
+
+    def storage_temperatures(self, hd_keys):
+        self.hd_lookups.append(hd_keys)
+        return [self.hd_temps[hd_key] for hd_key in hd_keys]
+
+
+def rel(action="increase", event="up", degrees=2, rate=5, pause_at=30):
+    """Thermal relationship properties"""
+    return {
+        "action": action,
+        "event": event,
+        "degrees": degrees,
+        "rate": rate,
+        "pauseAt": pause_at,
+    }
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ThermalSolverTests(unittest.TestCase):
+    """Tests thermal relationships of a server being advanced in one step"""
+
+    def _values(self, solver, **values):
+        return np.array([values[s_name] for s_name in solver.sensor_names])
+
+    def test_sensor_heating(self):
+        """Targets are heated up to pauseAt at the relationship rate"""
+        th_rels = FakeThermalRelationships(
+            sensor={
+                ("PSU1", "CPU_TEMP", "up"): rel(),
+                ("PSU2", "CPU_TEMP", "up"): rel(degrees=1, rate=10),
+            }
+        )
+        solver = ThermalSolver(th_rels)
+        self.assertEqual(["CPU_TEMP", "PSU1", "PSU2"], solver.sensor_names)
+
+        values = self._values(solver, CPU_TEMP=21, PSU1=1, PSU2=1)
+        values, _ = solver.step(0, values, ambient=21)
+        self.assertEqual(24, values[0])
+        self.assertEqual(5, solver.next_due())
+
+        # not due yet
+        self.assertFalse(solver.sensors_due(2))
+
+        values, _ = solver.step(5, values, ambient=21)
+        self.assertEqual(26, values[0])
+
+        for now in range(10, 40, 5):
+            values, _ = solver.step(now, values, ambient=21)
+        self.assertEqual(30, values[0])
+
+    def test_sensor_cooling(self):
+        """Source going down cools targets, never below the room temperature"""
+        th_rels = FakeThermalRelationships(
+            sensor={
+                ("PSU1", "CPU_TEMP", "down"): rel(
+                    action="decrease", event="down", degrees=5, pause_at=10
+                ),
+            }
+        )
+        solver = ThermalSolver(th_rels)
+
+        values, _ = solver.step(0, self._values(solver, CPU_TEMP=30, PSU1=1), 21)
+        self.assertEqual(30, values[0])
+
+        values[1] = 0
+        for now in range(5, 20, 5):
+            values, _ = solver.step(now, values, ambient=21)
+        self.assertEqual(21, values[0])
+
+    def test_model(self):
+        """Runtime models are looked up with the source sensor value"""
+        th_rels = FakeThermalRelationships(
+            sensor={
+                ("FAN", "CPU_TEMP", "up"): dict(
+                    rel(action="decrease", degrees=None, pause_at=21),
+                    model=ThermalModel({"100": 1, "500": 5}),
+                ),
+            }
+        )
+        solver = ThermalSolver(th_rels)
+
+        values, _ = solver.step(0, self._values(solver, CPU_TEMP=40, FAN=40), 21)
+        self.assertEqual(36, values[0])
+
+    def test_storage(self):
+        """Storage components are heated up to pauseAt & cooled by 1°,
+        only the changed temperatures are returned"""
+        drive, cache_vault = ("PhysicalDrive", 0, "1"), ("CacheVault", 0, "SV1")
+        th_rels = FakeThermalRelationships(
+            storage={
+                ("PSU1", "PhysicalDrive", 0, "1", "up"): rel(degrees=3),
+                ("PSU1", "CacheVault", 0, "SV1", "up"): rel(action="decrease"),
+            },
+            hd_temps={drive: 28, cache_vault: 22},
+        )
+        solver = ThermalSolver(th_rels)
+        self.assertEqual([cache_vault, drive], solver.storage_keys)
+        self.assertTrue(solver.storage_due(0))
+
+        values = self._values(solver, PSU1=1)
+        _, hd_updates = solver.step(0, values, 21)
+        self.assertEqual({drive: 30, cache_vault: 21}, hd_updates)
+
+        _, hd_updates = solver.step(5, values, 21)
+        self.assertEqual({}, hd_updates)
+        self.assertEqual([21, 30], solver.storage_temperatures.tolist())
+
+        # temperatures are kept by the re-compiled solver, new targets looked up
+        th_rels.version += 1
+        th_rels.storage[("PSU1", "PhysicalDrive", 0, "2", "up")] = rel()
+        th_rels.hd_temps[("PhysicalDrive", 0, "2")] = 25
+        solver = ThermalSolver(th_rels, previous=solver)
+
+        self.assertEqual([21, 30, 25], solver.storage_temperatures.tolist())
+        self.assertEqual([[("PhysicalDrive", 0, "2")]], th_rels.hd_lookups[1:])
+
+    def test_cpu(self):
+        """Impact of the previous cpu load is replaced with the new one"""
+        th_rels = FakeThermalRelationships(
+            cpu={"CPU_TEMP": {"model": ThermalModel({"10": 1, "50": 5})}}
+        )
+        solver = ThermalSolver(th_rels)
+
+        values = self._values(solver, CPU_TEMP=22)
+        values, _ = solver.step(0, values, 21, cpu_load=40)
+        self.assertEqual(26, values[0])
+
+        # due every 5 seconds
+        values, _ = solver.step(1, values, 21, cpu_load=0)
+        self.assertEqual(26, values[0])
+
+        values, _ = solver.step(5, values, 21, cpu_load=10)
+        self.assertEqual(23, values[0])
+
+    def test_recompile(self):
+        """Schedule of the existing relationships is kept on relationship updates"""
+        th_rels = FakeThermalRelationships(sensor={("PSU1", "CPU_TEMP", "up"): rel()})
+        solver = ThermalSolver(th_rels)
+        solver.step(0, self._values(solver, CPU_TEMP=21, PSU1=1), 21)
+
+        th_rels.version += 1
+        th_rels.sensor[("PSU1", "CPU_TEMP", "up")] = rel(rate=1)
+        th_rels.sensor[("PSU1", "PSU_TEMP", "up")] = rel()
+        solver = ThermalSolver(th_rels, previous=solver)
+
+        self.assertEqual(2, solver.version)
+        self.assertEqual(2, solver.num_relationships)
+        # new relationship is due right away
+        self.assertTrue(solver.sensors_due(1))
+
+        solver.step(1, self._values(solver, CPU_TEMP=23, PSU1=1, PSU_TEMP=21), 21)
+        self.assertEqual(5, solver.next_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
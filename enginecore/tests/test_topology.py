@@ -0,0 +1,85 @@
+"""Unittests for the in-memory topology index"""
+
+import unittest
+from enginecore.state.engine.topology import TopologyIndex
+
+
+class TopologyIndexTests(unittest.TestCase):
+    """Tests topology lookups served by the index"""
+
+    def setUp(self):
+        # outlet(1) -> pdu(2) -> outlets(3, 4) -> server(5) (dual-psu)
+        assets = [
+            {"key": k, "type": t}
+            for k, t in [(5, "server"), (1, "outlet"), (2, "pdu"), (3, "outlet")]
+        ] + [{"key": 4, "type": "outlet"}]
+
+        self.index = TopologyIndex(
+            assets=assets,
+            power_links=[(2, 1), (3, 2), (4, 2), (5, 4), (5, 3)],
+            mains_outlets=[1],
+            oids=[
+                {
+                    "key": 2,
+                    "oid": "1.3.6.1.4.1.13742.4.1.2.2.1.3.1",
+                    "name": "OutletState",
+                    "specs": {"switchOn": 1, "switchOff": 0},
+                    "asset_key": 3,
+                }
+            ],
+        )
+
+    def test_affected_assets(self):
+        """Children & parents are looked up by asset key"""
+        self.assertEqual(((3, 4), (1,)), self.index.get_affected_assets(2))
+        self.assertEqual(((), (3, 4)), self.index.get_affected_assets(5))
+        self.assertEqual(((2,), ()), self.index.get_affected_assets(1))
+
+    def test_unknown_asset(self):
+        """Assets not present in the topology have no neighbours"""
+        self.assertEqual(((), ()), self.index.get_affected_assets(42))
+        self.assertIsNone(self.index.get_asset_type(42))
+
+    def test_assets_ordered(self):
+        """All assets are ordered by key"""
+        self.assertEqual((1, 2, 3, 4, 5), self.index.asset_keys)
+        self.assertEqual("server", self.index.get_asset_type(5))
+
+    def test_mains_powered(self):
+        """Wall-powered outlets are indexed"""
+        self.assertEqual((1,), self.index.mains_powered_outlets)
+
+    def test_oid_info(self):
+        """Power OID is resolved to the asset it controls"""
+        asset_key, oid_details = self.index.get_asset_oid_info(
+            2, "1.3.6.1.4.1.13742.4.1.2.2.1.3.1"
+        )
+        self.assertEqual(3, asset_key)
+        self.assertEqual("OutletState", oid_details["name"])
+        self.assertEqual(1, oid_details["specs"]["switchOn"])
+
+        self.assertEqual((None, None), self.index.get_asset_oid_info(2, "1.3.6"))
+
+    def test_version(self):
+        """Index carries its topology version"""
+        self.assertEqual(1, self.index.version)
+        self.assertEqual(3, TopologyIndex([], [], [], version=3).version)
+
+    def test_power_domains(self):
+        """Assets sharing no power path belong to different domains"""
+        index = TopologyIndex(
+            assets=[{"key": k, "type": "outlet"} for k in (1, 2, 3, 4, 5, 6)],
+            power_links=[(2, 1), (4, 3)],
+            mains_outlets=[1, 3],
+            component_links=[(5, 6)],
+        )
+
+        self.assertEqual(3, index.num_domains)
+        self.assertEqual(index.get_domain(1), index.get_domain(2))
+        self.assertNotEqual(index.get_domain(2), index.get_domain(4))
+        self.assertEqual(index.get_domain(5), index.get_domain(6))
+        self.assertEqual(1, self.index.num_domains)
+
+
+if __name__ == "__main__":
+    unittest.main()
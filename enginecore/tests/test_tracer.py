@@ -0,0 +1,152 @@
+"""Unittests for engine iteration tracing"""
+import threading
+import unittest
+
+from enginecore.state.engine import events
+from enginecore.state.engine.iteration import EngineIteration, ThermalIteration
+from enginecore.state.engine.iteration_consumer import EngineIterationConsumer
+from enginecore.tools.tracer import LatencyHistogram, Tracer
+
+
+class Outlet:
+    """Asset stand-in (traces only need asset key & type)"""
+
+    key = 1
+
+
+def ambient_iteration():
+    """Ambient update iteration with no thermal subscribers"""
+    return ThermalIteration(events.AmbientEvent(old_temp=21, new_temp=22))
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    """Tests latency summary"""
+
+    def test_percentiles(self):
+        """Percentiles are approximated with bucket bounds"""
+        hist = LatencyHistogram()
+        for latency in [0.0005] * 90 + [0.015] * 9 + [0.3]:
+            hist.add(latency)
+
+        summary = hist.to_dict()
+        self.assertEqual(100, summary["count"])
+        self.assertEqual(1, summary["p50"])
+        self.assertEqual(20, summary["p99"])
+        self.assertAlmostEqual(300, summary["max"])
+        self.assertEqual(1, summary["buckets"]["500"])
+
+    def test_empty(self):
+        """Empty histogram has no percentiles"""
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+
+class TracerTests(unittest.TestCase):
+    """Tests iteration traces"""
+
+    def setUp(self):
+        self.tracer = Tracer(max_traces=2)
+        self.addCleanup(setattr, EngineIteration, "tracer", EngineIteration.tracer)
+        EngineIteration.tracer = self.tracer
+
+    def test_hops(self):
+        """Hops are recorded in the trace & latency histograms"""
+        thermal_iter = ambient_iteration()
+        trace = thermal_iter.trace
+
+        trace.launched()
+        trace.launch_returned()
+        trace.hop_started()
+        trace.hop(Outlet(), "AmbientUpEvent", trace.launched_at)
+        trace.branch_point("fork", "thermal", 2)
+        self.tracer.complete_trace(trace)
+
+        stats = self.tracer.stats()
+        self.assertEqual(
+            ["Outlet:AmbientUpEvent", "iteration:ThermalIteration"],
+            list(stats["histograms"]),
+        )
+
+        trace_details = stats["traces"][0]
+        self.assertEqual("ThermalIteration", trace_details["iteration"])
+        self.assertEqual(1, trace_details["hops"][0]["key"])
+        self.assertEqual(2, trace_details["branches"][0]["num_branches"])
+
+    def test_disabled(self):
+        """No traces are created when tracer is disabled"""
+        self.tracer.enabled = False
+        self.assertIsNone(ambient_iteration().trace)
+
+    def test_hop_calls(self):
+        """Calls made while asset handles an event are counted in the hop"""
+        trace = ambient_iteration().trace
+
+        trace.hop_started()
+        self.tracer.redis_call()
+        self.tracer.redis_call()
+        self.tracer.neo4j_call()
+        trace.hop(Outlet(), "AmbientUpEvent")
+
+        # calls made outside of a hop are not attributed to the trace
+        self.tracer.redis_call()
+
+        self.assertEqual((2, 1), (trace.redis_calls, trace.neo4j_calls))
+        self.assertEqual((2, 1), trace.hops[0][-2:])
+        self.assertEqual(3, self.tracer.stats()["redis_calls"])
+
+    def test_concurrent_calls(self):
+        """Calls made by other threads are not counted in the hop"""
+        trace = ambient_iteration().trace
+        trace.hop_started()
+
+        other_thread = threading.Thread(
+            target=lambda: [self.tracer.redis_call() for _ in range(100)]
+        )
+        other_thread.start()
+        other_thread.join()
+
+        self.tracer.redis_call()
+        trace.hop(Outlet(), "AmbientUpEvent")
+
+        self.assertEqual(1, trace.redis_calls)
+        self.assertEqual(101, self.tracer.stats()["redis_calls"])
+
+    def test_stats_sources(self):
+        """Stats reported by other components are included"""
+        self.tracer.add_stats_source("queues", lambda: {"thermal": {"queued": 3}})
+        self.assertEqual(3, self.tracer.stats()["queues"]["thermal"]["queued"])
+
+
+class ConsumerTracingTests(unittest.TestCase):
+    """Tests iteration traces collected by the iteration consumer"""
+
+    def setUp(self):
+        self.tracer = Tracer()
+        self.addCleanup(setattr, EngineIteration, "tracer", EngineIteration.tracer)
+        EngineIteration.tracer = self.tracer
+
+    def test_iteration_traced(self):
+        """Thermal iteration is traced from launch till completion"""
+        consumer = EngineIterationConsumer("test_worker")
+        completed = threading.Event()
+
+        def on_launched(*_):
+            consumer.unfreeze_task_queue()
+            completed.set()
+
+        consumer.start(on_iteration_launched=on_launched)
+
+        thermal_iter = ambient_iteration()
+        consumer.queue_iteration(thermal_iter)
+        self.assertTrue(completed.wait(timeout=5))
+        consumer.stop()
+
+        self.assertIsNotNone(thermal_iter.trace.launched_at)
+        self.assertIsNotNone(thermal_iter.trace.completed_at)
+
+        stats = self.tracer.stats()
+        self.assertIn("iteration:ThermalIteration", stats["histograms"])
+        self.assertEqual(1, len(stats["traces"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
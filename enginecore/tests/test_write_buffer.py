@@ -0,0 +1,129 @@
+"""Unittests for write-behind buffering of state updates"""
+import threading
+import unittest
+
+from enginecore.benchmark.standins import InMemoryRedis
+from enginecore.state.engine import events
+from enginecore.state.engine.iteration import PowerIteration
+from enginecore.tools import write_buffer
+from enginecore.tools.tracer import TRACER
+from enginecore.tools.write_buffer import BufferedStore, WriteBuffer
+
+
+class BufferedStoreTests(unittest.TestCase):
+    """Tests store proxy routing writes to the active buffer"""
+
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.store = BufferedStore(self.redis)
+        self.buffer = WriteBuffer()
+        self.store.set("1-outlet:load", 1.0)
+
+    def tearDown(self):
+        write_buffer.activate(None)
+
+    def test_passthrough(self):
+        """Writes go straight to the store when no buffer is active"""
+        self.store.set("1-outlet:state", 0)
+        self.assertEqual(b"0", self.redis.get("1-outlet:state"))
+        self.assertEqual(0, len(self.buffer))
+
+    def test_reads_see_buffered(self):
+        """Buffered values are visible to the thread making updates only"""
+        write_buffer.activate(self.buffer)
+        self.store.set("1-outlet:load", 0.5)
+        self.store.mset({"2-outlet:load": 2})
+
+        self.assertEqual(b"0.5", self.store.get("1-outlet:load"))
+        self.assertEqual(
+            [b"0.5", None, b"2"],
+            self.store.mget(["1-outlet:load", "3-outlet:load", "2-outlet:load"]),
+        )
+
+        other_thread = []
+        reader = threading.Thread(
+            target=lambda: other_thread.append(self.store.get("1-outlet:load"))
+        )
+        reader.start()
+        reader.join()
+
+        self.assertEqual([b"1.0"], other_thread)
+        self.assertEqual(b"1.0", self.redis.get("1-outlet:load"))
+
+    def test_flush(self):
+        """Buffered values are written & messages are published in one round trip"""
+        write_buffer.activate(self.buffer)
+        self.store.set("1-outlet:load", 0.5)
+        self.store.set("1-outlet:load", 0.25)
+        self.store.publish("load-upd", "1")
+        write_buffer.activate(None)
+
+        self.assertEqual(0, self.redis.published["load-upd"])
+        self.assertEqual(2, len(self.buffer))
+
+        calls = TRACER.calls[0]
+        self.buffer.flush(self.store)
+
+        self.assertEqual(1, TRACER.calls[0] - calls)
+        self.assertEqual(0, len(self.buffer))
+        self.assertEqual(b"0.25", self.redis.get("1-outlet:load"))
+        self.assertEqual(1, self.redis.published["load-upd"])
+
+    def test_empty_flush(self):
+        """Nothing is sent to the store if nothing was buffered"""
+        self.buffer.flush(self.redis)
+        self.assertEqual(0, sum(self.redis.published.values()))
+
+
+class WriteBehindTests(unittest.TestCase):
+    """Tests iterations buffering state updates only when write-behind is enabled"""
+
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.store = BufferedStore(self.redis)
+        self.store.set("1-outlet:load", 1.0)
+
+    def tearDown(self):
+        write_buffer.activate(None)
+
+    def _iteration(self):
+        return PowerIteration(
+            events.AssetPowerEvent(asset=None, old_out_volt=120, new_out_volt=0)
+        )
+
+    def _read_concurrently(self):
+        other_thread = []
+        reader = threading.Thread(
+            target=lambda: other_thread.append(self.store.get("1-outlet:load"))
+        )
+        reader.start()
+        reader.join()
+        return other_thread[0]
+
+    def test_disabled_by_default(self):
+        """Concurrent readers see updates of the iteration in progress"""
+        iteration = self._iteration()
+        self.assertIsNone(iteration.write_buffer)
+
+        write_buffer.activate(iteration.write_buffer)
+        self.store.set("1-outlet:load", 0.5)
+
+        self.assertEqual(b"0.5", self._read_concurrently())
+
+    def test_enabled(self):
+        """Concurrent readers see updates once the iteration is flushed"""
+        PowerIteration.write_behind = True
+        self.addCleanup(delattr, PowerIteration, "write_behind")
+
+        iteration = self._iteration()
+        write_buffer.activate(iteration.write_buffer)
+        self.store.set("1-outlet:load", 0.5)
+        self.assertEqual(b"1.0", self._read_concurrently())
+
+        write_buffer.activate(None)
+        iteration.write_buffer.flush(self.store)
+        self.assertEqual(b"0.5", self._read_concurrently())
+
+
+if __name__ == "__main__":
+    unittest.main()